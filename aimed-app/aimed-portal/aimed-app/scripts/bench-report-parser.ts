@@ -0,0 +1,146 @@
+/**
+ * Throughput and parity benchmark for the report-parser section tokenizer.
+ *
+ * Run (from aimed-app/):
+ *   python ../tools/bench_section_grammar.py generate ../corpus.jsonl
+ *   npx tsx scripts/bench-report-parser.ts ../corpus.jsonl ../ts-spans.ndjson
+ *
+ * Writes tokenizeReport() spans as NDJSON for the cross-language diff:
+ *   python ../tools/bench_section_grammar.py compare ../corpus.jsonl ../py-spans.ndjson ../ts-spans.ndjson
+ */
+import { readFileSync, writeFileSync } from "fs";
+import { parseReport, tokenizeReport } from "../src/lib/report-parser";
+import type { ParsedReport, ReportSection } from "../src/types/aimed";
+
+// ── Previous implementation (baseline) ──
+
+const LEGACY_STANDARD = ["ANAMNEZA", "STATUS", "DIJAGNOZA", "TERAPIJA", "PREPORUKE"];
+const LEGACY_FILTERED = ["PODACI O PACIJENTU", "DATUM PREGLEDA", "ZAKLJUČAK"];
+
+function legacyNormalizeHeader(header: string): string {
+  const cleaned = header.replace(/[\s:./\-]+$/g, "").trim();
+  if (cleaned.includes("/")) {
+    const first = cleaned.split("/")[0].trim();
+    if (LEGACY_STANDARD.includes(first)) return first;
+  }
+  return cleaned;
+}
+
+function legacyIsSectionHeader(line: string): boolean {
+  if (line.length < 3) return false;
+  if (!/[A-ZČĆŠĐŽ]/.test(line)) return false;
+  return line === line.toUpperCase() && /^[A-ZČĆŠĐŽ0-9\s/\-.:]+$/.test(line);
+}
+
+function legacyParseReport(text: string): ParsedReport {
+  const sections: ReportSection[] = [];
+  const warnings: string[] = [];
+  let current: ReportSection | null = null;
+
+  for (const line of text.split("\n")) {
+    const trimmed = line.trim();
+    if (!trimmed) {
+      if (current && current.content) current.content += "\n";
+      continue;
+    }
+    if (trimmed.startsWith("[NAPOMENA")) {
+      warnings.push(trimmed);
+      continue;
+    }
+    if (legacyIsSectionHeader(trimmed)) {
+      if (current) {
+        current.content = current.content.trim();
+        sections.push(current);
+      }
+      const normalized = legacyNormalizeHeader(trimmed);
+      current = LEGACY_FILTERED.includes(normalized) ? null : { title: normalized, content: "" };
+    } else if (current) {
+      current.content += (current.content ? "\n" : "") + trimmed;
+    }
+  }
+  if (current) {
+    current.content = current.content.trim();
+    sections.push(current);
+  }
+  return { sections, warnings, rawText: text };
+}
+
+// ── Benchmark ──
+
+interface CorpusEntry {
+  id: string;
+  report_text: string;
+}
+
+function timeBest(corpus: CorpusEntry[], fn: (text: string) => unknown, rounds = 5): number {
+  let best = Infinity;
+  for (let r = 0; r < rounds; r++) {
+    const start = performance.now();
+    for (const entry of corpus) fn(entry.report_text);
+    best = Math.min(best, performance.now() - start);
+  }
+  return best;
+}
+
+function main() {
+  const [corpusPath, spansPath] = process.argv.slice(2);
+  if (!corpusPath) {
+    console.error("Usage: npx tsx scripts/bench-report-parser.ts <corpus.jsonl> [spans.ndjson]");
+    process.exit(1);
+  }
+
+  const corpus: CorpusEntry[] = readFileSync(corpusPath, "utf-8")
+    .split("\n")
+    .filter(Boolean)
+    .map((line) => JSON.parse(line));
+  const totalBytes = corpus.reduce((n, e) => n + Buffer.byteLength(e.report_text), 0);
+
+  const mismatches = corpus.filter(
+    (e) =>
+      JSON.stringify(legacyParseReport(e.report_text)) !== JSON.stringify(parseReport(e.report_text))
+  );
+
+  // Warm up the JIT before timing
+  timeBest(corpus, legacyParseReport, 2);
+  timeBest(corpus, parseReport, 2);
+
+  const runs: [string, (text: string) => unknown][] = [
+    ["legacy", legacyParseReport],
+    ["tokenize", tokenizeReport],
+    ["grammar", parseReport],
+  ];
+  for (const [name, fn] of runs) {
+    const ms = timeBest(corpus, fn);
+    console.log(
+      `${name.padEnd(8)} ${Math.round(corpus.length / (ms / 1000)).toString().padStart(10)} reports/s  ` +
+        `${(totalBytes / (ms / 1000) / 1e6).toFixed(1).padStart(7)} MB/s  (${ms.toFixed(1)} ms)`
+    );
+  }
+
+  console.log(`Output mismatches vs legacy: ${mismatches.length}`);
+  mismatches.slice(0, 10).forEach((e) => console.log(`  ${e.id}`));
+
+  if (spansPath) {
+    const lines = corpus.map((e) => {
+      const tokens = tokenizeReport(e.report_text);
+      return JSON.stringify({
+        id: e.id,
+        sections: tokens.sections.map((s) => [
+          s.title,
+          s.filtered,
+          s.headerStart,
+          s.headerEnd,
+          s.contentStart,
+          s.contentEnd,
+        ]),
+        warnings: tokens.warnings.map((w) => [w.start, w.end]),
+      });
+    });
+    writeFileSync(spansPath, lines.join("\n") + "\n");
+    console.log(`Wrote spans for ${corpus.length} reports to ${spansPath}`);
+  }
+
+  process.exit(mismatches.length === 0 ? 0 : 1);
+}
+
+main();
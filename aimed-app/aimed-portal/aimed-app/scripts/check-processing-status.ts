@@ -0,0 +1,88 @@
+/**
+ * Check for the processing copy shown while a dictation is submitted, for
+ * both submit paths: sync (job mode off: uploading → processing) and async
+ * jobs (uploading → n8n stages, with a queue position in between).
+ *
+ * Run (from aimed-app/):
+ *   npx tsx scripts/check-processing-status.ts
+ */
+import type { ApiState } from "../src/hooks/use-aimed-api";
+import { processingLabel } from "../src/lib/processing-status";
+import type { QueueStatus } from "../src/types/aimed";
+
+interface Case {
+  name: string;
+  isUpdate: boolean;
+  steps: [ApiState, QueueStatus | null, string][]; // state, queue, expected label
+}
+
+const QUEUED: QueueStatus = { position: 2, estimatedWaitSeconds: 90 };
+
+const CASES: Case[] = [
+  {
+    name: "sync, new report",
+    isUpdate: false,
+    steps: [
+      ["uploading", null, "Šaljem snimak..."],
+      ["processing", null, "Obrađujem vaš nalaz..."],
+    ],
+  },
+  {
+    name: "sync, update",
+    isUpdate: true,
+    steps: [
+      ["uploading", null, "Šaljem snimak..."],
+      ["processing", null, "Ažuriram nalaz..."],
+    ],
+  },
+  {
+    name: "job, new report",
+    isUpdate: false,
+    steps: [
+      ["uploading", null, "Šaljem snimak..."],
+      ["uploaded", QUEUED, "Čekam na obradu — 2. u redu, oko 2 min..."],
+      ["uploaded", null, "Transkribujem diktat..."],
+      ["transcribed", null, "Strukturiram nalaz..."],
+      ["structured", null, "Provjeravam nalaz..."],
+      ["validated", null, "Završavam..."],
+    ],
+  },
+  {
+    name: "job, update",
+    isUpdate: true,
+    steps: [
+      ["uploading", null, "Šaljem snimak..."],
+      ["uploaded", QUEUED, "Čekam na obradu — 2. u redu, oko 2 min..."],
+      ["uploaded", null, "Ažuriram nalaz..."],
+      ["transcribed", null, "Ažuriram nalaz..."],
+      ["structured", null, "Ažuriram nalaz..."],
+      ["validated", null, "Ažuriram nalaz..."],
+    ],
+  },
+  {
+    // A job lost by the proxy falls back to the sync submit mid-way
+    name: "job falling back to sync",
+    isUpdate: false,
+    steps: [
+      ["uploaded", null, "Transkribujem diktat..."],
+      ["processing", null, "Obrađujem vaš nalaz..."],
+    ],
+  },
+];
+
+function main() {
+  let failures = 0;
+  for (const c of CASES) {
+    for (const [state, queue, label] of c.steps) {
+      const got = processingLabel(state, c.isUpdate, queue);
+      const ok = got === label;
+      if (!ok) failures++;
+      console.log(`  ${ok ? "OK  " : "FAIL"} ${c.name}: ${state}${queue ? " (queued)" : ""}`);
+      if (!ok) console.log(`       got  ${got}\n       want ${label}`);
+    }
+  }
+  console.log(failures === 0 ? "all labels match" : `${failures} differ`);
+  process.exit(failures === 0 ? 0 : 1);
+}
+
+main();
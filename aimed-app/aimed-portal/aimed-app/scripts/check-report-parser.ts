@@ -0,0 +1,42 @@
+/**
+ * Regression check for parseReport() over the fixed sample reports in
+ * tools/fixtures/section_reports.jsonl (expected output recorded from the
+ * parser that predates section-grammar.json). tools/test_section_grammar.py
+ * checks the Python validator and parser against the same file.
+ *
+ * Run (from aimed-app/):
+ *   npx tsx scripts/check-report-parser.ts [fixtures.jsonl]
+ */
+import { readFileSync } from "fs";
+import { parseReport } from "../src/lib/report-parser";
+import type { ReportSection } from "../src/types/aimed";
+
+interface Fixture {
+  id: string;
+  report_text: string;
+  parser: { sections: ReportSection[]; warnings: string[] };
+}
+
+function main() {
+  const path = process.argv[2] ?? "../tools/fixtures/section_reports.jsonl";
+  const fixtures: Fixture[] = readFileSync(path, "utf-8")
+    .split("\n")
+    .filter(Boolean)
+    .map((line) => JSON.parse(line));
+
+  let failures = 0;
+  for (const fixture of fixtures) {
+    const { sections, warnings, rawText } = parseReport(fixture.report_text);
+    const got = JSON.stringify({ sections, warnings });
+    const want = JSON.stringify(fixture.parser);
+    const ok = got === want && rawText === fixture.report_text;
+    if (!ok) failures++;
+    console.log(`  ${ok ? "OK  " : "FAIL"} ${fixture.id}`);
+    if (!ok) console.log(`       got  ${got}\n       want ${want}`);
+  }
+
+  console.log(`${fixtures.length} sample reports: ${failures === 0 ? "all match" : `${failures} differ`}`);
+  process.exit(failures === 0 ? 0 : 1);
+}
+
+main();
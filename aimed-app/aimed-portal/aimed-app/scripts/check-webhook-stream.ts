@@ -0,0 +1,101 @@
+/**
+ * Check for the streaming proxy's failure paths (src/lib/webhook-stream.ts).
+ * /api/submit waits for `uploaded` before it answers, so a webhook URL that
+ * cannot be used must settle both promises instead of throwing or hanging:
+ * invalid and missing URLs, an unreachable host, and a local stub webhook
+ * as the working baseline.
+ *
+ * Run (from aimed-app/):
+ *   npx tsx scripts/check-webhook-stream.ts
+ */
+import http from "node:http";
+import type { AddressInfo } from "node:net";
+import { streamToWebhook } from "../src/lib/webhook-stream";
+
+const BOUNDARY = "check-webhook-stream";
+const BODY = Buffer.from(
+  `--${BOUNDARY}\r\nContent-Disposition: form-data; name="audio"; filename="a.webm"\r\n` +
+    `Content-Type: audio/webm\r\n\r\n${"x".repeat(1024)}\r\n--${BOUNDARY}--\r\n`
+);
+// Longer than any case should take; a case that reaches it is the hang
+const SETTLE_MS = 5_000;
+
+interface Outcome {
+  threw: string | null;
+  uploaded: "resolved" | "rejected" | "pending";
+  status: number | "pending" | null;
+  bodyCancelled: boolean;
+}
+
+function within<T>(promise: Promise<T>, fallback: T): Promise<T> {
+  return Promise.race([promise, new Promise<T>((resolve) => setTimeout(() => resolve(fallback), SETTLE_MS))]);
+}
+
+async function forward(url: string): Promise<Outcome> {
+  let bodyCancelled = false;
+  const body = new ReadableStream<Uint8Array>({
+    start(controller) {
+      controller.enqueue(new Uint8Array(BODY));
+      controller.close();
+    },
+    cancel() {
+      bodyCancelled = true;
+    },
+  });
+
+  let streamed;
+  try {
+    streamed = streamToWebhook(
+      url,
+      { body, contentType: `multipart/form-data; boundary=${BOUNDARY}`, contentLength: BODY.length },
+      undefined,
+      SETTLE_MS
+    );
+  } catch (err) {
+    return { threw: (err as Error).name, uploaded: "pending", status: null, bodyCancelled };
+  }
+
+  const uploaded = await within(
+    streamed.uploaded.then(
+      () => "resolved" as const,
+      () => "rejected" as const
+    ),
+    "pending" as const
+  );
+  const result = await within(streamed.result, null);
+  return { threw: null, uploaded, status: result ? result.status : "pending", bodyCancelled };
+}
+
+async function main() {
+  const stub = http.createServer((req, res) => {
+    req.resume();
+    req.on("end", () => {
+      res.writeHead(200, { "Content-Type": "application/json" });
+      res.end(JSON.stringify([{ success: true, report_text: "ANAMNEZA\nUredno." }]));
+    });
+  });
+  await new Promise<void>((resolve) => stub.listen(0, "127.0.0.1", resolve));
+  const stubUrl = `http://127.0.0.1:${(stub.address() as AddressInfo).port}/webhook/AIMED`;
+
+  const cases: [string, string, Partial<Outcome>][] = [
+    ["invalid URL", "not a url", { threw: null, uploaded: "rejected", status: 502, bodyCancelled: true }],
+    ["missing URL", "", { threw: null, uploaded: "rejected", status: 502, bodyCancelled: true }],
+    ["unreachable host", "http://127.0.0.1:9/webhook/AIMED", { threw: null, uploaded: "rejected", status: 502 }],
+    ["stub webhook", stubUrl, { threw: null, uploaded: "resolved", status: 200 }],
+  ];
+
+  let failures = 0;
+  for (const [name, url, want] of cases) {
+    const got = await forward(url);
+    const diff = Object.entries(want).filter(([key, value]) => got[key as keyof Outcome] !== value);
+    if (diff.length > 0) failures++;
+    console.log(`  ${diff.length === 0 ? "OK  " : "FAIL"} ${name}`);
+    if (diff.length > 0) console.log(`       got  ${JSON.stringify(got)}\n       want ${JSON.stringify(want)}`);
+  }
+
+  stub.close();
+  console.log(failures === 0 ? "all forwards settle" : `${failures} differ`);
+  process.exit(failures === 0 ? 0 : 1);
+}
+
+main();
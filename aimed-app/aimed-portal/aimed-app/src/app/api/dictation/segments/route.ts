@@ -0,0 +1,64 @@
+import { after, NextRequest, NextResponse } from "next/server";
+import { createClient } from "@/lib/supabase/server";
+import { addSegment, isStreamingEnabled } from "@/lib/dictation-sessions";
+
+// One standalone segment of a dictation that is still being recorded.
+// Answers as soon as the segment is registered; STT runs in the background
+// and /api/submit waits for it when the final segment arrives.
+export async function POST(request: NextRequest) {
+  if (!isStreamingEnabled()) {
+    return NextResponse.json(
+      { success: false, error: "Streaming not configured" },
+      { status: 503 }
+    );
+  }
+
+  const supabase = await createClient();
+  const {
+    data: { user },
+    error: authError,
+  } = await supabase.auth.getUser();
+
+  if (authError || !user) {
+    return NextResponse.json(
+      { success: false, error: "Unauthorized" },
+      { status: 401 }
+    );
+  }
+
+  const {
+    data: { session },
+  } = await supabase.auth.getSession();
+
+  let formData: FormData;
+  try {
+    formData = await request.formData();
+  } catch {
+    return NextResponse.json({ success: false, error: "Neispravan zahtjev" }, { status: 400 });
+  }
+
+  const sessionId = formData.get("session_id");
+  const index = Number(formData.get("index"));
+  const startSeconds = Number(formData.get("start"));
+  const audio = formData.get("audio");
+
+  if (
+    typeof sessionId !== "string" ||
+    !Number.isInteger(index) ||
+    index < 0 ||
+    !Number.isFinite(startSeconds) ||
+    !(audio instanceof Blob)
+  ) {
+    return NextResponse.json({ success: false, error: "Neispravan segment" }, { status: 400 });
+  }
+
+  const transcript = addSegment(sessionId, user.id, index, startSeconds, audio, session?.access_token);
+  if (!transcript) {
+    return NextResponse.json({ success: false, error: "Sesija nije dostupna" }, { status: 409 });
+  }
+
+  // Keep the function alive until the segment is transcribed
+  after(() => transcript.then(() => undefined));
+
+  return NextResponse.json({ success: true, index }, { status: 202 });
+}
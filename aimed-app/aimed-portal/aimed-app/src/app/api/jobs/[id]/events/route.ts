@@ -0,0 +1,69 @@
+import { NextResponse } from "next/server";
+import { createClient } from "@/lib/supabase/server";
+import { subscribeJob } from "@/lib/transcription-jobs";
+import type { JobSnapshot } from "@/types/aimed";
+
+const HEARTBEAT_MS = 15_000;
+
+// Server-Sent Events: one `stage` event per pipeline stage, then `done` with the result
+export async function GET(request: Request, { params }: { params: Promise<{ id: string }> }) {
+  const supabase = await createClient();
+  const {
+    data: { user },
+  } = await supabase.auth.getUser();
+
+  if (!user) {
+    return NextResponse.json({ error: "Unauthorized" }, { status: 401 });
+  }
+
+  const { id } = await params;
+  const encoder = new TextEncoder();
+  let cleanup = () => {};
+
+  const stream = new ReadableStream<Uint8Array>({
+    start(controller) {
+      let closed = false;
+      const close = () => {
+        if (closed) return;
+        closed = true;
+        cleanup();
+        controller.close();
+      };
+      const send = (snapshot: JobSnapshot) => {
+        if (closed) return;
+        const event = snapshot.stage === "done" ? "done" : "stage";
+        controller.enqueue(encoder.encode(`event: ${event}\ndata: ${JSON.stringify(snapshot)}\n\n`));
+        if (event === "done") queueMicrotask(close);
+      };
+
+      const unsubscribe = subscribeJob(id, user.id, send);
+      if (!unsubscribe) {
+        controller.enqueue(encoder.encode(`event: missing\ndata: {}\n\n`));
+        closed = true;
+        controller.close();
+        return;
+      }
+
+      // Comment lines keep idle proxies from closing the connection mid-transcription
+      const heartbeat = setInterval(() => {
+        if (!closed) controller.enqueue(encoder.encode(`: ping\n\n`));
+      }, HEARTBEAT_MS);
+      cleanup = () => {
+        clearInterval(heartbeat);
+        unsubscribe();
+      };
+      request.signal.addEventListener("abort", close);
+    },
+    cancel() {
+      cleanup();
+    },
+  });
+
+  return new Response(stream, {
+    headers: {
+      "Content-Type": "text/event-stream; charset=utf-8",
+      "Cache-Control": "no-store, no-transform",
+      "X-Accel-Buffering": "no",
+    },
+  });
+}
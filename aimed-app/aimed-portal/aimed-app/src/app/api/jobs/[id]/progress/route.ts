@@ -0,0 +1,27 @@
+import { NextRequest, NextResponse } from "next/server";
+import { JOB_STAGES, reportStage } from "@/lib/transcription-jobs";
+import type { JobStage } from "@/types/aimed";
+
+// Stage callbacks from the n8n workflow, authenticated by the per-job token
+// the proxy passed along as the `progress_token` form field
+export async function POST(request: NextRequest, { params }: { params: Promise<{ id: string }> }) {
+  const { id } = await params;
+  const token = request.headers.get("authorization")?.replace(/^Bearer\s+/i, "") ?? "";
+
+  let stage: unknown;
+  try {
+    ({ stage } = await request.json());
+  } catch {
+    return NextResponse.json({ error: "Invalid body" }, { status: 400 });
+  }
+
+  if (typeof stage !== "string" || !JOB_STAGES.includes(stage as JobStage)) {
+    return NextResponse.json({ error: "Unknown stage" }, { status: 400 });
+  }
+
+  if (!reportStage(id, token, stage as JobStage)) {
+    return NextResponse.json({ error: "Unknown job" }, { status: 404 });
+  }
+
+  return NextResponse.json({ ok: true });
+}
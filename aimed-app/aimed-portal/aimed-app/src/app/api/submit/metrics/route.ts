@@ -0,0 +1,28 @@
+import { NextRequest, NextResponse } from "next/server";
+import { createClient } from "@/lib/supabase/server";
+import { submitCacheMetrics } from "@/lib/submit-cache";
+import { governorMetrics } from "@/lib/submit-governor";
+
+const METRICS_TOKEN = process.env.SUBMIT_METRICS_TOKEN;
+
+// Per-instance idempotency cache and admission queue counters for /api/submit.
+// Readable by a signed-in user, or by a scraper holding SUBMIT_METRICS_TOKEN.
+export async function GET(request: NextRequest) {
+  const authorization = request.headers.get("authorization");
+  const tokenOk = !!METRICS_TOKEN && authorization === `Bearer ${METRICS_TOKEN}`;
+
+  if (!tokenOk) {
+    const supabase = await createClient();
+    const {
+      data: { user },
+    } = await supabase.auth.getUser();
+
+    if (!user) {
+      return NextResponse.json({ error: "Unauthorized" }, { status: 401 });
+    }
+  }
+
+  return NextResponse.json({ ...submitCacheMetrics(), governor: governorMetrics() }, {
+    headers: { "Cache-Control": "no-store" },
+  });
+}
@@ -1,8 +1,230 @@
-import { NextRequest, NextResponse } from "next/server";
+import { after, NextRequest, NextResponse } from "next/server";
 import { createClient } from "@/lib/supabase/server";
+import { dedupeSubmit, recordHashMismatch, type SubmitResult } from "@/lib/submit-cache";
+import { completeJob, createJob, setJobQueue } from "@/lib/transcription-jobs";
+import { admit } from "@/lib/submit-governor";
+import { finishSession } from "@/lib/dictation-sessions";
+import {
+  CACHE_STATUS_HEADER,
+  CONTENT_HASH_HEADER,
+  DICTATION_SESSION_HEADER,
+  FINGERPRINT_FIELDS,
+  IDEMPOTENCY_KEY_HEADER,
+  fingerprintSubmission,
+  isValidIdempotencyKey,
+  type FingerprintFields,
+} from "@/lib/submit-fingerprint";
+import {
+  STREAMING_PROXY_ENABLED,
+  normalizeWebhookResponse,
+  streamToWebhook,
+} from "@/lib/webhook-stream";
+import type { QueueStatus } from "@/types/aimed";
 
 const WEBHOOK_URL = process.env.AIMED_Transcribe_WEBHOOK_URL;
 const TIMEOUT_MS = 60_000;
+// Async jobs are not bound by the browser's request timeout; long dictations
+// (up to 10 min of audio) need several minutes of STT + agent time
+const JOB_TIMEOUT_MS = Number(process.env.AIMED_JOB_TIMEOUT_SECONDS ?? 900) * 1000;
+// Longest wait for a free n8n slot (lib/submit-governor.ts). Requests the
+// browser is waiting on must leave room for the pipeline in its 60 s timeout.
+const SYNC_QUEUE_WAIT_MS = 15_000;
+const JOB_QUEUE_WAIT_MS = Number(process.env.AIMED_QUEUE_MAX_WAIT_SECONDS ?? 180) * 1000;
+// Origin n8n uses for progress callbacks, when it differs from the browser's
+const CALLBACK_ORIGIN = process.env.AIMED_JOB_CALLBACK_ORIGIN;
+
+const CONFLICT_RESULT: SubmitResult = {
+  status: 422,
+  body: { success: false, error: "Idempotency-Key je već iskorišten za drugi snimak" },
+};
+
+// The streamed segments could not be stitched; the client resends the full recording
+const DICTATION_UNAVAILABLE_STATUS = 409;
+const DICTATION_UNAVAILABLE_RESULT: SubmitResult = {
+  status: DICTATION_UNAVAILABLE_STATUS,
+  body: { success: false, error: "DICTATION_SESSION_UNAVAILABLE" },
+};
+
+function busyResult(retryAfterSeconds: number): SubmitResult {
+  return {
+    status: 503,
+    body: { success: false, error: "Sistem je trenutno zauzet", retry_after: retryAfterSeconds },
+  };
+}
+
+function retryAfterHeader(result: SubmitResult): Record<string, string> {
+  const retryAfter = result.body.retry_after;
+  return typeof retryAfter === "number" ? { "Retry-After": String(retryAfter) } : {};
+}
+
+/**
+ * Runs `call` in one of the doctor's n8n slots. `onQueue` follows the queue
+ * position while waiting and gets null once the call starts.
+ */
+async function governed(
+  doctor: string,
+  maxWaitMs: number,
+  onQueue: ((queue: QueueStatus | null) => void) | undefined,
+  call: () => Promise<SubmitResult>
+): Promise<SubmitResult> {
+  const admission = await admit(doctor, maxWaitMs, onQueue);
+  if (admission.kind === "rejected") return busyResult(admission.retryAfterSeconds);
+  onQueue?.(null);
+  try {
+    return await call();
+  } finally {
+    admission.release();
+  }
+}
+
+async function forwardToWebhook(
+  url: string,
+  formData: FormData,
+  accessToken: string | undefined,
+  timeoutMs: number = TIMEOUT_MS
+): Promise<SubmitResult> {
+  try {
+    const controller = new AbortController();
+    const timeout = setTimeout(() => controller.abort(), timeoutMs);
+
+    const headers: HeadersInit = {};
+    if (accessToken) {
+      headers["Authorization"] = `Bearer ${accessToken}`;
+    }
+
+    const response = await fetch(url, {
+      method: "POST",
+      body: formData,
+      headers,
+      signal: controller.signal,
+    });
+
+    clearTimeout(timeout);
+
+    // Error statuses are sanitized without reading n8n's body
+    const data = response.ok ? await response.json() : null;
+    return normalizeWebhookResponse(response.status, data);
+  } catch (err) {
+    if (err instanceof DOMException && err.name === "AbortError") {
+      return { status: 504, body: { success: false, error: "Timeout" } };
+    }
+
+    return {
+      status: 502,
+      body: { success: false, error: "Greška pri komunikaciji sa serverom" },
+    };
+  }
+}
+
+function idempotencyKeyOf(request: NextRequest): string | null {
+  const headerKey = request.headers.get(IDEMPOTENCY_KEY_HEADER);
+  return isValidIdempotencyKey(headerKey) ? headerKey : null;
+}
+
+function acceptedResponse(jobId: string): NextResponse {
+  const statusUrl = `/api/jobs/${jobId}`;
+  return NextResponse.json(
+    { job_id: jobId, status_url: statusUrl, events_url: `${statusUrl}/events` },
+    { status: 202, headers: { Location: statusUrl } }
+  );
+}
+
+/**
+ * Streaming path: the body is never parsed here, so there is no server-side
+ * content hash. Deduplication uses the client's fingerprint, else the
+ * Idempotency-Key alone; a request with neither is always forwarded.
+ */
+async function streamSubmit(
+  request: NextRequest,
+  webhookUrl: string,
+  body: ReadableStream<Uint8Array>,
+  contentLength: number,
+  userId: string,
+  accessToken: string | undefined
+): Promise<NextResponse> {
+  const idempotencyKey = idempotencyKeyOf(request);
+  const clientHash = request.headers.get(CONTENT_HASH_HEADER);
+  const contentKey =
+    clientHash && /^[0-9a-f]{64}$/.test(clientHash)
+      ? clientHash
+      : idempotencyKey
+        ? `key:${idempotencyKey}`
+        : `once:${crypto.randomUUID()}`;
+
+  const isAsync = request.headers.get("prefer")?.includes("respond-async") ?? false;
+  const job = isAsync ? createJob(userId) : null;
+  const extraFields: Record<string, string> = {};
+  if (job) {
+    const origin = CALLBACK_ORIGIN ?? request.nextUrl.origin;
+    extraFields.job_id = job.id;
+    extraFields.progress_url = `${origin}/api/jobs/${job.id}/progress`;
+    extraFields.progress_token = job.token;
+  }
+
+  // Settles with the upload once it is piped to n8n, or null when no slot
+  // freed up. The browser waits for the 202 here, so the short queue bound
+  // applies in both modes.
+  let markStarted: (uploaded: Promise<void> | null) => void = () => {};
+  const started = new Promise<Promise<void> | null>((resolve) => {
+    markStarted = resolve;
+  });
+  const forwarding = { called: false };
+  const onQueue = job ? (queue: QueueStatus | null) => setJobQueue(job.id, queue) : undefined;
+  const outcome = dedupeSubmit(userId, contentKey, idempotencyKey, async () => {
+    forwarding.called = true;
+    try {
+      return await governed(userId, SYNC_QUEUE_WAIT_MS, onQueue, async () => {
+        const streamed = streamToWebhook(
+          webhookUrl,
+          { body, contentType: request.headers.get("content-type") ?? "", contentLength, extraFields },
+          accessToken,
+          job ? JOB_TIMEOUT_MS : TIMEOUT_MS
+        );
+        markStarted(streamed.uploaded);
+        return streamed.result;
+      });
+    } finally {
+      // Also when admission or the forward throws, or `await started` below
+      // never settles; a no-op once the upload has started
+      markStarted(null);
+    }
+  });
+  // dedupeSubmit calls forward synchronously on a miss; hits, in-flight joins
+  // and conflicts never read the body
+  const uploaded = forwarding.called ? await started : null;
+  if (!uploaded) {
+    body.cancel().catch(() => {});
+  }
+
+  if (job) {
+    // Answer once n8n has the whole upload; the pipeline result arrives later
+    if (uploaded) {
+      try {
+        await uploaded;
+      } catch {
+        const failed = await outcome;
+        return NextResponse.json(
+          failed.kind === "conflict" ? CONFLICT_RESULT.body : failed.result.body,
+          { status: failed.kind === "conflict" ? CONFLICT_RESULT.status : failed.result.status }
+        );
+      }
+    }
+    after(async () => {
+      const settled = await outcome;
+      completeJob(job.id, settled.kind === "conflict" ? CONFLICT_RESULT : settled.result);
+    });
+    return acceptedResponse(job.id);
+  }
+
+  const settled = await outcome;
+  if (settled.kind === "conflict") {
+    return NextResponse.json(CONFLICT_RESULT.body, { status: CONFLICT_RESULT.status });
+  }
+  return NextResponse.json(settled.result.body, {
+    status: settled.result.status,
+    headers: { [CACHE_STATUS_HEADER]: settled.outcome, ...retryAfterHeader(settled.result) },
+  });
+}
 
 export async function POST(request: NextRequest) {
   if (!WEBHOOK_URL) {
@@ -31,74 +253,115 @@ export async function POST(request: NextRequest) {
     data: { session },
   } = await supabase.auth.getSession();
 
-  try {
-    const formData = await request.formData();
+  // Streaming mode pipes the upload to n8n as it arrives. Streamed dictations
+  // stay on the buffered path: their final segment is stitched into a
+  // transcript here, which needs the parsed form.
+  const contentLength = Number(request.headers.get("content-length"));
+  if (
+    STREAMING_PROXY_ENABLED &&
+    request.body &&
+    contentLength > 0 &&
+    request.headers.get("content-type")?.startsWith("multipart/form-data") &&
+    !request.headers.has(DICTATION_SESSION_HEADER)
+  ) {
+    return streamSubmit(request, WEBHOOK_URL, request.body, contentLength, user.id, session?.access_token);
+  }
 
-    const controller = new AbortController();
-    const timeout = setTimeout(() => controller.abort(), TIMEOUT_MS);
+  let formData: FormData;
+  try {
+    formData = await request.formData();
+  } catch {
+    return NextResponse.json(
+      { success: false, error: "Neispravan zahtjev" },
+      { status: 400 }
+    );
+  }
 
-    const headers: HeadersInit = {};
-    if (session?.access_token) {
-      headers["Authorization"] = `Bearer ${session.access_token}`;
-    }
+  const audio = formData.get("audio");
+  if (!(audio instanceof Blob)) {
+    return NextResponse.json(
+      { success: false, error: "Nedostaje audio zapis" },
+      { status: 400 }
+    );
+  }
 
-    const response = await fetch(WEBHOOK_URL, {
-      method: "POST",
-      body: formData,
-      headers,
-      signal: controller.signal,
-    });
+  // The server-side hash is authoritative; the client's copy only lets us
+  // notice when the two implementations drift apart
+  const fields: FingerprintFields = {};
+  for (const name of FINGERPRINT_FIELDS) {
+    const value = formData.get(name);
+    fields[name] = typeof value === "string" ? value : null;
+  }
+  const contentHash = await fingerprintSubmission(audio, fields);
+  const clientHash = request.headers.get(CONTENT_HASH_HEADER);
+  if (clientHash && clientHash !== contentHash) {
+    recordHashMismatch();
+  }
 
-    clearTimeout(timeout);
+  // Streamed dictation: `audio` is only the final segment. Stitch it to the
+  // segments transcribed during recording and send the workflow a transcript
+  // instead of audio, so it skips STT.
+  const dictationSession = formData.get("dictation_session");
+  const prepareBody = async (): Promise<FormData | null> => {
+    if (typeof dictationSession !== "string") return formData;
+    const transcript = await finishSession(
+      dictationSession,
+      user.id,
+      Number(formData.get("segment_count")),
+      audio,
+      Number(formData.get("segment_start")),
+      session?.access_token
+    );
+    if (!transcript) return null;
 
-    if (!response.ok) {
-      // Sanitize — never expose raw n8n error content to the client
-      return NextResponse.json(
-        { success: false, error: "Greška pri obradi zahtjeva" },
-        { status: response.status }
-      );
+    const body = new FormData();
+    for (const [name, value] of formData) {
+      if (name !== "audio" && name !== "segment_count" && name !== "segment_start") body.append(name, value);
     }
+    body.set("transcript", JSON.stringify(transcript));
+    return body;
+  };
+  const forward =
+    (timeoutMs?: number, maxWaitMs = SYNC_QUEUE_WAIT_MS, onQueue?: (queue: QueueStatus | null) => void) =>
+    (): Promise<SubmitResult> =>
+      governed(user.id, maxWaitMs, onQueue, async () => {
+        const body = await prepareBody();
+        if (!body) return DICTATION_UNAVAILABLE_RESULT;
+        return forwardToWebhook(WEBHOOK_URL, body, session?.access_token, timeoutMs);
+      });
 
-    let data = await response.json();
+  const idempotencyKey = idempotencyKeyOf(request);
 
-    // Support n8n array response (default for webhooks)
-    if (Array.isArray(data) && data.length > 0) {
-      data = data[0];
-    }
+  // Async mode: answer 202 with a job id right after the upload and run the
+  // pipeline in the background; n8n reports stages to /api/jobs/[id]/progress
+  if (request.headers.get("prefer")?.includes("respond-async")) {
+    const job = createJob(user.id);
+    const origin = CALLBACK_ORIGIN ?? request.nextUrl.origin;
+    formData.set("job_id", job.id);
+    formData.set("progress_url", `${origin}/api/jobs/${job.id}/progress`);
+    formData.set("progress_token", job.token);
 
-    // Structured sections: pass through directly
-    if (data.sections && typeof data.sections === "object") {
-      if (data.success === undefined || data.success === null) {
-        data.success = true;
-      }
-    } else if (!data.report_text && data.sections && typeof data.sections === "object") {
-      // Convert structured sections to plain text if report_text missing
-      const parts = [];
-      for (const [title, content] of Object.entries(data.sections)) {
-        if (content && typeof content === "string") {
-          parts.push(`${title.toUpperCase()}\n${content}`);
-        }
-      }
-      data.report_text = parts.join("\n\n");
-    }
+    after(async () => {
+      const outcome = await dedupeSubmit(
+        user.id,
+        contentHash,
+        idempotencyKey,
+        forward(JOB_TIMEOUT_MS, JOB_QUEUE_WAIT_MS, (queue) => setJobQueue(job.id, queue))
+      );
+      completeJob(job.id, outcome.kind === "conflict" ? CONFLICT_RESULT : outcome.result);
+    });
 
-    // Ensure success flag exists if we have valid content
-    if ((data.report_text || data.sections) && (data.success === undefined || data.success === null)) {
-      data.success = true;
-    }
+    return acceptedResponse(job.id);
+  }
 
-    return NextResponse.json(data);
-  } catch (err) {
-    if (err instanceof DOMException && err.name === "AbortError") {
-      return NextResponse.json(
-        { success: false, error: "Timeout" },
-        { status: 504 }
-      );
-    }
+  const outcome = await dedupeSubmit(user.id, contentHash, idempotencyKey, forward());
 
-    return NextResponse.json(
-      { success: false, error: "Greška pri komunikaciji sa serverom" },
-      { status: 502 }
-    );
+  if (outcome.kind === "conflict") {
+    return NextResponse.json(CONFLICT_RESULT.body, { status: CONFLICT_RESULT.status });
   }
+
+  return NextResponse.json(outcome.result.body, {
+    status: outcome.result.status,
+    headers: { [CACHE_STATUS_HEADER]: outcome.outcome, ...retryAfterHeader(outcome.result) },
+  });
 }
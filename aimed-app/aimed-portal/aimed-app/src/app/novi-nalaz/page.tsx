@@ -11,6 +11,8 @@ import { usePatients } from "@/hooks/use-patients";
 import { useReports } from "@/hooks/use-reports";
 import { cn } from "@/lib/utils";
 import { formatBosnianDate } from "@/lib/utils";
+import { useAuth } from "@/components/auth/auth-provider";
+import { deleteRecording, listUnfinishedRecordings, type StoredRecording } from "@/lib/recording-store";
 import type { ReportMode, Patient, Report } from "@/types/aimed";
 
 const MODES: { key: ReportMode; label: string; description: string }[] = [
@@ -53,6 +55,40 @@ function NoviNalazContent() {
   const [selectedReport, setSelectedReport] = useState<Report | null>(null);
 
   const { getPatient } = usePatients();
+  const { getReport } = useReports();
+  const { user } = useAuth();
+
+  // A recording interrupted by a crash or navigation, offered for processing
+  const [unfinished, setUnfinished] = useState<StoredRecording | null>(null);
+  const [recoveredId, setRecoveredId] = useState<string | null>(null);
+
+  useEffect(() => {
+    if (!user) return;
+    listUnfinishedRecordings(user.id).then((recordings) => setUnfinished(recordings[0] ?? null));
+  }, [user]);
+
+  async function handleRecover(recording: StoredRecording) {
+    setUnfinished(null);
+    setPatientLoading(true);
+    const patient = await getPatient(recording.patientId);
+    const report = recording.reportId ? await getReport(recording.reportId) : null;
+    setPatientLoading(false);
+
+    if (!patient || (recording.mode === "update" && !report)) {
+      deleteRecording(recording.id);
+      return;
+    }
+    setMode(recording.mode);
+    setSelectedPatient(patient);
+    setSelectedReport(report);
+    setRecoveredId(recording.id);
+    setFlowStarted(true);
+  }
+
+  function handleDiscard(recording: StoredRecording) {
+    setUnfinished(null);
+    deleteRecording(recording.id);
+  }
 
   // Auto-load patient from ?patient= query param and jump to recording
   const autoStarted = useRef(false);
@@ -74,6 +110,7 @@ function NoviNalazContent() {
     setFlowStarted(false);
     setSelectedPatient(null);
     setSelectedReport(null);
+    setRecoveredId(null);
   }
 
   // Once recording starts, show DictationFlow
@@ -99,6 +136,7 @@ function NoviNalazContent() {
                 mode={mode}
                 patient={selectedPatient}
                 existingReport={selectedReport}
+                recoveredRecordingId={recoveredId}
                 onReset={handleReset}
               />
             </ErrorBoundary>
@@ -127,6 +165,14 @@ function NoviNalazContent() {
       />
       <div className="px-8 py-8">
         <div className="mx-auto max-w-3xl">
+          {unfinished && (
+            <UnfinishedRecordingNotice
+              recording={unfinished}
+              onRecover={() => handleRecover(unfinished)}
+              onDiscard={() => handleDiscard(unfinished)}
+            />
+          )}
+
           {/* Mode selector */}
           <div className="grid grid-cols-1 sm:grid-cols-2 gap-3">
             {MODES.map((m) => (
@@ -193,6 +239,47 @@ function NoviNalazContent() {
   );
 }
 
+// ── Recovery of an interrupted recording ──
+
+function UnfinishedRecordingNotice({
+  recording,
+  onRecover,
+  onDiscard,
+}: {
+  recording: StoredRecording;
+  onRecover: () => void;
+  onDiscard: () => void;
+}) {
+  const minutes = Math.floor(recording.durationSeconds / 60);
+  const seconds = String(Math.floor(recording.durationSeconds % 60)).padStart(2, "0");
+
+  return (
+    <Card className="mb-6 flex flex-col gap-4 sm:flex-row sm:items-center sm:justify-between">
+      <div>
+        <p className="text-sm font-semibold text-aimed-black">Pronađen je nedovršen snimak</p>
+        <p className="mt-1 text-xs text-aimed-gray-400">
+          {minutes}:{seconds} · {formatBosnianDate(recording.startedAt)} — snimak nije obrađen jer je
+          stranica zatvorena ili je preglednik pao.
+        </p>
+      </div>
+      <div className="flex shrink-0 items-center gap-4">
+        <button
+          onClick={onDiscard}
+          className="text-xs text-aimed-gray-400 underline hover:text-aimed-black transition-colors"
+        >
+          Odbaci
+        </button>
+        <button
+          onClick={onRecover}
+          className="rounded-xl bg-aimed-accent px-5 py-2.5 text-sm font-medium text-white transition-all duration-300 hover:bg-aimed-accent-hover dark:bg-white dark:text-[#09090B] dark:hover:bg-[#E4E4E7]"
+        >
+          Obradi snimak
+        </button>
+      </div>
+    </Card>
+  );
+}
+
 // ── New mode: patient-form → ready → start ──
 
 function NewModeFlow({
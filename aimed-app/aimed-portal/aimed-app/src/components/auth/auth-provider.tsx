@@ -3,6 +3,7 @@
 import { createContext, useContext, useEffect, useRef, useState } from "react";
 import { usePathname, useRouter } from "next/navigation";
 import { createClient } from "@/lib/supabase/client";
+import { clearRecordings } from "@/lib/recording-store";
 import type { User } from "@supabase/supabase-js";
 
 interface AuthContextValue {
@@ -52,6 +53,9 @@ export function AuthProvider({ children }: { children: React.ReactNode }) {
       setUser(session?.user ?? null);
       setLoading(false);
 
+      // Also covers sign-out in another tab and expired sessions
+      if (event === "SIGNED_OUT") void clearRecordings();
+
       if (event === "SIGNED_IN" && session?.user) {
         const current = pathnameRef.current;
         const isPublic =
@@ -68,6 +72,8 @@ export function AuthProvider({ children }: { children: React.ReactNode }) {
   }, [supabase.auth, router]);
 
   async function signOut() {
+    // Unfinished dictations are patient audio; don't leave them on a shared PC
+    await clearRecordings();
     await supabase.auth.signOut();
     setUser(null);
   }
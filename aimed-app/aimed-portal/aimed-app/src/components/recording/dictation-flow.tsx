@@ -10,17 +10,21 @@ import { Button } from "@/components/ui/button";
 import { SkeletonCard } from "@/components/ui/skeleton";
 import { LiveWaveform } from "@/components/recording/live-waveform";
 import { SectionCard } from "@/components/report/section-card";
-import { useAudioRecorder, isDurationWarning } from "@/hooks/use-audio-recorder";
+import { useAudioRecorder, isDurationWarning, type RecordedSegment } from "@/hooks/use-audio-recorder";
 import { useAimedApi } from "@/hooks/use-aimed-api";
+import { DictationStream, STREAMING_ENABLED } from "@/services/dictation-stream";
+import { JOB_MODE_ENABLED } from "@/services/aimed-api";
 import { sectionsToPlainText } from "@/lib/report-parser";
 import type { PatientInfo } from "@/lib/pdf-generator";
 import { useAimedExport } from "@/hooks/use-aimed-export";
 import { saveDraft, loadDraft, clearDraft, saveToHistory } from "@/lib/report-storage";
+import { deleteRecording, type RecordingContext } from "@/lib/recording-store";
 import { useAuth } from "@/components/auth/auth-provider";
 import { useReports } from "@/hooks/use-reports";
 import { usePatients } from "@/hooks/use-patients";
 import { createClient } from "@/lib/supabase/client";
 import { formatBosnianDate } from "@/lib/utils";
+import { PROCESSING_STEPS, processingLabel, processingStepIndex } from "@/lib/processing-status";
 import type { ReportMode, ReportSection, Patient, Report } from "@/types/aimed";
 
 const DEFAULT_SECTIONS = ["ANAMNEZA", "STATUS", "DIJAGNOZA", "TERAPIJA", "PREPORUKE"];
@@ -70,16 +74,29 @@ interface DictationFlowProps {
   mode: ReportMode;
   patient: Patient;
   existingReport?: Report | null;
+  /** Unfinished recording from IndexedDB to process instead of recording anew */
+  recoveredRecordingId?: string | null;
   onReset: () => void;
 }
 
-export function DictationFlow({ mode, patient, existingReport, onReset }: DictationFlowProps) {
+export function DictationFlow({ mode, patient, existingReport, recoveredRecordingId, onReset }: DictationFlowProps) {
   const [focusedSection, setFocusedSection] = useState<number | null>(null);
   const [copyFeedback, setCopyFeedback] = useState(false);
   const submittedRef = useRef(false);
+  // Streaming mode: segments of the current recording uploaded while dictating
+  const dictationRef = useRef<DictationStream | null>(null);
+  const handleSegment = useCallback(
+    (segment: RecordedSegment) => dictationRef.current?.push(segment),
+    []
+  );
 
   const { user } = useAuth();
-  const recorder = useAudioRecorder();
+  // Lets an interrupted recording be recovered on /novi-nalaz
+  const persist = useMemo<RecordingContext | null>(
+    () => (user ? { doctorId: user.id, patientId: patient.id, mode, reportId: existingReport?.id } : null),
+    [user, patient.id, mode, existingReport?.id]
+  );
+  const recorder = useAudioRecorder({ onSegment: STREAMING_ENABLED ? handleSegment : undefined, persist });
   const api = useAimedApi();
   const { exportPdf, exportWord, pdfLoading, wordLoading } = useAimedExport();
   const { createReport } = useReports();
@@ -155,12 +172,30 @@ export function DictationFlow({ mode, patient, existingReport, onReset }: Dictat
     return () => clearTimeout(timer);
   }, [editedSections, patientInfo, mode]);
 
-  // Auto-start recording on mount
-  useEffect(() => {
+  function startRecording() {
+    dictationRef.current = STREAMING_ENABLED ? new DictationStream() : null;
     recorder.startRecording();
+  }
+
+  // Auto-start recording on mount (or pick up the recovered one)
+  useEffect(() => {
+    if (recoveredRecordingId) {
+      recorder.restoreRecording(recoveredRecordingId).then((restored) => {
+        if (!restored) startRecording();
+      });
+    } else {
+      startRecording();
+    }
     // eslint-disable-next-line react-hooks/exhaustive-deps
   }, []);
 
+  // The report exists now; the stored recording is no longer needed
+  useEffect(() => {
+    if (api.state === "done" && recorder.recordingId) {
+      deleteRecording(recorder.recordingId);
+    }
+  }, [api.state, recorder.recordingId]);
+
   // When audioBlob is produced, auto-submit to API
   const handleBlobReady = useCallback(() => {
     if (recorder.audioBlob && !submittedRef.current) {
@@ -186,9 +221,11 @@ export function DictationFlow({ mode, patient, existingReport, onReset }: Dictat
           ? sectionsToPlainText(existingReport.content.sections)
           : undefined,
         preferredSections: doctorSections,
+        dictation: dictationRef.current ?? undefined,
+        speech: recorder.speech,
       });
     }
-  }, [recorder.audioBlob, recorder.duration, api, mode, doctorId, existingReport, doctorSections]);
+  }, [recorder.audioBlob, recorder.duration, recorder.speech, api, mode, doctorId, existingReport, doctorSections]);
 
   useEffect(() => {
     handleBlobReady();
@@ -219,7 +256,7 @@ export function DictationFlow({ mode, patient, existingReport, onReset }: Dictat
     setEditedSections([]);
     clearDraft();
     // Re-start recording after a tick so the recorder state settles
-    setTimeout(() => recorder.startRecording(), 100);
+    setTimeout(() => startRecording(), 100);
   }
 
   function handleRetry() {
@@ -364,6 +401,9 @@ export function DictationFlow({ mode, patient, existingReport, onReset }: Dictat
   else if (api.state !== "done") flowState = "processing";
   else flowState = "editing";
 
+  // Sync submits report no stages: no stage bar, just the label
+  const processingStep = JOB_MODE_ENABLED ? processingStepIndex(api.state) : -1;
+
   return (
     <AnimatePresence mode="wait">
       {flowState === "mic-error" && (
@@ -457,9 +497,9 @@ export function DictationFlow({ mode, patient, existingReport, onReset }: Dictat
 
             <LiveWaveform frequencyData={recorder.frequencyData} />
 
-            {isDurationWarning(recorder.duration) && (
+            {isDurationWarning(recorder.duration, recorder.maxDuration) && (
               <p className="px-2 text-center text-xs text-aimed-amber">
-                Snimak se približava maksimalnom trajanju (10 min).
+                Snimak se približava maksimalnom trajanju ({recorder.maxDuration / 60} min).
               </p>
             )}
 
@@ -528,12 +568,20 @@ export function DictationFlow({ mode, patient, existingReport, onReset }: Dictat
               </motion.div>
             ))}
           </motion.div>
-          <p className="mt-6 text-center text-sm text-aimed-gray-400">
-            {api.state === "uploading"
-              ? "Šaljem snimak..."
-              : isUpdate
-                ? "Ažuriram nalaz..."
-                : "Obrađujem vaš nalaz..."}
+          {processingStep >= 0 && (
+            <div className="mx-auto mt-6 flex max-w-xs gap-1.5">
+              {PROCESSING_STEPS.map((step, i) => (
+                <div
+                  key={step.state}
+                  className={`h-1 flex-1 rounded-full transition-colors ${
+                    i <= processingStep ? "bg-aimed-accent" : "bg-aimed-gray-100"
+                  }`}
+                />
+              ))}
+            </div>
+          )}
+          <p className={`${processingStep >= 0 ? "mt-3" : "mt-6"} text-center text-sm text-aimed-gray-400`}>
+            {processingLabel(api.state, isUpdate, api.queue)}
           </p>
         </motion.div>
       )}
@@ -1,47 +1,73 @@
 "use client";
 
-import { useMemo } from "react";
+import { useEffect, useRef } from "react";
 
 interface LiveWaveformProps {
-  /** Frequency data from AnalyserNode (64 bins, values 0-255). Null = fallback CSS animation. */
+  /**
+   * Live frequency buffer from useAudioRecorder (64 bins, values 0-255),
+   * updated in place every frame. Null = fallback CSS animation.
+   */
   frequencyData: Uint8Array | null;
   /** Number of bars to render */
   bars?: number;
 }
 
+const BAR_WIDTH = 2;
+const BAR_GAP = 3;
+const MIN_BAR_HEIGHT = 4;
+const MAX_BAR_HEIGHT = 64;
+const CANVAS_HEIGHT = 80; // h-20
+
 /**
  * Renders a real-time audio waveform when frequencyData is available,
  * or falls back to CSS-animated bars when not.
+ *
+ * The live waveform is drawn to a canvas from its own animation frame loop,
+ * so the recording screen does not re-render 60 times per second.
  */
 export function LiveWaveform({ frequencyData, bars = 48 }: LiveWaveformProps) {
-  // Map frequency bins to the desired number of bars
-  const heights = useMemo(() => {
-    if (!frequencyData || frequencyData.length === 0) return null;
+  const canvasRef = useRef<HTMLCanvasElement>(null);
+
+  useEffect(() => {
+    const canvas = canvasRef.current;
+    const ctx = canvas?.getContext("2d");
+    if (!canvas || !ctx || !frequencyData || frequencyData.length === 0) return;
 
-    const result: number[] = [];
-    const binCount = frequencyData.length;
+    const width = bars * (BAR_WIDTH + BAR_GAP) - BAR_GAP;
+    const dpr = window.devicePixelRatio || 1;
+    canvas.width = width * dpr;
+    canvas.height = CANVAS_HEIGHT * dpr;
+    canvas.style.width = `${width}px`;
+    canvas.style.height = `${CANVAS_HEIGHT}px`;
+    ctx.scale(dpr, dpr);
+    // Bar colour comes from the text-aimed-gray-500 class on the canvas
+    ctx.fillStyle = getComputedStyle(canvas).color;
+
+    const data = frequencyData;
+    const binCount = data.length;
     const step = binCount / bars;
+    let frame = 0;
 
-    for (let i = 0; i < bars; i++) {
-      const binIndex = Math.min(Math.floor(i * step), binCount - 1);
-      // Map 0-255 to 4-64px range
-      const normalized = frequencyData[binIndex] / 255;
-      result.push(4 + normalized * 60);
+    function draw() {
+      ctx.clearRect(0, 0, width, CANVAS_HEIGHT);
+      for (let i = 0; i < bars; i++) {
+        const binIndex = Math.min(Math.floor(i * step), binCount - 1);
+        // Map 0-255 to 4-64px range
+        const height = MIN_BAR_HEIGHT + (data[binIndex] / 255) * (MAX_BAR_HEIGHT - MIN_BAR_HEIGHT);
+        ctx.fillRect(i * (BAR_WIDTH + BAR_GAP), CANVAS_HEIGHT - height, BAR_WIDTH, height);
+      }
+      frame = requestAnimationFrame(draw);
     }
-    return result;
+    draw();
+
+    return () => cancelAnimationFrame(frame);
   }, [frequencyData, bars]);
 
   // Real-time waveform
-  if (heights) {
+  if (frequencyData && frequencyData.length > 0) {
     return (
-      <div className="flex h-20 items-end justify-center gap-[3px] px-2">
-        {heights.map((h, i) => (
-          <div
-            key={i}
-            className="w-[2px] rounded-full bg-aimed-gray-500 transition-[height] duration-75"
-            style={{ height: `${h}px` }}
-          />
-        ))}
+      <div className="flex h-20 items-end justify-center px-2">
+        <canvas ref={canvasRef} className="text-aimed-gray-500" aria-hidden="true" />
       </div>
     );
   }
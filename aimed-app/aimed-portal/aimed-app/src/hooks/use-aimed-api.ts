@@ -1,11 +1,18 @@
 "use client";
 
 import { useState, useCallback } from "react";
-import { submitRecording, AimedApiError } from "@/services/aimed-api";
+import { submitRecording, submitRecordingAsync, AimedApiError, JOB_MODE_ENABLED } from "@/services/aimed-api";
 import { parseReport } from "@/lib/report-parser";
-import type { ParsedReport, ReportMode, ReportSection } from "@/types/aimed";
+import type { DictationStream } from "@/services/dictation-stream";
+import type { EncodeReport } from "@/services/audio-encoder";
+import type { SpeechSummary } from "@/lib/voice-activity";
+import type { JobStage, ParsedReport, QueueStatus, ReportMode, ReportSection } from "@/types/aimed";
 
-export type ApiState = "idle" | "uploading" | "processing" | "done" | "error";
+/**
+ * "uploading" while the recording is prepared and sent. Then a sync submit is
+ * "processing" until done, and an async job reports the n8n pipeline stages.
+ */
+export type ApiState = "idle" | "uploading" | "processing" | Exclude<JobStage, "done"> | "done" | "error";
 
 interface SubmitOptions {
   mode?: ReportMode;
@@ -13,12 +20,20 @@ interface SubmitOptions {
   doctorId?: string;
   existingData?: Record<string, string>;
   preferredSections?: string[];
+  /** Segments streamed during recording; the full blob is the fallback */
+  dictation?: DictationStream;
+  /** Recorder voice activity: no speech blocks the upload, silence is trimmed */
+  speech?: SpeechSummary | null;
 }
 
 interface UseAimedApiReturn {
   state: ApiState;
   report: ParsedReport | null;
   error: string | null;
+  /** Size/latency of the upload re-encoding for the last full-recording submit */
+  encodeReport: EncodeReport | null;
+  /** Queue position while the job waits for n8n capacity */
+  queue: QueueStatus | null;
   submit: (audioBlob: Blob, options?: SubmitOptions) => Promise<void>;
   reset: () => void;
 }
@@ -37,22 +52,36 @@ export function useAimedApi(): UseAimedApiReturn {
   const [state, setState] = useState<ApiState>("idle");
   const [report, setReport] = useState<ParsedReport | null>(null);
   const [error, setError] = useState<string | null>(null);
+  const [encodeReport, setEncodeReport] = useState<EncodeReport | null>(null);
+  const [queue, setQueue] = useState<QueueStatus | null>(null);
 
   const submit = useCallback(async (audioBlob: Blob, options?: SubmitOptions) => {
     setState("uploading");
     setError(null);
     setReport(null);
+    setEncodeReport(null);
+    setQueue(null);
 
     try {
-      setState("processing");
-      const data = await submitRecording({
+      const request = {
         audioBlob,
         mode: options?.mode,
         existingReport: options?.existingReport,
         doctorId: options?.doctorId,
         existingData: options?.existingData,
         preferredSections: options?.preferredSections,
-      });
+        dictation: options?.dictation,
+        speech: options?.speech,
+        onEncoded: setEncodeReport,
+        // Sync path only (also after a lost job falls back to it)
+        onSending: () => setState("processing"),
+      };
+      const data = JOB_MODE_ENABLED
+        ? await submitRecordingAsync(request, (stage, position) => {
+            if (stage !== "done") setState(stage);
+            setQueue(position);
+          })
+        : await submitRecording(request);
 
       let parsed: ParsedReport;
 
@@ -77,6 +106,7 @@ export function useAimedApi(): UseAimedApiReturn {
       }
 
       setReport(parsed);
+      setQueue(null);
       setState("done");
     } catch (err) {
       const message =
@@ -84,6 +114,7 @@ export function useAimedApi(): UseAimedApiReturn {
           ? err.message
           : "Došlo je do greške. Pokušajte ponovo.";
       setError(message);
+      setQueue(null);
       setState("error");
     }
   }, []);
@@ -92,7 +123,9 @@ export function useAimedApi(): UseAimedApiReturn {
     setState("idle");
     setReport(null);
     setError(null);
+    setEncodeReport(null);
+    setQueue(null);
   }, []);
 
-  return { state, report, error, submit, reset };
+  return { state, report, error, encodeReport, queue, submit, reset };
 }
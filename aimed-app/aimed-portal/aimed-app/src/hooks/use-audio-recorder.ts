@@ -1,6 +1,14 @@
 "use client";
 
 import { useState, useRef, useCallback, useEffect } from "react";
+import { UPLOAD_BITRATE } from "@/services/audio-encoder";
+import { SpeechDetector, speechBandLevel, type SpeechSummary } from "@/lib/voice-activity";
+import {
+  PersistentRecording,
+  deleteRecording,
+  loadRecording,
+  type RecordingContext,
+} from "@/lib/recording-store";
 
 // ── Types ──
 
@@ -10,8 +18,43 @@ export interface AudioRecorderState {
   duration: number;
   audioBlob: Blob | null;
   error: string | null;
-  /** Normalized frequency data (0-255) for waveform visualization, 64 bins */
+  /**
+   * Frequency data (0-255, 64 bins) for waveform visualization. One buffer,
+   * overwritten in place on every animation frame without re-rendering:
+   * read it from your own requestAnimationFrame loop. Null while not recording.
+   */
   frequencyData: Uint8Array | null;
+  /** Where speech was heard, set with audioBlob (null when the analyser was unavailable) */
+  speech: SpeechSummary | null;
+  /** IndexedDB id of the current recording, when it is persisted */
+  recordingId: string | null;
+  /** Auto-stop limit in seconds (longer in streaming mode) */
+  maxDuration: number;
+}
+
+/** A standalone, independently decodable piece of the recording (streaming mode) */
+export interface RecordedSegment {
+  blob: Blob;
+  index: number;
+  /** Offset of the segment within the recording, in seconds (pauses excluded) */
+  startSeconds: number;
+  /** True for the segment that ends when recording stops */
+  final: boolean;
+}
+
+export interface AudioRecorderOptions {
+  /**
+   * Streaming mode: a second MediaRecorder is restarted at quiet moments so
+   * every segment is a complete file the server can transcribe while the
+   * doctor keeps talking. The full recording (audioBlob) is unaffected.
+   * Raises the auto-stop limit from 10 to 40 minutes.
+   */
+  onSegment?: (segment: RecordedSegment) => void;
+  /**
+   * Persist chunks to IndexedDB under this context, so the recording survives
+   * a crash or navigation and can be restored with restoreRecording()
+   */
+  persist?: RecordingContext | null;
 }
 
 export interface AudioRecorderActions {
@@ -19,13 +62,24 @@ export interface AudioRecorderActions {
   stopRecording: () => void;
   pauseRecording: () => void;
   resumeRecording: () => void;
+  /** Discards the current recording, including its stored copy */
   resetRecording: () => void;
+  /** Loads a recording left in IndexedDB as audioBlob; false if it is gone */
+  restoreRecording: (id: string) => Promise<boolean>;
 }
 
 // ── Constants ──
 
-const MAX_DURATION = 600; // 10 minutes
-const WARNING_DURATION = 480; // 8 minutes
+const MAX_DURATION = 600; // 10 minutes as a single upload
+// With streaming segments every part is transcribed while recording, so
+// long specialist exams fit; bounded by MAX_SEGMENTS in dictation-sessions.ts
+const MAX_SEGMENTED_DURATION = 2400; // 40 minutes
+const WARNING_LEAD = 120; // warn 2 minutes before the limit
+
+// Streaming segments: cut at the first quiet frame after SEGMENT_MIN_SECONDS,
+// or unconditionally at SEGMENT_MAX_SECONDS
+const SEGMENT_MIN_SECONDS = 20;
+const SEGMENT_MAX_SECONDS = 45;
 
 const ERROR_MESSAGES: Record<string, string> = {
   NotAllowedError: "Pristup mikrofonu je odbijen. Omogućite mikrofon u postavkama preglednika.",
@@ -50,25 +104,61 @@ function getPreferredMimeType(): string {
   return "";
 }
 
+// Ask for the upload bitrate up front; browsers that honour it need no re-encoding
+function recorderOptions(mimeType: string): MediaRecorderOptions {
+  return mimeType ? { mimeType, audioBitsPerSecond: UPLOAD_BITRATE } : { audioBitsPerSecond: UPLOAD_BITRATE };
+}
+
+interface ActiveSegment {
+  recorder: MediaRecorder;
+  index: number;
+  startSeconds: number;
+  final: boolean;
+}
+
 // ── Hook ──
 
-export function useAudioRecorder(): AudioRecorderState & AudioRecorderActions {
+export function useAudioRecorder(
+  options: AudioRecorderOptions = {}
+): AudioRecorderState & AudioRecorderActions {
   const [isRecording, setIsRecording] = useState(false);
   const [isPaused, setIsPaused] = useState(false);
   const [duration, setDuration] = useState(0);
   const [audioBlob, setAudioBlob] = useState<Blob | null>(null);
   const [error, setError] = useState<string | null>(null);
   const [frequencyData, setFrequencyData] = useState<Uint8Array | null>(null);
+  const [speech, setSpeech] = useState<SpeechSummary | null>(null);
+  const [recordingId, setRecordingId] = useState<string | null>(null);
 
   const mediaRecorderRef = useRef<MediaRecorder | null>(null);
   const streamRef = useRef<MediaStream | null>(null);
-  const chunksRef = useRef<Blob[]>([]);
+  const persistentRef = useRef<PersistentRecording | null>(null);
+  const recordingIdRef = useRef<string | null>(null);
   const timerRef = useRef<ReturnType<typeof requestAnimationFrame> | null>(null);
   const startTimeRef = useRef<number>(0);
   const pausedElapsedRef = useRef<number>(0);
   const analyserRef = useRef<AnalyserNode | null>(null);
-  const animFrameRef = useRef<number | null>(null);
+  const frequencyRef = useRef<Uint8Array | null>(null);
+  const shownDurationRef = useRef(0);
   const audioContextRef = useRef<AudioContext | null>(null);
+  const detectorRef = useRef<SpeechDetector | null>(null);
+  const elapsedRef = useRef(0);
+
+  // Streaming mode
+  const onSegmentRef = useRef(options.onSegment);
+  const persistRef = useRef(options.persist);
+  const maxDurationRef = useRef(MAX_DURATION);
+  const maxDuration = options.onSegment ? MAX_SEGMENTED_DURATION : MAX_DURATION;
+  const segmentRef = useRef<ActiveSegment | null>(null);
+  const segmentIndexRef = useRef(0);
+
+  useEffect(() => {
+    onSegmentRef.current = options.onSegment;
+  }, [options.onSegment]);
+
+  useEffect(() => {
+    persistRef.current = options.persist;
+  }, [options.persist]);
 
   // Cleanup everything
   const cleanup = useCallback(() => {
@@ -78,18 +168,20 @@ export function useAudioRecorder(): AudioRecorderState & AudioRecorderActions {
       timerRef.current = null;
     }
 
-    // Stop animation frame
-    if (animFrameRef.current) {
-      cancelAnimationFrame(animFrameRef.current);
-      animFrameRef.current = null;
-    }
-
     // Stop media recorder
     if (mediaRecorderRef.current && mediaRecorderRef.current.state !== "inactive") {
       mediaRecorderRef.current.stop();
     }
     mediaRecorderRef.current = null;
 
+    // Discard the in-progress segment
+    const segment = segmentRef.current;
+    segmentRef.current = null;
+    if (segment && segment.recorder.state !== "inactive") {
+      segment.recorder.onstop = null;
+      segment.recorder.stop();
+    }
+
     // Stop all tracks (releases microphone)
     if (streamRef.current) {
       streamRef.current.getTracks().forEach((track) => track.stop());
@@ -102,6 +194,7 @@ export function useAudioRecorder(): AudioRecorderState & AudioRecorderActions {
     }
     audioContextRef.current = null;
     analyserRef.current = null;
+    frequencyRef.current = null;
   }, []);
 
   // Cleanup on unmount
@@ -122,27 +215,105 @@ export function useAudioRecorder(): AudioRecorderState & AudioRecorderActions {
 
       source.connect(analyser);
       analyserRef.current = analyser;
+      detectorRef.current = new SpeechDetector();
 
-      const dataArray = new Uint8Array(analyser.frequencyBinCount);
-
-      function updateFrequency() {
-        if (!analyserRef.current) return;
-        analyserRef.current.getByteFrequencyData(dataArray);
-        // Create a copy so React detects the change
-        setFrequencyData(new Uint8Array(dataArray));
-        animFrameRef.current = requestAnimationFrame(updateFrequency);
-      }
-      updateFrequency();
+      // Filled by sampleAnalyser() from the timer loop; handed to React once
+      const bins = new Uint8Array(analyser.frequencyBinCount);
+      frequencyRef.current = bins;
+      setFrequencyData(bins);
     } catch {
       // AnalyserNode not critical — waveform will fall back to CSS animation
     }
   }, []);
 
+  // Called from the timer loop: one analyser read per frame feeds both the
+  // waveform buffer and the speech detector
+  const sampleAnalyser = useCallback((elapsedSeconds: number) => {
+    elapsedRef.current = elapsedSeconds;
+    const analyser = analyserRef.current;
+    const bins = frequencyRef.current;
+    if (!analyser || !bins) return;
+    analyser.getByteFrequencyData(bins);
+    detectorRef.current?.update(speechBandLevel(bins, analyser.context.sampleRate, analyser.fftSize), elapsedSeconds);
+  }, []);
+
+  // elapsedRef follows animation frames, which stop while the tab is hidden;
+  // catch it up from the clock before using it outside the timer loop
+  const syncElapsed = useCallback(() => {
+    if (timerRef.current !== null) {
+      elapsedRef.current = (performance.now() - startTimeRef.current + pausedElapsedRef.current) / 1000;
+    }
+    return elapsedRef.current;
+  }, []);
+
+  // The timer runs every frame, but React only hears about whole seconds
+  const showDuration = useCallback((elapsed: number) => {
+    if (elapsed === shownDurationRef.current) return;
+    shownDurationRef.current = elapsed;
+    setDuration(elapsed);
+  }, []);
+
+  // Starts a recorder for the next segment; its own chunk list keeps the
+  // outgoing and incoming segments apart while they briefly overlap
+  const startSegment = useCallback((stream: MediaStream, mimeType: string, startSeconds: number) => {
+    const chunks: Blob[] = [];
+    const recorder = new MediaRecorder(stream, recorderOptions(mimeType));
+    const segment: ActiveSegment = { recorder, index: segmentIndexRef.current++, startSeconds, final: false };
+
+    recorder.ondataavailable = (e) => {
+      if (e.data.size > 0) chunks.push(e.data);
+    };
+    recorder.onstop = () => {
+      onSegmentRef.current?.({
+        blob: new Blob(chunks, { type: mimeType || "audio/webm" }),
+        index: segment.index,
+        startSeconds: segment.startSeconds,
+        final: segment.final,
+      });
+    };
+
+    recorder.start(1000);
+    segmentRef.current = segment;
+  }, []);
+
+  const stopFinalSegment = useCallback(() => {
+    const segment = segmentRef.current;
+    segmentRef.current = null;
+    if (!segment || segment.recorder.state === "inactive") return;
+    segment.final = true;
+    segment.recorder.stop();
+  }, []);
+
+  // Called from the timer loop: rotate the segment recorder at a pause in speech
+  const maybeRotateSegment = useCallback((elapsedSeconds: number) => {
+    const segment = segmentRef.current;
+    const stream = streamRef.current;
+    if (!segment || !stream || segment.recorder.state !== "recording") return;
+
+    const length = elapsedSeconds - segment.startSeconds;
+    if (length < SEGMENT_MIN_SECONDS) return;
+
+    const quiet = detectorRef.current !== null && !detectorRef.current.speaking;
+    if (!quiet && length < SEGMENT_MAX_SECONDS) return;
+
+    // Start the next segment before stopping this one so no audio is lost
+    startSegment(stream, segment.recorder.mimeType, elapsedSeconds);
+    segment.recorder.stop();
+  }, [startSegment]);
+
   const startRecording = useCallback(async () => {
     setError(null);
     setAudioBlob(null);
     setDuration(0);
-    chunksRef.current = [];
+    shownDurationRef.current = 0;
+    setSpeech(null);
+    segmentIndexRef.current = 0;
+    maxDurationRef.current = onSegmentRef.current ? MAX_SEGMENTED_DURATION : MAX_DURATION;
+    persistentRef.current = null;
+    recordingIdRef.current = null;
+    setRecordingId(null);
+    detectorRef.current = null;
+    elapsedRef.current = 0;
 
     // Check browser support
     if (typeof navigator === "undefined" || !navigator.mediaDevices?.getUserMedia) {
@@ -169,20 +340,31 @@ export function useAudioRecorder(): AudioRecorderState & AudioRecorderActions {
       streamRef.current = stream;
 
       const mimeType = getPreferredMimeType();
-      const recorder = new MediaRecorder(stream, mimeType ? { mimeType } : undefined);
+      const recorder = new MediaRecorder(stream, recorderOptions(mimeType));
       mediaRecorderRef.current = recorder;
 
+      // Chunks go to IndexedDB as they arrive instead of piling up on the heap
+      const persistent = await PersistentRecording.create(mimeType || "audio/webm", persistRef.current ?? null);
+      persistentRef.current = persistent;
+      if (persistent.persistent) {
+        recordingIdRef.current = persistent.id;
+        setRecordingId(persistent.id);
+      }
+
       recorder.ondataavailable = (e) => {
         if (e.data.size > 0) {
-          chunksRef.current.push(e.data);
+          persistent.append(e.data, syncElapsed());
         }
       };
 
       recorder.onstop = () => {
-        const blob = new Blob(chunksRef.current, {
-          type: mimeType || "audio/webm",
+        const summary = detectorRef.current?.finish(elapsedRef.current) ?? null;
+        persistent.assemble().then((blob) => {
+          // Ignore a recording that was reset while its last chunks were written
+          if (persistentRef.current !== persistent) return;
+          setAudioBlob(blob);
+          setSpeech(summary);
         });
-        setAudioBlob(blob);
         setIsRecording(false);
         setFrequencyData(null);
 
@@ -208,21 +390,24 @@ export function useAudioRecorder(): AudioRecorderState & AudioRecorderActions {
 
       // Request data every 1 second for progressive chunking
       recorder.start(1000);
+      if (onSegmentRef.current) startSegment(stream, mimeType, 0);
       setIsRecording(true);
 
       // Start timestamp-based timer via rAF (no drift)
       startTimeRef.current = performance.now();
       pausedElapsedRef.current = 0;
       function tickTimer() {
-        const elapsed = Math.floor(
-          (performance.now() - startTimeRef.current + pausedElapsedRef.current) / 1000
-        );
-        setDuration(elapsed);
+        const exact = (performance.now() - startTimeRef.current + pausedElapsedRef.current) / 1000;
+        const elapsed = Math.floor(exact);
+        showDuration(elapsed);
         // Auto-stop at max
-        if (elapsed >= MAX_DURATION) {
+        if (elapsed >= maxDurationRef.current) {
+          stopFinalSegment();
           mediaRecorderRef.current?.stop();
           return;
         }
+        sampleAnalyser(exact);
+        maybeRotateSegment(exact);
         timerRef.current = requestAnimationFrame(tickTimer);
       }
       timerRef.current = requestAnimationFrame(tickTimer);
@@ -234,7 +419,7 @@ export function useAudioRecorder(): AudioRecorderState & AudioRecorderActions {
       setError(ERROR_MESSAGES[name] || "Neočekivana greška. Pokušajte ponovo.");
       cleanup();
     }
-  }, [cleanup, startAnalyser]);
+  }, [cleanup, startAnalyser, startSegment, stopFinalSegment, showDuration, sampleAnalyser, maybeRotateSegment, syncElapsed]);
 
   const pauseRecording = useCallback(() => {
     if (
@@ -244,22 +429,20 @@ export function useAudioRecorder(): AudioRecorderState & AudioRecorderActions {
       return;
 
     mediaRecorderRef.current.pause();
+    segmentRef.current?.recorder.pause();
     setIsPaused(true);
 
     // Accumulate elapsed time and stop the timer
+    syncElapsed();
     pausedElapsedRef.current += performance.now() - startTimeRef.current;
     if (timerRef.current) {
       cancelAnimationFrame(timerRef.current);
       timerRef.current = null;
     }
 
-    // Stop waveform updates while paused
-    if (animFrameRef.current) {
-      cancelAnimationFrame(animFrameRef.current);
-      animFrameRef.current = null;
-    }
+    // Waveform falls back to the idle animation while paused
     setFrequencyData(null);
-  }, []);
+  }, [syncElapsed]);
 
   const resumeRecording = useCallback(() => {
     if (
@@ -269,65 +452,74 @@ export function useAudioRecorder(): AudioRecorderState & AudioRecorderActions {
       return;
 
     mediaRecorderRef.current.resume();
+    segmentRef.current?.recorder.resume();
     setIsPaused(false);
 
     // Restart timer from now, with accumulated elapsed time preserved
     startTimeRef.current = performance.now();
     function tickTimer() {
-      const elapsed = Math.floor(
-        (performance.now() - startTimeRef.current + pausedElapsedRef.current) /
-          1000
-      );
-      setDuration(elapsed);
-      if (elapsed >= MAX_DURATION) {
+      const exact = (performance.now() - startTimeRef.current + pausedElapsedRef.current) / 1000;
+      const elapsed = Math.floor(exact);
+      showDuration(elapsed);
+      if (elapsed >= maxDurationRef.current) {
+        stopFinalSegment();
         mediaRecorderRef.current?.stop();
         return;
       }
+      sampleAnalyser(exact);
+      maybeRotateSegment(exact);
       timerRef.current = requestAnimationFrame(tickTimer);
     }
     timerRef.current = requestAnimationFrame(tickTimer);
 
-    // Restart waveform analyser
-    if (analyserRef.current) {
-      const dataArray = new Uint8Array(analyserRef.current.frequencyBinCount);
-      function updateFrequency() {
-        if (!analyserRef.current) return;
-        analyserRef.current.getByteFrequencyData(dataArray);
-        setFrequencyData(new Uint8Array(dataArray));
-        animFrameRef.current = requestAnimationFrame(updateFrequency);
-      }
-      updateFrequency();
-    }
-  }, []);
+    // Resume the live waveform
+    setFrequencyData(frequencyRef.current);
+  }, [stopFinalSegment, showDuration, sampleAnalyser, maybeRotateSegment]);
 
   const stopRecording = useCallback(() => {
+    // onstop hands this to the speech detector as the recording length
+    syncElapsed();
     if (timerRef.current) {
       cancelAnimationFrame(timerRef.current);
       timerRef.current = null;
     }
 
-    if (animFrameRef.current) {
-      cancelAnimationFrame(animFrameRef.current);
-      animFrameRef.current = null;
-    }
-
+    stopFinalSegment();
     if (mediaRecorderRef.current && mediaRecorderRef.current.state !== "inactive") {
       mediaRecorderRef.current.stop();
     }
-  }, []);
+  }, [stopFinalSegment, syncElapsed]);
 
   const resetRecording = useCallback(() => {
     cleanup();
     setIsRecording(false);
     setIsPaused(false);
     setDuration(0);
+    shownDurationRef.current = 0;
     setAudioBlob(null);
     setError(null);
     setFrequencyData(null);
-    chunksRef.current = [];
+    setSpeech(null);
     pausedElapsedRef.current = 0;
+
+    persistentRef.current = null;
+    if (recordingIdRef.current) deleteRecording(recordingIdRef.current);
+    recordingIdRef.current = null;
+    setRecordingId(null);
   }, [cleanup]);
 
+  const restoreRecording = useCallback(async (id: string) => {
+    const stored = await loadRecording(id);
+    if (!stored) return false;
+    persistentRef.current = null;
+    recordingIdRef.current = id;
+    setRecordingId(id);
+    setDuration(Math.floor(stored.recording.durationSeconds));
+    setSpeech(null);
+    setAudioBlob(stored.blob);
+    return true;
+  }, []);
+
   return {
     isRecording,
     isPaused,
@@ -335,20 +527,24 @@ export function useAudioRecorder(): AudioRecorderState & AudioRecorderActions {
     audioBlob,
     error,
     frequencyData,
+    speech,
+    recordingId,
+    maxDuration,
     startRecording,
     stopRecording,
     pauseRecording,
     resumeRecording,
     resetRecording,
+    restoreRecording,
   };
 }
 
-/** Returns true if duration is at or past the 8-minute warning threshold */
-export function isDurationWarning(duration: number): boolean {
-  return duration >= WARNING_DURATION;
+/** Returns true if duration is within 2 minutes of the limit (8 minutes by default) */
+export function isDurationWarning(duration: number, maxDuration = MAX_DURATION): boolean {
+  return duration >= maxDuration - WARNING_LEAD;
 }
 
 /** Returns true if duration hit the maximum */
-export function isDurationMax(duration: number): boolean {
-  return duration >= MAX_DURATION;
+export function isDurationMax(duration: number, maxDuration = MAX_DURATION): boolean {
+  return duration >= maxDuration;
 }
@@ -0,0 +1,175 @@
+/**
+ * Incremental transcription for streamed dictations.
+ *
+ * While the doctor is still talking, the client uploads standalone segments
+ * to /api/dictation/segments; each one is sent to the STT-only n8n webhook
+ * (AIMED_Segment_WEBHOOK_URL) right away. When recording stops, /api/submit
+ * receives only the final segment: it is transcribed, the transcripts are
+ * stitched together and the main workflow gets a ready `transcript` field,
+ * so only the last few seconds of STT plus structuring remain.
+ *
+ * Sessions live in the server process (like the submit cache and jobs).
+ */
+
+export interface TranscriptWord {
+  text: string;
+  start?: number;
+  end?: number;
+  type?: string;
+}
+
+/** The subset of the ElevenLabs Scribe response the v5 workflow reads */
+export interface Transcript {
+  text: string;
+  words: TranscriptWord[];
+  language_probability: number | null;
+}
+
+interface Segment {
+  startSeconds: number;
+  transcript: Promise<Transcript | null>;
+}
+
+interface Session {
+  owner: string;
+  segments: Map<number, Segment>;
+  updatedAt: number;
+}
+
+const SEGMENT_WEBHOOK_URL = process.env.AIMED_Segment_WEBHOOK_URL;
+const SEGMENT_TIMEOUT_MS = 60_000;
+const SESSION_TTL_MS = 30 * 60_000;
+const MAX_SEGMENTS = 160; // 40 min recorder limit / 20 s shortest segment, with headroom
+
+const sessions = new Map<string, Session>();
+
+export function isStreamingEnabled(): boolean {
+  return !!SEGMENT_WEBHOOK_URL;
+}
+
+function prune(now: number) {
+  for (const [id, session] of sessions) {
+    if (now - session.updatedAt > SESSION_TTL_MS) sessions.delete(id);
+  }
+}
+
+async function transcribe(audio: Blob, accessToken: string | undefined): Promise<Transcript | null> {
+  if (!SEGMENT_WEBHOOK_URL) return null;
+
+  const formData = new FormData();
+  formData.append("audio", audio, audio instanceof File ? audio.name : "segment.webm");
+  const headers: HeadersInit = {};
+  if (accessToken) {
+    headers["Authorization"] = `Bearer ${accessToken}`;
+  }
+
+  try {
+    const response = await fetch(SEGMENT_WEBHOOK_URL, {
+      method: "POST",
+      body: formData,
+      headers,
+      signal: AbortSignal.timeout(SEGMENT_TIMEOUT_MS),
+    });
+    if (!response.ok) return null;
+
+    let data = await response.json();
+    if (Array.isArray(data) && data.length > 0) {
+      data = data[0];
+    }
+    return {
+      text: typeof data.text === "string" ? data.text.trim() : "",
+      words: Array.isArray(data.words) ? data.words : [],
+      language_probability: typeof data.language_probability === "number" ? data.language_probability : null,
+    };
+  } catch {
+    return null;
+  }
+}
+
+/** Concatenates segment transcripts, shifting word timings to recording time */
+function stitch(parts: { startSeconds: number; transcript: Transcript }[]): Transcript {
+  const words: TranscriptWord[] = [];
+  let weighted = 0;
+  let weight = 0;
+
+  for (const { startSeconds, transcript } of parts) {
+    for (const word of transcript.words) {
+      words.push({
+        ...word,
+        start: word.start !== undefined ? word.start + startSeconds : undefined,
+        end: word.end !== undefined ? word.end + startSeconds : undefined,
+      });
+    }
+    if (transcript.language_probability !== null) {
+      const count = Math.max(1, transcript.words.length);
+      weighted += transcript.language_probability * count;
+      weight += count;
+    }
+  }
+
+  return {
+    text: parts.map((p) => p.transcript.text).filter(Boolean).join(" "),
+    words,
+    language_probability: weight ? weighted / weight : null,
+  };
+}
+
+/**
+ * Registers segment `index` of a session and starts transcribing it.
+ * Returns null when the session belongs to someone else or is full.
+ */
+export function addSegment(
+  sessionId: string,
+  owner: string,
+  index: number,
+  startSeconds: number,
+  audio: Blob,
+  accessToken: string | undefined
+): Promise<Transcript | null> | null {
+  const now = Date.now();
+  prune(now);
+
+  let session = sessions.get(sessionId);
+  if (!session) {
+    session = { owner, segments: new Map(), updatedAt: now };
+    sessions.set(sessionId, session);
+  }
+  if (session.owner !== owner || session.segments.size >= MAX_SEGMENTS) return null;
+
+  const transcript = transcribe(audio, accessToken);
+  session.segments.set(index, { startSeconds, transcript });
+  session.updatedAt = now;
+  return transcript;
+}
+
+/**
+ * Transcribes the final segment, waits for the earlier ones and returns the
+ * stitched transcript. Returns null if a segment is missing (e.g. it reached
+ * another server instance) or failed; the client then resubmits the full
+ * recording.
+ */
+export async function finishSession(
+  sessionId: string,
+  owner: string,
+  segmentCount: number,
+  finalAudio: Blob,
+  finalStartSeconds: number,
+  accessToken: string | undefined
+): Promise<Transcript | null> {
+  const session = sessions.get(sessionId);
+  if (!session || session.owner !== owner || session.segments.size !== segmentCount) return null;
+  for (let i = 0; i < segmentCount; i++) {
+    if (!session.segments.has(i)) return null;
+  }
+
+  const pending = [...session.segments.entries()]
+    .sort(([a], [b]) => a - b)
+    .map(([, segment]) => segment);
+  pending.push({ startSeconds: finalStartSeconds, transcript: transcribe(finalAudio, accessToken) });
+
+  const transcripts = await Promise.all(pending.map((segment) => segment.transcript));
+  sessions.delete(sessionId);
+  if (transcripts.some((t) => t === null)) return null;
+
+  return stitch(pending.map((segment, i) => ({ startSeconds: segment.startSeconds, transcript: transcripts[i]! })));
+}
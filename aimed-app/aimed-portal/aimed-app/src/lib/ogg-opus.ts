@@ -0,0 +1,148 @@
+/**
+ * Minimal Ogg Opus muxer (RFC 7845) for packets produced by WebCodecs
+ * AudioEncoder. Mono only, one logical stream, no comments beyond the vendor.
+ */
+
+const OPUS_RATE = 48000;
+// libopus lookahead (6.5 ms), used when the encoder does not hand us an OpusHead
+const DEFAULT_PRE_SKIP = 312;
+const PACKETS_PER_PAGE = 50; // ~1 s of 20 ms frames
+
+let crcTable: Uint32Array | null = null;
+
+function oggCrc(data: Uint8Array): number {
+  if (!crcTable) {
+    crcTable = new Uint32Array(256);
+    for (let i = 0; i < 256; i++) {
+      let r = i << 24;
+      for (let j = 0; j < 8; j++) {
+        r = r & 0x80000000 ? (r << 1) ^ 0x04c11db7 : r << 1;
+      }
+      crcTable[i] = r >>> 0;
+    }
+  }
+  let crc = 0;
+  for (let i = 0; i < data.length; i++) {
+    crc = ((crc << 8) ^ crcTable[((crc >>> 24) ^ data[i]) & 0xff]) >>> 0;
+  }
+  return crc;
+}
+
+function page(
+  packets: Uint8Array[],
+  granule: bigint,
+  serial: number,
+  sequence: number,
+  flags: number
+): Uint8Array {
+  const lacing: number[] = [];
+  for (const packet of packets) {
+    let size = packet.length;
+    while (size >= 255) {
+      lacing.push(255);
+      size -= 255;
+    }
+    lacing.push(size);
+  }
+
+  const bodySize = packets.reduce((sum, p) => sum + p.length, 0);
+  const out = new Uint8Array(27 + lacing.length + bodySize);
+  const view = new DataView(out.buffer);
+  out.set([0x4f, 0x67, 0x67, 0x53]); // "OggS"
+  out[4] = 0; // version
+  out[5] = flags;
+  view.setBigInt64(6, granule, true);
+  view.setUint32(14, serial, true);
+  view.setUint32(18, sequence, true);
+  out[26] = lacing.length;
+  out.set(lacing, 27);
+
+  let offset = 27 + lacing.length;
+  for (const packet of packets) {
+    out.set(packet, offset);
+    offset += packet.length;
+  }
+  view.setUint32(22, oggCrc(out), true);
+  return out;
+}
+
+function opusHead(inputSampleRate: number, preSkip: number): Uint8Array {
+  const head = new Uint8Array(19);
+  const view = new DataView(head.buffer);
+  head.set(new TextEncoder().encode("OpusHead"));
+  head[8] = 1; // version
+  head[9] = 1; // channels
+  view.setUint16(10, preSkip, true);
+  view.setUint32(12, inputSampleRate, true);
+  view.setInt16(16, 0, true); // output gain
+  head[18] = 0; // mapping family
+  return head;
+}
+
+function opusTags(vendor: string): Uint8Array {
+  const vendorBytes = new TextEncoder().encode(vendor);
+  const tags = new Uint8Array(8 + 4 + vendorBytes.length + 4);
+  const view = new DataView(tags.buffer);
+  tags.set(new TextEncoder().encode("OpusTags"));
+  view.setUint32(8, vendorBytes.length, true);
+  tags.set(vendorBytes, 12);
+  view.setUint32(12 + vendorBytes.length, 0, true); // no user comments
+  return tags;
+}
+
+export interface OpusPacket {
+  data: Uint8Array;
+  /** Duration in microseconds, as reported by EncodedAudioChunk */
+  durationUs: number;
+}
+
+/**
+ * Wraps encoded Opus packets into an Ogg file. `totalSamples` is the length
+ * of the source audio at `inputSampleRate`, so players trim the padding of
+ * the last frame. `description` is the encoder's OpusHead, when it gives one.
+ */
+export function muxOggOpus(
+  packets: OpusPacket[],
+  inputSampleRate: number,
+  totalSamples: number,
+  description?: Uint8Array
+): Uint8Array {
+  const serial = (Math.random() * 0xffffffff) >>> 0;
+  const head =
+    description && description.length >= 19 && new TextDecoder().decode(description.subarray(0, 8)) === "OpusHead"
+      ? description
+      : opusHead(inputSampleRate, DEFAULT_PRE_SKIP);
+  const preSkip = new DataView(head.buffer, head.byteOffset).getUint16(10, true);
+  const endGranule = BigInt(preSkip + Math.round((totalSamples * OPUS_RATE) / inputSampleRate));
+
+  const pages: Uint8Array[] = [
+    page([head], 0n, serial, 0, 0x02),
+    page([opusTags("AiMED")], 0n, serial, 1, 0),
+  ];
+
+  let granule = BigInt(preSkip);
+  for (let i = 0; i < packets.length; i += PACKETS_PER_PAGE) {
+    const batch = packets.slice(i, i + PACKETS_PER_PAGE);
+    for (const packet of batch) {
+      granule += BigInt(Math.round((packet.durationUs * OPUS_RATE) / 1_000_000));
+    }
+    const last = i + PACKETS_PER_PAGE >= packets.length;
+    pages.push(
+      page(
+        batch.map((p) => p.data),
+        last && granule > endGranule ? endGranule : granule,
+        serial,
+        pages.length,
+        last ? 0x04 : 0
+      )
+    );
+  }
+
+  const out = new Uint8Array(pages.reduce((sum, p) => sum + p.length, 0));
+  let offset = 0;
+  for (const p of pages) {
+    out.set(p, offset);
+    offset += p.length;
+  }
+  return out;
+}
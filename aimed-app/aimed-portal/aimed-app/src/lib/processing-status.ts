@@ -0,0 +1,37 @@
+import type { ApiState } from "@/hooks/use-aimed-api";
+import type { QueueStatus } from "@/types/aimed";
+
+// ── Processing copy for the dictation flow ──
+//
+// Sync submits (job mode off) only go uploading → processing → done; async
+// jobs report the pipeline stages below. Update dictations always read
+// "Ažuriram nalaz..." once the upload is out, in both modes.
+
+/** Progress copy for each async job stage, in pipeline order */
+export const PROCESSING_STEPS = [
+  { state: "uploading", label: "Šaljem snimak..." },
+  { state: "uploaded", label: "Transkribujem diktat..." },
+  { state: "transcribed", label: "Strukturiram nalaz..." },
+  { state: "structured", label: "Provjeravam nalaz..." },
+  { state: "validated", label: "Završavam..." },
+] as const;
+
+/** Shown instead of the step label while the job waits for a free n8n slot */
+export function queueLabel(queue: QueueStatus): string {
+  const wait =
+    queue.estimatedWaitSeconds < 60 ? "manje od minute" : `oko ${Math.ceil(queue.estimatedWaitSeconds / 60)} min`;
+  return `Čekam na obradu — ${queue.position}. u redu, ${wait}...`;
+}
+
+/** Index into PROCESSING_STEPS for the progress bar; -1 outside the job stages (sync "processing") */
+export function processingStepIndex(state: ApiState): number {
+  return PROCESSING_STEPS.findIndex((step) => step.state === state);
+}
+
+export function processingLabel(state: ApiState, isUpdate: boolean, queue: QueueStatus | null): string {
+  if (queue) return queueLabel(queue);
+  if (state === "uploading") return "Šaljem snimak...";
+  if (isUpdate) return "Ažuriram nalaz...";
+  const step = PROCESSING_STEPS[processingStepIndex(state)];
+  return step ? step.label : "Obrađujem vaš nalaz...";
+}
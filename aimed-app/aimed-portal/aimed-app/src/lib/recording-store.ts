@@ -0,0 +1,241 @@
+import type { ReportMode } from "@/types/aimed";
+
+// ── Crash-safe recording storage (IndexedDB) ──
+//
+// MediaRecorder chunks are written to IndexedDB as they arrive, so a tab
+// crash or an accidental navigation does not lose the dictation and the heap
+// does not hold ten minutes of audio. The upload Blob is assembled from the
+// stored chunks (browsers keep those on disk). Without IndexedDB (private
+// mode, quota) chunks simply stay in memory. The audio is patient data on a
+// possibly shared PC: the store is cleared on sign-out and entries expire
+// after a working day.
+
+const DB_NAME = "aimed_recordings";
+const DB_VERSION = 1;
+const RECORDINGS = "recordings";
+const CHUNKS = "chunks";
+const MAX_AGE_MS = 8 * 60 * 60_000; // older unfinished recordings are dropped
+
+/** What is needed to reopen the dictation a recording belongs to */
+export interface RecordingContext {
+  doctorId: string;
+  patientId: string;
+  mode: ReportMode;
+  /** Report being updated (update mode) */
+  reportId?: string;
+}
+
+export interface StoredRecording extends RecordingContext {
+  id: string;
+  mimeType: string;
+  startedAt: string;
+  updatedAt: string;
+  durationSeconds: number;
+  chunkCount: number;
+}
+
+interface StoredChunk {
+  recordingId: string;
+  seq: number;
+  data: Blob;
+}
+
+let dbPromise: Promise<IDBDatabase | null> | null = null;
+
+function promisify<T>(request: IDBRequest<T>): Promise<T> {
+  return new Promise((resolve, reject) => {
+    request.onsuccess = () => resolve(request.result);
+    request.onerror = () => reject(request.error);
+  });
+}
+
+function transactionDone(tx: IDBTransaction): Promise<void> {
+  return new Promise((resolve, reject) => {
+    tx.oncomplete = () => resolve();
+    tx.onerror = () => reject(tx.error);
+    tx.onabort = () => reject(tx.error);
+  });
+}
+
+function openDb(): Promise<IDBDatabase | null> {
+  if (dbPromise) return dbPromise;
+  dbPromise = new Promise<IDBDatabase | null>((resolve) => {
+    if (typeof indexedDB === "undefined") return resolve(null);
+    try {
+      const request = indexedDB.open(DB_NAME, DB_VERSION);
+      request.onupgradeneeded = () => {
+        const db = request.result;
+        db.createObjectStore(RECORDINGS, { keyPath: "id" });
+        db.createObjectStore(CHUNKS, { keyPath: ["recordingId", "seq"] });
+      };
+      request.onsuccess = () => resolve(request.result);
+      request.onerror = () => resolve(null);
+      request.onblocked = () => resolve(null);
+    } catch {
+      resolve(null);
+    }
+  });
+  return dbPromise;
+}
+
+/** All chunks of one recording, in order */
+function chunkRange(recordingId: string): IDBKeyRange {
+  return IDBKeyRange.bound([recordingId, 0], [recordingId, Infinity]);
+}
+
+/**
+ * One recording in progress. Chunks are written in order; a chunk IndexedDB
+ * refuses (e.g. quota) is kept in memory so the recording stays complete.
+ */
+export class PersistentRecording {
+  private seq = 0;
+  private writes: Promise<void> = Promise.resolve();
+  private readonly unsaved = new Map<number, Blob>();
+
+  private constructor(
+    readonly id: string,
+    private readonly mimeType: string,
+    private readonly db: IDBDatabase | null,
+    private readonly meta: StoredRecording | null
+  ) {}
+
+  static async create(mimeType: string, context: RecordingContext | null): Promise<PersistentRecording> {
+    const id = typeof crypto !== "undefined" && crypto.randomUUID ? crypto.randomUUID() : `${Date.now()}-${Math.random()}`;
+    const db = context ? await openDb() : null;
+    if (!db || !context) return new PersistentRecording(id, mimeType, null, null);
+
+    const now = new Date().toISOString();
+    const meta: StoredRecording = {
+      ...context,
+      id,
+      mimeType,
+      startedAt: now,
+      updatedAt: now,
+      durationSeconds: 0,
+      chunkCount: 0,
+    };
+    try {
+      await promisify(db.transaction(RECORDINGS, "readwrite").objectStore(RECORDINGS).put(meta));
+      return new PersistentRecording(id, mimeType, db, meta);
+    } catch {
+      return new PersistentRecording(id, mimeType, null, null);
+    }
+  }
+
+  /** True when chunks reach IndexedDB (the recording can be recovered) */
+  get persistent(): boolean {
+    return this.meta !== null;
+  }
+
+  /** Stores a chunk from ondataavailable; `durationSeconds` is the recording length so far */
+  append(chunk: Blob, durationSeconds: number) {
+    const seq = this.seq++;
+    const { db, meta } = this;
+    if (!db || !meta) {
+      this.unsaved.set(seq, chunk);
+      return;
+    }
+
+    this.writes = this.writes.then(async () => {
+      try {
+        const tx = db.transaction([RECORDINGS, CHUNKS], "readwrite");
+        const stored: StoredChunk = { recordingId: this.id, seq, data: chunk };
+        tx.objectStore(CHUNKS).put(stored);
+        meta.chunkCount = seq + 1;
+        meta.durationSeconds = durationSeconds;
+        meta.updatedAt = new Date().toISOString();
+        tx.objectStore(RECORDINGS).put(meta);
+        await transactionDone(tx);
+      } catch {
+        this.unsaved.set(seq, chunk);
+      }
+    });
+  }
+
+  /** Waits for pending writes and builds the recording Blob from storage */
+  async assemble(): Promise<Blob> {
+    await this.writes;
+    const stored = this.db ? await readChunks(this.db, this.id) : [];
+    const parts: Blob[] = [];
+    for (let seq = 0; seq < this.seq; seq++) {
+      const part = this.unsaved.get(seq) ?? stored[seq];
+      if (part) parts.push(part);
+    }
+    return new Blob(parts, { type: this.mimeType });
+  }
+}
+
+async function readChunks(db: IDBDatabase, recordingId: string): Promise<Blob[]> {
+  try {
+    const chunks = await promisify(
+      db.transaction(CHUNKS).objectStore(CHUNKS).getAll(chunkRange(recordingId))
+    ) as StoredChunk[];
+    const bySeq: Blob[] = [];
+    for (const chunk of chunks) bySeq[chunk.seq] = chunk.data;
+    return bySeq;
+  } catch {
+    return [];
+  }
+}
+
+/** Recordings of this doctor that were never finished, newest first (old ones are purged) */
+export async function listUnfinishedRecordings(doctorId: string): Promise<StoredRecording[]> {
+  const db = await openDb();
+  if (!db) return [];
+  try {
+    const all = (await promisify(db.transaction(RECORDINGS).objectStore(RECORDINGS).getAll())) as StoredRecording[];
+    const cutoff = Date.now() - MAX_AGE_MS;
+    const expired = all.filter((r) => Date.parse(r.updatedAt) < cutoff);
+    await Promise.all(expired.map((r) => deleteRecording(r.id)));
+    return all
+      .filter((r) => r.doctorId === doctorId && r.chunkCount > 0 && !expired.includes(r))
+      .sort((a, b) => b.updatedAt.localeCompare(a.updatedAt));
+  } catch {
+    return [];
+  }
+}
+
+/** Assembles a stored recording for upload */
+export async function loadRecording(id: string): Promise<{ blob: Blob; recording: StoredRecording } | null> {
+  const db = await openDb();
+  if (!db) return null;
+  try {
+    const recording = (await promisify(db.transaction(RECORDINGS).objectStore(RECORDINGS).get(id))) as
+      | StoredRecording
+      | undefined;
+    if (!recording) return null;
+    const chunks = (await readChunks(db, id)).filter(Boolean);
+    if (chunks.length === 0) return null;
+    return { blob: new Blob(chunks, { type: recording.mimeType }), recording };
+  } catch {
+    return null;
+  }
+}
+
+/** Removes a recording once its report exists or the doctor discarded it */
+export async function deleteRecording(id: string): Promise<void> {
+  const db = await openDb();
+  if (!db) return;
+  try {
+    const tx = db.transaction([RECORDINGS, CHUNKS], "readwrite");
+    tx.objectStore(RECORDINGS).delete(id);
+    tx.objectStore(CHUNKS).delete(chunkRange(id));
+    await transactionDone(tx);
+  } catch {
+    // Storage unavailable — the entry expires after MAX_AGE_MS
+  }
+}
+
+/** Removes every stored recording, of any doctor (sign-out) */
+export async function clearRecordings(): Promise<void> {
+  const db = await openDb();
+  if (!db) return;
+  try {
+    const tx = db.transaction([RECORDINGS, CHUNKS], "readwrite");
+    tx.objectStore(RECORDINGS).clear();
+    tx.objectStore(CHUNKS).clear();
+    await transactionDone(tx);
+  } catch {
+    // Storage unavailable — entries expire after MAX_AGE_MS
+  }
+}
@@ -1,10 +1,56 @@
-import type { ReportSection, ParsedReport } from "@/types/aimed";
+import type { ReportSection, ParsedReport, ReportTokens, SectionSpan } from "@/types/aimed";
+import grammar from "@/lib/section-grammar.json";
 
-/** Standard medical report sections */
-const STANDARD_SECTIONS = ["ANAMNEZA", "STATUS", "DIJAGNOZA", "TERAPIJA", "PREPORUKE"];
+/**
+ * Section grammar shared with tools/section_grammar.py (STANDARD_SECTIONS,
+ * FILTERED_SECTIONS, header charset and normalizeHeader rules).
+ */
+const STANDARD_SECTIONS = new Set(grammar.standardSections);
+const FILTERED_SECTIONS = new Set(grammar.filteredSections);
+
+function escapeRegExp(value: string): string {
+  return value.replace(/[.*+?^${}()|[\]\\]/g, "\\$&");
+}
+
+/**
+ * Compiles the grammar into one token regex (same construction as
+ * tools/section_grammar.py). Each match skips blank space (group 1) and then
+ * captures a warning line (2), a header line (3) or a whole run of plain
+ * content lines (4) — one match per header/warning/block, not per line.
+ * All captured bodies are trimmed. A header is ALL CAPS, at least
+ * `minLength` chars, with at least one letter.
+ */
+function compileTokenPattern(): RegExp {
+  const ws = grammar.whitespace;
+  const letters = grammar.header.letters;
+  const solid = letters + grammar.header.symbols;
+  const inner = solid + grammar.header.innerWhitespace;
+  const middle = Math.max(grammar.header.minLength - 2, 1);
+  const prefix = escapeRegExp(grammar.warningPrefix);
+
+  const header = `(?=[${inner}]*[${letters}])[${solid}][${inner}]{${middle},}[${solid}]`;
+  const lineEnd = `[${ws}]*(?:\\n|$)`;
+  const line = `[^${ws}\\n](?:[^\\n]*[^${ws}\\n])?`;
+  return new RegExp(
+    `([${ws}\\n]*)(?:` +
+      `(${prefix}(?:[^\\n]*[^${ws}\\n])?)(?=${lineEnd})` +
+      `|(${header})(?=${lineEnd})` +
+      `|(${line}(?:[${ws}\\n]*\\n[${ws}]*(?!${prefix}|${header}${lineEnd})${line})*)` +
+      `)`,
+    "g"
+  );
+}
+
+const TOKEN_PATTERN = compileTokenPattern();
+const EDGE_WHITESPACE = new RegExp(`^[${grammar.whitespace}]+|[${grammar.whitespace}]+$`, "g");
+const LINE_EDGES = new RegExp(`[${grammar.whitespace}]*\\n[${grammar.whitespace}]*`, "g");
+const TRAILING_PUNCTUATION = new RegExp(
+  `[${grammar.whitespace}${grammar.normalize.trailingPunctuation}]+$`
+);
 
-/** Sections the AI sometimes hallucinates — these are filtered out */
-const FILTERED_SECTIONS = ["PODACI O PACIJENTU", "DATUM PREGLEDA", "ZAKLJUČAK"];
+function trim(value: string): string {
+  return value.replace(EDGE_WHITESPACE, "");
+}
 
 /**
  * Maps composite/variant headers to their standard base section.
@@ -12,15 +58,67 @@ const FILTERED_SECTIONS = ["PODACI O PACIJENTU", "DATUM PREGLEDA", "ZAKLJUČAK"]
  */
 function normalizeHeader(header: string): string {
   // Strip trailing punctuation (:, ., /)
-  let cleaned = header.replace(/[\s:./\-]+$/g, "").trim();
+  const cleaned = trim(header.replace(TRAILING_PUNCTUATION, ""));
   // For composite headers like "PREPORUKE/KONTROLE", take the first part
-  if (cleaned.includes("/")) {
-    const first = cleaned.split("/")[0].trim();
-    if (STANDARD_SECTIONS.includes(first)) return first;
+  const separator = grammar.normalize.compositeSeparator;
+  if (cleaned.includes(separator)) {
+    const first = trim(cleaned.split(separator)[0]);
+    if (STANDARD_SECTIONS.has(first)) return first;
   }
   return cleaned;
 }
 
+/**
+ * Walks `report_text` once and returns section and warning spans as offsets
+ * into the original string — no per-line copies or concatenation.
+ * Filtered (hallucinated) sections are kept and flagged so callers can decide.
+ */
+export function tokenizeReport(text: string): ReportTokens {
+  const sections: SectionSpan[] = [];
+  const warnings: ReportTokens["warnings"] = [];
+  let current: SectionSpan | null = null;
+
+  const pattern = new RegExp(TOKEN_PATTERN);
+  let match: RegExpExecArray | null;
+
+  while ((match = pattern.exec(text)) !== null) {
+    const start = match.index + match[1].length;
+
+    if (match[2] !== undefined) {
+      warnings.push({ start, end: start + match[2].length });
+    } else if (match[3] !== undefined) {
+      const end = start + match[3].length;
+      const title = normalizeHeader(match[3]);
+      current = {
+        title,
+        filtered: FILTERED_SECTIONS.has(title),
+        headerStart: start,
+        headerEnd: end,
+        contentStart: end,
+        contentEnd: end,
+      };
+      sections.push(current);
+    } else if (match[4] !== undefined && current) {
+      if (current.contentStart === current.contentEnd) current.contentStart = start;
+      current.contentEnd = start + match[4].length;
+    }
+  }
+
+  return { sections, warnings };
+}
+
+/** Materializes a section body: trimmed lines, warnings removed, inner blank lines kept */
+export function sectionContent(text: string, span: SectionSpan): string {
+  const body = text.slice(span.contentStart, span.contentEnd);
+  if (!body.includes("\n")) return body;
+  const trimmed = body.replace(LINE_EDGES, "\n");
+  if (!trimmed.includes(grammar.warningPrefix)) return trimmed;
+  return trimmed
+    .split("\n")
+    .filter((line) => !line.startsWith(grammar.warningPrefix))
+    .join("\n");
+}
+
 /**
  * Parses the plain-text `report_text` from n8n into structured sections.
  *
@@ -31,67 +129,21 @@ function normalizeHeader(header: string): string {
  *   NEXT SECTION
  *   More content...
  *
- * Warnings are lines matching [NAPOMENA: ...].
+ * Warnings are lines matching [NAPOMENA: ...]. Hallucinated sections
+ * (FILTERED_SECTIONS) are dropped together with their content.
  */
 export function parseReport(text: string): ParsedReport {
-  const lines = text.split("\n");
-  const sections: ReportSection[] = [];
-  const warnings: string[] = [];
-  let currentSection: ReportSection | null = null;
-
-  for (const line of lines) {
-    const trimmed = line.trim();
-
-    if (!trimmed) {
-      // Preserve blank lines within section content
-      if (currentSection && currentSection.content) {
-        currentSection.content += "\n";
-      }
-      continue;
-    }
+  const tokens = tokenizeReport(text);
 
-    // Check for warnings
-    if (trimmed.startsWith("[NAPOMENA")) {
-      warnings.push(trimmed);
-      continue;
-    }
+  const sections: ReportSection[] = tokens.sections
+    .filter((span) => !span.filtered)
+    .map((span) => ({ title: span.title, content: sectionContent(text, span) }));
 
-    // Check for section header: ALL CAPS, at least 3 characters, no lowercase
-    if (isSectionHeader(trimmed)) {
-      if (currentSection) {
-        currentSection.content = currentSection.content.trim();
-        sections.push(currentSection);
-      }
-      const normalized = normalizeHeader(trimmed);
-      // Skip hallucinated sections
-      if (FILTERED_SECTIONS.includes(normalized)) {
-        currentSection = null;
-        continue;
-      }
-      currentSection = { title: normalized, content: "" };
-    } else if (currentSection) {
-      currentSection.content +=
-        (currentSection.content ? "\n" : "") + trimmed;
-    }
-  }
-
-  if (currentSection) {
-    currentSection.content = currentSection.content.trim();
-    sections.push(currentSection);
-  }
+  const warnings = tokens.warnings.map((w) => text.slice(w.start, w.end));
 
   return { sections, warnings, rawText: text };
 }
 
-/** Heuristic: a line is a section header if it's ALL CAPS, 3+ chars, and contains at least one letter */
-function isSectionHeader(line: string): boolean {
-  if (line.length < 3) return false;
-  // Must have at least one letter
-  if (!/[A-ZČĆŠĐŽ]/.test(line)) return false;
-  // Must be uppercase (allow spaces, digits, slashes, dashes, dots)
-  return line === line.toUpperCase() && /^[A-ZČĆŠĐŽ0-9\s/\-.:]+$/.test(line);
-}
-
 /** Converts parsed sections back to plain text (for clipboard copy), filtering out empty ones */
 export function sectionsToPlainText(sections: ReportSection[]): string {
   return sections
@@ -0,0 +1,152 @@
+/**
+ * In-flight deduplication and short-lived result cache for /api/submit.
+ *
+ * A retried submission (same doctor, same audio + fields) joins the upstream
+ * request that is still running, or gets the finished result, instead of
+ * paying for STT and the agent a second time. State lives in the server
+ * process, so hit rates are per instance.
+ *
+ * Configuration:
+ *   SUBMIT_CACHE_TTL_SECONDS    how long finished results are served (default 600, 0 disables)
+ *   SUBMIT_CACHE_MAX_ENTRIES    LRU capacity (default 200)
+ */
+
+export interface SubmitResult {
+  status: number;
+  body: Record<string, unknown>;
+}
+
+export type CacheOutcome = "hit" | "inflight" | "miss";
+
+export type DedupeResult =
+  | { kind: "result"; outcome: CacheOutcome; result: SubmitResult }
+  | { kind: "conflict" };
+
+interface Entry {
+  result: SubmitResult;
+  expiresAt: number;
+}
+
+const TTL_MS = Math.max(0, Number(process.env.SUBMIT_CACHE_TTL_SECONDS ?? 600)) * 1000;
+const MAX_ENTRIES = Math.max(1, Number(process.env.SUBMIT_CACHE_MAX_ENTRIES ?? 200));
+
+// Map iteration order is insertion order: re-inserting on access makes it an LRU
+const results = new Map<string, Entry>();
+const inflight = new Map<string, Promise<SubmitResult>>();
+// Idempotency key → content key it was first used with
+const idempotencyKeys = new Map<string, { contentKey: string; expiresAt: number }>();
+
+const counters = {
+  requests: 0,
+  hits: 0,
+  inflightJoins: 0,
+  misses: 0,
+  stored: 0,
+  evictions: 0,
+  expired: 0,
+  keyConflicts: 0,
+  hashMismatches: 0,
+};
+
+function isCacheable(result: SubmitResult): boolean {
+  // Guardrail rejections (success: false, 200) are as deterministic as reports;
+  // upstream errors and timeouts are not
+  return result.status === 200;
+}
+
+function getFresh(key: string, now: number): SubmitResult | null {
+  const entry = results.get(key);
+  if (!entry) return null;
+  results.delete(key);
+  if (entry.expiresAt <= now) {
+    counters.expired++;
+    return null;
+  }
+  results.set(key, entry);
+  return entry.result;
+}
+
+function store(key: string, result: SubmitResult, now: number) {
+  if (TTL_MS === 0 || !isCacheable(result)) return;
+  results.delete(key);
+  results.set(key, { result, expiresAt: now + TTL_MS });
+  counters.stored++;
+  while (results.size > MAX_ENTRIES) {
+    const oldest = results.keys().next().value as string;
+    results.delete(oldest);
+    counters.evictions++;
+  }
+}
+
+function rememberKey(scopedKey: string, contentKey: string, now: number): boolean {
+  const known = idempotencyKeys.get(scopedKey);
+  if (known && known.expiresAt > now && known.contentKey !== contentKey) {
+    return false;
+  }
+  idempotencyKeys.delete(scopedKey);
+  idempotencyKeys.set(scopedKey, { contentKey, expiresAt: now + Math.max(TTL_MS, 60_000) });
+  while (idempotencyKeys.size > MAX_ENTRIES * 4) {
+    idempotencyKeys.delete(idempotencyKeys.keys().next().value as string);
+  }
+  return true;
+}
+
+/**
+ * Runs `forward` at most once per (scope, contentHash) at a time, and serves
+ * its 200 result again for the TTL. Reusing an idempotency key with different
+ * content is a conflict.
+ */
+export async function dedupeSubmit(
+  scope: string,
+  contentHash: string,
+  idempotencyKey: string | null,
+  forward: () => Promise<SubmitResult>
+): Promise<DedupeResult> {
+  counters.requests++;
+  const now = Date.now();
+  const contentKey = `${scope}:${contentHash}`;
+
+  if (idempotencyKey && !rememberKey(`${scope}:${idempotencyKey}`, contentKey, now)) {
+    counters.keyConflicts++;
+    return { kind: "conflict" };
+  }
+
+  const cached = getFresh(contentKey, now);
+  if (cached) {
+    counters.hits++;
+    return { kind: "result", outcome: "hit", result: cached };
+  }
+
+  const running = inflight.get(contentKey);
+  if (running) {
+    counters.inflightJoins++;
+    return { kind: "result", outcome: "inflight", result: await running };
+  }
+
+  counters.misses++;
+  const pending = forward()
+    .then((result) => {
+      store(contentKey, result, Date.now());
+      return result;
+    })
+    .finally(() => inflight.delete(contentKey));
+  inflight.set(contentKey, pending);
+  return { kind: "result", outcome: "miss", result: await pending };
+}
+
+export function recordHashMismatch() {
+  counters.hashMismatches++;
+}
+
+export function submitCacheMetrics() {
+  const served = counters.hits + counters.inflightJoins;
+  const decided = served + counters.misses;
+  return {
+    ...counters,
+    hitRate: decided ? served / decided : 0,
+    entries: results.size,
+    inflight: inflight.size,
+    ttlSeconds: TTL_MS / 1000,
+    maxEntries: MAX_ENTRIES,
+  };
+}
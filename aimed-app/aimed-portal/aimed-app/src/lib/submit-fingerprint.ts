@@ -0,0 +1,51 @@
+/**
+ * Submission fingerprint shared by the browser (services/aimed-api.ts) and
+ * the /api/submit proxy, so both derive the same content hash from the
+ * same audio + form fields using WebCrypto.
+ */
+
+export const IDEMPOTENCY_KEY_HEADER = "Idempotency-Key";
+export const CONTENT_HASH_HEADER = "X-Content-Hash";
+export const CACHE_STATUS_HEADER = "X-Idempotency-Cache";
+/** Marks streamed dictations, which the proxy must parse instead of piping through */
+export const DICTATION_SESSION_HEADER = "X-Dictation-Session";
+
+/** Form fields that change the generated report, in hashing order */
+export const FINGERPRINT_FIELDS = [
+  "mode",
+  "existing_report",
+  "doctor_id",
+  "existing_data",
+  "preferred_sections",
+  "dictation_session",
+] as const;
+
+export type FingerprintFields = Partial<Record<(typeof FINGERPRINT_FIELDS)[number], string | null>>;
+
+const IDEMPOTENCY_KEY_PATTERN = /^[A-Za-z0-9_:-]{8,128}$/;
+
+function toHex(buffer: ArrayBuffer): string {
+  return Array.from(new Uint8Array(buffer), (b) => b.toString(16).padStart(2, "0")).join("");
+}
+
+/**
+ * sha256(sha256(fields JSON) || sha256(audio)) as hex.
+ * Hashing the parts separately avoids copying the audio into a combined buffer.
+ */
+export async function fingerprintSubmission(audio: Blob, fields: FingerprintFields): Promise<string> {
+  const fieldBytes = new TextEncoder().encode(
+    JSON.stringify(FINGERPRINT_FIELDS.map((name) => fields[name] ?? null))
+  );
+  const [fieldDigest, audioDigest] = await Promise.all([
+    crypto.subtle.digest("SHA-256", fieldBytes),
+    crypto.subtle.digest("SHA-256", await audio.arrayBuffer()),
+  ]);
+  const combined = new Uint8Array(64);
+  combined.set(new Uint8Array(fieldDigest), 0);
+  combined.set(new Uint8Array(audioDigest), 32);
+  return toHex(await crypto.subtle.digest("SHA-256", combined));
+}
+
+export function isValidIdempotencyKey(key: string | null): key is string {
+  return key !== null && IDEMPOTENCY_KEY_PATTERN.test(key);
+}
@@ -0,0 +1,210 @@
+/**
+ * Admission control in front of the n8n transcription webhook.
+ *
+ * Every forward from /api/submit takes a slot: at most MAX_ACTIVE run at once
+ * on this server instance, and at most MAX_ACTIVE_PER_DOCTOR for one doctor.
+ * Requests over the limit wait in a fair queue — one FIFO per doctor, served
+ * round-robin — so a clinic re-dictating a batch cannot starve everyone else.
+ * Waiting is bounded by the caller's maxWaitMs and the queue length is capped;
+ * rejected requests get a Retry-After estimate. Like the submit cache and the
+ * job store, state lives in the server process.
+ *
+ * Configuration:
+ *   AIMED_MAX_CONCURRENT              transcriptions in flight per instance (default 8)
+ *   AIMED_MAX_CONCURRENT_PER_DOCTOR   transcriptions in flight per doctor (default 2)
+ *   AIMED_MAX_QUEUED                  waiting requests per instance (default 100)
+ */
+
+import type { QueueStatus } from "@/types/aimed";
+
+const MAX_ACTIVE = Math.max(1, Number(process.env.AIMED_MAX_CONCURRENT ?? 8));
+const MAX_ACTIVE_PER_DOCTOR = Math.max(1, Number(process.env.AIMED_MAX_CONCURRENT_PER_DOCTOR ?? 2));
+const MAX_QUEUED = Math.max(0, Number(process.env.AIMED_MAX_QUEUED ?? 100));
+// Wait estimates start from this transcription time and follow measured ones
+const INITIAL_SERVICE_MS = 30_000;
+const SERVICE_SMOOTHING = 0.2;
+
+export type Admission =
+  | { kind: "admitted"; waitedMs: number; release: () => void }
+  | { kind: "rejected"; reason: "queue_full" | "timeout"; retryAfterSeconds: number };
+
+interface Waiter {
+  doctor: string;
+  enqueuedAt: number;
+  admit: () => void;
+  onQueue?: (status: QueueStatus) => void;
+  last: QueueStatus | null;
+}
+
+const active = new Map<string, number>();
+let activeTotal = 0;
+// Doctor → waiting requests. Map order is the round-robin order: a doctor
+// moves to the back after being served.
+const queues = new Map<string, Waiter[]>();
+let queuedTotal = 0;
+let serviceMs = INITIAL_SERVICE_MS;
+
+const counters = {
+  admitted: 0,
+  queued: 0,
+  rejectedFull: 0,
+  rejectedTimeout: 0,
+  totalWaitMs: 0,
+};
+
+function occupy(doctor: string): () => void {
+  const startedAt = Date.now();
+  activeTotal++;
+  active.set(doctor, (active.get(doctor) ?? 0) + 1);
+
+  let released = false;
+  return () => {
+    if (released) return;
+    released = true;
+    activeTotal--;
+    const remaining = (active.get(doctor) ?? 1) - 1;
+    if (remaining > 0) active.set(doctor, remaining);
+    else active.delete(doctor);
+    serviceMs += SERVICE_SMOOTHING * (Date.now() - startedAt - serviceMs);
+    dispatch();
+  };
+}
+
+function hasFreeSlot(doctor: string): boolean {
+  return activeTotal < MAX_ACTIVE && (active.get(doctor) ?? 0) < MAX_ACTIVE_PER_DOCTOR;
+}
+
+/** Admits waiters round-robin across doctors while slots are free */
+function dispatch() {
+  let admitted = true;
+  while (admitted && activeTotal < MAX_ACTIVE) {
+    admitted = false;
+    for (const [doctor, queue] of queues) {
+      if (!hasFreeSlot(doctor)) continue;
+      const waiter = queue.shift();
+      queues.delete(doctor);
+      if (queue.length > 0) queues.set(doctor, queue);
+      if (!waiter) continue;
+      queuedTotal--;
+      waiter.admit();
+      admitted = true;
+      break;
+    }
+  }
+  notifyPositions();
+}
+
+/**
+ * 1-based positions in the order the round-robin would serve the current
+ * queue, and the wait that implies at the measured transcription time.
+ */
+function estimate(): Map<Waiter, QueueStatus> {
+  const statuses = new Map<Waiter, QueueStatus>();
+  const lanes = [...queues.values()];
+  let position = 0;
+  for (let round = 0; lanes.some((lane) => round < lane.length); round++) {
+    for (const lane of lanes) {
+      const waiter = lane[round];
+      if (!waiter) continue;
+      position++;
+      // Globally, `position` slots have to free up; a doctor at the limit also
+      // waits for their own transcriptions to finish
+      const ownAhead = round + (active.get(waiter.doctor) ?? 0) - MAX_ACTIVE_PER_DOCTOR + 1;
+      const waitMs = Math.max(
+        (position * serviceMs) / MAX_ACTIVE,
+        ownAhead > 0 ? Math.ceil(ownAhead / MAX_ACTIVE_PER_DOCTOR) * serviceMs : 0
+      );
+      statuses.set(waiter, { position, estimatedWaitSeconds: Math.ceil(waitMs / 1000) });
+    }
+  }
+  return statuses;
+}
+
+function notifyPositions() {
+  for (const [waiter, status] of estimate()) {
+    const last = waiter.last;
+    if (last && last.position === status.position && last.estimatedWaitSeconds === status.estimatedWaitSeconds) {
+      continue;
+    }
+    waiter.last = status;
+    waiter.onQueue?.(status);
+  }
+}
+
+function retryAfterSeconds(): number {
+  return Math.max(1, Math.ceil(((queuedTotal + 1) * serviceMs) / MAX_ACTIVE / 1000));
+}
+
+/**
+ * Waits for a transcription slot for `doctor`, at most `maxWaitMs`.
+ * `onQueue` hears the queue position and estimated wait whenever they change.
+ * An admitted caller must call `release()` when the webhook call ends.
+ */
+export function admit(
+  doctor: string,
+  maxWaitMs: number,
+  onQueue?: (status: QueueStatus) => void
+): Promise<Admission> {
+  // Free capacity means nobody else can use it right now: other waiters are
+  // only queued behind their own per-doctor limit
+  if (hasFreeSlot(doctor) && !queues.has(doctor)) {
+    counters.admitted++;
+    return Promise.resolve({ kind: "admitted", waitedMs: 0, release: occupy(doctor) });
+  }
+
+  if (queuedTotal >= MAX_QUEUED) {
+    counters.rejectedFull++;
+    return Promise.resolve({ kind: "rejected", reason: "queue_full", retryAfterSeconds: retryAfterSeconds() });
+  }
+
+  return new Promise((resolve) => {
+    const waiter: Waiter = {
+      doctor,
+      enqueuedAt: Date.now(),
+      admit: () => {
+        clearTimeout(timer);
+        const waitedMs = Date.now() - waiter.enqueuedAt;
+        counters.admitted++;
+        counters.totalWaitMs += waitedMs;
+        resolve({ kind: "admitted", waitedMs, release: occupy(doctor) });
+      },
+      onQueue,
+      last: null,
+    };
+
+    const timer = setTimeout(() => {
+      const queue = queues.get(doctor);
+      const index = queue?.indexOf(waiter) ?? -1;
+      if (!queue || index < 0) return;
+      queue.splice(index, 1);
+      if (queue.length === 0) queues.delete(doctor);
+      queuedTotal--;
+      counters.rejectedTimeout++;
+      resolve({ kind: "rejected", reason: "timeout", retryAfterSeconds: retryAfterSeconds() });
+      notifyPositions();
+    }, maxWaitMs);
+
+    const queue = queues.get(doctor);
+    if (queue) queue.push(waiter);
+    else queues.set(doctor, [waiter]);
+    queuedTotal++;
+    counters.queued++;
+    notifyPositions();
+  });
+}
+
+export function governorMetrics() {
+  const admitted = counters.admitted;
+  return {
+    ...counters,
+    active: activeTotal,
+    queuedNow: queuedTotal,
+    doctorsActive: active.size,
+    doctorsQueued: queues.size,
+    meanWaitMs: admitted ? Math.round(counters.totalWaitMs / admitted) : 0,
+    serviceSeconds: Math.round(serviceMs / 100) / 10,
+    maxConcurrent: MAX_ACTIVE,
+    maxConcurrentPerDoctor: MAX_ACTIVE_PER_DOCTOR,
+    maxQueued: MAX_QUEUED,
+  };
+}
@@ -0,0 +1,130 @@
+/**
+ * In-process job store for asynchronous /api/submit requests.
+ *
+ * The proxy creates a job once the upload is received, runs the webhook call
+ * in the background and records the stages n8n reports back through
+ * /api/jobs/[id]/progress. Clients follow a job over SSE
+ * (/api/jobs/[id]/events) or by polling /api/jobs/[id]. Like the submit cache,
+ * state lives in the server process, so progress callbacks must reach the
+ * instance that owns the job.
+ */
+
+import type { JobSnapshot, JobStage, QueueStatus } from "@/types/aimed";
+import type { SubmitResult } from "@/lib/submit-cache";
+
+/** Pipeline order; a job only ever moves forward through it */
+export const JOB_STAGES: JobStage[] = ["uploaded", "transcribed", "structured", "validated", "done"];
+
+// Finished jobs stay readable long enough for a reconnecting client
+const RETENTION_MS = 30 * 60_000;
+
+interface Job {
+  id: string;
+  owner: string;
+  token: string;
+  stage: JobStage;
+  stageTimes: Partial<Record<JobStage, number>>;
+  createdAt: number;
+  result: SubmitResult | null;
+  queue: QueueStatus | null;
+  listeners: Set<(snapshot: JobSnapshot) => void>;
+}
+
+const jobs = new Map<string, Job>();
+
+function prune(now: number) {
+  for (const [id, job] of jobs) {
+    if (job.stage === "done" && now - (job.stageTimes.done ?? now) > RETENTION_MS) {
+      jobs.delete(id);
+    }
+  }
+}
+
+function snapshot(job: Job): JobSnapshot {
+  return {
+    id: job.id,
+    stage: job.stage,
+    stageTimes: { ...job.stageTimes },
+    elapsedMs: Date.now() - job.createdAt,
+    status: job.result?.status ?? null,
+    result: job.result?.body ?? null,
+    queue: job.queue,
+  };
+}
+
+function notify(job: Job) {
+  const current = snapshot(job);
+  for (const listener of job.listeners) listener(current);
+}
+
+/** Registers a job in the "uploaded" stage; `token` authenticates n8n progress callbacks */
+export function createJob(owner: string): { id: string; token: string } {
+  const now = Date.now();
+  prune(now);
+  const job: Job = {
+    id: crypto.randomUUID(),
+    owner,
+    token: crypto.randomUUID(),
+    stage: "uploaded",
+    stageTimes: { uploaded: now },
+    createdAt: now,
+    result: null,
+    queue: null,
+    listeners: new Set(),
+  };
+  jobs.set(job.id, job);
+  return { id: job.id, token: job.token };
+}
+
+/** Returns the job if it exists and belongs to `owner` */
+export function getJob(id: string, owner: string): JobSnapshot | null {
+  const job = jobs.get(id);
+  return job && job.owner === owner ? snapshot(job) : null;
+}
+
+/**
+ * Advances a job to `stage` when called with the job's callback token.
+ * Out-of-order or repeated reports are ignored.
+ */
+export function reportStage(id: string, token: string, stage: JobStage): boolean {
+  const job = jobs.get(id);
+  if (!job || job.token !== token || stage === "done") return false;
+  if (JOB_STAGES.indexOf(stage) <= JOB_STAGES.indexOf(job.stage)) return true;
+  job.stage = stage;
+  job.stageTimes[stage] = Date.now();
+  notify(job);
+  return true;
+}
+
+/** Publishes the job's place in the admission queue (null once it is admitted) */
+export function setJobQueue(id: string, queue: QueueStatus | null) {
+  const job = jobs.get(id);
+  if (!job || job.stage === "done" || (job.queue === null && queue === null)) return;
+  job.queue = queue;
+  notify(job);
+}
+
+export function completeJob(id: string, result: SubmitResult) {
+  const job = jobs.get(id);
+  if (!job || job.stage === "done") return;
+  job.stage = "done";
+  job.queue = null;
+  job.stageTimes.done = Date.now();
+  job.result = result;
+  notify(job);
+  job.listeners.clear();
+}
+
+/** Calls `listener` on every change until the job is done; returns an unsubscribe function */
+export function subscribeJob(
+  id: string,
+  owner: string,
+  listener: (snapshot: JobSnapshot) => void
+): (() => void) | null {
+  const job = jobs.get(id);
+  if (!job || job.owner !== owner) return null;
+  listener(snapshot(job));
+  if (job.stage === "done") return () => {};
+  job.listeners.add(listener);
+  return () => job.listeners.delete(listener);
+}
@@ -0,0 +1,132 @@
+/**
+ * Voice activity detection on the recorder's AnalyserNode.
+ *
+ * The recorder feeds one speech-band level per animation frame; the detector
+ * keeps an adaptive noise floor and records where speech was heard. The
+ * result is used to skip uploading recordings without any speech and to trim
+ * leading/trailing silence and long pauses before encoding (audio-encoder.ts).
+ *
+ * Browsers stop animation frames while the tab is hidden, but the recorder
+ * keeps recording. Stretches without samples are counted as speech, so audio
+ * the detector never heard is neither trimmed nor taken for silence.
+ */
+
+/** Seconds on the recording timeline (pauses excluded, like the MediaRecorder output) */
+export interface SpeechSpan {
+  start: number;
+  end: number;
+}
+
+export interface SpeechSummary {
+  /** Heard speech plus unobserved stretches */
+  spans: SpeechSpan[];
+  speechSeconds: number;
+  /** Part of speechSeconds the detector did not sample (hidden tab) */
+  unobservedSeconds: number;
+  durationSeconds: number;
+}
+
+// Levels are mean getByteFrequencyData() values over SPEECH_BAND_HZ;
+// the byte scale covers the analyser's 70 dB range (≈ 3.6 per dB)
+export const SPEECH_BAND_HZ: [number, number] = [300, 3400];
+const SPEECH_MARGIN = 30; // ≈ 8 dB above the noise floor
+const MIN_SPEECH_LEVEL = 40;
+const FLOOR_RISE_PER_SECOND = 2; // the floor drops instantly but follows rising noise slowly
+const HANGOVER_SECONDS = 0.3;
+const MIN_SPAN_SECONDS = 0.15; // shorter bursts are clicks or page flips
+const MAX_SAMPLE_GAP_SECONDS = 0.25; // longer without a frame = not observed
+
+// Trimming: keep this much around speech; pauses longer than MAX_PAUSE_SECONDS
+// shrink to 2 × TRIM_PADDING_SECONDS
+const TRIM_PADDING_SECONDS = 0.4;
+const MAX_PAUSE_SECONDS = 2;
+
+export class SpeechDetector {
+  /** True while inside a speech span (including the hangover) */
+  speaking = false;
+  private floor = 0;
+  private lastTime = 0;
+  private lastVoiced = 0;
+  private spanStart: number | null = null;
+  private unobserved = 0;
+  private readonly spans: SpeechSpan[] = [];
+
+  update(level: number, time: number) {
+    const dt = Math.max(0, time - this.lastTime);
+    if (dt > MAX_SAMPLE_GAP_SECONDS) this.markUnobserved(time);
+    this.lastTime = time;
+    // The floor only follows noise it has sampled
+    const rise = FLOOR_RISE_PER_SECOND * Math.min(dt, MAX_SAMPLE_GAP_SECONDS);
+    this.floor = level < this.floor ? level : Math.min(level, this.floor + rise);
+
+    if (level >= Math.max(this.floor + SPEECH_MARGIN, MIN_SPEECH_LEVEL)) {
+      this.lastVoiced = time;
+      this.spanStart ??= time;
+    } else if (this.spanStart !== null && time - this.lastVoiced > HANGOVER_SECONDS) {
+      this.closeSpan();
+    }
+    this.speaking = this.spanStart !== null;
+  }
+
+  /** Counts lastTime..time as speech: extends the open span or starts one */
+  private markUnobserved(time: number) {
+    this.spanStart ??= this.lastTime;
+    this.lastVoiced = time;
+    this.unobserved += time - this.lastTime;
+  }
+
+  private closeSpan() {
+    if (this.spanStart !== null && this.lastVoiced - this.spanStart >= MIN_SPAN_SECONDS) {
+      this.spans.push({ start: this.spanStart, end: this.lastVoiced });
+    }
+    this.spanStart = null;
+    this.speaking = false;
+  }
+
+  finish(durationSeconds: number): SpeechSummary {
+    if (durationSeconds - this.lastTime > MAX_SAMPLE_GAP_SECONDS) {
+      this.markUnobserved(durationSeconds);
+      this.lastTime = durationSeconds;
+    }
+    this.closeSpan();
+    const spans = [...this.spans];
+    return {
+      spans,
+      speechSeconds: spans.reduce((sum, s) => sum + (s.end - s.start), 0),
+      unobservedSeconds: this.unobserved,
+      durationSeconds,
+    };
+  }
+}
+
+/** Mean level of the speech band in getByteFrequencyData() output */
+export function speechBandLevel(bins: Uint8Array, sampleRate: number, fftSize: number): number {
+  const hzPerBin = sampleRate / fftSize;
+  const from = Math.max(0, Math.floor(SPEECH_BAND_HZ[0] / hzPerBin));
+  const to = Math.min(bins.length - 1, Math.ceil(SPEECH_BAND_HZ[1] / hzPerBin));
+  let sum = 0;
+  for (let i = from; i <= to; i++) sum += bins[i];
+  return sum / (to - from + 1);
+}
+
+/**
+ * Parts of the recording to upload: every speech span with padding, merged
+ * across pauses up to MAX_PAUSE_SECONDS. Leading/trailing silence is dropped.
+ */
+export function planTrim(summary: SpeechSummary): SpeechSpan[] {
+  const keep: SpeechSpan[] = [];
+  let lastSpeechEnd = -Infinity;
+
+  for (const span of summary.spans) {
+    const start = Math.max(0, span.start - TRIM_PADDING_SECONDS);
+    const end = Math.min(summary.durationSeconds, span.end + TRIM_PADDING_SECONDS);
+    const last = keep[keep.length - 1];
+    if (last && span.start - lastSpeechEnd <= MAX_PAUSE_SECONDS) {
+      last.end = Math.max(last.end, end);
+    } else {
+      keep.push({ start, end });
+    }
+    lastSpeechEnd = span.end;
+  }
+  return keep;
+}
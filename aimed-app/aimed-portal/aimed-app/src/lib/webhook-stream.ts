@@ -0,0 +1,190 @@
+import http from "node:http";
+import https from "node:https";
+import { Readable } from "node:stream";
+import { pipeline } from "node:stream/promises";
+import type { ReadableStream as NodeReadableStream } from "node:stream/web";
+import type { SubmitResult } from "@/lib/submit-cache";
+
+// ── Streaming proxy to the n8n webhook ──
+//
+// request.formData() buffers the whole multipart upload before anything is
+// sent to n8n, and fetch() then serializes a second copy. In streaming mode
+// /api/submit pipes the request body straight into an upstream request
+// instead: memory per upload stays at a few socket buffers, and n8n starts
+// receiving audio while the browser is still sending it. pipeline() applies
+// back-pressure — a slow n8n slows the browser's upload instead of filling
+// the heap.
+//
+// Upstream connections come from a keep-alive pool, so concurrent uploads do
+// not each pay a TCP (+ TLS) handshake.
+//
+// Configuration:
+//   AIMED_SUBMIT_STREAMING=true        enable the streaming path in /api/submit
+//   AIMED_UPSTREAM_MAX_SOCKETS         pooled connections per n8n host (default 32)
+
+export const STREAMING_PROXY_ENABLED = process.env.AIMED_SUBMIT_STREAMING === "true";
+
+const MAX_SOCKETS = Number(process.env.AIMED_UPSTREAM_MAX_SOCKETS ?? 32);
+const httpAgent = new http.Agent({ keepAlive: true, maxSockets: MAX_SOCKETS });
+const httpsAgent = new https.Agent({ keepAlive: true, maxSockets: MAX_SOCKETS });
+
+export class UpstreamTimeoutError extends Error {
+  constructor() {
+    super("Webhook timeout");
+    this.name = "UpstreamTimeoutError";
+  }
+}
+
+export interface StreamedForward {
+  /** Resolves once the whole upload has been handed to n8n */
+  uploaded: Promise<void>;
+  /** n8n's answer, normalized like the buffered path */
+  result: Promise<SubmitResult>;
+}
+
+export interface StreamUpload {
+  body: ReadableStream<Uint8Array>;
+  contentType: string;
+  contentLength: number;
+  /** Form fields added in front of the client's parts (async job callback) */
+  extraFields?: Record<string, string>;
+}
+
+/** Multipart boundary from a Content-Type header */
+export function multipartBoundary(contentType: string): string | null {
+  const match = /;\s*boundary=(?:"([^"]+)"|([^;\s]+))/i.exec(contentType);
+  return match ? (match[1] ?? match[2]) : null;
+}
+
+function fieldParts(boundary: string, fields: Record<string, string>): Buffer {
+  let text = "";
+  for (const [name, value] of Object.entries(fields)) {
+    text += `--${boundary}\r\nContent-Disposition: form-data; name="${name}"\r\n\r\n${value}\r\n`;
+  }
+  return Buffer.from(text, "utf8");
+}
+
+/**
+ * Shapes a webhook answer for the browser. Shared by the buffered and the
+ * streaming path so both return the same body for the same n8n output.
+ */
+export function normalizeWebhookResponse(status: number, data: unknown): SubmitResult {
+  if (status < 200 || status >= 300) {
+    // Sanitize — never expose raw n8n error content to the client
+    return { status, body: { success: false, error: "Greška pri obradi zahtjeva" } };
+  }
+
+  // Support n8n array response (default for webhooks)
+  const first: unknown = Array.isArray(data) && data.length > 0 ? data[0] : data;
+  if (!first || typeof first !== "object") {
+    return { status: 502, body: { success: false, error: "Greška pri komunikaciji sa serverom" } };
+  }
+  const body = first as Record<string, unknown>;
+
+  // Structured sections: pass through directly
+  if (body.sections && typeof body.sections === "object") {
+    if (body.success === undefined || body.success === null) {
+      body.success = true;
+    }
+  }
+
+  // Ensure success flag exists if we have valid content
+  if ((body.report_text || body.sections) && (body.success === undefined || body.success === null)) {
+    body.success = true;
+  }
+
+  return { status: 200, body };
+}
+
+/**
+ * Pipes a multipart upload to the webhook without buffering it. The caller
+ * must have authenticated the request; the body is consumed exactly once.
+ * Never throws: a bad webhook URL fails `uploaded` and answers 502 in `result`.
+ */
+export function streamToWebhook(
+  url: string,
+  upload: StreamUpload,
+  accessToken: string | undefined,
+  timeoutMs: number
+): StreamedForward {
+  const boundary = multipartBoundary(upload.contentType);
+  const prefix =
+    boundary && upload.extraFields && Object.keys(upload.extraFields).length > 0
+      ? fieldParts(boundary, upload.extraFields)
+      : null;
+
+  const headers: http.OutgoingHttpHeaders = {
+    "Content-Type": upload.contentType,
+    "Content-Length": upload.contentLength + (prefix?.length ?? 0),
+  };
+  if (accessToken) {
+    headers["Authorization"] = `Bearer ${accessToken}`;
+  }
+
+  let markUploaded: () => void = () => {};
+  let failUpload: (err: unknown) => void = () => {};
+  const uploaded = new Promise<void>((resolve, reject) => {
+    markUploaded = resolve;
+    failUpload = reject;
+  });
+  // Callers that only await `result` must not see an unhandled rejection
+  uploaded.catch(() => {});
+
+  const response = new Promise<{ status: number; data: unknown }>((resolve, reject) => {
+    // Throws here (invalid or missing URL) reject `response` like a network error
+    const target = new URL(url);
+    const transport = target.protocol === "https:" ? https : http;
+    const req = transport.request(
+      target,
+      { method: "POST", headers, agent: target.protocol === "https:" ? httpsAgent : httpAgent },
+      (res) => {
+        const chunks: Buffer[] = [];
+        res.on("data", (chunk: Buffer) => chunks.push(chunk));
+        res.on("error", reject);
+        res.on("end", () => {
+          let data: unknown = null;
+          try {
+            data = JSON.parse(Buffer.concat(chunks).toString("utf8"));
+          } catch {
+            // Non-JSON body — normalizeWebhookResponse treats it as a bad gateway
+          }
+          resolve({ status: res.statusCode ?? 502, data });
+        });
+      }
+    );
+
+    const timeout = setTimeout(() => req.destroy(new UpstreamTimeoutError()), timeoutMs);
+    req.on("close", () => clearTimeout(timeout));
+    req.on("error", (err) => {
+      failUpload(err);
+      reject(err);
+    });
+    // "finish": the last byte of the body was handed to the socket
+    req.on("finish", () => markUploaded());
+
+    if (prefix) req.write(prefix);
+    const source = Readable.fromWeb(upload.body as unknown as NodeReadableStream<Uint8Array>);
+    pipeline(source, req).catch((err) => {
+      // The browser aborted or the upstream socket failed mid-upload
+      req.destroy(err);
+      failUpload(err);
+      reject(err);
+    });
+  });
+
+  response.catch((err) => {
+    // No-op once the upload finished; before that the body may never be read
+    failUpload(err);
+    if (!upload.body.locked) upload.body.cancel().catch(() => {});
+  });
+
+  const result = response.then(
+    ({ status, data }) => normalizeWebhookResponse(status, data),
+    (err): SubmitResult =>
+      err instanceof UpstreamTimeoutError
+        ? { status: 504, body: { success: false, error: "Timeout" } }
+        : { status: 502, body: { success: false, error: "Greška pri komunikaciji sa serverom" } }
+  );
+
+  return { uploaded, result };
+}
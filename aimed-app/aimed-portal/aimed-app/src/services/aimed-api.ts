@@ -1,17 +1,41 @@
-import type { AimedApiResponse, ReportMode } from "@/types/aimed";
+import type { AimedApiResponse, JobAccepted, JobSnapshot, JobStage, QueueStatus, ReportMode } from "@/types/aimed";
+import {
+  CONTENT_HASH_HEADER,
+  DICTATION_SESSION_HEADER,
+  IDEMPOTENCY_KEY_HEADER,
+  fingerprintSubmission,
+  type FingerprintFields,
+} from "@/lib/submit-fingerprint";
+import type { DictationStream, StreamedDictation } from "@/services/dictation-stream";
+import { encodeForUpload, getFileExtension, type EncodeReport } from "@/services/audio-encoder";
+import { planTrim, type SpeechSummary } from "@/lib/voice-activity";
 
 const TIMEOUT_MS = 60_000; // 60 seconds
 const MAX_RETRIES = 2;
 const RETRY_DELAYS = [1000, 3000]; // exponential backoff
+// Async jobs: proxy defaults (AIMED_QUEUE_MAX_WAIT_SECONDS=180 + AIMED_JOB_TIMEOUT_SECONDS=900) + slack
+const JOB_TIMEOUT_MS = 19 * 60_000;
+const POLL_INTERVAL_MS = 2000;
+const DICTATION_UNAVAILABLE_STATUS = 409; // proxy could not stitch the streamed segments
+
+/**
+ * Whether dictations go through async job mode. Jobs, their SSE/poll routes
+ * and the n8n progress callbacks live in one server process, so this needs a
+ * single long-running Next.js instance (no serverless, no load balancing).
+ */
+export const JOB_MODE_ENABLED = process.env.NEXT_PUBLIC_AIMED_JOB_MODE === "true";
 
 // ── Error messages (Bosnian) ──
 
 const ERROR_MESSAGES = {
   NETWORK: "Nema internet konekcije. Provjerite vezu i pokušajte ponovo.",
   SERVER: "Server trenutno nije dostupan. Pokušajte ponovo za nekoliko minuta.",
+  BUSY: "Sistem je trenutno preopterećen. Pokušajte ponovo za nekoliko minuta.",
   TIMEOUT: "Obrada traje predugo. Pokušajte sa kraćim snimkom.",
   EMPTY: "Nije moguće obraditi snimak. Provjerite kvalitet audio zapisa.",
   NO_URL: "Webhook URL nije konfigurisan. Provjerite .env.local postavke.",
+  // Same wording as the n8n Silence Guardrail
+  NO_SPEECH: "Nije detektovan govor u snimku. Molimo pokušajte ponovo.",
   UNKNOWN: "Došlo je do greške. Pokušajte ponovo.",
 } as const;
 
@@ -25,13 +49,12 @@ export class AimedApiError extends Error {
   }
 }
 
-// ── File extension helper ──
-
-function getFileExtension(blob: Blob): string {
-  if (blob.type.includes("webm")) return "webm";
-  if (blob.type.includes("mp4")) return "mp4";
-  if (blob.type.includes("wav")) return "wav";
-  return "webm";
+/** The job is not in this server instance's store (other instance, restart, eviction) */
+class JobMissingError extends AimedApiError {
+  constructor() {
+    super(ERROR_MESSAGES.SERVER, false);
+    this.name = "JobMissingError";
+  }
 }
 
 // ── Core API call ──
@@ -43,30 +66,133 @@ interface SubmitOptions {
   doctorId?: string;
   existingData?: Record<string, string>;
   preferredSections?: string[];
+  /** Reuse a key to make a resubmission idempotent; generated per call otherwise */
+  idempotencyKey?: string;
+  /** Streaming mode (async only): segments already uploaded during recording */
+  dictation?: DictationStream;
+  /** Called with the re-encoding report once the full recording is prepared for upload */
+  onEncoded?: (report: EncodeReport) => void;
+  /** Sync submit: called once the upload is prepared and the request goes out */
+  onSending?: () => void;
+  /** Voice activity from the recorder: gates the upload and trims silence */
+  speech?: SpeechSummary | null;
 }
 
-async function submitOnce(options: SubmitOptions): Promise<AimedApiResponse> {
-  const ext = getFileExtension(options.audioBlob);
-  const formData = new FormData();
-  formData.append("audio", options.audioBlob, `recording.${ext}`);
+interface StreamedSubmitOptions extends SubmitOptions {
+  streamed?: StreamedDictation;
+}
+
+interface SubmitIdentity {
+  idempotencyKey: string | null;
+  contentHash: string | null;
+}
+
+function buildFields(options: StreamedSubmitOptions): FingerprintFields {
+  const fields: FingerprintFields = {};
 
   // Mode-specific fields
   if (options.mode && options.mode !== "new") {
-    formData.append("mode", options.mode);
+    fields.mode = options.mode;
   }
   if (options.mode === "update" && options.existingReport) {
-    formData.append("existing_report", options.existingReport);
+    fields.existing_report = options.existingReport;
   }
   if (options.doctorId) {
-    formData.append("doctor_id", options.doctorId);
+    fields.doctor_id = options.doctorId;
   }
   if (options.existingData) {
-    formData.append("existing_data", JSON.stringify(options.existingData));
+    fields.existing_data = JSON.stringify(options.existingData);
   }
   if (options.preferredSections && options.preferredSections.length > 0) {
-    formData.append("preferred_sections", JSON.stringify(options.preferredSections));
+    fields.preferred_sections = JSON.stringify(options.preferredSections);
+  }
+  if (options.streamed) {
+    fields.dictation_session = options.streamed.sessionId;
+  }
+  return fields;
+}
+
+// crypto.subtle / randomUUID only exist in secure contexts; without them the
+// proxy still deduplicates on its own content hash
+async function buildIdentity(options: SubmitOptions, fields: FingerprintFields): Promise<SubmitIdentity> {
+  const idempotencyKey =
+    options.idempotencyKey ??
+    (typeof crypto !== "undefined" && crypto.randomUUID ? crypto.randomUUID() : null);
+  let contentHash: string | null = null;
+  try {
+    contentHash = await fingerprintSubmission(options.audioBlob, fields);
+  } catch {
+    contentHash = null;
   }
+  return { idempotencyKey, contentHash };
+}
 
+function buildFormData(options: StreamedSubmitOptions, fields: FingerprintFields): FormData {
+  const ext = getFileExtension(options.audioBlob);
+  const formData = new FormData();
+  formData.append("audio", options.audioBlob, `recording.${ext}`);
+  for (const [name, value] of Object.entries(fields)) {
+    if (value) formData.append(name, value);
+  }
+  if (options.streamed) {
+    formData.append("segment_count", String(options.streamed.segmentCount));
+    formData.append("segment_start", options.streamed.finalStartSeconds.toFixed(3));
+  }
+  return formData;
+}
+
+function buildHeaders(identity: SubmitIdentity, fields: FingerprintFields): Record<string, string> {
+  const headers: Record<string, string> = {};
+  if (identity.idempotencyKey) headers[IDEMPOTENCY_KEY_HEADER] = identity.idempotencyKey;
+  if (identity.contentHash) headers[CONTENT_HASH_HEADER] = identity.contentHash;
+  if (fields.dictation_session) headers[DICTATION_SESSION_HEADER] = fields.dictation_session;
+  return headers;
+}
+
+function statusError(status: number): AimedApiError {
+  // 503: no n8n slot freed up in time; an immediate retry would queue again
+  if (status === 503) return new AimedApiError(ERROR_MESSAGES.BUSY, false);
+  const isServer = status >= 500;
+  return new AimedApiError(isServer ? ERROR_MESSAGES.SERVER : ERROR_MESSAGES.UNKNOWN, false);
+}
+
+function validateResponse(data: AimedApiResponse): AimedApiResponse {
+  // Handle explicit error responses (e.g. silence guardrail)
+  if (!data.success && data.error) {
+    throw new AimedApiError(data.message || ERROR_MESSAGES.EMPTY, false);
+  }
+
+  // Validate: need either sections or report_text
+  if (data.success && data.sections) {
+    return data;
+  }
+
+  if (!data.success || !data.report_text) {
+    throw new AimedApiError(ERROR_MESSAGES.EMPTY, false);
+  }
+
+  return data;
+}
+
+function toApiError(err: unknown): AimedApiError {
+  if (err instanceof AimedApiError) return err;
+
+  if (err instanceof DOMException && err.name === "AbortError") {
+    return new AimedApiError(ERROR_MESSAGES.TIMEOUT, false);
+  }
+
+  if (err instanceof TypeError) {
+    return new AimedApiError(ERROR_MESSAGES.NETWORK, true);
+  }
+
+  return new AimedApiError(ERROR_MESSAGES.UNKNOWN, false);
+}
+
+async function submitOnce(
+  options: SubmitOptions,
+  fields: FingerprintFields,
+  identity: SubmitIdentity
+): Promise<AimedApiResponse> {
   const controller = new AbortController();
   const timeout = setTimeout(() => controller.abort(), TIMEOUT_MS);
 
@@ -74,62 +200,30 @@ async function submitOnce(options: SubmitOptions): Promise<AimedApiResponse> {
     // Route through Next.js API proxy to avoid CORS issues
     const response = await fetch("/api/submit", {
       method: "POST",
-      body: formData,
+      body: buildFormData(options, fields),
+      headers: buildHeaders(identity, fields),
       signal: controller.signal,
     });
 
     clearTimeout(timeout);
 
     if (!response.ok) {
-      const isServer = response.status >= 500;
-      throw new AimedApiError(
-        isServer ? ERROR_MESSAGES.SERVER : ERROR_MESSAGES.UNKNOWN,
-        false
-      );
-    }
-
-    const data: AimedApiResponse = await response.json();
-
-    // Handle explicit error responses (e.g. silence guardrail)
-    if (!data.success && data.error) {
-      throw new AimedApiError(data.message || ERROR_MESSAGES.EMPTY, false);
+      throw statusError(response.status);
     }
 
-    // Validate: need either sections or report_text
-    if (data.success && data.sections) {
-      return data;
-    }
-
-    if (!data.success || !data.report_text) {
-      throw new AimedApiError(ERROR_MESSAGES.EMPTY, false);
-    }
-
-    return data;
+    return validateResponse(await response.json());
   } catch (err) {
     clearTimeout(timeout);
-
-    if (err instanceof AimedApiError) throw err;
-
-    if (err instanceof DOMException && err.name === "AbortError") {
-      throw new AimedApiError(ERROR_MESSAGES.TIMEOUT, false);
-    }
-
-    if (err instanceof TypeError) {
-      throw new AimedApiError(ERROR_MESSAGES.NETWORK, true);
-    }
-
-    throw new AimedApiError(ERROR_MESSAGES.UNKNOWN, false);
+    throw toApiError(err);
   }
 }
 
-// ── Public API with retry ──
-
-export async function submitRecording(options: SubmitOptions): Promise<AimedApiResponse> {
+async function withRetry<T>(fn: () => Promise<T>): Promise<T> {
   let lastError: AimedApiError | null = null;
 
   for (let attempt = 0; attempt <= MAX_RETRIES; attempt++) {
     try {
-      return await submitOnce(options);
+      return await fn();
     } catch (err) {
       lastError = err instanceof AimedApiError ? err : new AimedApiError(ERROR_MESSAGES.UNKNOWN);
 
@@ -145,3 +239,201 @@ export async function submitRecording(options: SubmitOptions): Promise<AimedApiR
 
   throw lastError ?? new AimedApiError(ERROR_MESSAGES.UNKNOWN);
 }
+
+// ── Public API with retry ──
+
+// Recordings without any speech would only reach the Silence Guardrail after
+// a paid STT call
+function checkSpeech(options: SubmitOptions) {
+  if (options.speech && options.speech.spans.length === 0) {
+    throw new AimedApiError(ERROR_MESSAGES.NO_SPEECH, false);
+  }
+}
+
+async function prepareUpload(options: SubmitOptions): Promise<SubmitOptions> {
+  const keep = options.speech ? planTrim(options.speech) : undefined;
+  const { blob, report } = await encodeForUpload(options.audioBlob, keep);
+  options.onEncoded?.(report);
+  return { ...options, audioBlob: blob };
+}
+
+export async function submitRecording(options: SubmitOptions): Promise<AimedApiResponse> {
+  checkSpeech(options);
+  options = await prepareUpload(options);
+
+  // Same key + hash on every retry, so a retry after a dropped response is
+  // answered from the proxy cache instead of re-running STT and the agent
+  const fields = buildFields(options);
+  const identity = await buildIdentity(options, fields);
+
+  options.onSending?.();
+  return withRetry(() => submitOnce(options, fields, identity));
+}
+
+// ── Async job mode ──
+
+async function startJob(
+  options: SubmitOptions,
+  fields: FingerprintFields,
+  identity: SubmitIdentity
+): Promise<JobAccepted> {
+  const controller = new AbortController();
+  const timeout = setTimeout(() => controller.abort(), TIMEOUT_MS);
+
+  try {
+    const response = await fetch("/api/submit", {
+      method: "POST",
+      body: buildFormData(options, fields),
+      headers: { ...buildHeaders(identity, fields), Prefer: "respond-async" },
+      signal: controller.signal,
+    });
+
+    clearTimeout(timeout);
+
+    if (response.status !== 202) {
+      throw statusError(response.status);
+    }
+
+    return await response.json();
+  } catch (err) {
+    clearTimeout(timeout);
+    throw toApiError(err);
+  }
+}
+
+async function pollJob(statusUrl: string): Promise<JobSnapshot> {
+  const response = await fetch(statusUrl, { cache: "no-store" });
+  if (response.status === 404) throw new JobMissingError();
+  if (!response.ok) throw statusError(response.status);
+  return response.json();
+}
+
+/** Called with each pipeline stage and, while the job waits for n8n, its queue position */
+export type JobProgressListener = (stage: JobStage, queue: QueueStatus | null) => void;
+
+/**
+ * Follows a job until it is done: SSE first, polling when the stream is
+ * unavailable or drops (e.g. a buffering proxy or a network change).
+ */
+function followJob(job: JobAccepted, onStage: JobProgressListener): Promise<JobSnapshot> {
+  return new Promise((resolve, reject) => {
+    let settled = false;
+    let source: EventSource | null = null;
+    let pollTimer: ReturnType<typeof setTimeout> | null = null;
+
+    const deadline = setTimeout(
+      () => finish(null, new AimedApiError(ERROR_MESSAGES.TIMEOUT, false)),
+      JOB_TIMEOUT_MS
+    );
+
+    function finish(snapshot: JobSnapshot | null, error?: AimedApiError) {
+      if (settled) return;
+      settled = true;
+      clearTimeout(deadline);
+      if (pollTimer) clearTimeout(pollTimer);
+      source?.close();
+      if (snapshot) resolve(snapshot);
+      else reject(error ?? new AimedApiError(ERROR_MESSAGES.UNKNOWN, false));
+    }
+
+    function handle(snapshot: JobSnapshot) {
+      if (snapshot.stage === "done") finish(snapshot);
+      else onStage(snapshot.stage, snapshot.queue ?? null);
+    }
+
+    async function poll(failures = 0) {
+      if (settled) return;
+      try {
+        handle(await pollJob(job.status_url));
+        failures = 0;
+      } catch (err) {
+        const error = toApiError(err);
+        // Transient network errors are retried; a 404 means the job is gone (JobMissingError)
+        if (!error.retryable || failures >= MAX_RETRIES) return finish(null, error);
+        failures++;
+      }
+      if (!settled) pollTimer = setTimeout(() => poll(failures), POLL_INTERVAL_MS);
+    }
+
+    if (typeof EventSource === "undefined") {
+      poll();
+      return;
+    }
+
+    source = new EventSource(job.events_url);
+    source.addEventListener("stage", (e) => handle(JSON.parse((e as MessageEvent).data)));
+    source.addEventListener("done", (e) => handle(JSON.parse((e as MessageEvent).data)));
+    source.addEventListener("missing", () => finish(null, new JobMissingError()));
+    source.onerror = () => {
+      if (settled) return;
+      source?.close();
+      source = null;
+      poll();
+    };
+  });
+}
+
+async function runJob(
+  options: StreamedSubmitOptions,
+  onStage: JobProgressListener
+): Promise<JobSnapshot> {
+  const fields = buildFields(options);
+  const identity = await buildIdentity(options, fields);
+
+  const job = await withRetry(() => startJob(options, fields, identity));
+  onStage("uploaded", null);
+
+  return followJob(job, onStage);
+}
+
+/**
+ * Submits a recording as a background job and reports pipeline stages
+ * (uploaded → transcribed → structured → validated) as they happen, plus the
+ * queue position while the proxy waits for a free n8n slot.
+ * Not bound by the 60 s request timeout, so long dictations finish.
+ *
+ * With `dictation`, only the final segment is uploaded now; if the proxy
+ * cannot use the streamed segments, the full recording is sent instead.
+ * Audio is re-encoded to 16 kHz Opus first (see audio-encoder.ts).
+ *
+ * If the job disappears (it lived on another instance or the server
+ * restarted), the recording is still in hand and is resubmitted through the
+ * synchronous path.
+ */
+export async function submitRecordingAsync(
+  options: SubmitOptions,
+  onStage: JobProgressListener = () => {}
+): Promise<AimedApiResponse> {
+  checkSpeech(options);
+  try {
+    return await submitAsJob(options, onStage);
+  } catch (err) {
+    if (!(err instanceof JobMissingError)) throw err;
+    return submitRecording(options);
+  }
+}
+
+async function submitAsJob(options: SubmitOptions, onStage: JobProgressListener): Promise<AimedApiResponse> {
+  let snapshot: JobSnapshot | null = null;
+
+  const streamed = options.dictation ? await options.dictation.finish() : null;
+  if (streamed) {
+    snapshot = await runJob(
+      {
+        ...options,
+        audioBlob: streamed.finalSegment,
+        streamed,
+        // Different content than the full recording, so it needs its own key
+        idempotencyKey: options.idempotencyKey && `${options.idempotencyKey}:stream`,
+      },
+      onStage
+    );
+    if (snapshot.status === DICTATION_UNAVAILABLE_STATUS) snapshot = null;
+  }
+
+  snapshot ??= await runJob(await prepareUpload(options), onStage);
+  if (snapshot.status !== 200) {
+    throw statusError(snapshot.status ?? 500);
+  }
+  return validateResponse(snapshot.result as AimedApiResponse);
+}
@@ -0,0 +1,197 @@
+import type { EncodeRequest, EncodeResponse } from "@/services/opus-encoder.worker";
+import type { SpeechSpan } from "@/lib/voice-activity";
+
+/**
+ * Normalizes recordings before upload. MediaRecorder output differs per
+ * browser (WebM/Opus in Chrome and Firefox, MP4/AAC in Safari, sometimes
+ * WAV), so the same dictation can be ten times larger on one machine than on
+ * another. Everything is re-encoded to 16 kHz mono Ogg Opus at UPLOAD_BITRATE
+ * in a Web Worker (WebCodecs AudioEncoder). Without WebCodecs, or if anything
+ * fails, the original recording is uploaded unchanged.
+ *
+ * Given the speech spans from the recorder's voice activity detection, the
+ * silence around and between them is cut out before encoding.
+ */
+
+export const UPLOAD_SAMPLE_RATE = 16000;
+/** Opus bitrate in bits/s; 24 kbit/s keeps speech fully intelligible for STT */
+export const UPLOAD_BITRATE = Number(process.env.NEXT_PUBLIC_AIMED_UPLOAD_BITRATE ?? 24000);
+
+const OPUS_MIME_TYPE = "audio/ogg;codecs=opus";
+const ENCODE_TIMEOUT_MS = 30_000;
+// Opus input already this close to the target is kept: re-encoding would
+// only add generation loss
+const PASSTHROUGH_HEADROOM = 1.5;
+const MIN_TRIM_SECONDS = 1; // less is not worth re-encoding an Opus recording for
+
+export interface EncodeReport {
+  method: "opus" | "passthrough";
+  /** Why the recording was uploaded as recorded */
+  reason?: "unsupported" | "already-opus" | "not-smaller" | "failed";
+  inputType: string;
+  inputBytes: number;
+  outputType: string;
+  outputBytes: number;
+  durationSeconds: number | null;
+  /** Silence removed by trimming */
+  trimmedSeconds: number;
+  bitrate: number;
+  /** Decode + encode time in the browser */
+  encodeMs: number;
+}
+
+export interface EncodedAudio {
+  blob: Blob;
+  report: EncodeReport;
+}
+
+// Retries of the same recording reuse the encoded file (and its content hash)
+const encoded = new WeakMap<Blob, Promise<EncodedAudio>>();
+
+export function getFileExtension(blob: Blob): string {
+  if (blob.type.includes("ogg")) return "ogg";
+  if (blob.type.includes("webm")) return "webm";
+  if (blob.type.includes("mp4")) return "mp4";
+  if (blob.type.includes("wav")) return "wav";
+  return "webm";
+}
+
+function isSupported(): boolean {
+  return (
+    typeof Worker !== "undefined" &&
+    typeof OfflineAudioContext !== "undefined" &&
+    typeof AudioEncoder !== "undefined"
+  );
+}
+
+/** Decodes and resamples to UPLOAD_SAMPLE_RATE, then downmixes to mono */
+async function decodeMono(blob: Blob): Promise<Float32Array> {
+  const context = new OfflineAudioContext(1, 1, UPLOAD_SAMPLE_RATE);
+  const buffer = await context.decodeAudioData(await blob.arrayBuffer());
+  if (buffer.numberOfChannels === 1) return buffer.getChannelData(0);
+
+  const mono = new Float32Array(buffer.length);
+  for (let c = 0; c < buffer.numberOfChannels; c++) {
+    const channel = buffer.getChannelData(c);
+    for (let i = 0; i < mono.length; i++) mono[i] += channel[i] / buffer.numberOfChannels;
+  }
+  return mono;
+}
+
+/** Concatenates the `keep` ranges of the recording */
+function cut(pcm: Float32Array, keep: SpeechSpan[]): Float32Array {
+  const ranges = keep.map(({ start, end }) => [
+    Math.min(pcm.length, Math.round(start * UPLOAD_SAMPLE_RATE)),
+    Math.min(pcm.length, Math.round(end * UPLOAD_SAMPLE_RATE)),
+  ]);
+  const out = new Float32Array(ranges.reduce((sum, [from, to]) => sum + (to - from), 0));
+  let offset = 0;
+  for (const [from, to] of ranges) {
+    out.set(pcm.subarray(from, to), offset);
+    offset += to - from;
+  }
+  return out;
+}
+
+function runWorker(request: EncodeRequest): Promise<Uint8Array> {
+  return new Promise((resolve, reject) => {
+    const worker = new Worker(new URL("./opus-encoder.worker.ts", import.meta.url), { type: "module" });
+    const timeout = setTimeout(() => {
+      worker.terminate();
+      reject(new Error("Opus encoder timed out"));
+    }, ENCODE_TIMEOUT_MS);
+
+    worker.onmessage = (e: MessageEvent<EncodeResponse>) => {
+      clearTimeout(timeout);
+      worker.terminate();
+      if (e.data.ok) resolve(e.data.data);
+      else reject(new Error(e.data.error));
+    };
+    worker.onerror = (e) => {
+      clearTimeout(timeout);
+      worker.terminate();
+      reject(new Error(e.message));
+    };
+    worker.postMessage(request, [request.pcm.buffer as ArrayBuffer]);
+  });
+}
+
+async function encode(blob: Blob, keep: SpeechSpan[] | undefined): Promise<EncodedAudio> {
+  const started = performance.now();
+  const report: EncodeReport = {
+    method: "passthrough",
+    inputType: blob.type,
+    inputBytes: blob.size,
+    outputType: blob.type,
+    outputBytes: blob.size,
+    durationSeconds: null,
+    trimmedSeconds: 0,
+    bitrate: UPLOAD_BITRATE,
+    encodeMs: 0,
+  };
+  const passthrough = (reason: EncodeReport["reason"]): EncodedAudio => {
+    report.reason = reason;
+    report.encodeMs = Math.round(performance.now() - started);
+    return { blob, report };
+  };
+
+  const config: AudioEncoderConfig = {
+    codec: "opus",
+    sampleRate: UPLOAD_SAMPLE_RATE,
+    numberOfChannels: 1,
+    bitrate: UPLOAD_BITRATE,
+  };
+  const supported =
+    isSupported() &&
+    (await AudioEncoder.isConfigSupported(config).catch(() => ({ supported: false }))).supported;
+  if (!supported) return passthrough("unsupported");
+
+  try {
+    let pcm = await decodeMono(blob);
+    report.durationSeconds = pcm.length / UPLOAD_SAMPLE_RATE;
+
+    const trimmed = keep && keep.length > 0 ? cut(pcm, keep) : null;
+    const trimmedSeconds = trimmed ? (pcm.length - trimmed.length) / UPLOAD_SAMPLE_RATE : 0;
+    const inputBitrate = report.durationSeconds > 0 ? (blob.size * 8) / report.durationSeconds : Infinity;
+    if (
+      trimmedSeconds < MIN_TRIM_SECONDS &&
+      blob.type.includes("opus") &&
+      inputBitrate <= UPLOAD_BITRATE * PASSTHROUGH_HEADROOM
+    ) {
+      return passthrough("already-opus");
+    }
+
+    if (trimmed && trimmedSeconds > 0) {
+      pcm = trimmed;
+    } else {
+      // getChannelData() views belong to the AudioBuffer; copy before transferring
+      pcm = pcm.slice();
+    }
+    const data = await runWorker({ pcm, sampleRate: UPLOAD_SAMPLE_RATE, bitrate: UPLOAD_BITRATE });
+    const output = new Blob([data as BlobPart], { type: OPUS_MIME_TYPE });
+    if (output.size >= blob.size) return passthrough("not-smaller");
+
+    report.method = "opus";
+    report.trimmedSeconds = trimmedSeconds;
+    report.outputType = output.type;
+    report.outputBytes = output.size;
+    report.encodeMs = Math.round(performance.now() - started);
+    return { blob: output, report };
+  } catch {
+    return passthrough("failed");
+  }
+}
+
+/**
+ * Returns the recording as it should be uploaded, with a size/latency report.
+ * `keep` (from planTrim) limits it to the given ranges. Never throws: the
+ * original blob is the fallback.
+ */
+export function encodeForUpload(blob: Blob, keep?: SpeechSpan[]): Promise<EncodedAudio> {
+  let result = encoded.get(blob);
+  if (!result) {
+    result = encode(blob, keep);
+    encoded.set(blob, result);
+  }
+  return result;
+}
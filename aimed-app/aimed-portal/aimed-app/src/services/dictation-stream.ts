@@ -0,0 +1,92 @@
+import type { RecordedSegment } from "@/hooks/use-audio-recorder";
+import { encodeForUpload, getFileExtension } from "@/services/audio-encoder";
+import { JOB_MODE_ENABLED } from "@/services/aimed-api";
+
+const SEGMENT_TIMEOUT_MS = 30_000;
+const FINAL_SEGMENT_WAIT_MS = 5_000;
+const RETRY_DELAY_MS = 1000;
+
+/**
+ * Whether the recorder should emit segments (needs AIMED_Segment_WEBHOOK_URL on
+ * the server). Only the async job path finishes a streamed dictation.
+ */
+export const STREAMING_ENABLED = JOB_MODE_ENABLED && process.env.NEXT_PUBLIC_AIMED_STREAMING_UPLOAD === "true";
+
+/** What /api/submit needs to finish a streamed dictation */
+export interface StreamedDictation {
+  sessionId: string;
+  segmentCount: number;
+  finalSegment: Blob;
+  finalStartSeconds: number;
+}
+
+async function uploadSegment(sessionId: string, segment: RecordedSegment): Promise<boolean> {
+  const { blob } = await encodeForUpload(segment.blob);
+  const formData = new FormData();
+  formData.append("session_id", sessionId);
+  formData.append("index", String(segment.index));
+  formData.append("start", segment.startSeconds.toFixed(3));
+  formData.append("audio", blob, `segment-${segment.index}.${getFileExtension(blob)}`);
+
+  // One retry for a flaky connection; anything else falls back to a full upload
+  for (let attempt = 0; attempt < 2; attempt++) {
+    try {
+      const response = await fetch("/api/dictation/segments", {
+        method: "POST",
+        body: formData,
+        signal: AbortSignal.timeout(SEGMENT_TIMEOUT_MS),
+      });
+      return response.ok;
+    } catch {
+      await new Promise((r) => setTimeout(r, RETRY_DELAY_MS));
+    }
+  }
+  return false;
+}
+
+/**
+ * Uploads recorder segments while the doctor is still dictating, so the
+ * server can transcribe them incrementally. One instance per recording.
+ */
+export class DictationStream {
+  readonly sessionId = crypto.randomUUID();
+  private uploads: Promise<boolean>[] = [];
+  private final: Promise<RecordedSegment>;
+  private resolveFinal!: (segment: RecordedSegment) => void;
+
+  constructor() {
+    this.final = new Promise((resolve) => {
+      this.resolveFinal = resolve;
+    });
+  }
+
+  /** Pass to useAudioRecorder({ onSegment }) */
+  push = (segment: RecordedSegment) => {
+    if (segment.final) {
+      this.resolveFinal(segment);
+    } else {
+      this.uploads.push(uploadSegment(this.sessionId, segment));
+    }
+  };
+
+  /**
+   * Waits for the final segment and every earlier upload. Returns null when
+   * streaming did not work out and the full recording should be sent instead.
+   */
+  async finish(): Promise<StreamedDictation | null> {
+    const timeout = new Promise<null>((resolve) => setTimeout(() => resolve(null), FINAL_SEGMENT_WAIT_MS));
+    const final = await Promise.race([this.final, timeout]);
+    if (!final || final.index !== this.uploads.length) return null;
+
+    // Encode the final segment while the earlier uploads settle
+    const [uploaded, { blob }] = await Promise.all([Promise.all(this.uploads), encodeForUpload(final.blob)]);
+    if (uploaded.some((ok) => !ok)) return null;
+
+    return {
+      sessionId: this.sessionId,
+      segmentCount: this.uploads.length,
+      finalSegment: blob,
+      finalStartSeconds: final.startSeconds,
+    };
+  }
+}
@@ -0,0 +1,78 @@
+import { muxOggOpus, type OpusPacket } from "@/lib/ogg-opus";
+
+/** Message sent to the worker: mono PCM already resampled to `sampleRate` */
+export interface EncodeRequest {
+  pcm: Float32Array;
+  sampleRate: number;
+  bitrate: number;
+}
+
+export type EncodeResponse = { ok: true; data: Uint8Array } | { ok: false; error: string };
+
+const FEED_SECONDS = 1; // PCM handed to the encoder per AudioData
+const DEFAULT_FRAME_US = 20_000;
+
+function toBytes(source: AllowSharedBufferSource): Uint8Array {
+  return ArrayBuffer.isView(source)
+    ? new Uint8Array(source.buffer, source.byteOffset, source.byteLength)
+    : new Uint8Array(source);
+}
+
+async function encode({ pcm, sampleRate, bitrate }: EncodeRequest): Promise<Uint8Array> {
+  const packets: OpusPacket[] = [];
+  let description: Uint8Array | undefined;
+  let failure: DOMException | null = null;
+
+  const encoder = new AudioEncoder({
+    output: (chunk, metadata) => {
+      const data = new Uint8Array(chunk.byteLength);
+      chunk.copyTo(data);
+      packets.push({ data, durationUs: chunk.duration ?? DEFAULT_FRAME_US });
+      if (metadata?.decoderConfig?.description) {
+        description = toBytes(metadata.decoderConfig.description);
+      }
+    },
+    error: (e) => {
+      failure = e;
+    },
+  });
+
+  encoder.configure({
+    codec: "opus",
+    sampleRate,
+    numberOfChannels: 1,
+    bitrate,
+    opus: { application: "voip", signal: "voice", frameDuration: DEFAULT_FRAME_US },
+  });
+
+  const step = sampleRate * FEED_SECONDS;
+  for (let offset = 0; offset < pcm.length && !failure; offset += step) {
+    const frames = pcm.subarray(offset, offset + step);
+    const data = new AudioData({
+      format: "f32-planar",
+      sampleRate,
+      numberOfChannels: 1,
+      numberOfFrames: frames.length,
+      timestamp: Math.round((offset / sampleRate) * 1_000_000),
+      data: frames,
+    });
+    encoder.encode(data);
+    data.close();
+  }
+
+  await encoder.flush();
+  encoder.close();
+  if (failure) throw failure;
+
+  return muxOggOpus(packets, sampleRate, pcm.length, description);
+}
+
+self.onmessage = async (e: MessageEvent<EncodeRequest>) => {
+  let response: EncodeResponse;
+  try {
+    response = { ok: true, data: await encode(e.data) };
+  } catch (err) {
+    response = { ok: false, error: err instanceof Error ? err.message : String(err) };
+  }
+  self.postMessage(response, { transfer: response.ok ? [response.data.buffer as ArrayBuffer] : [] });
+};
@@ -9,6 +9,29 @@ export interface ParsedReport {
   rawText: string;
 }
 
+/** Offsets into report_text produced by tokenizeReport() */
+export interface TextSpan {
+  start: number;
+  end: number;
+}
+
+export interface SectionSpan {
+  /** Normalized header (e.g. "PREPORUKE/KONTROLE" → "PREPORUKE") */
+  title: string;
+  /** True for sections the AI hallucinates (FILTERED_SECTIONS) */
+  filtered: boolean;
+  headerStart: number;
+  headerEnd: number;
+  /** First to last non-blank content line; equal when the section is empty */
+  contentStart: number;
+  contentEnd: number;
+}
+
+export interface ReportTokens {
+  sections: SectionSpan[];
+  warnings: TextSpan[];
+}
+
 export interface AimedApiResponse {
   success: boolean;
   /** Error code from n8n (e.g. NO_SPEECH_DETECTED) */
@@ -24,9 +47,56 @@ export interface AimedApiResponse {
     datumNalaza: string;
     version: string;
     parseError?: string | null;
+    /** Structuring model picked by the workflow's Route Model node */
+    route?: ModelRoute;
+    /** Mentions resolved before the agent ran (null when there was nothing to look up) */
+    prelink?: { mentions: number; resolved: number } | null;
+    /** MKB-10 / drug registry tool calls the agent still made */
+    toolCalls?: { mkb10: number; drugs: number };
   };
 }
 
+/** metadata.route of a v5 response */
+export interface ModelRoute {
+  tier: "fast" | "full";
+  model: string;
+  /** Why the full model was needed (empty for the fast tier) */
+  reasons: string[];
+}
+
+// ── Asynchronous transcription jobs ──
+
+/** Pipeline stages reported for an async /api/submit job */
+export type JobStage = "uploaded" | "transcribed" | "structured" | "validated" | "done";
+
+/** Place of a job waiting for a transcription slot (see lib/submit-governor.ts) */
+export interface QueueStatus {
+  /** 1 = next to start */
+  position: number;
+  estimatedWaitSeconds: number;
+}
+
+/** GET /api/jobs/[id] and each SSE event from /api/jobs/[id]/events */
+export interface JobSnapshot {
+  id: string;
+  stage: JobStage;
+  /** Epoch ms at which each reached stage was recorded */
+  stageTimes: Partial<Record<JobStage, number>>;
+  elapsedMs: number;
+  /** HTTP status the synchronous endpoint would have returned (set once done) */
+  status: number | null;
+  result: AimedApiResponse | Record<string, unknown> | null;
+  /** Set while the job waits for n8n capacity, null once it runs */
+  queue: QueueStatus | null;
+}
+
+/** 202 response of POST /api/submit with `Prefer: respond-async` */
+export interface JobAccepted {
+  job_id: string;
+  status_url: string;
+  events_url: string;
+}
+
 export type RecordingState = "idle" | "recording" | "paused";
 
 export type AppState = "idle" | "recording" | "uploading" | "processing" | "done" | "error";
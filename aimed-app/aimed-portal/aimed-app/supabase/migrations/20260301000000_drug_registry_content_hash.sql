@@ -0,0 +1,13 @@
+-- ============================================================
+-- Drug registry: incremental import keys
+-- entry_key identifies a registry row across editions (trade name|strength|form),
+-- content_hash lets tools/ingest_drug_registry.py skip unchanged rows
+-- ============================================================
+
+ALTER TABLE IF EXISTS public.drug_registry
+  ADD COLUMN IF NOT EXISTS entry_key text,
+  ADD COLUMN IF NOT EXISTS content_hash text;
+
+-- Upsert target (PostgREST on_conflict=entry_key); NULLs from the old import don't collide
+CREATE UNIQUE INDEX IF NOT EXISTS idx_drug_registry_entry_key
+  ON public.drug_registry(entry_key);
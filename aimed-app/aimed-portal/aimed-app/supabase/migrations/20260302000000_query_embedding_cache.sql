@@ -0,0 +1,94 @@
+-- ============================================================
+-- Query embedding cache for search-drugs
+-- Content-addressed by sha256(model || ':' || normalized query), LRU-evicted,
+-- with daily hit/miss counters. Filled by the Edge Function on a miss and
+-- pre-warmed with every trade name and INN by tools/embedding_cache.py.
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS public.query_embedding_cache (
+  query_hash text PRIMARY KEY,
+  query text NOT NULL,
+  model text NOT NULL,
+  embedding extensions.vector(1536) NOT NULL,
+  hit_count integer DEFAULT 0 NOT NULL,
+  created_at timestamptz DEFAULT now() NOT NULL,
+  last_used_at timestamptz DEFAULT now() NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_query_embedding_cache_last_used
+  ON public.query_embedding_cache(last_used_at);
+
+CREATE TABLE IF NOT EXISTS public.query_embedding_cache_stats (
+  day date PRIMARY KEY DEFAULT current_date,
+  hits bigint DEFAULT 0 NOT NULL,
+  misses bigint DEFAULT 0 NOT NULL
+);
+
+-- Service role only (Edge Function + warm-up job): RLS without policies for
+-- the tables, EXECUTE revoked from everyone else for the functions below
+ALTER TABLE public.query_embedding_cache ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.query_embedding_cache_stats ENABLE ROW LEVEL SECURITY;
+
+-- Lookup, recency bump and hit/miss count in one round trip
+CREATE OR REPLACE FUNCTION public.lookup_query_embedding(p_query_hash text)
+RETURNS extensions.vector
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public, extensions
+AS $$
+DECLARE
+  found extensions.vector;
+BEGIN
+  UPDATE public.query_embedding_cache
+    SET hit_count = hit_count + 1, last_used_at = now()
+    WHERE query_hash = p_query_hash
+    RETURNING embedding INTO found;
+
+  INSERT INTO public.query_embedding_cache_stats AS s (day, hits, misses)
+    VALUES (current_date, (found IS NOT NULL)::int, (found IS NULL)::int)
+    ON CONFLICT (day) DO UPDATE
+      SET hits = s.hits + EXCLUDED.hits, misses = s.misses + EXCLUDED.misses;
+
+  RETURN found;
+END;
+$$;
+
+-- Store a fresh embedding and evict the least recently used rows beyond
+-- max_entries (fixed here, not a parameter, so no caller can shrink the cache)
+CREATE OR REPLACE FUNCTION public.store_query_embedding(
+  p_query_hash text,
+  p_query text,
+  p_model text,
+  p_embedding extensions.vector
+)
+RETURNS int
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public, extensions
+AS $$
+DECLARE
+  max_entries constant int := 20000;
+  evicted int := 0;
+BEGIN
+  INSERT INTO public.query_embedding_cache (query_hash, query, model, embedding)
+    VALUES (p_query_hash, p_query, p_model, p_embedding)
+    ON CONFLICT (query_hash) DO UPDATE SET last_used_at = now();
+
+  IF (SELECT count(*) FROM public.query_embedding_cache) > max_entries THEN
+    DELETE FROM public.query_embedding_cache
+      WHERE query_hash IN (
+        SELECT query_hash FROM public.query_embedding_cache
+        ORDER BY last_used_at DESC
+        OFFSET max_entries
+      );
+    GET DIAGNOSTICS evicted = ROW_COUNT;
+  END IF;
+
+  RETURN evicted;
+END;
+$$;
+
+REVOKE EXECUTE ON FUNCTION public.lookup_query_embedding(text) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.store_query_embedding(text, text, text, extensions.vector) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.lookup_query_embedding(text) TO service_role;
+GRANT EXECUTE ON FUNCTION public.store_query_embedding(text, text, text, extensions.vector) TO service_role;
@@ -0,0 +1,165 @@
+-- ============================================================
+-- Batched MKB-10 / drug registry search
+-- One RPC per lookup kind resolves every term of a dictation:
+-- unnest(...) WITH ORDINALITY plus a LATERAL top-k per term. Scoring and
+-- filters match search_mkb10(), search_drugs_fuzzy() and match_drugs(), so
+-- a { queries: [...] } request to search-mkb10 / search-drugs ranks each
+-- term exactly like a single { query } request would.
+-- Rows come back ordered by term_index (1-based position in the input
+-- array), then similarity; terms without a match have no rows.
+-- ============================================================
+
+CREATE OR REPLACE FUNCTION public.search_mkb10_batch(search_terms text[], max_results int DEFAULT 5)
+RETURNS TABLE (
+  term_index  int,
+  search_term text,
+  code        text,
+  name_hr     text,
+  name_lat    text,
+  category    text,
+  similarity  real
+)
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+SET search_path = public, extensions
+AS $$
+  SELECT t.ord::int, t.term, m.code, m.name_hr, m.name_lat, m.category, m.score
+  FROM unnest(search_terms) WITH ORDINALITY AS t(term, ord)
+  CROSS JOIN LATERAL (
+    SELECT
+      c.code,
+      c.name_hr,
+      c.name_lat,
+      c.category,
+      GREATEST(
+        similarity(c.name_hr, t.term),
+        similarity(COALESCE(c.name_lat, ''), t.term),
+        CASE WHEN c.code ILIKE t.term || '%' THEN 1.0 ELSE 0.0 END
+      )::real AS score
+    FROM public.mkb10_codes c
+    WHERE
+      c.name_hr % t.term
+      OR c.name_lat % t.term
+      OR c.code ILIKE t.term || '%'
+      OR c.name_hr ILIKE '%' || t.term || '%'
+    ORDER BY score DESC
+    LIMIT max_results
+  ) m
+  ORDER BY t.ord, m.score DESC;
+$$;
+
+CREATE OR REPLACE FUNCTION public.search_drugs_fuzzy_batch(search_terms text[], max_results int DEFAULT 5)
+RETURNS TABLE (
+  term_index   int,
+  search_term  text,
+  trade_name   text,
+  generic_name text,
+  strength     text,
+  form         text,
+  atc_code     text,
+  similarity   real
+)
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+SET search_path = public, extensions
+AS $$
+  SELECT t.ord::int, t.term, d.trade_name, d.generic_name, d.strength, d.form, d.atc_code, d.score
+  FROM unnest(search_terms) WITH ORDINALITY AS t(term, ord)
+  CROSS JOIN LATERAL (
+    SELECT
+      r.trade_name,
+      r.generic_name,
+      r.strength,
+      r.form,
+      r.atc_code,
+      GREATEST(
+        similarity(r.trade_name, t.term),
+        similarity(COALESCE(r.generic_name, ''), t.term)
+      )::real AS score
+    FROM public.drug_registry r
+    WHERE
+      r.trade_name % t.term
+      OR r.generic_name % t.term
+      OR r.trade_name ILIKE '%' || t.term || '%'
+    ORDER BY score DESC
+    LIMIT max_results
+  ) d
+  ORDER BY t.ord, d.score DESC;
+$$;
+
+-- query_embeddings: JSON array of embeddings (each a JSON array of 1536 floats),
+-- the shape supabase-js sends; each element casts to vector as-is
+CREATE OR REPLACE FUNCTION public.match_drugs_batch(
+  query_embeddings jsonb,
+  match_threshold float DEFAULT 0.5,
+  match_count int DEFAULT 5
+)
+RETURNS TABLE (
+  term_index    int,
+  id            int,
+  trade_name    text,
+  generic_name  text,
+  strength      text,
+  form          text,
+  atc_code      text,
+  content_chunk text,
+  similarity    float
+)
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+SET search_path = public, extensions
+AS $$
+  SELECT q.ord::int, d.id, d.trade_name, d.generic_name, d.strength, d.form, d.atc_code, d.content_chunk, d.score
+  FROM jsonb_array_elements_text(query_embeddings) WITH ORDINALITY AS q(embedding, ord)
+  CROSS JOIN LATERAL (
+    SELECT
+      r.id,
+      r.trade_name,
+      r.generic_name,
+      r.strength,
+      r.form,
+      r.atc_code,
+      r.content_chunk,
+      1 - (r.embedding <=> q.embedding::extensions.vector) AS score
+    FROM public.drug_registry r
+    WHERE 1 - (r.embedding <=> q.embedding::extensions.vector) > match_threshold
+    ORDER BY r.embedding <=> q.embedding::extensions.vector
+    LIMIT match_count
+  ) d
+  ORDER BY q.ord, d.score DESC;
+$$;
+
+-- lookup_query_embedding() for many hashes: recency bump and one stats row update
+CREATE OR REPLACE FUNCTION public.lookup_query_embeddings(p_query_hashes text[])
+RETURNS TABLE (query_hash text, embedding extensions.vector)
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public, extensions
+AS $$
+DECLARE
+  found_count int;
+BEGIN
+  RETURN QUERY
+  WITH bumped AS (
+    UPDATE public.query_embedding_cache c
+      SET hit_count = c.hit_count + 1, last_used_at = now()
+      WHERE c.query_hash = ANY(p_query_hashes)
+      RETURNING c.query_hash, c.embedding
+  )
+  SELECT b.query_hash, b.embedding FROM bumped b;
+
+  GET DIAGNOSTICS found_count = ROW_COUNT;
+
+  INSERT INTO public.query_embedding_cache_stats AS s (day, hits, misses)
+    VALUES (current_date, found_count, cardinality(p_query_hashes) - found_count)
+    ON CONFLICT (day) DO UPDATE
+      SET hits = s.hits + EXCLUDED.hits, misses = s.misses + EXCLUDED.misses;
+END;
+$$;
+
+-- Writes the cache counters; like lookup_query_embedding(), service role only
+REVOKE EXECUTE ON FUNCTION public.lookup_query_embeddings(text[]) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.lookup_query_embeddings(text[]) TO service_role;
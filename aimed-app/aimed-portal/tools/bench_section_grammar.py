@@ -0,0 +1,192 @@
+"""
+Benchmark and parity check for the shared section grammar.
+
+Generates a synthetic report corpus, measures tokenizer throughput against the
+previous line-by-line parser, and diffs the span output of the Python
+(tools/section_grammar.py) and TypeScript (src/lib/report-parser.ts) tokenizers.
+
+Usage:
+  python tools/bench_section_grammar.py generate corpus.jsonl [count]
+  python tools/bench_section_grammar.py bench corpus.jsonl
+  python tools/section_grammar.py --spans corpus.jsonl > py-spans.ndjson
+  (cd aimed-app && npx tsx scripts/bench-report-parser.ts ../corpus.jsonl ../ts-spans.ndjson)
+  python tools/bench_section_grammar.py compare corpus.jsonl py-spans.ndjson ts-spans.ndjson
+"""
+
+import json
+import random
+import re
+import sys
+import time
+
+from section_grammar import parse_report, spans_record, tokenize
+
+HEADERS = [
+    "ANAMNEZA", "STATUS", "DIJAGNOZA", "TERAPIJA", "PREPORUKE",
+    "PREPORUKE / KONTROLA", "PREPORUKE/KONTROLE", "TERAPIJA:", "STATUS.",
+    "DATUM PREGLEDA", "PODACI O PACIJENTU", "ZAKLJUČAK", "EHO SRCA", "EKG",
+]
+LINES = [
+    "Pacijent se žali na bol u donjem dijelu leđa sa propagacijom u lijevu nogu.",
+    "Tegobe su počele prije tri dana nakon dizanja tereta.",
+    "Lasegueov test pozitivan lijevo na 40°. Krvni pritisak 130/85 mmHg.",
+    "Ishijalgija (MKB-10: M54.3).",
+    "Sumamed 500mg 1x1 per os 3 dana. Brufen 400mg 3x1 per os 5 dana.",
+    "Kontrola za 10 dana. Mirovanje, izbjegavati dizanje tereta.",
+    "TA 130/80 MMHG",
+    "12.01.2025.",
+    "- Ne uzimati lijek na prazan stomak",
+    "Pacijentica navodi bol 😣 u grudima.",
+]
+WARNINGS = [
+    "[NAPOMENA: Doza lijeka nije jasno izgovorena]",
+    "[NAPOMENA: Provjeriti MKB-10 šifru]",
+]
+
+
+def generate_report(rng: random.Random) -> str:
+    out = []
+    if rng.random() < 0.1:
+        out.append("Uvodni tekst bez sekcije.")
+    for header in rng.sample(HEADERS, rng.randint(2, 7)):
+        indent = " " * rng.choice([0, 0, 0, 2])
+        out.append(indent + header + rng.choice(["", "", " ", "\t"]))
+        for _ in range(rng.randint(0, 6)):
+            roll = rng.random()
+            if roll < 0.1:
+                out.append(rng.choice(WARNINGS))
+            elif roll < 0.2:
+                out.append(rng.choice(["", "   "]))
+            else:
+                out.append(rng.choice(["", "  ", "\t"]) + rng.choice(LINES))
+        out.append("")
+    sep = "\r\n" if rng.random() < 0.1 else "\n"
+    return sep.join(out)
+
+
+def generate(path: str, count: int, seed: int = 5):
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(count):
+            record = {"id": f"r{i}", "report_text": generate_report(rng)}
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+# Previous implementation (per-line upper() + two regexes + string
+# concatenation), kept as the throughput baseline.
+
+_LEGACY_STANDARD = ["ANAMNEZA", "STATUS", "DIJAGNOZA", "TERAPIJA", "PREPORUKE"]
+_LEGACY_FILTERED = ["PODACI O PACIJENTU", "DATUM PREGLEDA", "ZAKLJUČAK"]
+_LEGACY_LETTER = re.compile(r"[A-ZČĆŠĐŽ]")
+_LEGACY_CHARSET = re.compile(r"^[A-ZČĆŠĐŽ0-9\s/\-.:]+$")
+_LEGACY_TRAILING = re.compile(r"[\s:./\-]+$")
+
+
+def legacy_parse_report(text: str) -> tuple[list[tuple[str, str]], list[str]]:
+    sections, warnings = [], []
+    current = None
+    for line in text.split("\n"):
+        trimmed = line.strip()
+        if not trimmed:
+            if current and current[1]:
+                current[1] += "\n"
+            continue
+        if trimmed.startswith("[NAPOMENA"):
+            warnings.append(trimmed)
+            continue
+        if (
+            len(trimmed) >= 3
+            and _LEGACY_LETTER.search(trimmed)
+            and trimmed == trimmed.upper()
+            and _LEGACY_CHARSET.match(trimmed)
+        ):
+            if current:
+                sections.append((current[0], current[1].strip()))
+            cleaned = _LEGACY_TRAILING.sub("", trimmed).strip()
+            if "/" in cleaned and cleaned.split("/")[0].strip() in _LEGACY_STANDARD:
+                cleaned = cleaned.split("/")[0].strip()
+            current = None if cleaned in _LEGACY_FILTERED else [cleaned, ""]
+        elif current:
+            current[1] += ("\n" if current[1] else "") + trimmed
+    if current:
+        sections.append((current[0], current[1].strip()))
+    return sections, warnings
+
+
+def load_corpus(path: str) -> list[tuple[str, str]]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [(r["id"], r["report_text"]) for r in map(json.loads, f) if r]
+
+
+def bench(path: str, rounds: int = 5):
+    corpus = load_corpus(path)
+    total_bytes = sum(len(t.encode("utf-8")) for _, t in corpus)
+
+    mismatches = [
+        report_id for report_id, text in corpus
+        if legacy_parse_report(text) != parse_report(text)
+    ]
+
+    runs = (("legacy", legacy_parse_report), ("tokenize", tokenize), ("grammar", parse_report))
+    for name, fn in runs:
+        best = float("inf")
+        for _ in range(rounds):
+            start = time.perf_counter()
+            for _, text in corpus:
+                fn(text)
+            best = min(best, time.perf_counter() - start)
+        print(
+            f"{name:8s} {len(corpus) / best:10.0f} reports/s  "
+            f"{total_bytes / best / 1e6:7.1f} MB/s  ({best * 1000:.1f} ms best of {rounds})"
+        )
+
+    print(f"Output mismatches vs legacy: {len(mismatches)}")
+    for report_id in mismatches[:10]:
+        print(f"  {report_id}")
+    return not mismatches
+
+
+def _utf16_offsets(text: str):
+    """Maps code-point offsets to UTF-16 offsets (JS string indices)."""
+    if all(ord(c) <= 0xFFFF for c in text):
+        return None
+    table, pos = [], 0
+    for c in text:
+        table.append(pos)
+        pos += 2 if ord(c) > 0xFFFF else 1
+    table.append(pos)
+    return table
+
+
+def compare(corpus_path: str, py_path: str, ts_path: str) -> bool:
+    texts = dict(load_corpus(corpus_path))
+    differences = 0
+    with open(py_path, encoding="utf-8") as py, open(ts_path, encoding="utf-8") as ts:
+        for py_line, ts_line in zip(py, ts, strict=True):
+            py_rec, ts_rec = json.loads(py_line), json.loads(ts_line)
+            table = _utf16_offsets(texts.get(py_rec["id"], ""))
+            if table:
+                py_rec = spans_record(py_rec["id"], texts[py_rec["id"]])
+                for s in py_rec["sections"]:
+                    s[2:] = [table[i] for i in s[2:]]
+                py_rec["warnings"] = [[table[a], table[b]] for a, b in py_rec["warnings"]]
+            if py_rec != ts_rec:
+                differences += 1
+                if differences <= 10:
+                    print(f"DIFF {py_rec['id']}\n  py: {py_rec}\n  ts: {ts_rec}")
+    print(f"Span differences: {differences}")
+    return differences == 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 3 and sys.argv[1] == "generate":
+        count = int(sys.argv[3]) if len(sys.argv) > 3 else 20000
+        generate(sys.argv[2], count)
+        print(f"Wrote {count} reports to {sys.argv[2]}")
+    elif len(sys.argv) == 3 and sys.argv[1] == "bench":
+        sys.exit(0 if bench(sys.argv[2]) else 1)
+    elif len(sys.argv) == 5 and sys.argv[1] == "compare":
+        sys.exit(0 if compare(sys.argv[2], sys.argv[3], sys.argv[4]) else 1)
+    else:
+        print(__doc__)
+        sys.exit(1)
@@ -0,0 +1,206 @@
+"""
+Memory / latency benchmark for the /api/submit proxy under concurrent uploads.
+
+Sends N concurrent multipart uploads of synthetic audio through the Next.js
+proxy to the local stub webhook and reports:
+
+  - request latency p50/p95/p99 and throughput (for --async: time to 202)
+  - peak and mean RSS of the Next.js server while the uploads run (Linux,
+    sampled from /proc every 50 ms, child processes included)
+  - how many uploads reached the stub
+
+Every upload carries distinct random bytes and its own Idempotency-Key, so
+the submit cache never answers for n8n. Run it once with the buffered proxy
+and once with AIMED_SUBMIT_STREAMING=true, against a production build
+(`npm run build && npm start`), and compare:
+
+Usage:
+  python tools/bench_submit_proxy.py --cookie COOKIE --pid PID [options]
+
+Options:
+  --proxy URL       /api/submit URL (default: http://localhost:3000/api/submit)
+  --stub URL        Stub webhook URL (default: http://127.0.0.1:5678/webhook/AIMED-transcribe-v5)
+  --cookie COOKIE   Cookie header of a signed-in browser session (sb-...-auth-token=...)
+  --pid PID         Process id of the Next.js server (for RSS sampling)
+  --concurrency N   Uploads in flight at once (default: 20)
+  --requests N      Total uploads (default: 100)
+  --size-mb MB      Audio size per upload (default: 5, ~10 min of 64 kbps Opus)
+  --async           Send Prefer: respond-async and time the 202
+  --settle SECONDS  With --async: wait before reading the stub's counters (default: 5)
+  --out FILE        Write the summary as JSON
+  --compare FILE    Print the change against an earlier --out file
+
+Examples:
+  python tools/stub_webhook.py --latency fixed:1
+  npm start                                   # buffered proxy
+  python tools/bench_submit_proxy.py --cookie "$C" --pid $(pgrep -f next-server) --out buffered.json
+  AIMED_SUBMIT_STREAMING=true npm start       # streaming proxy
+  python tools/bench_submit_proxy.py --cookie "$C" --pid $(pgrep -f next-server) --compare buffered.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+from pathlib import Path
+
+import aiohttp
+
+PAGE_KB = os.sysconf("SC_PAGE_SIZE") // 1024
+
+
+def percentile(values: list[float], p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def process_tree(pid: int) -> list[int]:
+    """pid and all of its descendants (Linux /proc)."""
+    pids, queue = [], [pid]
+    while queue:
+        current = queue.pop()
+        pids.append(current)
+        for task in Path(f"/proc/{current}/task").glob("*"):
+            try:
+                queue.extend(int(child) for child in (task / "children").read_text().split())
+            except OSError:
+                pass
+    return pids
+
+
+def rss_mb(pids: list[int]) -> float:
+    total_kb = 0
+    for pid in pids:
+        try:
+            total_kb += int(Path(f"/proc/{pid}/statm").read_text().split()[1]) * PAGE_KB
+        except (OSError, IndexError, ValueError):
+            pass
+    return total_kb / 1024
+
+
+async def sample_memory(pid: int, samples: list[float], stop: asyncio.Event):
+    pids = process_tree(pid)
+    while not stop.is_set():
+        samples.append(rss_mb(pids))
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=0.05)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def upload(session: aiohttp.ClientSession, args, size: int) -> tuple[float, int, str | None]:
+    form = aiohttp.FormData()
+    form.add_field("audio", os.urandom(size), filename="recording.webm", content_type="audio/webm")
+    form.add_field("mode", "new")
+    headers = {"Cookie": args.cookie, "Idempotency-Key": str(uuid.uuid4())}
+    if args.async_mode:
+        headers["Prefer"] = "respond-async"
+
+    start = time.perf_counter()
+    try:
+        async with session.post(args.proxy, data=form, headers=headers) as response:
+            await response.read()
+            return time.perf_counter() - start, response.status, None
+    except aiohttp.ClientError as e:
+        return time.perf_counter() - start, 0, type(e).__name__
+
+
+async def run(args) -> dict:
+    size = int(args.size_mb * 1024 * 1024)
+    latencies: list[float] = []
+    statuses: dict[str, int] = {}
+    memory: list[float] = []
+    stop = asyncio.Event()
+    queue = iter(range(args.requests))
+
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=300)) as session:
+        await session.post(args.stub + "/stats/reset")
+        idle_mb = rss_mb(process_tree(args.pid))
+
+        async def worker():
+            for _ in queue:
+                latency, status, error = await upload(session, args, size)
+                latencies.append(latency)
+                key = error or str(status)
+                statuses[key] = statuses.get(key, 0) + 1
+
+        sampler = asyncio.create_task(sample_memory(args.pid, memory, stop))
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        wall = time.perf_counter() - started
+        stop.set()
+        await sampler
+
+        if args.async_mode:
+            await asyncio.sleep(args.settle)
+        async with session.get(args.stub + "/stats") as response:
+            stub_stats = await response.json()
+
+    return {
+        "mode": "async" if args.async_mode else "sync",
+        "concurrency": args.concurrency,
+        "requests": args.requests,
+        "size_mb": args.size_mb,
+        "wall_s": round(wall, 2),
+        "uploads_per_s": round(args.requests / wall, 2) if wall else 0,
+        "latency_p50_s": round(percentile(latencies, 50), 3),
+        "latency_p95_s": round(percentile(latencies, 95), 3),
+        "latency_p99_s": round(percentile(latencies, 99), 3),
+        "rss_idle_mb": round(idle_mb, 1),
+        "rss_peak_mb": round(max(memory, default=idle_mb), 1),
+        "rss_mean_mb": round(sum(memory) / len(memory), 1) if memory else round(idle_mb, 1),
+        "rss_growth_per_upload_mb": round((max(memory, default=idle_mb) - idle_mb) / args.concurrency, 2),
+        "statuses": statuses,
+        "stub_requests": stub_stats.get("requests"),
+    }
+
+
+def print_summary(summary: dict, baseline: dict | None):
+    for key, value in summary.items():
+        line = f"  {key:<26} {value}"
+        if baseline and isinstance(value, (int, float)) and isinstance(baseline.get(key), (int, float)):
+            line += f"   (was {baseline[key]})"
+        print(line)
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+
+    parser = argparse.ArgumentParser(description="Memory / latency benchmark for the /api/submit proxy")
+    parser.add_argument("--proxy", default="http://localhost:3000/api/submit")
+    parser.add_argument("--stub", default="http://127.0.0.1:5678/webhook/AIMED-transcribe-v5")
+    parser.add_argument("--cookie", required=True)
+    parser.add_argument("--pid", type=int, required=True)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--size-mb", type=float, default=5)
+    parser.add_argument("--async", dest="async_mode", action="store_true")
+    parser.add_argument("--settle", type=float, default=5)
+    parser.add_argument("--out")
+    parser.add_argument("--compare")
+    args = parser.parse_args()
+
+    if not Path(f"/proc/{args.pid}").exists():
+        parser.error(f"no process {args.pid} (RSS sampling needs Linux /proc)")
+
+    summary = asyncio.run(run(args))
+    baseline = json.loads(Path(args.compare).read_text()) if args.compare else None
+
+    print(f"/api/submit, {args.requests} uploads of {args.size_mb} MB, {args.concurrency} concurrent:")
+    print_summary(summary, baseline)
+
+    if args.out:
+        Path(args.out).write_text(json.dumps(summary, indent=2) + "\n")
+        print(f"Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+Frame-time benchmark for the recording screen (live waveform + timer).
+
+Opens /novi-nalaz?patient=<id> in headless Chromium with a fake microphone,
+so DictationFlow starts recording right away, throttles the CPU to mimic a
+low-end clinic PC, and samples for a fixed window:
+
+  - frame times (requestAnimationFrame deltas): p50/p95/p99, share of frames
+    over 16.7 ms and 33.3 ms
+  - long tasks (> 50 ms) from PerformanceObserver
+  - DOM mutations per second (each React re-render of the old <div> bars
+    rewrote 48 inline heights per frame)
+
+The recording is cancelled afterwards, nothing is uploaded. To prove a change,
+run once on the old commit and once on the new one and compare:
+
+Usage:
+  python tools/bench_waveform.py --patient <uuid> [options]
+
+Options:
+  --base-url URL         App origin (default: http://localhost:3000)
+  --patient ID           Patient id of the logged-in doctor (required)
+  --storage-state FILE   Playwright storage state with a logged-in session
+  --email E --password P Log in through /login instead (saves --storage-state if given)
+  --seconds N            Sampling window (default: 20)
+  --cpu-throttle N       Chrome CPU slowdown factor (default: 4, 1 = off)
+  --out FILE             Write the summary as JSON
+  --compare FILE         Print the change against an earlier --out file
+
+Examples:
+  git checkout <old> && python tools/bench_waveform.py --patient $P --storage-state auth.json --out before.json
+  git checkout <new> && python tools/bench_waveform.py --patient $P --storage-state auth.json --compare before.json
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+from playwright.async_api import async_playwright
+
+# Collected in the page; window.__aimedBench.stop() returns the raw samples
+COLLECTOR_JS = """
+() => {
+  const frames = [];
+  const longTasks = [];
+  let mutations = 0;
+  let last = performance.now();
+  let running = true;
+
+  function tick(now) {
+    frames.push(now - last);
+    last = now;
+    if (running) requestAnimationFrame(tick);
+  }
+  requestAnimationFrame(tick);
+
+  const longTaskObserver = new PerformanceObserver((list) => {
+    for (const entry of list.getEntries()) longTasks.push(entry.duration);
+  });
+  longTaskObserver.observe({ type: "longtask" });
+
+  const mutationObserver = new MutationObserver((records) => { mutations += records.length; });
+  mutationObserver.observe(document.body, { subtree: true, childList: true, attributes: true, characterData: true });
+
+  const started = performance.now();
+  window.__aimedBench = {
+    stop() {
+      running = false;
+      longTaskObserver.disconnect();
+      mutationObserver.disconnect();
+      return { frames: frames.slice(1), longTasks, mutations, elapsedMs: performance.now() - started };
+    },
+  };
+}
+"""
+
+
+def percentile(values: list[float], p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(raw: dict, cpu_throttle: float) -> dict:
+    frames = raw["frames"]
+    seconds = raw["elapsedMs"] / 1000
+    return {
+        "cpu_throttle": cpu_throttle,
+        "seconds": round(seconds, 1),
+        "frames": len(frames),
+        "fps": round(len(frames) / seconds, 1) if seconds else 0,
+        "frame_p50_ms": round(percentile(frames, 50), 2),
+        "frame_p95_ms": round(percentile(frames, 95), 2),
+        "frame_p99_ms": round(percentile(frames, 99), 2),
+        "frames_over_16ms_pct": round(100 * sum(f > 16.7 for f in frames) / max(1, len(frames)), 1),
+        "frames_over_33ms_pct": round(100 * sum(f > 33.4 for f in frames) / max(1, len(frames)), 1),
+        "long_tasks": len(raw["longTasks"]),
+        "long_task_ms": round(sum(raw["longTasks"]), 1),
+        "dom_mutations_per_s": round(raw["mutations"] / seconds, 1) if seconds else 0,
+    }
+
+
+async def login(page, base_url: str, email: str, password: str):
+    await page.goto(f"{base_url}/login")
+    await page.fill('input[type="email"]', email)
+    await page.fill('input[type="password"]', password)
+    await page.click('button[type="submit"]')
+    await page.wait_for_url("**/dashboard", timeout=15000)
+
+
+async def run(args) -> dict:
+    async with async_playwright() as pw:
+        browser = await pw.chromium.launch(
+            headless=True,
+            args=["--use-fake-ui-for-media-stream", "--use-fake-device-for-media-stream"],
+        )
+        state = args.storage_state if args.storage_state and Path(args.storage_state).exists() else None
+        context = await browser.new_context(storage_state=state, permissions=["microphone"])
+        page = await context.new_page()
+
+        if args.email and args.password:
+            await login(page, args.base_url, args.email, args.password)
+            if args.storage_state:
+                await context.storage_state(path=args.storage_state)
+
+        await page.goto(f"{args.base_url}/novi-nalaz?patient={args.patient}")
+        # The timer appears once DictationFlow is recording
+        await page.get_by_text("Otkaži").wait_for(timeout=20000)
+        await page.wait_for_timeout(1000)
+
+        if args.cpu_throttle > 1:
+            cdp = await context.new_cdp_session(page)
+            await cdp.send("Emulation.setCPUThrottlingRate", {"rate": args.cpu_throttle})
+
+        await page.evaluate(COLLECTOR_JS)
+        await page.wait_for_timeout(args.seconds * 1000)
+        raw = await page.evaluate("window.__aimedBench.stop()")
+
+        await page.get_by_text("Otkaži").click()
+        await browser.close()
+        return summarize(raw, args.cpu_throttle)
+
+
+def print_summary(summary: dict, baseline: dict | None):
+    for key, value in summary.items():
+        line = f"  {key:<22} {value}"
+        if baseline and isinstance(value, (int, float)) and isinstance(baseline.get(key), (int, float)):
+            line += f"   (was {baseline[key]})"
+        print(line)
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+
+    parser = argparse.ArgumentParser(description="Frame-time benchmark for the recording screen")
+    parser.add_argument("--base-url", default="http://localhost:3000")
+    parser.add_argument("--patient", required=True)
+    parser.add_argument("--storage-state")
+    parser.add_argument("--email")
+    parser.add_argument("--password")
+    parser.add_argument("--seconds", type=int, default=20)
+    parser.add_argument("--cpu-throttle", type=float, default=4)
+    parser.add_argument("--out")
+    parser.add_argument("--compare")
+    args = parser.parse_args()
+
+    if not args.storage_state and not (args.email and args.password):
+        parser.error("log in with --storage-state or --email/--password")
+
+    summary = asyncio.run(run(args))
+    baseline = json.loads(Path(args.compare).read_text()) if args.compare else None
+
+    print(f"Recording screen, {summary['seconds']} s at {args.cpu_throttle}x CPU throttle:")
+    print_summary(summary, baseline)
+
+    if args.out:
+        Path(args.out).write_text(json.dumps(summary, indent=2) + "\n")
+        print(f"Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
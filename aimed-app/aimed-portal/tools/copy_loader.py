@@ -0,0 +1,429 @@
+"""
+Bulk, diff-aware loader for mkb10_codes and drug_registry over COPY.
+
+The v5 guide imports MKB-10 with 500-row REST upserts, and the registry
+the same way. Each batch commits on its own, so a refresh can stop halfway
+and leave the search RPCs on a mix of editions. It also never deletes
+codes that were withdrawn. This loader instead:
+
+  1. COPYs the new edition into a temp table (one round trip per ~MBs)
+  2. diffs it against the live table on the natural key
+       inserts  keys only in the new edition
+       updates  keys in both whose compared columns differ
+       deletes  keys no longer present
+  3. applies all three in ONE transaction. Readers keep seeing the old
+     edition through MVCC until the commit and the new one right after,
+     never a half-loaded table.
+  4. when the delta touches more than --rebuild-threshold of the table,
+     REINDEXes the trigram/vector indexes CONCURRENTLY after the commit
+     (fresh ivfflat centroids, flushed GIN pending list) and ANALYZEs it.
+
+A delete guard refuses to drop more than --max-delete of the live rows, so
+a truncated export cannot wipe the table.
+
+Usage:
+  python tools/copy_loader.py mkb10_codes mkb10.csv [--dsn DATABASE_URL] [--dry-run]
+  python tools/copy_loader.py drug_registry registry.jsonl [--dsn DATABASE_URL]
+  python tools/copy_loader.py bench --dsn postgresql://localhost/postgres [--rows 15000]
+
+Inputs: the MKB-10 CSV (code,name_hr,name_lat,category) and, for the
+registry, the JSONL written by `ingest_drug_registry.py --store FILE.jsonl`
+(rows with entry_key, content_hash and embedding).
+
+bench runs in a scratch schema (loader_bench) of a local Postgres and
+compares 500-row upsert batches with the COPY loader on a full load, a
+no-op refresh and a 5% edition change, with a reader thread checking that
+it only ever sees complete editions.
+
+Needs psycopg 3 (pip install "psycopg[binary]").
+"""
+
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+REST_BATCH_SIZE = 500  # what the guide's import_mkb10.py sends per upsert
+
+
+@dataclass(frozen=True)
+class TableSpec:
+    name: str
+    key: str
+    columns: tuple[str, ...]
+    # Columns that decide whether a row changed (all columns when empty)
+    compare: tuple[str, ...] = ()
+    # Columns COPY receives as text and casts (pgvector accepts '[1,2,...]')
+    vector_columns: tuple[str, ...] = ()
+
+
+TABLES = {
+    "mkb10_codes": TableSpec(
+        name="mkb10_codes",
+        key="code",
+        columns=("code", "name_hr", "name_lat", "category"),
+    ),
+    "drug_registry": TableSpec(
+        name="drug_registry",
+        key="entry_key",
+        columns=("entry_key", "content_hash", "trade_name", "generic_name", "strength", "form",
+                 "manufacturer", "atc_code", "content_chunk", "embedding"),
+        # content_hash already covers every other column and the embedding model
+        compare=("content_hash",),
+        vector_columns=("embedding",),
+    ),
+}
+
+
+@dataclass
+class LoadReport:
+    table: str
+    staged: int = 0
+    live_before: int = 0
+    inserted: int = 0
+    updated: int = 0
+    deleted: int = 0
+    reindexed: list[str] = field(default_factory=list)
+    copy_seconds: float = 0.0
+    apply_seconds: float = 0.0
+    reindex_seconds: float = 0.0
+
+    @property
+    def delta(self) -> int:
+        return self.inserted + self.updated + self.deleted
+
+
+def _connect(dsn: str | None):
+    try:
+        import psycopg
+    except ImportError:
+        raise SystemExit("ERROR: copy_loader needs psycopg (pip install 'psycopg[binary]')")
+    if not dsn:
+        raise SystemExit("ERROR: pass --dsn or set DATABASE_URL")
+    return psycopg.connect(dsn)
+
+
+def read_rows(spec: TableSpec, path: str) -> list[tuple]:
+    """Input rows as tuples in spec.columns order; empty strings become NULL."""
+    if path.endswith(".jsonl"):
+        with open(path, encoding="utf-8") as f:
+            records = [json.loads(line) for line in f if line.strip()]
+    else:
+        with open(path, encoding="utf-8", newline="") as f:
+            records = list(csv.DictReader(f))
+
+    rows, seen = [], set()
+    for record in records:
+        row = []
+        for column in spec.columns:
+            value = record.get(column)
+            if isinstance(value, str):
+                value = value.strip() or None
+            if column in spec.vector_columns and isinstance(value, list):
+                value = "[" + ",".join(map(str, value)) + "]"
+            row.append(value)
+        key = row[spec.columns.index(spec.key)]
+        if key is None:
+            raise ValueError(f"{path}: row without {spec.key}: {record}")
+        if key in seen:
+            raise ValueError(f"{path}: duplicate {spec.key} {key!r}")
+        seen.add(key)
+        rows.append(tuple(row))
+    return rows
+
+
+def search_indexes(cur, schema: str, table: str) -> list[str]:
+    """Trigram and vector indexes on the table — the ones worth rebuilding after a big delta."""
+    cur.execute(
+        "SELECT indexname FROM pg_indexes WHERE schemaname = %s AND tablename = %s "
+        "AND (indexdef ILIKE '%%gin_trgm_ops%%' OR indexdef ILIKE '%%ivfflat%%' OR indexdef ILIKE '%%hnsw%%')",
+        (schema, table),
+    )
+    return [row[0] for row in cur.fetchall()]
+
+
+def load(
+    conn,
+    spec: TableSpec,
+    rows: list[tuple],
+    schema: str = "public",
+    rebuild_threshold: float = 0.2,
+    max_delete: float = 0.5,
+    dry_run: bool = False,
+) -> LoadReport:
+    from psycopg import sql
+
+    report = LoadReport(table=f"{schema}.{spec.name}", staged=len(rows))
+    target = sql.Identifier(schema, spec.name)
+    key = sql.Identifier(spec.key)
+    columns = sql.SQL(", ").join(map(sql.Identifier, spec.columns))
+    compared = spec.compare or tuple(c for c in spec.columns if c != spec.key)
+    t_cols = sql.SQL(", ").join(sql.SQL("t.{}").format(sql.Identifier(c)) for c in compared)
+    s_cols = sql.SQL(", ").join(sql.SQL("s.{}").format(sql.Identifier(c)) for c in compared)
+    assignments = sql.SQL(", ").join(
+        sql.SQL("{0} = s.{0}").format(sql.Identifier(c)) for c in spec.columns if c != spec.key
+    )
+
+    with conn.transaction(), conn.cursor() as cur:
+        start = time.perf_counter()
+        cur.execute(
+            sql.SQL("CREATE TEMP TABLE stage ON COMMIT DROP AS SELECT {} FROM {} WITH NO DATA").format(columns, target)
+        )
+        with cur.copy(sql.SQL("COPY stage ({}) FROM STDIN").format(columns)) as copy:
+            for row in rows:
+                copy.write_row(row)
+        cur.execute(sql.SQL("CREATE UNIQUE INDEX ON stage ({})").format(key))
+        cur.execute("ANALYZE stage")
+        report.copy_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        cur.execute(sql.SQL("SELECT count(*) FROM {}").format(target))
+        report.live_before = cur.fetchone()[0]
+        cur.execute(
+            sql.SQL("SELECT count(*) FROM {} t WHERE NOT EXISTS (SELECT 1 FROM stage s WHERE s.{k} = t.{k})").format(
+                target, k=key
+            )
+        )
+        doomed = cur.fetchone()[0]
+        if report.live_before and doomed / report.live_before > max_delete:
+            raise SystemExit(
+                f"ERROR: refusing to delete {doomed} of {report.live_before} rows from {report.table} "
+                f"(over --max-delete {max_delete:.0%}); is the input complete?"
+            )
+
+        cur.execute(
+            sql.SQL(
+                "INSERT INTO {t} ({c}) SELECT {c} FROM stage s "
+                "WHERE NOT EXISTS (SELECT 1 FROM {t} t WHERE t.{k} = s.{k})"
+            ).format(t=target, c=columns, k=key)
+        )
+        report.inserted = cur.rowcount
+        cur.execute(
+            sql.SQL(
+                "UPDATE {t} t SET {a} FROM stage s WHERE t.{k} = s.{k} AND ({tc}) IS DISTINCT FROM ({sc})"
+            ).format(t=target, a=assignments, k=key, tc=t_cols, sc=s_cols)
+        )
+        report.updated = cur.rowcount
+        cur.execute(
+            sql.SQL("DELETE FROM {t} t WHERE NOT EXISTS (SELECT 1 FROM stage s WHERE s.{k} = t.{k})").format(
+                t=target, k=key
+            )
+        )
+        report.deleted = cur.rowcount
+        report.apply_seconds = time.perf_counter() - start
+
+        if dry_run:
+            # Leave the transaction through an exception so everything is rolled back
+            raise _DryRun(report)
+
+    live = max(report.live_before, report.staged, 1)
+    if report.delta / live > rebuild_threshold:
+        start = time.perf_counter()
+        # REINDEX CONCURRENTLY cannot run inside a transaction block
+        previous, conn.autocommit = conn.autocommit, True
+        try:
+            with conn.cursor() as cur:
+                for index in search_indexes(cur, schema, spec.name):
+                    cur.execute(sql.SQL("REINDEX INDEX CONCURRENTLY {}").format(sql.Identifier(schema, index)))
+                    report.reindexed.append(index)
+                cur.execute(sql.SQL("ANALYZE {}").format(target))
+        finally:
+            conn.autocommit = previous
+        report.reindex_seconds = time.perf_counter() - start
+    return report
+
+
+class _DryRun(Exception):
+    def __init__(self, report: LoadReport):
+        self.report = report
+
+
+def load_file(conn, table: str, path: str, **kwargs) -> LoadReport:
+    spec = TABLES[table]
+    rows = read_rows(spec, path)
+    try:
+        return load(conn, spec, rows, **kwargs)
+    except _DryRun as e:
+        return e.report
+
+
+def print_report(report: LoadReport, dry_run: bool = False):
+    print(f"{report.table}: {report.staged} staged, {report.live_before} live before")
+    print(f"  inserted {report.inserted}  updated {report.updated}  deleted {report.deleted}")
+    print(f"  COPY {report.copy_seconds:.2f}s  apply {report.apply_seconds:.2f}s", end="")
+    if report.reindexed:
+        print(f"  reindex {report.reindex_seconds:.2f}s ({', '.join(report.reindexed)})")
+    else:
+        print()
+    if dry_run:
+        print("  dry run — rolled back")
+
+
+# ── Benchmark ──
+
+BENCH_SCHEMA = "loader_bench"
+
+
+def _synthetic_mkb10(count: int, seed: int = 7) -> list[tuple]:
+    rng = random.Random(seed)
+    words = ["bolest", "upala", "tumor", "povreda", "sindrom", "lezija", "infekcija", "akutna", "kronična",
+             "lijevog", "desnog", "koljena", "pluća", "jetre", "bubrega", "kože", "srca", "oka", "uha"]
+    rows = []
+    for i in range(count):
+        code = f"{chr(65 + i // 1000 % 26)}{i % 1000 // 10:02d}.{i % 10}"
+        if i >= 26000:
+            code += str(i // 26000)
+        name = " ".join(rng.choice(words) for _ in range(rng.randint(2, 5))).capitalize()
+        rows.append((code, name, f"Morbus {rng.randint(1, 999)}", f"{code[0]}00-{code[0]}99"))
+    return rows
+
+
+def _next_edition(rows: list[tuple], seed: int = 8) -> list[tuple]:
+    """~5% renamed, ~1% withdrawn, ~1% new codes."""
+    rng = random.Random(seed)
+    edition = []
+    for code, name, latin, category in rows:
+        roll = rng.random()
+        if roll < 0.01:
+            continue
+        if roll < 0.06:
+            name += " (revidirano)"
+        edition.append((code, name, latin, category))
+    # Base codes are letter + two digits, so four digits never collide
+    edition += [(f"U{n:04d}", "Nova šifra", None, "U00-U99") for n in range(len(rows) // 100)]
+    return edition
+
+
+def _rest_style(conn, rows: list[tuple]) -> float:
+    """The guide's pattern: one upsert statement + commit per 500-row batch."""
+    start = time.perf_counter()
+    statement = (
+        f"INSERT INTO {BENCH_SCHEMA}.mkb10_codes (code, name_hr, name_lat, category) VALUES (%s, %s, %s, %s) "
+        "ON CONFLICT (code) DO UPDATE SET name_hr = EXCLUDED.name_hr, name_lat = EXCLUDED.name_lat, "
+        "category = EXCLUDED.category"
+    )
+    for i in range(0, len(rows), REST_BATCH_SIZE):
+        with conn.transaction(), conn.cursor() as cur:
+            cur.executemany(statement, rows[i:i + REST_BATCH_SIZE])
+    return time.perf_counter() - start
+
+
+class _Reader(threading.Thread):
+    """Polls the row count the way a search RPC would see the table."""
+
+    def __init__(self, dsn: str):
+        super().__init__(daemon=True)
+        self.dsn, self.counts, self.stop = dsn, set(), threading.Event()
+
+    def run(self):
+        with _connect(self.dsn) as conn:
+            conn.autocommit = True
+            while not self.stop.is_set():
+                self.counts.add(conn.execute(f"SELECT count(*) FROM {BENCH_SCHEMA}.mkb10_codes").fetchone()[0])
+                time.sleep(0.001)
+
+
+def _observe(dsn: str, action):
+    reader = _Reader(dsn)
+    reader.start()
+    try:
+        result = action()
+    finally:
+        reader.stop.set()
+        reader.join()
+    return result, reader.counts
+
+
+def bench(dsn: str, count: int):
+    base = _synthetic_mkb10(count)
+    edition = _next_edition(base)
+    spec = TABLES["mkb10_codes"]
+    with _connect(dsn) as conn:
+        conn.autocommit = True
+        conn.execute(f"CREATE SCHEMA IF NOT EXISTS {BENCH_SCHEMA}")
+        conn.execute(f"DROP TABLE IF EXISTS {BENCH_SCHEMA}.mkb10_codes")
+        conn.execute(
+            f"CREATE TABLE {BENCH_SCHEMA}.mkb10_codes (id serial PRIMARY KEY, code text UNIQUE NOT NULL, "
+            "name_hr text NOT NULL, name_lat text, category text)"
+        )
+        try:
+            conn.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            conn.execute(f"CREATE INDEX ON {BENCH_SCHEMA}.mkb10_codes USING gin (name_hr gin_trgm_ops)")
+        except Exception as e:
+            print(f"(no trigram index: {e})")
+        conn.autocommit = False
+
+        print(f"Edition A: {len(base)} codes, edition B: {len(edition)} codes")
+        print(f"{'':28s} {'upsert x500':>12s} {'COPY + diff':>12s}")
+
+        conn.execute(f"TRUNCATE {BENCH_SCHEMA}.mkb10_codes")
+        conn.commit()
+        rest_full = _rest_style(conn, base)
+        rest_noop = _rest_style(conn, base)
+        rest_change, rest_seen = _observe(dsn, lambda: _rest_style(conn, edition))
+
+        conn.execute(f"TRUNCATE {BENCH_SCHEMA}.mkb10_codes")
+        conn.commit()
+        full = load(conn, spec, base, schema=BENCH_SCHEMA)
+        noop = load(conn, spec, base, schema=BENCH_SCHEMA)
+        change, copy_seen = _observe(dsn, lambda: load(conn, spec, edition, schema=BENCH_SCHEMA))
+
+        seconds = lambda r: r.copy_seconds + r.apply_seconds + r.reindex_seconds
+        print(f"{'full load':28s} {rest_full:11.2f}s {seconds(full):11.2f}s")
+        print(f"{'no-op refresh':28s} {rest_noop:11.2f}s {seconds(noop):11.2f}s")
+        print(f"{'edition A → B':28s} {rest_change:11.2f}s {seconds(change):11.2f}s")
+        print(
+            f"  COPY loader delta: +{change.inserted} ~{change.updated} -{change.deleted}"
+            f"{', reindexed ' + ', '.join(change.reindexed) if change.reindexed else ''}"
+        )
+        print(f"  row counts seen by a reader: upsert batches {sorted(rest_seen)}, COPY loader {sorted(copy_seen)}")
+        print("  (upserts never delete withdrawn codes; the COPY loader's reader sees only the two complete editions)")
+
+        conn.autocommit = True
+        conn.execute(f"DROP SCHEMA {BENCH_SCHEMA} CASCADE")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+
+    if sys.argv[1] == "bench":
+        parser = argparse.ArgumentParser(description="Benchmark the COPY loader against batched upserts")
+        parser.add_argument("command")
+        parser.add_argument("--dsn", default=os.getenv("DATABASE_URL"))
+        parser.add_argument("--rows", type=int, default=15000)
+        args = parser.parse_args()
+        bench(args.dsn, args.rows)
+        sys.exit(0)
+
+    parser = argparse.ArgumentParser(description="Bulk, diff-aware COPY loader")
+    parser.add_argument("table", choices=sorted(TABLES))
+    parser.add_argument("input")
+    parser.add_argument("--dsn", default=os.getenv("DATABASE_URL"))
+    parser.add_argument("--schema", default="public")
+    parser.add_argument("--rebuild-threshold", type=float, default=0.2,
+                        help="Reindex search indexes when the delta exceeds this share of the table")
+    parser.add_argument("--max-delete", type=float, default=0.5,
+                        help="Refuse to delete more than this share of the live rows")
+    parser.add_argument("--dry-run", action="store_true", help="Compute the delta, then roll back")
+    args = parser.parse_args()
+
+    with _connect(args.dsn) as conn:
+        report = load_file(
+            conn, args.table, args.input,
+            schema=args.schema,
+            rebuild_threshold=args.rebuild_threshold,
+            max_delete=args.max_delete,
+            dry_run=args.dry_run,
+        )
+    print_report(report, args.dry_run)
@@ -0,0 +1,539 @@
+"""
+Local phonetic corrector for drug names in Bosnian transcripts.
+
+Most registar_lijekova calls exist to undo speech-to-text spelling errors
+("Sumam" → SUMAMED, "amoksilin" → amoksicilin, "Klacit" → KLACID). This
+resolves them locally against the drug_registry export: every trade name and
+INN is reduced to a phonetic key that folds Bosnian/Latin spelling variants
+(č/ć → c, x → ks, ph → f, c before a/o/u → k, doubled letters ...), and keys
+are looked up through a SymSpell-style delete index (Damerau-Levenshtein,
+up to 2 edits) plus a prefix scan for truncated names.
+
+Candidates come back in the search-drugs Edge Function's result shape
+(trade_name, generic_name, strength, form, atc_code, match_score) with
+search_method "phonetic", so they can be fed to the agent directly.
+
+Usage:
+  python tools/drug_corrector.py correct drugs.csv "amoksilin" [-k 5] [--json]
+  python tools/drug_corrector.py annotate drugs.csv transcript.txt [--json] [--apply]
+  python tools/drug_corrector.py bench drugs.csv [--transcripts FILE]
+
+The registry CSV is the drug_registry table export:
+  \\copy (SELECT trade_name, generic_name, strength, form, atc_code FROM public.drug_registry) TO 'drugs.csv' CSV HEADER
+Pass --dsn (or set DATABASE_URL) instead of a CSV path to read the table directly,
+and --vocabulary FILE to add words that must never be turned into a drug name.
+
+Can also be imported and used programmatically:
+  from drug_corrector import DrugCorrector
+  corrector = DrugCorrector.from_csv("drugs.csv")
+  corrector.correct("Sumam")               # → [DrugCandidate(trade_name="SUMAMED", ...), ...]
+  corrector.annotate(transcript)           # → [DrugMention(...), ...] for the whole text
+"""
+
+import argparse
+import bisect
+import csv
+import json
+import os
+import random
+import re
+import statistics
+import sys
+import time
+import unicodedata
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+MAX_EDIT_DISTANCE = 2
+# SymSpell indexes deletes of the key prefix only; the rest is verified
+PREFIX_LENGTH = 7
+# A truncated name has to keep at least this share of the full key
+MIN_PREFIX_RATIO = 0.6
+# Corrections below this score are reported but not applied
+MIN_APPLY_SCORE = 0.7
+DEFAULT_MAX_RESULTS = 5
+MAX_NGRAM = 3
+
+# Bosnian/Latin spelling variants that STT produces for the same sound.
+# Applied in order to the lower-cased, diacritic-folded word.
+PHONETIC_RULES = [
+    (re.compile(r"sch"), "s"),
+    (re.compile(r"ch"), "h"),
+    (re.compile(r"ph"), "f"),
+    (re.compile(r"th"), "t"),
+    (re.compile(r"ck"), "k"),
+    (re.compile(r"qu"), "kv"),
+    (re.compile(r"q"), "k"),
+    (re.compile(r"x"), "ks"),
+    (re.compile(r"w"), "v"),
+    (re.compile(r"y"), "i"),
+    (re.compile(r"[ao]e"), "e"),
+    (re.compile(r"t[sz]"), "c"),
+    (re.compile(r"c(?![eiy]|$)"), "k"),
+    (re.compile(r"([ldn])j"), r"\1"),
+    (re.compile(r"(.)\1+"), r"\1"),
+]
+DIACRITICS = str.maketrans({"č": "c", "ć": "c", "š": "s", "ž": "z", "đ": "dj"})
+
+# Words that sit next to drug names in dictation and must never be "corrected"
+# into one; extend per deployment with --vocabulary
+COMMON_WORDS = frozenset("""
+    tableta tablete tableti tabletu kapsula kapsule kapsulu sirup sirupa kapi
+    injekcija injekcije ampula ampule mast krema gel sprej supozitorij
+    dnevno dnevna puta put jednom dvaput triput ujutro ujutru uvece navece
+    podne prije poslije nakon jela obroka po ili sa uz prema od do za
+    doza doze dozi dozu terapija terapije terapiju lijek lijeka lijekove
+    nastaviti nastavlja ukinuti ukida uvesti uvodi povecati smanjiti potrebi
+    jedan jedna dva dvije tri cetiri pet sest sedam osam devet deset
+    dan dana dani sedmica sedmice sedmicu mjesec mjeseca kontrola kontrolu
+    pacijent pacijentica nalaz preporuka zatim takodje
+    mg mcg ml ij iu gram grama miligrama
+""".split())
+
+STRENGTH_PATTERN = re.compile(r"(\d+(?:[.,]\d+)?)\s*(mg|mcg|µg|g|ml|ij|iu)\b", re.IGNORECASE)
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def fold(text: str) -> str:
+    """Lower-case and strip Bosnian diacritics (and any other combining marks)."""
+    text = text.lower().translate(DIACRITICS)
+    if text.isascii():
+        return text
+    return "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+
+
+def phonetic_key(text: str) -> str:
+    """Spelling-independent key for a name; words are concatenated."""
+    key = "".join(WORD_PATTERN.findall(fold(text))).replace("_", "")
+    for pattern, replacement in PHONETIC_RULES:
+        key = pattern.sub(replacement, key)
+    return key
+
+
+def bit_pattern(text: str) -> tuple[dict[str, int], int]:
+    """Per-character match masks of `text` for edit_distance()."""
+    masks: dict[str, int] = {}
+    for i, ch in enumerate(text):
+        masks[ch] = masks.get(ch, 0) | (1 << i)
+    return masks, len(text)
+
+
+def edit_distance(a: str, b: str, limit: int, pattern: tuple[dict[str, int], int] | None = None) -> int:
+    """
+    Optimal string alignment distance (Levenshtein plus adjacent
+    transpositions), or limit + 1 when it is larger. Bit-parallel over `b`
+    (Myers/Hyyrö), so comparing one query against many names only pays for
+    bit_pattern(b) once.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    if not a or not b:
+        return max(len(a), len(b))
+    masks, size = pattern or bit_pattern(b)
+    full = (1 << size) - 1
+    last = 1 << (size - 1)
+    vp, vn, d0, pm_prev, score = full, 0, 0, 0, size
+    for ch in a:
+        pm = masks.get(ch, 0)
+        d0 = (((pm & vp) + vp) ^ vp) | pm | vn | (((~d0 & pm) << 1) & pm_prev)
+        hp = vn | ~(d0 | vp)
+        hn = d0 & vp
+        if hp & last:
+            score += 1
+        elif hn & last:
+            score -= 1
+        hp = ((hp << 1) | 1) & full
+        hn = (hn << 1) & full
+        vp = hn | (~(d0 | hp) & full)
+        vn = hp & d0
+        pm_prev = pm
+    return score if score <= limit else limit + 1
+
+
+def max_distance(key: str) -> int:
+    """Short names get fewer edits, or every 4-letter word would match something."""
+    if len(key) < 4:
+        return 0
+    return 1 if len(key) < 7 else MAX_EDIT_DISTANCE
+
+
+def _deletes(key: str, distance: int) -> set[str]:
+    found = {key}
+    frontier = {key}
+    for _ in range(distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))} - found
+        found |= frontier
+    return found
+
+
+def _strength_key(text: str | None) -> str | None:
+    match = STRENGTH_PATTERN.search(text or "")
+    if not match:
+        return None
+    unit = match.group(2).lower().replace("µg", "mcg").replace("iu", "ij")
+    return match.group(1).replace(",", ".") + unit
+
+
+@dataclass(slots=True)
+class DrugEntry:
+    trade_name: str
+    generic_name: str | None
+    strength: str | None
+    form: str | None
+    atc_code: str | None
+
+
+@dataclass(slots=True)
+class DrugCandidate:
+    entry: DrugEntry
+    matched_name: str
+    matched_field: str  # "trade_name" | "generic_name"
+    distance: int
+    score: float
+
+    def to_tool_result(self) -> dict:
+        """Same shape as one entry of the search-drugs Edge Function's `results`."""
+        return {
+            "trade_name": self.entry.trade_name,
+            "generic_name": self.entry.generic_name or None,
+            "strength": self.entry.strength or None,
+            "form": self.entry.form or None,
+            "atc_code": self.entry.atc_code or None,
+            "match_score": self.score,
+            "search_method": "phonetic",
+        }
+
+
+@dataclass
+class DrugMention:
+    start: int
+    end: int
+    text: str
+    correction: str
+    matched_field: str
+    score: float
+    candidates: list[DrugCandidate] = field(default_factory=list)
+
+    @property
+    def changed(self) -> bool:
+        return fold(self.text) != fold(self.correction)
+
+    def to_dict(self) -> dict:
+        best = self.candidates[0] if self.candidates else None
+        return {
+            "start": self.start,
+            "end": self.end,
+            "text": self.text,
+            "correction": self.correction,
+            "matched_field": self.matched_field,
+            "score": self.score,
+            "trade_name": best.entry.trade_name if best else None,
+            "generic_name": best.entry.generic_name if best else None,
+            "strength": best.entry.strength if best else None,
+            "atc_code": best.entry.atc_code if best else None,
+            "candidates": [c.to_tool_result() for c in self.candidates],
+        }
+
+
+class DrugCorrector:
+    def __init__(self, entries: list[DrugEntry], vocabulary: set[str] | None = None, cache_size: int = 8192):
+        self.entries = entries
+        self.common_words = COMMON_WORDS | {fold(w) for w in vocabulary or ()}
+        # key → (display name, field, entry indices)
+        names: dict[tuple[str, str], tuple[str, list[int]]] = {}
+        for i, entry in enumerate(entries):
+            for field_name, name in (("trade_name", entry.trade_name), ("generic_name", entry.generic_name)):
+                key = phonetic_key(name or "")
+                if len(key) < 2:
+                    continue
+                display, rows = names.setdefault((key, field_name), (name.strip(), []))
+                rows.append(i)
+
+        self._names = [(key, field_name, display, rows) for (key, field_name), (display, rows) in names.items()]
+        self._sorted_keys = sorted((key, n) for n, (key, *_) in enumerate(self._names))
+        self._deletes: dict[str, list[int]] = {}
+        for n, (key, *_) in enumerate(self._names):
+            for variant in _deletes(key[:PREFIX_LENGTH], MAX_EDIT_DISTANCE):
+                self._deletes.setdefault(variant, []).append(n)
+        self._lookup = lru_cache(maxsize=cache_size)(self._lookup_key)
+
+    @classmethod
+    def from_csv(cls, path: str, **kwargs) -> "DrugCorrector":
+        with open(path, encoding="utf-8", newline="") as f:
+            entries = [_entry(row) for row in csv.DictReader(f) if (row.get("trade_name") or "").strip()]
+        return cls(entries, **kwargs)
+
+    @classmethod
+    def from_postgres(cls, dsn: str, **kwargs) -> "DrugCorrector":
+        try:
+            import psycopg
+        except ImportError:
+            raise SystemExit("ERROR: --dsn needs psycopg (pip install 'psycopg[binary]')")
+        with psycopg.connect(dsn) as conn:
+            rows = conn.execute(
+                "SELECT trade_name, generic_name, strength, form, atc_code FROM public.drug_registry ORDER BY id"
+            ).fetchall()
+        return cls([DrugEntry(*row) for row in rows], **kwargs)
+
+    def _lookup_key(self, key: str) -> tuple[tuple[int, int], ...]:
+        """(name index, distance) pairs within reach of a phonetic key."""
+        limit = max_distance(key)
+        pattern = bit_pattern(key)
+        found: dict[int, int] = {}
+        for variant in _deletes(key[:PREFIX_LENGTH], limit):
+            for n in self._deletes.get(variant, ()):
+                if n in found:
+                    continue
+                distance = edit_distance(self._names[n][0], key, limit, pattern)
+                if distance <= limit:
+                    found[n] = distance
+
+        # Truncated dictation ("Sumam" for Sumamed): count the missing tail as insertions
+        if len(key) >= 5:
+            i = bisect.bisect_left(self._sorted_keys, (key, -1))
+            while i < len(self._sorted_keys) and self._sorted_keys[i][0].startswith(key):
+                name_key, n = self._sorted_keys[i]
+                if n not in found and len(key) / len(name_key) >= MIN_PREFIX_RATIO:
+                    found[n] = len(name_key) - len(key)
+                i += 1
+        return tuple(found.items())
+
+    def correct(self, term: str, max_results: int = DEFAULT_MAX_RESULTS) -> list[DrugCandidate]:
+        """Registry rows whose trade name or INN sounds like `term`, best first."""
+        key = phonetic_key(term)
+        if len(key) < 2:
+            return []
+        folded = fold(term).strip()
+        ranked = []
+        for n, distance in self._lookup(key):
+            name_key, field_name, display, rows = self._names[n]
+            score = round(1 - distance / max(len(key), len(name_key)), 4)
+            # Exact spelling beats an equal phonetic match; trade names beat INNs
+            ranked.append((-score, fold(display) != folded, field_name != "trade_name", display, n, distance, score))
+        ranked.sort()
+
+        candidates, seen = [], set()
+        for *_, n, distance, score in ranked:
+            _, field_name, display, rows = self._names[n]
+            for i in rows:
+                if i in seen:
+                    continue
+                seen.add(i)
+                candidates.append(DrugCandidate(self.entries[i], display, field_name, distance, score))
+                if len(candidates) >= max_results:
+                    return candidates
+        return candidates
+
+    def search_tool_response(self, query: str, max_results: int = DEFAULT_MAX_RESULTS) -> dict:
+        """The search-drugs Edge Function's JSON body for `query`."""
+        results = [c.to_tool_result() for c in self.correct(query, max_results)]
+        return {"query": query.strip(), "results": results, "count": len(results), "source": "Registar lijekova BiH"}
+
+    def annotate(self, text: str, max_candidates: int = 3) -> list[DrugMention]:
+        """
+        Finds drug names in a whole transcript in one left-to-right pass.
+        At each word the longest phrase (up to MAX_NGRAM words) that resolves
+        to a registry name wins; a strength dictated right after it
+        ("Sumamed 500 mg") selects the matching registry row.
+        """
+        words = list(WORD_PATTERN.finditer(text))
+        mentions = []
+        i = 0
+        while i < len(words):
+            mention, used = self._mention_at(text, words, i, max_candidates)
+            if mention:
+                mentions.append(mention)
+            i += used
+        return mentions
+
+    def _mention_at(self, text: str, words: list, i: int, max_candidates: int) -> tuple[DrugMention | None, int]:
+        first = words[i].group()
+        if fold(first) in self.common_words or first.isdigit():
+            return None, 1
+        for n in range(min(MAX_NGRAM, len(words) - i), 0, -1):
+            span = words[i:i + n]
+            if any(w.group().isdigit() or fold(w.group()) in self.common_words for w in span[1:]):
+                continue
+            start, end = span[0].start(), span[-1].end()
+            phrase = text[start:end]
+            candidates = self.correct(phrase, max_candidates * 4)
+            # A multi-word phrase only counts when it matches a multi-word name
+            candidates = [c for c in candidates if n == 1 or " " in c.matched_name]
+            if not candidates:
+                continue
+            best = candidates[0]
+            same_name = [c for c in candidates if c.matched_name == best.matched_name]
+            strength = _strength_key(text[end:end + 16])
+            if strength:
+                same_name.sort(key=lambda c: _strength_key(c.entry.strength) != strength)
+            others = [c for c in candidates if c.matched_name != best.matched_name]
+            return DrugMention(
+                start=start,
+                end=end,
+                text=phrase,
+                correction=best.matched_name,
+                matched_field=best.matched_field,
+                score=best.score,
+                candidates=(same_name + others)[:max_candidates],
+            ), n
+        return None, 1
+
+    def apply(self, text: str, mentions: list[DrugMention], min_score: float = MIN_APPLY_SCORE) -> str:
+        """Rewrites the transcript with confident corrections, keeping everything else."""
+        out, last = [], 0
+        for m in mentions:
+            if m.changed and m.score >= min_score:
+                out.append(text[last:m.start])
+                out.append(_match_case(m.text, m.correction))
+                last = m.end
+        out.append(text[last:])
+        return "".join(out)
+
+
+def _match_case(original: str, correction: str) -> str:
+    """Registry names are stored in capitals; follow the dictated word's casing instead."""
+    if original.isupper():
+        return correction.upper()
+    if original[:1].isupper():
+        return correction.title()
+    return correction.lower()
+
+
+def _entry(row: dict) -> DrugEntry:
+    value = lambda name: (row.get(name) or "").strip() or None
+    return DrugEntry(row["trade_name"].strip(), value("generic_name"), value("strength"), value("form"), value("atc_code"))
+
+
+# ── Benchmark ──
+
+# Spelling slips seen in Scribe output for dictated drug names
+STT_SLIPS = [("ks", "x"), ("x", "ks"), ("c", "k"), ("k", "c"), ("ll", "l"), ("ph", "f"), ("y", "i"), ("ć", "c"), ("č", "c"), ("š", "s"), ("ž", "z")]
+
+
+def corrupt(name: str, rng: random.Random) -> str:
+    word = name.lower()
+    roll = rng.random()
+    if roll < 0.3:
+        for a, b in rng.sample(STT_SLIPS, len(STT_SLIPS)):
+            if a in word:
+                return word.replace(a, b, 1)
+    if roll < 0.55 and len(word) > 6:
+        return word[: max(4, round(len(word) * 0.75))]
+    if roll < 0.85 and len(word) > 5:
+        i = rng.randrange(1, len(word) - 1)
+        return word[:i] + word[i + 1:]
+    return word
+
+
+def bench(corrector: DrugCorrector, transcripts: list[str] | None, count: int = 2000, seed: int = 5):
+    rng = random.Random(seed)
+    names = [(display, rows) for _, field_name, display, rows in corrector._names if field_name == "trade_name"]
+    samples = [(corrupt(display, rng), display) for display, _ in rng.choices(names, k=count)]
+
+    corrector._lookup.cache_clear()
+    token_us, hits = [], 0
+    for token, expected in samples:
+        start = time.perf_counter()
+        candidates = corrector.correct(token)
+        token_us.append((time.perf_counter() - start) * 1e6)
+        hits += bool(candidates) and candidates[0].matched_name == expected
+    ordered = sorted(token_us)
+    pick = lambda p: ordered[min(int(len(ordered) * p / 100), len(ordered) - 1)]
+    print(f"Registry: {len(corrector.entries)} rows, {len(corrector._names)} names, {len(corrector._deletes)} delete keys")
+    print(
+        f"correct  µs  p50 {pick(50):7.1f}  p95 {pick(95):7.1f}  p99 {pick(99):7.1f}  "
+        f"mean {statistics.fmean(ordered):7.1f}  (cold cache, {count} tokens)"
+    )
+    print(f"  top-1 recovers the dictated trade name: {hits / count:.1%}")
+
+    if not transcripts:
+        filler = "Pacijent navodi bolove u grlu tri dana, afebrilan. Preporuka: {} {} dva puta dnevno uz obrok, kontrola za sedam dana."
+        transcripts = [filler.format(*(corrupt(d, rng) for d, _ in rng.sample(names, 2))) for _ in range(200)]
+    corrector._lookup.cache_clear()
+    start = time.perf_counter()
+    words = sum(len(WORD_PATTERN.findall(t)) for t in transcripts)
+    mentions = sum(len(corrector.annotate(t)) for t in transcripts)
+    elapsed = time.perf_counter() - start
+    print(
+        f"annotate {len(transcripts)} transcripts, {words} words in {elapsed * 1000:.1f} ms "
+        f"({elapsed / words * 1e6:.1f} µs/word, {mentions} mentions)"
+    )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+
+    parser = argparse.ArgumentParser(description="Local phonetic drug-name corrector")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name in ("correct", "annotate", "bench"):
+        p = sub.add_parser(name)
+        p.add_argument("registry", nargs="?", help="drug_registry CSV export")
+        p.add_argument("--dsn", default=os.getenv("DATABASE_URL"))
+        p.add_argument("--vocabulary", help="File of extra words that are never drug names, one per line")
+        if name == "correct":
+            p.add_argument("term")
+            p.add_argument("-k", type=int, default=DEFAULT_MAX_RESULTS)
+        elif name == "annotate":
+            p.add_argument("transcript", help="Text file, or - for stdin")
+            p.add_argument("--apply", action="store_true", help="Print the corrected transcript")
+        else:
+            p.add_argument("--transcripts", help="Text file with one transcript per line")
+        if name != "bench":
+            p.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    vocabulary = None
+    if args.vocabulary:
+        with open(args.vocabulary, encoding="utf-8") as f:
+            vocabulary = {line.strip() for line in f if line.strip()}
+
+    start = time.perf_counter()
+    if args.registry:
+        corrector = DrugCorrector.from_csv(args.registry, vocabulary=vocabulary)
+    elif args.dsn:
+        corrector = DrugCorrector.from_postgres(args.dsn, vocabulary=vocabulary)
+    else:
+        parser.error("pass a registry CSV or --dsn / DATABASE_URL")
+    load_ms = (time.perf_counter() - start) * 1000
+
+    if args.command == "correct":
+        start = time.perf_counter()
+        candidates = corrector.correct(args.term, args.k)
+        elapsed = (time.perf_counter() - start) * 1e6
+        if args.json:
+            print(json.dumps(corrector.search_tool_response(args.term, args.k), indent=2, ensure_ascii=False))
+        else:
+            for c in candidates:
+                e = c.entry
+                print(f"{c.score:.2f}  {e.trade_name:24s} {e.generic_name or '-':24s} {e.strength or '-':12s} {e.atc_code or '-'}")
+            print(f"{len(candidates)} candidates in {elapsed:.0f} µs (registry loaded in {load_ms:.0f} ms)")
+    elif args.command == "annotate":
+        if args.transcript == "-":
+            text = sys.stdin.read()
+        else:
+            with open(args.transcript, encoding="utf-8") as f:
+                text = f.read()
+        start = time.perf_counter()
+        mentions = corrector.annotate(text)
+        elapsed = (time.perf_counter() - start) * 1000
+        if args.apply:
+            print(corrector.apply(text, mentions))
+        elif args.json:
+            print(json.dumps([m.to_dict() for m in mentions], indent=2, ensure_ascii=False))
+        else:
+            for m in mentions:
+                best = m.candidates[0].entry
+                mark = "→" if m.changed else "="
+                print(
+                    f"{m.start:6d}  {m.text[:24]:24s} {mark} {m.correction[:24]:24s} {m.score:.2f}  "
+                    f"{best.generic_name or '-'} {best.strength or ''} {best.atc_code or ''}"
+                )
+            print(f"{len(mentions)} drug mentions in {elapsed:.1f} ms")
+    else:
+        transcripts = None
+        if args.transcripts:
+            with open(args.transcripts, encoding="utf-8") as f:
+                transcripts = [line.strip() for line in f if line.strip()]
+        bench(corrector, transcripts)
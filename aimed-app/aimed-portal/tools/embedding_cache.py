@@ -0,0 +1,351 @@
+"""
+Content-addressed embedding cache for the search-drugs vector fallback.
+
+Keys are sha256("<model>:<normalized query>") with the query NFC-normalized,
+trimmed, lower-cased and whitespace-collapsed — exactly what the Edge
+Function computes, so a warm-up run here fills the same rows it reads.
+Entries are evicted least-recently-used beyond a capacity, and every lookup
+counts a hit or a miss (per day).
+
+Two backends with the same interface:
+  supabase      public.query_embedding_cache through the lookup_query_embedding /
+                store_query_embedding RPCs (migration 20260302000000), via
+                SUPABASE_URL + SUPABASE_SERVICE_ROLE_KEY; its capacity is
+                fixed by the migration, --capacity only applies to SQLite
+  FILE.sqlite   local SQLite file, for offline runs and benchmarks
+
+Usage:
+  python tools/embedding_cache.py warm drugs.csv [--target supabase|FILE.sqlite] [--embedder openai|hashing]
+  python tools/embedding_cache.py stats [--target supabase|FILE.sqlite]
+  python tools/embedding_cache.py bench drugs.csv [--queries 20000] [--latency-ms 250] [--capacity 20000]
+
+warm pre-embeds every distinct trade name and INN from the registry CSV
+(ingest_drug_registry.py --csv output) that is not cached yet.
+
+bench replays a Zipf-distributed stream of dictated drug names (mixed case,
+stray whitespace) against a fresh SQLite cache with the local hashing
+embedder, once cold and once after warm-up. The embedder's network latency
+is not slept but added per miss (--latency-ms), so the run takes seconds
+while the reported per-query latency models the Edge Function's.
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import random
+import re
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import unicodedata
+from datetime import date
+
+import numpy as np
+from dotenv import load_dotenv
+
+from ingest_drug_registry import BATCH_SIZE, EMBEDDERS, Embedder
+
+load_dotenv()
+
+DEFAULT_CAPACITY = 20000  # store_query_embedding() max_entries
+
+
+def normalize_query(query: str) -> str:
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", query).strip().lower())
+
+
+def query_hash(model: str, normalized: str) -> str:
+    return hashlib.sha256(f"{model}:{normalized}".encode("utf-8")).hexdigest()
+
+
+class SqliteEmbeddingCache:
+    def __init__(self, path: str, capacity: int = DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.db = sqlite3.connect(path)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS query_embedding_cache (
+                query_hash TEXT PRIMARY KEY,
+                query TEXT NOT NULL,
+                model TEXT NOT NULL,
+                embedding BLOB NOT NULL,
+                hit_count INTEGER NOT NULL DEFAULT 0,
+                last_used INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_last_used ON query_embedding_cache(last_used);
+            CREATE TABLE IF NOT EXISTS query_embedding_cache_stats (
+                day TEXT PRIMARY KEY,
+                hits INTEGER NOT NULL DEFAULT 0,
+                misses INTEGER NOT NULL DEFAULT 0
+            );
+        """)
+        # A counter rather than wall time, so recency is exact within a burst
+        self._tick = self.db.execute("SELECT COALESCE(MAX(last_used), 0) FROM query_embedding_cache").fetchone()[0]
+        self._count = self.db.execute("SELECT COUNT(*) FROM query_embedding_cache").fetchone()[0]
+
+    def _next_tick(self) -> int:
+        self._tick += 1
+        return self._tick
+
+    def lookup(self, key: str) -> np.ndarray | None:
+        row = self.db.execute("SELECT embedding FROM query_embedding_cache WHERE query_hash = ?", (key,)).fetchone()
+        if row:
+            self.db.execute(
+                "UPDATE query_embedding_cache SET hit_count = hit_count + 1, last_used = ? WHERE query_hash = ?",
+                (self._next_tick(), key),
+            )
+        self.db.execute(
+            "INSERT INTO query_embedding_cache_stats (day, hits, misses) VALUES (?, ?, ?) "
+            "ON CONFLICT(day) DO UPDATE SET hits = hits + excluded.hits, misses = misses + excluded.misses",
+            (date.today().isoformat(), int(row is not None), int(row is None)),
+        )
+        return np.frombuffer(row[0], dtype=np.float32) if row else None
+
+    def store(self, key: str, query: str, model: str, embedding) -> int:
+        """Inserts one embedding and returns how many LRU entries were evicted."""
+        tick = self._next_tick()
+        if self.db.execute(
+            "UPDATE query_embedding_cache SET last_used = ? WHERE query_hash = ?", (tick, key)
+        ).rowcount:
+            return 0
+        self.db.execute(
+            "INSERT INTO query_embedding_cache (query_hash, query, model, embedding, last_used) VALUES (?, ?, ?, ?, ?)",
+            (key, query, model, np.asarray(embedding, dtype=np.float32).tobytes(), tick),
+        )
+        self._count += 1
+        if self._count <= self.capacity:
+            return 0
+        evicted = self.db.execute(
+            "DELETE FROM query_embedding_cache WHERE query_hash IN "
+            "(SELECT query_hash FROM query_embedding_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (self.capacity,),
+        ).rowcount
+        self._count -= evicted
+        return evicted
+
+    def missing(self, keys: list[str]) -> set[str]:
+        present = set()
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            rows = self.db.execute(
+                f"SELECT query_hash FROM query_embedding_cache WHERE query_hash IN ({','.join('?' * len(chunk))})", chunk
+            )
+            present.update(r[0] for r in rows)
+        return set(keys) - present
+
+    def stats(self) -> dict:
+        hits, misses = self.db.execute(
+            "SELECT COALESCE(SUM(hits), 0), COALESCE(SUM(misses), 0) FROM query_embedding_cache_stats"
+        ).fetchone()
+        return {"entries": self._count, "capacity": self.capacity, "hits": hits, "misses": misses}
+
+    def close(self):
+        self.db.commit()
+        self.db.close()
+
+
+class SupabaseEmbeddingCache:
+    def __init__(self):
+        import requests
+
+        url = os.getenv("SUPABASE_URL")
+        key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+        if not url or not key:
+            raise SystemExit("ERROR: --target supabase needs SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY")
+        self.base = url.rstrip("/") + "/rest/v1"
+        self.capacity = DEFAULT_CAPACITY
+        self.session = requests.Session()
+        self.session.headers.update({"apikey": key, "Authorization": f"Bearer {key}"})
+
+    def _rpc(self, name: str, params: dict):
+        response = self.session.post(f"{self.base}/rpc/{name}", json=params, timeout=30)
+        response.raise_for_status()
+        return response.json()
+
+    def lookup(self, key: str) -> np.ndarray | None:
+        found = self._rpc("lookup_query_embedding", {"p_query_hash": key})
+        return np.asarray(json.loads(found), dtype=np.float32) if found else None
+
+    def store(self, key: str, query: str, model: str, embedding) -> int:
+        return self._rpc("store_query_embedding", {
+            "p_query_hash": key,
+            "p_query": query,
+            "p_model": model,
+            "p_embedding": json.dumps([float(x) for x in embedding]),
+        })
+
+    def missing(self, keys: list[str]) -> set[str]:
+        present = set()
+        for i in range(0, len(keys), BATCH_SIZE):
+            chunk = keys[i:i + BATCH_SIZE]
+            response = self.session.get(
+                f"{self.base}/query_embedding_cache",
+                params={"select": "query_hash", "query_hash": f"in.({','.join(chunk)})"},
+                timeout=30,
+            )
+            response.raise_for_status()
+            present.update(r["query_hash"] for r in response.json())
+        return set(keys) - present
+
+    def stats(self) -> dict:
+        response = self.session.get(
+            f"{self.base}/query_embedding_cache_stats", params={"select": "hits,misses"}, timeout=30
+        )
+        response.raise_for_status()
+        rows = response.json()
+        count = self.session.head(
+            f"{self.base}/query_embedding_cache", params={"select": "query_hash"},
+            headers={"Prefer": "count=exact", "Range": "0-0"}, timeout=30,
+        ).headers.get("content-range", "*/0").rsplit("/", 1)[-1]
+        return {
+            "entries": int(count) if count.isdigit() else None,
+            "capacity": self.capacity,
+            "hits": sum(r["hits"] for r in rows),
+            "misses": sum(r["misses"] for r in rows),
+        }
+
+    def close(self):
+        self.session.close()
+
+
+def embed_query(cache, embedder: Embedder, query: str) -> tuple[np.ndarray, bool]:
+    """What the Edge Function does: cached vector, or embed + store. Returns (vector, hit)."""
+    normalized = normalize_query(query)
+    key = query_hash(embedder.model, normalized)
+    found = cache.lookup(key)
+    if found is not None:
+        return found, True
+    vector = embedder.embed([normalized])[0]
+    cache.store(key, normalized, embedder.model, vector)
+    return np.asarray(vector, dtype=np.float32), False
+
+
+def registry_names(csv_path: str) -> list[str]:
+    """Distinct normalized trade names and INNs."""
+    names = set()
+    with open(csv_path, encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            for column in ("trade_name", "generic_name"):
+                value = normalize_query(row.get(column) or "")
+                if len(value) >= 2:
+                    names.add(value)
+    return sorted(names)
+
+
+def warm(cache, embedder: Embedder, names: list[str]) -> tuple[int, int]:
+    """Embeds the names that are not cached yet; returns (already cached, embedded)."""
+    keys = {query_hash(embedder.model, name): name for name in names}
+    todo = sorted(cache.missing(list(keys)))
+    for i in range(0, len(todo), BATCH_SIZE):
+        batch = todo[i:i + BATCH_SIZE]
+        vectors = embedder.embed([keys[k] for k in batch])
+        for key, vector in zip(batch, vectors):
+            cache.store(key, keys[key], embedder.model, vector)
+    return len(keys) - len(todo), len(todo)
+
+
+def _open_target(target: str, capacity: int):
+    return SupabaseEmbeddingCache() if target == "supabase" else SqliteEmbeddingCache(target, capacity)
+
+
+# ── Benchmark ──
+
+def query_stream(names: list[str], count: int, seed: int = 11, skew: float = 1.1) -> list[str]:
+    """Zipf-weighted dictation: a few hundred names dominate, with case and spacing noise."""
+    rng = random.Random(seed)
+    order = names[:]
+    rng.shuffle(order)
+    weights = [1 / (rank + 1) ** skew for rank in range(len(order))]
+    queries = []
+    for name in rng.choices(order, weights=weights, k=count):
+        roll = rng.random()
+        if roll < 0.3:
+            name = name.upper()
+        elif roll < 0.6:
+            name = name.title()
+        if rng.random() < 0.1:
+            name = f" {name}  "
+        queries.append(name)
+    return queries
+
+
+def _percentiles(values: list[float]) -> str:
+    ordered = sorted(values)
+    pick = lambda p: ordered[min(int(len(ordered) * p / 100), len(ordered) - 1)]
+    return f"p50 {pick(50):8.2f}  p95 {pick(95):8.2f}  p99 {pick(99):8.2f}  mean {statistics.fmean(ordered):8.2f}"
+
+
+def bench(csv_path: str, count: int, latency_ms: float, capacity: int):
+    embedder = EMBEDDERS["hashing"]()
+    names = registry_names(csv_path)
+    queries = query_stream(names, count)
+    print(f"Registry names: {len(names)}, queries: {count} ({len(set(map(normalize_query, queries)))} distinct)")
+    print(f"Embedding latency modelled at {latency_ms:.0f} ms per miss, cache capacity {capacity}")
+    print(f"{'no cache':22s} ms  {_percentiles([latency_ms] * count)}")
+
+    for label, prewarm in (("cold cache", False), ("warmed cache", True)):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = SqliteEmbeddingCache(os.path.join(tmp, "cache.sqlite"), capacity)
+            if prewarm:
+                start = time.perf_counter()
+                _, embedded = warm(cache, embedder, names)
+                print(f"  warm-up: {embedded} names embedded locally in {time.perf_counter() - start:.1f}s "
+                      f"(~{embedded / BATCH_SIZE * latency_ms / 1000:.0f}s of API time in {embedded // BATCH_SIZE + 1} batches)")
+                cache.db.execute("DELETE FROM query_embedding_cache_stats")
+            latencies, cache_us = [], []
+            for query in queries:
+                start = time.perf_counter()
+                _, hit = embed_query(cache, embedder, query)
+                elapsed = time.perf_counter() - start
+                if hit:
+                    cache_us.append(elapsed * 1e6)
+                latencies.append(elapsed * 1000 + (0 if hit else latency_ms))
+            stats = cache.stats()
+            cache.close()
+        total = stats["hits"] + stats["misses"]
+        print(f"{label:22s} ms  {_percentiles(latencies)}")
+        print(
+            f"  hits {stats['hits']}  misses {stats['misses']}  hit rate {stats['hits'] / total:.1%}  "
+            f"entries {stats['entries']}  cache hit cost p50 {statistics.median(cache_us) if cache_us else 0:.0f} µs"
+        )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+
+    parser = argparse.ArgumentParser(description="Query embedding cache for search-drugs")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("warm")
+    p.add_argument("registry")
+    p.add_argument("--target", default="supabase")
+    p.add_argument("--embedder", choices=sorted(EMBEDDERS), default="openai")
+    p.add_argument("--capacity", type=int, default=DEFAULT_CAPACITY)
+    p = sub.add_parser("stats")
+    p.add_argument("--target", default="supabase")
+    p = sub.add_parser("bench")
+    p.add_argument("registry")
+    p.add_argument("--queries", type=int, default=20000)
+    p.add_argument("--latency-ms", type=float, default=250)
+    p.add_argument("--capacity", type=int, default=DEFAULT_CAPACITY)
+    args = parser.parse_args()
+
+    if args.command == "warm":
+        cache = _open_target(args.target, args.capacity)
+        names = registry_names(args.registry)
+        start = time.perf_counter()
+        cached, embedded = warm(cache, EMBEDDERS[args.embedder](), names)
+        cache.close()
+        print(f"{len(names)} names: {cached} already cached, {embedded} embedded ({time.perf_counter() - start:.1f}s)")
+    elif args.command == "stats":
+        cache = _open_target(args.target, DEFAULT_CAPACITY)
+        stats = cache.stats()
+        cache.close()
+        total = stats["hits"] + stats["misses"]
+        print(json.dumps({**stats, "hit_rate": round(stats["hits"] / total, 4) if total else None}, indent=2))
+    else:
+        bench(args.registry, args.queries, args.latency_ms, args.capacity)
@@ -0,0 +1,310 @@
+"""
+Offline evaluation of the v5 Route Model node (fast vs full structuring model).
+
+`route` replays recorded cases (the workflow_replay.py format) through the
+Silence Guardrail, Prepare Agent Context and Route Model ports and prints how
+the traffic would split between the tiers and why. Thresholds can be
+overridden to see how the split moves before editing the node.
+
+`compare` runs the AI Agent loop for each case against the Anthropic Messages
+API with both models — same system prompt, same MKB-10 / drug registry tools
+(called on the Supabase edge functions), temperature 0 — and reports latency
+and output parity of the fast model against the full one:
+
+  - same section keys after Parse & Validate
+  - text similarity of the sections (difflib ratio)
+  - same MKB-10 codes and the same numbers (doses, durations, pressures)
+
+broken down by the tier the router picked, since only the "fast" cases are
+ever answered by the fast model in production.
+
+Usage:
+  python tools/eval_model_routing.py route <cases.jsonl|folder> [threshold options]
+  python tools/eval_model_routing.py compare <cases.jsonl|folder> [--limit N] [--use-recorded] [--out FILE]
+
+Options:
+  --max-words N          FAST_MAX_WORDS override
+  --max-sections N       FAST_MAX_SECTIONS override
+  --max-entities N       FAST_MAX_ENTITIES override
+  --max-message-chars N  FAST_MAX_MESSAGE_CHARS override
+  --limit N              compare: first N speech cases only (default: 50)
+  --use-recorded         compare: use the case's agent_output as the full-model reference
+                         and only call the fast model
+  --out FILE             compare: write one JSON line per case
+
+Needs ANTHROPIC_API_KEY (and SUPABASE_ANON_KEY for the tools) in .env.
+
+Examples:
+  python tools/eval_model_routing.py route fixtures/cases.jsonl --max-words 200
+  python tools/eval_model_routing.py compare fixtures/cases.jsonl --limit 20 --out parity.jsonl
+"""
+
+import argparse
+import difflib
+import json
+import os
+import re
+import sys
+import time
+from collections import Counter
+
+import requests
+from dotenv import load_dotenv
+
+import workflow_replay as replay
+
+load_dotenv()
+
+ANTHROPIC_URL = "https://api.anthropic.com/v1/messages"
+ANTHROPIC_VERSION = "2023-06-01"
+TOOL_RESULT_CHARS = 4000
+_FROM_AI = re.compile(r"\$fromAI\('([^']+)',\s*'([^']*)'")
+_MKB_CODE = re.compile(r"\b[A-Z]\d{2}(?:\.\d{1,2})?\b")
+_NUMBER = re.compile(r"\d+(?:[.,]\d+)?")
+
+
+def percentile(values: list[float], p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def routed_contexts(cases: list[dict]) -> list[tuple[dict, dict]]:
+    """(case, Route Model output) for every case that passes the Silence Guardrail."""
+    routed = []
+    for case in cases:
+        guarded = replay.silence_guardrail(case.get("stt") or {})
+        if guarded["_guardrail"]["isSilence"]:
+            continue
+        context = replay.prepare_agent_context(guarded, case.get("webhook") or {})
+        routed.append((case, replay.route_model(context)))
+    return routed
+
+
+def print_routes(routed: list[tuple[dict, dict]]):
+    tiers = Counter(ctx["route"]["tier"] for _, ctx in routed)
+    reasons = Counter(reason for _, ctx in routed for reason in ctx["route"]["reasons"])
+    total = len(routed) or 1
+    print(f"Route Model over {len(routed)} speech cases:")
+    for tier in ("fast", "full"):
+        features = [ctx["route"]["features"] for _, ctx in routed if ctx["route"]["tier"] == tier]
+        words = [f["words"] for f in features]
+        entities = [f["drugs"] + f["diagnoses"] for f in features]
+        print(
+            f"  {tier:5s} {tiers[tier]:6d} ({tiers[tier] / total:.1%})  "
+            f"words p50 {percentile(words, 50):.0f} / p95 {percentile(words, 95):.0f}  "
+            f"entities p50 {percentile(entities, 50):.0f} / p95 {percentile(entities, 95):.0f}"
+        )
+    if reasons:
+        print("Reasons for the full model:")
+        for reason, count in reasons.most_common():
+            print(f"  {reason:24s} {count:6d}")
+
+
+# ── Agent loop ──
+
+def agent_setup() -> tuple[str, list[dict], dict[str, str]]:
+    """System prompt, Messages API tool definitions and tool URLs from the v5 workflow."""
+    with open(replay.V5_WORKFLOW, "r", encoding="utf-8") as f:
+        nodes = {n["name"]: n for n in json.load(f)["nodes"]}
+    system = nodes["AI Agent"]["parameters"]["options"]["systemMessage"]
+    tools, urls = [], {}
+    for node in nodes.values():
+        if not node["type"].endswith("toolHttpRequest"):
+            continue
+        params = node["parameters"]
+        argument, description = _FROM_AI.search(params["jsonBody"]).groups()
+        tools.append({
+            "name": params["name"],
+            "description": params["description"],
+            "input_schema": {
+                "type": "object",
+                "properties": {argument: {"type": "string", "description": description}},
+                "required": [argument],
+            },
+        })
+        urls[params["name"]] = params["url"]
+    return system, tools, urls
+
+
+def call_tool(session: requests.Session, url: str, arguments: dict) -> str:
+    # The tool nodes send {"queries": <the $fromAI argument split on ";">}
+    terms = [t.strip() for t in str(next(iter(arguments.values()), "")).split(";") if t.strip()]
+    key = os.getenv("SUPABASE_ANON_KEY", "")
+    headers = {"Authorization": f"Bearer {key}"} if key else {}
+    try:
+        response = session.post(url, json={"queries": terms}, headers=headers, timeout=10)
+        return response.text[:TOOL_RESULT_CHARS]
+    except requests.RequestException as e:
+        return f"ERROR: {type(e).__name__}"
+
+
+def run_agent(session: requests.Session, tier: str, user_message: str, setup, max_iterations: int = 8) -> dict:
+    """One AI Agent run with the given tier: final text, latency, tool calls and token usage."""
+    system, tools, urls = setup
+    model = replay.ROUTE_TIERS[tier]
+    headers = {
+        "x-api-key": os.environ["ANTHROPIC_API_KEY"],
+        "anthropic-version": ANTHROPIC_VERSION,
+        "content-type": "application/json",
+    }
+    messages = [{"role": "user", "content": user_message}]
+    usage = Counter()
+    tool_calls = 0
+    text = ""
+
+    start = time.perf_counter()
+    for _ in range(max_iterations):
+        response = session.post(
+            ANTHROPIC_URL,
+            headers=headers,
+            json={
+                "model": model["model"],
+                "max_tokens": model["maxTokens"],
+                "temperature": 0,
+                "system": system,
+                "tools": tools,
+                "messages": messages,
+            },
+            timeout=300,
+        )
+        response.raise_for_status()
+        body = response.json()
+        usage.update({k: v for k, v in body.get("usage", {}).items() if isinstance(v, int)})
+        text = "".join(block.get("text", "") for block in body["content"] if block["type"] == "text")
+        calls = [block for block in body["content"] if block["type"] == "tool_use"]
+        if body.get("stop_reason") != "tool_use" or not calls:
+            break
+        messages.append({"role": "assistant", "content": body["content"]})
+        messages.append({
+            "role": "user",
+            "content": [
+                {"type": "tool_result", "tool_use_id": call["id"], "content": call_tool(session, urls[call["name"]], call["input"])}
+                for call in calls
+            ],
+        })
+        tool_calls += len(calls)
+
+    return {
+        "model": model["model"],
+        "output": text,
+        "latency_s": round(time.perf_counter() - start, 3),
+        "tool_calls": tool_calls,
+        "input_tokens": usage["input_tokens"],
+        "output_tokens": usage["output_tokens"],
+    }
+
+
+# ── Parity ──
+
+def section_text(result: dict) -> str:
+    return "\n".join(f"{k}: {replay.js_str(v)}" for k, v in result["sections"].items() if k != "_napomene")
+
+
+def parity(reference: dict, candidate: dict) -> dict:
+    """Compares two Parse & Validate results."""
+    ref_text, cand_text = section_text(reference), section_text(candidate)
+    return {
+        "same_keys": set(reference["sections"]) == set(candidate["sections"]),
+        "similarity": round(difflib.SequenceMatcher(None, ref_text, cand_text).ratio(), 3),
+        "same_mkb": set(_MKB_CODE.findall(ref_text)) == set(_MKB_CODE.findall(cand_text)),
+        "same_numbers": Counter(_NUMBER.findall(ref_text)) == Counter(_NUMBER.findall(cand_text)),
+        "parse_ok": candidate["success"],
+    }
+
+
+def compare(cases: list[dict], limit: int, use_recorded: bool, out: str | None):
+    if not os.getenv("ANTHROPIC_API_KEY"):
+        raise SystemExit("ERROR: compare needs ANTHROPIC_API_KEY (in .env or the environment)")
+    setup = agent_setup()
+    session = requests.Session()
+    rows = []
+
+    routed = [(c, ctx) for c, ctx in routed_contexts(cases) if not use_recorded or c.get("agent_output")][:limit]
+    for i, (case, ctx) in enumerate(routed, 1):
+        fast = run_agent(session, "fast", ctx["userMessage"], setup)
+        if use_recorded:
+            full = {"model": "recorded", "output": case["agent_output"], "latency_s": None}
+        else:
+            full = run_agent(session, "full", ctx["userMessage"], setup)
+        reference = replay.parse_and_validate({"output": full["output"]}, ctx)
+        candidate = replay.parse_and_validate({"output": fast["output"]}, ctx)
+        row = {
+            "id": case["id"],
+            "route": {k: ctx["route"][k] for k in ("tier", "reasons", "features")},
+            "fast": {k: v for k, v in fast.items() if k != "output"},
+            "full": {k: v for k, v in full.items() if k != "output"},
+            "parity": parity(reference, candidate),
+        }
+        rows.append(row)
+        p = row["parity"]
+        print(
+            f"[{i}/{len(routed)}] {case['id']} routed {ctx['route']['tier']:4s}  "
+            f"fast {fast['latency_s']:6.2f}s  full {full['latency_s'] or 0:6.2f}s  "
+            f"keys {'=' if p['same_keys'] else '≠'}  sim {p['similarity']:.2f}  "
+            f"mkb {'=' if p['same_mkb'] else '≠'}  numbers {'=' if p['same_numbers'] else '≠'}"
+        )
+
+    if out:
+        with open(out, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(r, ensure_ascii=False) + "\n" for r in rows)
+        print(f"Wrote {len(rows)} rows to {out}")
+    print_parity(rows)
+
+
+def print_parity(rows: list[dict]):
+    print("\nFast model vs full model:")
+    for tier in ("fast", "full", None):
+        subset = [r for r in rows if tier is None or r["route"]["tier"] == tier]
+        if not subset:
+            continue
+        label = "all" if tier is None else f"routed {tier}"
+
+        def rate(key: str) -> float:
+            return sum(r["parity"][key] for r in subset) / len(subset)
+
+        fast_lat = [r["fast"]["latency_s"] for r in subset]
+        full_lat = [r["full"]["latency_s"] for r in subset if r["full"]["latency_s"] is not None]
+        print(
+            f"  {label:12s} n={len(subset):4d}  keys {rate('same_keys'):.0%}  "
+            f"sim {sum(r['parity']['similarity'] for r in subset) / len(subset):.2f}  "
+            f"mkb {rate('same_mkb'):.0%}  numbers {rate('same_numbers'):.0%}  parsed {rate('parse_ok'):.0%}"
+        )
+        line = f"  {'':12s} latency fast p50 {percentile(fast_lat, 50):.2f}s / p95 {percentile(fast_lat, 95):.2f}s"
+        if full_lat:
+            line += f"   full p50 {percentile(full_lat, 50):.2f}s / p95 {percentile(full_lat, 95):.2f}s"
+        print(line)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+
+    parser = argparse.ArgumentParser(description="Offline evaluation of the v5 model routing")
+    parser.add_argument("command", choices=["route", "compare"])
+    parser.add_argument("cases")
+    parser.add_argument("--max-words", type=int)
+    parser.add_argument("--max-sections", type=int)
+    parser.add_argument("--max-entities", type=int)
+    parser.add_argument("--max-message-chars", type=int)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--use-recorded", action="store_true")
+    parser.add_argument("--out")
+    args = parser.parse_args()
+
+    for option, constant in [
+        ("max_words", "FAST_MAX_WORDS"),
+        ("max_sections", "FAST_MAX_SECTIONS"),
+        ("max_entities", "FAST_MAX_ENTITIES"),
+        ("max_message_chars", "FAST_MAX_MESSAGE_CHARS"),
+    ]:
+        if getattr(args, option) is not None:
+            setattr(replay, constant, getattr(args, option))
+
+    cases = replay.load_cases(args.cases)
+    if args.command == "route":
+        print_routes(routed_contexts(cases))
+    else:
+        compare(cases, args.limit, args.use_recorded, args.out)
@@ -0,0 +1,228 @@
+"""
+Tool calls before and after the v5 pre-linking stage (Extract Mentions + Pre-link Lookup).
+
+`mentions` replays recorded cases offline and prints how many diagnosis and
+drug mentions Extract Mentions finds per dictation — the lookups the agent
+would otherwise make one tool call at a time.
+
+`compare` runs the AI Agent loop for each case twice against the Anthropic
+Messages API, with the model the Route Model picks: once with the plain user
+message (before) and once with the mentions resolved by one batch request
+per Supabase edge function and listed in the message (after). It reports tool calls,
+agent latency, lookup time and output parity between the two runs.
+
+Usage:
+  python tools/eval_prelink.py mentions <cases.jsonl|folder>
+  python tools/eval_prelink.py compare <cases.jsonl|folder> [--limit N] [--out FILE]
+
+Options:
+  --limit N   compare: first N speech cases only (default: 30)
+  --out FILE  compare: write one JSON line per case
+
+Needs ANTHROPIC_API_KEY and SUPABASE_ANON_KEY in .env.
+
+Examples:
+  python tools/eval_prelink.py mentions fixtures/cases.jsonl
+  python tools/eval_prelink.py compare fixtures/cases.jsonl --limit 20 --out prelink.jsonl
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from dotenv import load_dotenv
+
+import workflow_replay as replay
+from eval_model_routing import agent_setup, parity, percentile, run_agent
+
+load_dotenv()
+
+# Pre-link Lookup constants; keep in sync with the node's jsCode
+FUNCTIONS_URL = "https://ljtxybwihzyxocxzsizx.supabase.co/functions/v1"
+LOOKUP_TIMEOUT_S = 6  # whole batch
+MIN_MKB_SCORE = 0.4
+MIN_DRUG_SCORE = 0.45
+MAX_DRUG_CANDIDATES = 3
+
+
+def prelinked_contexts(cases: list[dict]) -> list[tuple[dict, dict]]:
+    """(case, Extract Mentions output) for every case that passes the Silence Guardrail."""
+    contexts = []
+    for case in cases:
+        guarded = replay.silence_guardrail(case.get("stt") or {})
+        if guarded["_guardrail"]["isSilence"]:
+            continue
+        context = replay.prepare_agent_context(guarded, case.get("webhook") or {})
+        contexts.append((case, replay.extract_mentions(context)))
+    return contexts
+
+
+def print_mentions(contexts: list[tuple[dict, dict]]):
+    diagnoses = [len(ctx["mentions"]["diagnoses"]) for _, ctx in contexts]
+    drugs = [len(ctx["mentions"]["drugs"]) for _, ctx in contexts]
+    totals = Counter(d + r for d, r in zip(diagnoses, drugs))
+    print(f"Extract Mentions over {len(contexts)} speech cases:")
+    print(f"  diagnoses  p50 {percentile(diagnoses, 50):.0f}  p95 {percentile(diagnoses, 95):.0f}  total {sum(diagnoses)}")
+    print(f"  drugs      p50 {percentile(drugs, 50):.0f}  p95 {percentile(drugs, 95):.0f}  total {sum(drugs)}")
+    print("Mentions per dictation:")
+    for count in sorted(totals):
+        print(f"  {count:3d}  {totals[count]:6d}")
+
+
+def search_batch(session: requests.Session, function: str, queries: list[str]) -> list[list[dict]]:
+    """{"queries": [...]} → one result list per term, in order; empty lists if the call fails."""
+    if not queries:
+        return []
+    key = os.getenv("SUPABASE_ANON_KEY", "")
+    try:
+        response = session.post(
+            f"{FUNCTIONS_URL}/{function}",
+            json={"queries": queries},
+            headers={"Authorization": f"Bearer {key}"},
+            timeout=LOOKUP_TIMEOUT_S,
+        )
+        response.raise_for_status()
+        answered = response.json().get("queries") or []
+    except (requests.RequestException, ValueError):
+        answered = []
+    return [(answered[i].get("results") or []) if i < len(answered) else [] for i in range(len(queries))]
+
+
+def describe_drug(row: dict) -> str:
+    name = " ".join(str(row[k]) for k in ("trade_name", "strength", "form") if row.get(k))
+    details = [row.get("generic_name"), row.get("atc_code") and f"ATC {row['atc_code']}"]
+    details = [d for d in details if d]
+    return f"{name} ({', '.join(details)})" if details else name
+
+
+def prelink(session: requests.Session, pool: ThreadPoolExecutor, context: dict) -> dict:
+    """Pre-link Lookup: one batch per edge function, resolved mentions appended to the user message."""
+    mentions = context["mentions"]
+    start = time.perf_counter()
+    mkb_future = pool.submit(search_batch, session, "search-mkb10", mentions["diagnoses"])
+    drugs_future = pool.submit(search_batch, session, "search-drugs", mentions["drugs"])
+    mkb, drugs = mkb_future.result(), drugs_future.result()
+
+    lines, unresolved = [], []
+    for term, results in zip(mentions["diagnoses"], mkb):
+        best = next((r for r in results if r["match_score"] >= MIN_MKB_SCORE), None)
+        if not best:
+            unresolved.append(term)
+            continue
+        latin = f" ({best['latin']})" if best.get("latin") else ""
+        lines.append(f'- dijagnoza "{term}" → {best["name"]}{latin}, MKB-10: {best["code"]}')
+    for term, results in zip(mentions["drugs"], drugs):
+        candidates = [r for r in results if r["match_score"] >= MIN_DRUG_SCORE][:MAX_DRUG_CANDIDATES]
+        if not candidates:
+            unresolved.append(term)
+            continue
+        lines.append(f'- lijek "{term}" → {"; ".join(describe_drug(r) for r in candidates)}')
+
+    message = context["userMessage"]
+    if lines:
+        message += (
+            "\n\nPROVJERENO U BAZAMA (MKB-10 i Registar lijekova BiH):\n" + "\n".join(lines) + "\n\n"
+            "Za pojmove sa ove liste NE pozivaj alate — koristi navedene šifre i nazive. "
+            "Alate pozovi SAMO za dijagnoze i lijekove iz transkripta kojih nema na listi."
+        )
+    total = len(mentions["diagnoses"]) + len(mentions["drugs"])
+    return {
+        **context,
+        "userMessage": message,
+        "prelink": {
+            "mentions": total,
+            "resolved": total - len(unresolved),
+            "unresolved": unresolved,
+            "lookupMs": round((time.perf_counter() - start) * 1000),
+        },
+    }
+
+
+def compare(cases: list[dict], limit: int, out: str | None):
+    if not os.getenv("ANTHROPIC_API_KEY") or not os.getenv("SUPABASE_ANON_KEY"):
+        raise SystemExit("ERROR: compare needs ANTHROPIC_API_KEY and SUPABASE_ANON_KEY (in .env or the environment)")
+    setup = agent_setup()
+    session = requests.Session()
+    rows = []
+
+    contexts = prelinked_contexts(cases)[:limit]
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        for i, (case, ctx) in enumerate(contexts, 1):
+            tier = replay.route_model(ctx)["route"]["tier"]
+            linked = prelink(session, pool, ctx)
+            before = run_agent(session, tier, ctx["userMessage"], setup)
+            after = run_agent(session, tier, linked["userMessage"], setup)
+            reference = replay.parse_and_validate({"output": before["output"]}, ctx)
+            candidate = replay.parse_and_validate({"output": after["output"]}, linked)
+            row = {
+                "id": case["id"],
+                "tier": tier,
+                "mentions": ctx["mentions"],
+                "prelink": linked["prelink"],
+                "before": {k: v for k, v in before.items() if k != "output"},
+                "after": {k: v for k, v in after.items() if k != "output"},
+                "parity": parity(reference, candidate),
+            }
+            rows.append(row)
+            print(
+                f"[{i}/{len(contexts)}] {case['id']} {tier:4s}  "
+                f"resolved {linked['prelink']['resolved']}/{linked['prelink']['mentions']} "
+                f"in {linked['prelink']['lookupMs']} ms  "
+                f"tool calls {before['tool_calls']} → {after['tool_calls']}  "
+                f"agent {before['latency_s']:.2f}s → {after['latency_s']:.2f}s  "
+                f"sim {row['parity']['similarity']:.2f}"
+            )
+
+    if out:
+        with open(out, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(r, ensure_ascii=False) + "\n" for r in rows)
+        print(f"Wrote {len(rows)} rows to {out}")
+    print_summary(rows)
+
+
+def print_summary(rows: list[dict]):
+    if not rows:
+        print("No speech cases to compare.")
+        return
+    n = len(rows)
+    for label in ("before", "after"):
+        calls = [r[label]["tool_calls"] for r in rows]
+        latency = [r[label]["latency_s"] for r in rows]
+        zero = sum(1 for c in calls if c == 0)
+        print(
+            f"  {label:6s} tool calls total {sum(calls):5d}  mean {sum(calls) / n:.2f}  "
+            f"zero-call reports {zero / n:.0%}  agent p50 {percentile(latency, 50):.2f}s / p95 {percentile(latency, 95):.2f}s"
+        )
+    lookups = [r["prelink"]["lookupMs"] for r in rows]
+    resolved = sum(r["prelink"]["resolved"] for r in rows)
+    mentions = sum(r["prelink"]["mentions"] for r in rows)
+    print(f"  lookups resolved {resolved}/{mentions}  p50 {percentile(lookups, 50):.0f} ms / p95 {percentile(lookups, 95):.0f} ms")
+    rate = {k: sum(r["parity"][k] for r in rows) / n for k in ("same_keys", "same_mkb", "same_numbers")}
+    print(
+        f"  after vs before: keys {rate['same_keys']:.0%}  mkb {rate['same_mkb']:.0%}  "
+        f"numbers {rate['same_numbers']:.0%}  sim {sum(r['parity']['similarity'] for r in rows) / n:.2f}"
+    )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+
+    parser = argparse.ArgumentParser(description="Tool calls before and after the v5 pre-linking stage")
+    parser.add_argument("command", choices=["mentions", "compare"])
+    parser.add_argument("cases")
+    parser.add_argument("--limit", type=int, default=30)
+    parser.add_argument("--out")
+    args = parser.parse_args()
+
+    cases = replay.load_cases(args.cases)
+    if args.command == "mentions":
+        print_mentions(prelinked_contexts(cases))
+    else:
+        compare(cases, args.limit, args.out)
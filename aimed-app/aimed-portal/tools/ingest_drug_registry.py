@@ -0,0 +1,450 @@
+"""
+Incremental import of the BiH drug registry PDF into public.drug_registry.
+
+Replaces the one-shot vectorize_drug_registry.py from the v5 guide (7.2):
+
+  1. Pages are extracted in a process pool (PyMuPDF), in order, and fed to
+     the parser as they arrive instead of being joined into one string.
+  2. The ATC monograph layout is parsed as a stream of lines:
+       J01FA10 azitromicin                       ATC code → INN
+       SUMAMED - PLIVA HRVATSKA d.o.o.           TRADE NAME - manufacturer
+       film tableta [500 mg] 3 tablete           form [strength] packaging
+     giving one row per trade name + strength + form.
+  3. Every row gets an entry_key (trade name|strength|form) and a
+     content_hash over its fields, its chunk and the embedding model. Only
+     new or changed rows are embedded and upserted; --prune removes rows that
+     left the registry.
+
+Embeddings go through a pluggable backend: "openai" (text-embedding-3-small)
+or "hashing", a deterministic local stand-in (character-trigram feature
+hashing, same 1536 dimensions) so the whole pipeline runs offline.
+
+Needs migration 20260301000000_drug_registry_content_hash.sql (entry_key,
+content_hash columns). Rows imported by the old script have no entry_key;
+the first incremental run re-inserts them under keys, --prune drops the old ones.
+
+Usage:
+  python tools/ingest_drug_registry.py Registar-za-objavu_slozeno.pdf [options]
+
+Options:
+  --store supabase|FILE.jsonl   Target (default: supabase, via SUPABASE_URL + SUPABASE_SERVICE_ROLE_KEY)
+  --embedder openai|hashing     Embedding backend (default: openai, needs OPENAI_API_KEY)
+  --workers N                   PDF extraction processes (default: CPU count)
+  --embed-concurrency N         Parallel embedding requests (default: 4)
+  --prune                       Delete rows no longer in the registry
+  --dry-run                     Parse and diff only, write nothing
+  --csv FILE                    Also write trade_name,generic_name,strength,form,atc_code
+                                (the drug_corrector.py registry format)
+
+A text dump with one page per form feed (pdftotext output) is accepted in
+place of the PDF, which is how the pipeline is exercised without PyMuPDF.
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import math
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Iterable, Iterator, Protocol
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+EMBEDDING_DIMENSIONS = 1536  # drug_registry.embedding is vector(1536)
+BATCH_SIZE = 100
+
+ATC_LINE = re.compile(r"^(?P<atc>[A-Z]\d{2}[A-Z]{2}\d{2})\b\s*(?P<inn>.*)$")
+TRADE_LINE = re.compile(r"^(?P<trade>[A-ZČĆŽŠĐ0-9][A-ZČĆŽŠĐ0-9 .,/+®()'-]*?)\s+[-–]\s+(?P<manufacturer>\S.*)$")
+PRESENTATION_LINE = re.compile(r"^(?P<form>[^\[\]]+?)\s*\[(?P<strength>[^\]]+)\]\s*(?P<packaging>.*)$")
+PAGE_NUMBER = re.compile(r"^\d{1,4}$")
+
+
+@dataclass
+class RegistryEntry:
+    trade_name: str
+    generic_name: str | None
+    strength: str | None
+    form: str | None
+    manufacturer: str | None
+    atc_code: str | None
+    content_chunk: str
+
+    @property
+    def entry_key(self) -> str:
+        return "|".join((self.trade_name, self.strength or "", self.form or "")).lower()
+
+    def content_hash(self, model: str) -> str:
+        fields = [self.trade_name, self.generic_name, self.strength, self.form,
+                  self.manufacturer, self.atc_code, self.content_chunk, model]
+        return hashlib.sha256(json.dumps(fields, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+# ── Extraction ──
+
+def _extract_range(args: tuple[str, int, int]) -> list[str]:
+    import fitz  # PyMuPDF; imported in the worker so the parent stays light
+
+    path, start, stop = args
+    with fitz.open(path) as doc:
+        return [doc[i].get_text() for i in range(start, stop)]
+
+
+def extract_pages(path: Path, workers: int | None = None) -> Iterator[str]:
+    """Yields page texts in document order while later pages are still being extracted."""
+    if path.suffix.lower() != ".pdf":
+        yield from path.read_text(encoding="utf-8").split("\f")
+        return
+    try:
+        import fitz
+    except ImportError:
+        raise SystemExit("ERROR: PDF extraction needs PyMuPDF (pip install pymupdf)")
+    with fitz.open(str(path)) as doc:
+        page_count = doc.page_count
+    workers = workers or os.cpu_count() or 1
+    # Several small ranges per worker keep the pool busy to the end
+    step = max(1, math.ceil(page_count / (workers * 4)))
+    ranges = [(str(path), i, min(i + step, page_count)) for i in range(0, page_count, step)]
+    if workers == 1:
+        for r in ranges:
+            yield from _extract_range(r)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for pages in pool.map(_extract_range, ranges):
+            yield from pages
+
+
+# ── Parsing ──
+
+def parse_entries(pages: Iterable[str]) -> Iterator[RegistryEntry]:
+    """Streams registry rows out of the monograph text, one presentation line at a time."""
+    atc = inn = trade = manufacturer = None
+    awaiting_inn = False
+    for page in pages:
+        for raw in page.splitlines():
+            line = " ".join(raw.split())
+            if not line or PAGE_NUMBER.match(line):
+                continue
+            if m := ATC_LINE.match(line):
+                atc, inn, trade, manufacturer = m["atc"], m["inn"] or None, None, None
+                awaiting_inn = inn is None
+            elif awaiting_inn:
+                inn, awaiting_inn = line, False
+            elif m := TRADE_LINE.match(line):
+                trade, manufacturer = m["trade"].strip(), m["manufacturer"].strip()
+            elif trade and (m := PRESENTATION_LINE.match(line)):
+                chunk = "\n".join(filter(None, (f"{atc} {inn or ''}".strip(), f"{trade} - {manufacturer}", line)))
+                yield RegistryEntry(
+                    trade_name=trade,
+                    generic_name=inn,
+                    strength=m["strength"].strip() or None,
+                    form=m["form"].strip() or None,
+                    manufacturer=manufacturer,
+                    atc_code=atc,
+                    content_chunk=chunk,
+                )
+
+
+def collect_entries(entries: Iterable[RegistryEntry]) -> dict[str, RegistryEntry]:
+    """Keyed by entry_key; repeated presentations (other pack sizes) are folded into one chunk."""
+    collected: dict[str, RegistryEntry] = {}
+    for entry in entries:
+        existing = collected.get(entry.entry_key)
+        if existing is None:
+            collected[entry.entry_key] = entry
+        else:
+            existing.content_chunk += "\n" + entry.content_chunk.rsplit("\n", 1)[-1]
+    return collected
+
+
+# ── Embedding backends ──
+
+class Embedder(Protocol):
+    model: str
+
+    def embed(self, texts: list[str]) -> list[list[float]]: ...
+
+
+class HashingEmbedder:
+    """Deterministic offline stand-in: signed feature hashing of character trigrams, L2-normalised."""
+
+    model = "local-hashing-trigram-1536"
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        vectors = np.zeros((len(texts), EMBEDDING_DIMENSIONS), dtype=np.float32)
+        for row, text in enumerate(texts):
+            padded = f"  {text.lower()} "
+            for i in range(len(padded) - 2):
+                digest = hashlib.blake2b(padded[i:i + 3].encode("utf-8"), digest_size=8).digest()
+                value = int.from_bytes(digest, "little")
+                vectors[row, value % EMBEDDING_DIMENSIONS] += 1.0 if value >> 63 else -1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors /= np.where(norms == 0, 1, norms)
+        return vectors.round(6).tolist()
+
+
+class OpenAIEmbedder:
+    model = "text-embedding-3-small"
+
+    def __init__(self, api_key: str | None = None, retries: int = 5):
+        import requests
+
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        if not self.api_key:
+            raise SystemExit("ERROR: --embedder openai needs OPENAI_API_KEY")
+        self.session = requests.Session()
+        self.retries = retries
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        for attempt in range(self.retries):
+            response = self.session.post(
+                "https://api.openai.com/v1/embeddings",
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                json={"model": self.model, "input": texts},
+                timeout=60,
+            )
+            if response.status_code == 429 or response.status_code >= 500:
+                time.sleep(float(response.headers.get("retry-after") or 2 ** attempt))
+                continue
+            response.raise_for_status()
+            return [item["embedding"] for item in sorted(response.json()["data"], key=lambda d: d["index"])]
+        response.raise_for_status()
+        raise RuntimeError(f"Embedding request kept failing ({response.status_code})")
+
+
+EMBEDDERS = {"openai": OpenAIEmbedder, "hashing": HashingEmbedder}
+
+
+# ── Stores ──
+
+class Store(Protocol):
+    def existing_hashes(self) -> dict[str | None, str | None]: ...
+
+    def upsert(self, rows: list[dict]): ...
+
+    def delete(self, keys: list[str | None]): ...
+
+
+class JsonlStore:
+    """Local file with one row per line; stands in for the table offline."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.rows: dict[str, dict] = {}
+        if self.path.exists():
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        row = json.loads(line)
+                        self.rows[row["entry_key"]] = row
+
+    def existing_hashes(self) -> dict[str | None, str | None]:
+        return {key: row.get("content_hash") for key, row in self.rows.items()}
+
+    def upsert(self, rows: list[dict]):
+        for row in rows:
+            self.rows[row["entry_key"]] = row
+
+    def delete(self, keys: list[str | None]):
+        for key in keys:
+            self.rows.pop(key, None)
+
+    def close(self):
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            for row in self.rows.values():
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+        os.replace(tmp, self.path)
+
+
+class SupabaseStore:
+    """public.drug_registry over PostgREST, upserting on entry_key."""
+
+    def __init__(self, url: str | None = None, key: str | None = None):
+        import requests
+
+        url = url or os.getenv("SUPABASE_URL")
+        key = key or os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+        if not url or not key:
+            raise SystemExit("ERROR: --store supabase needs SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY")
+        self.endpoint = f"{url.rstrip('/')}/rest/v1/drug_registry"
+        self.session = requests.Session()
+        self.session.headers.update({"apikey": key, "Authorization": f"Bearer {key}"})
+
+    def existing_hashes(self) -> dict[str | None, str | None]:
+        hashes, offset, page = {}, 0, 1000
+        while True:
+            response = self.session.get(
+                self.endpoint,
+                params={"select": "entry_key,content_hash", "order": "id"},
+                headers={"Range": f"{offset}-{offset + page - 1}"},
+                timeout=60,
+            )
+            response.raise_for_status()
+            rows = response.json()
+            hashes.update((r["entry_key"], r["content_hash"]) for r in rows)
+            if len(rows) < page:
+                return hashes
+            offset += page
+
+    def upsert(self, rows: list[dict]):
+        payload = [{**row, "embedding": f"[{','.join(map(str, row['embedding']))}]"} for row in rows]
+        response = self.session.post(
+            self.endpoint,
+            params={"on_conflict": "entry_key"},
+            headers={"Prefer": "resolution=merge-duplicates,return=minimal"},
+            json=payload,
+            timeout=120,
+        )
+        response.raise_for_status()
+
+    def delete(self, keys: list[str | None]):
+        if None in keys:
+            # Rows from the pre-incremental import
+            self.session.delete(self.endpoint, params={"entry_key": "is.null"}, timeout=60).raise_for_status()
+        keys = [k for k in keys if k is not None]
+        for i in range(0, len(keys), BATCH_SIZE):
+            quoted = ",".join('"' + k.replace("\\", "\\\\").replace('"', '\\"') + '"' for k in keys[i:i + BATCH_SIZE])
+            self.session.delete(self.endpoint, params={"entry_key": f"in.({quoted})"}, timeout=60).raise_for_status()
+
+    def close(self):
+        self.session.close()
+
+
+# ── Pipeline ──
+
+@dataclass
+class IngestReport:
+    pages: int = 0
+    entries: int = 0
+    new: int = 0
+    changed: int = 0
+    unchanged: int = 0
+    removed: int = 0
+    extract_parse_seconds: float = 0.0
+    embed_seconds: float = 0.0
+    write_seconds: float = 0.0
+
+
+def _row(entry: RegistryEntry, content_hash: str, embedding: list[float]) -> dict:
+    row = asdict(entry)
+    row.update(entry_key=entry.entry_key, content_hash=content_hash, embedding=embedding)
+    return row
+
+
+def ingest(
+    source: Path,
+    store: Store,
+    embedder: Embedder,
+    workers: int | None = None,
+    embed_concurrency: int = 4,
+    prune: bool = False,
+    dry_run: bool = False,
+    csv_path: str | None = None,
+) -> IngestReport:
+    report = IngestReport()
+    start = time.perf_counter()
+
+    def counted(pages: Iterable[str]) -> Iterator[str]:
+        for page in pages:
+            report.pages += 1
+            yield page
+
+    entries = collect_entries(parse_entries(counted(extract_pages(source, workers))))
+    report.entries = len(entries)
+    report.extract_parse_seconds = time.perf_counter() - start
+
+    if csv_path:
+        with open(csv_path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["trade_name", "generic_name", "strength", "form", "atc_code"])
+            writer.writerows((e.trade_name, e.generic_name, e.strength, e.form, e.atc_code) for e in entries.values())
+
+    existing = store.existing_hashes()
+    pending = []
+    for key, entry in entries.items():
+        content_hash = entry.content_hash(embedder.model)
+        if key not in existing:
+            report.new += 1
+        elif existing[key] != content_hash:
+            report.changed += 1
+        else:
+            report.unchanged += 1
+            continue
+        pending.append((entry, content_hash))
+    stale = [key for key in existing if key not in entries]
+    report.removed = len(stale)
+    if dry_run:
+        return report
+
+    batches = [pending[i:i + BATCH_SIZE] for i in range(0, len(pending), BATCH_SIZE)]
+
+    def embed_batch(batch):
+        return embedder.embed([entry.content_chunk for entry, _ in batch])
+
+    with ThreadPoolExecutor(max_workers=max(1, embed_concurrency)) as pool:
+        # Batches are upserted as their embeddings arrive, in order
+        embed_start = time.perf_counter()
+        for batch, vectors in zip(batches, pool.map(embed_batch, batches)):
+            write_start = time.perf_counter()
+            store.upsert([_row(entry, content_hash, vector) for (entry, content_hash), vector in zip(batch, vectors)])
+            report.write_seconds += time.perf_counter() - write_start
+        report.embed_seconds = time.perf_counter() - embed_start - report.write_seconds
+
+    if prune and stale:
+        write_start = time.perf_counter()
+        store.delete(stale)
+        report.write_seconds += time.perf_counter() - write_start
+    return report
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+
+    parser = argparse.ArgumentParser(description="Incremental drug registry import")
+    parser.add_argument("source")
+    parser.add_argument("--store", default="supabase")
+    parser.add_argument("--embedder", choices=sorted(EMBEDDERS), default="openai")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--embed-concurrency", type=int, default=4)
+    parser.add_argument("--prune", action="store_true")
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--csv")
+    args = parser.parse_args()
+
+    store = SupabaseStore() if args.store == "supabase" else JsonlStore(args.store)
+    embedder = EMBEDDERS[args.embedder]()
+
+    start = time.perf_counter()
+    report = ingest(
+        Path(args.source), store, embedder,
+        workers=args.workers,
+        embed_concurrency=args.embed_concurrency,
+        prune=args.prune,
+        dry_run=args.dry_run,
+        csv_path=args.csv,
+    )
+    if not args.dry_run:
+        store.close()
+
+    print(f"Pages:     {report.pages} ({report.extract_parse_seconds:.1f}s extract + parse)")
+    print(f"Entries:   {report.entries}")
+    print(f"New:       {report.new}")
+    print(f"Changed:   {report.changed}")
+    print(f"Unchanged: {report.unchanged}")
+    print(f"Removed:   {report.removed}{'' if args.prune or not report.removed else ' (kept; run with --prune to delete)'}")
+    if args.dry_run:
+        print("Dry run — nothing embedded or written")
+    else:
+        print(f"Embedded in {report.embed_seconds:.1f}s, written in {report.write_seconds:.1f}s")
+    print(f"Total:     {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,346 @@
+"""
+Concurrent load test for the AIMED n8n transcription webhook.
+
+Replays a folder of audio fixtures with N concurrent "doctors", ramping them
+up over a configurable window and keeping them busy for a fixed duration.
+Writes every request (latency, status, error code, response metadata) plus an
+aggregate summary (p50/p95/p99 latency, throughput, error breakdown) to a
+JSON results file. Timed-out requests count in the overall latency at the time
+they were cut off (>= --timeout), so their percentiles are lower bounds once
+the webhook saturates; `timeouts` says how many of them there were.
+
+Usage:
+  python tools/load_webhook.py <fixtures_dir> [options]
+
+Options:
+  --url URL            Webhook URL (default: AIMED_WEBHOOK_URL from .env)
+  --concurrency N      Concurrent virtual doctors (default: 30)
+  --ramp-up SECONDS    Spread worker start-up over this window (default: 10)
+  --duration SECONDS   Keep sending for this long after the first start (default: 120)
+  --timeout SECONDS    Per-request timeout (default: 120)
+  --mode new|update    Form field `mode` (default: new)
+  --sections A,B,C     Form field `preferred_sections`
+  --out FILE           Results file (default: load_results.json)
+  --preflight          Skip fixtures the Silence Guardrail would reject (see preflight_audio.py)
+
+Examples:
+  python tools/load_webhook.py fixtures/audio --concurrency 30 --duration 300
+  python tools/load_webhook.py fixtures/audio --url http://localhost:5678/webhook/AIMED-transcribe-v5
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+import aiohttp
+
+from test_webhook import AUDIO_SUFFIXES, get_webhook_url, sniff_mime_type
+
+
+@dataclass
+class LoadConfig:
+    url: str
+    fixtures: list[str]
+    concurrency: int = 30
+    ramp_up: float = 10.0
+    duration: float = 120.0
+    timeout: float = 120.0
+    mode: str = "new"
+    sections: list[str] | None = None
+
+
+@dataclass
+class RequestResult:
+    worker: int
+    fixture: str
+    started_at: float
+    latency: float
+    outcome: str
+    status: int | None = None
+    error_code: str | None = None
+    metadata: dict | None = None
+
+
+@dataclass
+class LoadSummary:
+    requests: int = 0
+    successes: int = 0
+    wall_time: float = 0.0
+    throughput: float = 0.0
+    success_throughput: float = 0.0
+    timeouts: int = 0
+    latency: dict = field(default_factory=dict)
+    success_latency: dict = field(default_factory=dict)
+    outcomes: dict = field(default_factory=dict)
+    status_codes: dict = field(default_factory=dict)
+    metadata: dict = field(default_factory=dict)
+
+
+def find_fixtures(folder: str) -> list[Path]:
+    paths = sorted(p for p in Path(folder).rglob("*") if p.suffix.lower() in AUDIO_SUFFIXES)
+    if not paths:
+        raise SystemExit(f"ERROR: No audio fixtures ({', '.join(sorted(AUDIO_SUFFIXES))}) in {folder}")
+    return paths
+
+
+def percentile(values: list[float], pct: float) -> float | None:
+    """Linear-interpolated percentile (same as numpy's default)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def latency_stats(values: list[float]) -> dict:
+    if not values:
+        return {}
+    return {
+        "min": round(min(values), 3),
+        "p50": round(percentile(values, 50), 3),
+        "p95": round(percentile(values, 95), 3),
+        "p99": round(percentile(values, 99), 3),
+        "max": round(max(values), 3),
+        "mean": round(sum(values) / len(values), 3),
+    }
+
+
+def classify(status: int, data: dict | None) -> tuple[str, str | None]:
+    """Maps a response to (outcome, error_code)."""
+    if status >= 500:
+        return "http_5xx", None
+    if status >= 400:
+        return "http_4xx", None
+    if data is None:
+        return "invalid_json", None
+    if data.get("success"):
+        return "ok", None
+    error_code = data.get("error")
+    if error_code == "NO_SPEECH_DETECTED":
+        return "NO_SPEECH_DETECTED", error_code
+    return "success_false", error_code
+
+
+def build_form(config: LoadConfig, path: Path) -> aiohttp.FormData:
+    form = aiohttp.FormData()
+    form.add_field(
+        "audio",
+        path.read_bytes(),
+        filename=path.name,
+        content_type=sniff_mime_type(path),
+    )
+    form.add_field("mode", config.mode)
+    if config.sections:
+        form.add_field("preferred_sections", json.dumps(config.sections, ensure_ascii=False))
+    return form
+
+
+async def send_one(
+    session: aiohttp.ClientSession, config: LoadConfig, worker: int, path: Path, t0: float
+) -> RequestResult:
+    start = time.perf_counter()
+    base = {"worker": worker, "fixture": path.name, "started_at": round(start - t0, 3)}
+
+    try:
+        async with session.post(config.url, data=build_form(config, path)) as response:
+            body = await response.read()
+            latency = time.perf_counter() - start
+            try:
+                data = json.loads(body)
+            except ValueError:
+                data = None
+            # n8n webhooks may answer with a single-item array
+            if isinstance(data, list) and data:
+                data = data[0]
+            if not isinstance(data, dict):
+                data = None
+            outcome, error_code = classify(response.status, data)
+            return RequestResult(
+                **base,
+                latency=round(latency, 3),
+                outcome=outcome,
+                status=response.status,
+                error_code=error_code,
+                metadata=(data or {}).get("metadata"),
+            )
+    except asyncio.TimeoutError:
+        return RequestResult(**base, latency=round(time.perf_counter() - start, 3), outcome="timeout")
+    except aiohttp.ClientError as e:
+        return RequestResult(
+            **base,
+            latency=round(time.perf_counter() - start, 3),
+            outcome="network",
+            error_code=type(e).__name__,
+        )
+
+
+async def worker_loop(
+    session: aiohttp.ClientSession,
+    config: LoadConfig,
+    worker: int,
+    fixtures: "itertools.cycle[Path]",
+    t0: float,
+    deadline: float,
+    results: list[RequestResult],
+):
+    # Stagger start-up across the ramp-up window
+    await asyncio.sleep(config.ramp_up * worker / max(config.concurrency, 1))
+    while time.perf_counter() < deadline:
+        result = await send_one(session, config, worker, next(fixtures), t0)
+        results.append(result)
+        print(
+            f"[{result.started_at:7.1f}s] worker {worker:3d} {result.fixture:30.30s} "
+            f"{result.outcome:18s} {result.latency:6.2f}s"
+        )
+
+
+async def run_load(config: LoadConfig) -> tuple[list[RequestResult], float]:
+    fixtures = itertools.cycle([Path(p) for p in config.fixtures])
+    results: list[RequestResult] = []
+    timeout = aiohttp.ClientTimeout(total=config.timeout)
+    connector = aiohttp.TCPConnector(limit=config.concurrency)
+
+    async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+        t0 = time.perf_counter()
+        deadline = t0 + config.duration
+        await asyncio.gather(*(
+            worker_loop(session, config, i, fixtures, t0, deadline, results)
+            for i in range(config.concurrency)
+        ))
+        wall_time = time.perf_counter() - t0
+
+    return results, wall_time
+
+
+def summarize_metadata(results: list[RequestResult]) -> dict:
+    versions, engines, modes, tools = Counter(), Counter(), Counter(), Counter()
+    confidences = []
+    guardrail_triggered = 0
+    parse_errors = 0
+
+    for r in results:
+        meta = r.metadata or {}
+        if not meta:
+            continue
+        versions[meta.get("version")] += 1
+        engines[meta.get("transcriptionEngine")] += 1
+        modes[meta.get("mode")] += 1
+        tools.update(meta.get("toolsUsed") or [])
+        if isinstance(meta.get("transcriptionConfidence"), (int, float)):
+            confidences.append(meta["transcriptionConfidence"])
+        if (meta.get("guardrail") or {}).get("triggered"):
+            guardrail_triggered += 1
+        if meta.get("parseError"):
+            parse_errors += 1
+
+    return {
+        "versions": dict(versions),
+        "transcriptionEngines": dict(engines),
+        "modes": dict(modes),
+        "toolsUsed": dict(tools),
+        "transcriptionConfidence": latency_stats(confidences),
+        "guardrailTriggered": guardrail_triggered,
+        "parseErrors": parse_errors,
+    }
+
+
+def summarize(results: list[RequestResult], wall_time: float) -> LoadSummary:
+    # Timeouts stay in at their cut-off latency: dropping them would improve
+    # p95/p99 exactly when the webhook saturates
+    latencies = [r.latency for r in results]
+    ok = [r.latency for r in results if r.outcome == "ok"]
+    timeouts = sum(1 for r in results if r.outcome == "timeout")
+    return LoadSummary(
+        requests=len(results),
+        successes=len(ok),
+        wall_time=round(wall_time, 3),
+        throughput=round(len(results) / wall_time, 3) if wall_time else 0.0,
+        success_throughput=round(len(ok) / wall_time, 3) if wall_time else 0.0,
+        timeouts=timeouts,
+        latency=latency_stats(latencies),
+        success_latency=latency_stats(ok),
+        outcomes=dict(Counter(r.outcome for r in results)),
+        status_codes={str(k): v for k, v in Counter(r.status for r in results if r.status).items()},
+        metadata=summarize_metadata(results),
+    )
+
+
+def print_summary(summary: LoadSummary):
+    print("=" * 60)
+    print(f"Requests:   {summary.requests} in {summary.wall_time:.1f}s "
+          f"({summary.throughput:.2f} req/s, {summary.success_throughput:.2f} ok/s)")
+    lat = summary.latency
+    if lat:
+        print(f"Latency:    p50 {lat['p50']:.2f}s  p95 {lat['p95']:.2f}s  p99 {lat['p99']:.2f}s  max {lat['max']:.2f}s")
+    if summary.timeouts:
+        share = summary.timeouts / summary.requests
+        print(f"            {summary.timeouts} timed out ({share:.1%}), counted at their cut-off; "
+              f"percentiles above p{100 * (1 - share):.0f} are lower bounds")
+    print("Outcomes:")
+    for outcome, count in sorted(summary.outcomes.items(), key=lambda kv: -kv[1]):
+        print(f"  {outcome:20s} {count}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent load test for the AIMED webhook")
+    parser.add_argument("fixtures_dir")
+    parser.add_argument("--url")
+    parser.add_argument("--concurrency", type=int, default=30)
+    parser.add_argument("--ramp-up", type=float, default=10.0)
+    parser.add_argument("--duration", type=float, default=120.0)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--mode", choices=["new", "update"], default="new")
+    parser.add_argument("--sections")
+    parser.add_argument("--out", default="load_results.json")
+    parser.add_argument("--preflight", action="store_true")
+    args = parser.parse_args()
+
+    fixtures = find_fixtures(args.fixtures_dir)
+    if args.preflight:
+        from preflight_audio import preflight_filter
+
+        fixtures, rejected = preflight_filter(fixtures)
+        for a in rejected:
+            print(f"Skipping {Path(a.file).name}: {a.reason or a.verdict} — {a.message}")
+        if not fixtures:
+            raise SystemExit("ERROR: No fixtures left after pre-flight")
+
+    config = LoadConfig(
+        url=get_webhook_url(args.url),
+        fixtures=[str(p) for p in fixtures],
+        concurrency=args.concurrency,
+        ramp_up=args.ramp_up,
+        duration=args.duration,
+        timeout=args.timeout,
+        mode=args.mode,
+        sections=[s.strip() for s in args.sections.split(",")] if args.sections else None,
+    )
+
+    print(f"URL:         {config.url}")
+    print(f"Fixtures:    {len(config.fixtures)} files")
+    print(f"Concurrency: {config.concurrency} (ramp-up {config.ramp_up:.0f}s, duration {config.duration:.0f}s)")
+
+    results, wall_time = asyncio.run(run_load(config))
+    summary = summarize(results, wall_time)
+    print_summary(summary)
+
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "config": asdict(config),
+                "summary": asdict(summary),
+                "requests": [asdict(r) for r in results],
+            },
+            f,
+            indent=2,
+            ensure_ascii=False,
+        )
+    print(f"Results written to {args.out}")
@@ -0,0 +1,472 @@
+"""
+Memory-mapped MKB-10 trigram + prefix index, a local stand-in for search_mkb10().
+
+Compiles the MKB-10 CSV (code,name_hr,name_lat,category) into one compact
+binary file that is mmap-ed at query time. Ranking follows the Postgres
+function used by the search-mkb10 Edge Function:
+
+  score = GREATEST(similarity(name_hr), similarity(name_lat), code ILIKE 'q%' ? 1 : 0)
+  WHERE name_hr % q OR name_lat % q OR code ILIKE 'q%' OR name_hr ILIKE '%q%'
+
+with pg_trgm trigram extraction (lower-cased alphanumeric words padded with
+two leading and one trailing space) and the default 0.3 similarity threshold.
+Postgres leaves the order of equal scores undefined; here ties are broken by
+code.
+
+Usage:
+  python tools/mkb10_index.py build mkb10.csv mkb10.idx
+  python tools/mkb10_index.py query mkb10.idx "išijas" [-k 5] [--json]
+  python tools/mkb10_index.py bench mkb10.idx [queries.txt] [--dsn DATABASE_URL] [--edge-url URL]
+
+Can also be imported and used programmatically:
+  from mkb10_index import Mkb10Index
+  with Mkb10Index("mkb10.idx") as index:
+      matches = index.search("išijas", max_results=5)
+"""
+
+import argparse
+import bisect
+import csv
+import json
+import math
+import mmap
+import os
+import random
+import statistics
+import struct
+import sys
+import time
+from array import array
+from dataclasses import dataclass
+
+import numpy as np
+
+MAGIC = b"MKB10TRG"
+VERSION = 1
+SIMILARITY_THRESHOLD = 0.3  # pg_trgm.similarity_threshold default
+DEFAULT_MAX_RESULTS = 5
+
+# Section order in the file; the header stores (offset, length) for each
+SECTIONS = ("string_offsets", "strings", "trigram_counts", "trigram_keys", "posting_offsets", "postings", "name_offsets", "names")
+HEADER = struct.Struct("<8sII")
+SECTION_ENTRY = struct.Struct("<QQ")
+FIELDS = 4  # code, name_hr, name_lat, category
+
+
+@dataclass(slots=True)
+class Mkb10Match:
+    code: str
+    name_hr: str
+    name_lat: str | None
+    category: str | None
+    similarity: float
+
+    def to_tool_result(self) -> dict:
+        """Same shape as one entry of the search-mkb10 Edge Function's `results`."""
+        return {
+            "code": self.code,
+            "name": self.name_hr,
+            "latin": self.name_lat or None,
+            "category": self.category or None,
+            "match_score": self.similarity,
+        }
+
+
+def trigram_words(text: str) -> list[str]:
+    """pg_trgm word splitting: runs of alphanumeric characters, lower-cased."""
+    words, current = [], []
+    for ch in text.lower():
+        if ch.isalnum():
+            current.append(ch)
+        elif current:
+            words.append("".join(current))
+            current = []
+    if current:
+        words.append("".join(current))
+    return words
+
+
+def trigram_keys(text: str) -> set[int]:
+    """The unique pg_trgm trigrams of `text`, packed as 3 × 21-bit code points."""
+    keys = set()
+    for word in trigram_words(text):
+        padded = "  " + word + " "
+        for i in range(len(padded) - 2):
+            keys.add((ord(padded[i]) << 42) | (ord(padded[i + 1]) << 21) | ord(padded[i + 2]))
+    return keys
+
+
+def _align(buffer: bytearray, boundary: int = 8):
+    buffer.extend(b"\0" * (-len(buffer) % boundary))
+
+
+def build_index(csv_path: str, out_path: str) -> int:
+    """Compiles the MKB-10 CSV into an index file. Returns the number of codes."""
+    with open(csv_path, "r", encoding="utf-8-sig", newline="") as f:
+        rows = [
+            (r["code"].strip(), r["name_hr"].strip(), (r.get("name_lat") or "").strip(), (r.get("category") or "").strip())
+            for r in csv.DictReader(f)
+            if (r.get("code") or "").strip()
+        ]
+    # Sorted by lower-cased code so `code ILIKE 'q%'` is a binary search
+    rows.sort(key=lambda r: r[0].lower())
+
+    string_offsets = array("I", [0])
+    strings = bytearray()
+    trigram_counts = array("H")
+    postings_by_key: dict[int, list[int]] = {}
+    name_offsets = array("I")
+    names = bytearray(b"\n")
+
+    for rec, row in enumerate(rows):
+        for value in row:
+            strings.extend(value.encode("utf-8"))
+            string_offsets.append(len(strings))
+        for field, text in enumerate((row[1], row[2])):
+            keys = trigram_keys(text)
+            trigram_counts.append(min(len(keys), 0xFFFF))
+            for key in keys:
+                postings_by_key.setdefault(key, []).append(rec * 2 + field)
+        name_offsets.append(len(names))
+        names.extend(row[1].lower().encode("utf-8") + b"\n")
+
+    keys_sorted = sorted(postings_by_key)
+    trigram_key_array = array("Q", keys_sorted)
+    posting_offsets = array("I", [0])
+    postings = array("I")
+    for key in keys_sorted:
+        postings.extend(postings_by_key[key])
+        posting_offsets.append(len(postings))
+
+    sections = {
+        "string_offsets": string_offsets.tobytes(),
+        "strings": bytes(strings),
+        "trigram_counts": trigram_counts.tobytes(),
+        "trigram_keys": trigram_key_array.tobytes(),
+        "posting_offsets": posting_offsets.tobytes(),
+        "postings": postings.tobytes(),
+        "name_offsets": name_offsets.tobytes(),
+        "names": bytes(names),
+    }
+
+    out = bytearray(HEADER.pack(MAGIC, VERSION, len(rows)))
+    table_at = len(out)
+    out.extend(b"\0" * SECTION_ENTRY.size * len(SECTIONS))
+    _align(out)
+    for i, name in enumerate(SECTIONS):
+        data = sections[name]
+        SECTION_ENTRY.pack_into(out, table_at + i * SECTION_ENTRY.size, len(out), len(data))
+        out.extend(data)
+        _align(out)
+
+    tmp_path = f"{out_path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(out)
+    os.replace(tmp_path, out_path)
+    return len(rows)
+
+
+class Mkb10Index:
+    """Read-only view over an index file; all lookups go straight to the mmap."""
+
+    def __init__(self, path: str):
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.size = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} MKB-10 index")
+
+        view = memoryview(self._mmap)
+        sections = {}
+        for i, name in enumerate(SECTIONS):
+            offset, length = SECTION_ENTRY.unpack_from(self._mmap, HEADER.size + i * SECTION_ENTRY.size)
+            sections[name] = view[offset:offset + length]
+            if name == "names":
+                # Substring scans run mmap.find() directly over this byte range
+                self._names_start, self._names_end = offset, offset + length
+
+        self._string_offsets = sections["string_offsets"].cast("I")
+        self._strings = sections["strings"]
+        self._trigram_counts = np.frombuffer(sections["trigram_counts"], dtype=np.uint16)
+        self._trigram_keys = sections["trigram_keys"].cast("Q")
+        self._posting_offsets = sections["posting_offsets"].cast("I")
+        self._postings = np.frombuffer(sections["postings"], dtype=np.uint32)
+        self._name_offsets = sections["name_offsets"].cast("I")
+        self._views = [view, *sections.values()]
+
+    def close(self):
+        # Every export of the mapping has to be released before it can close
+        for attr in ("_string_offsets", "_trigram_keys", "_posting_offsets", "_name_offsets"):
+            getattr(self, attr).release()
+        self._trigram_counts = self._postings = None
+        for v in reversed(self._views):
+            v.release()
+        self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _field(self, rec: int, field: int) -> str:
+        i = rec * FIELDS + field
+        return str(self._strings[self._string_offsets[i]:self._string_offsets[i + 1]], "utf-8")
+
+    def _match(self, rec: int, score: float) -> Mkb10Match:
+        return Mkb10Match(
+            code=self._field(rec, 0),
+            name_hr=self._field(rec, 1),
+            name_lat=self._field(rec, 2) or None,
+            category=self._field(rec, 3) or None,
+            # Shortest round-trip text, as Postgres prints a REAL ("0.4", not 0.4000000059604645)
+            similarity=float(str(score)),
+        )
+
+    def lookup(self, code: str) -> Mkb10Match | None:
+        rec = bisect.bisect_left(range(self.size), code.lower(), key=lambda r: self._field(r, 0).lower())
+        if rec < self.size and self._field(rec, 0).lower() == code.lower():
+            return self._match(rec, 1.0)
+        return None
+
+    def _code_prefix(self, term: str) -> range:
+        prefix = term.lower()
+        codes = range(self.size)
+        start = bisect.bisect_left(codes, prefix, key=lambda r: self._field(r, 0).lower())
+        end = start
+        while end < self.size and self._field(end, 0).lower().startswith(prefix):
+            end += 1
+        return range(start, end)
+
+    def _name_substring(self, term: str) -> list[int]:
+        """name_hr ILIKE '%term%' via mmap.find() over the lower-cased name blob."""
+        needle = term.lower().encode("utf-8")
+        if not needle or b"\n" in needle:
+            return []
+        base, end = self._names_start, self._names_end
+        found = []
+        pos = self._mmap.find(needle, base, end)
+        while pos != -1:
+            rec = bisect.bisect_right(self._name_offsets, pos - base) - 1
+            found.append(rec)
+            # Skip to the next name; one hit per record is enough
+            next_start = base + self._name_offsets[rec + 1] if rec + 1 < self.size else end
+            pos = self._mmap.find(needle, next_start, end)
+        return found
+
+    def _query_postings(self, term: str) -> tuple[int, list[np.ndarray]]:
+        """Number of query trigrams and the posting list of each one present in the index."""
+        query = trigram_keys(term)
+        slices = []
+        for key in query:
+            i = bisect.bisect_left(self._trigram_keys, key)
+            if i < len(self._trigram_keys) and self._trigram_keys[i] == key:
+                slices.append(self._postings[self._posting_offsets[i]:self._posting_offsets[i + 1]])
+        return len(query), slices
+
+    def _overlaps(self, slices: list[np.ndarray]) -> np.ndarray:
+        """Shared-trigram count for every posting entry (record * 2 + field)."""
+        if not slices:
+            return np.zeros(self.size * 2, dtype=np.int64)
+        return np.bincount(np.concatenate(slices), minlength=self.size * 2)
+
+    def _similarity(self, entries: np.ndarray, shared: np.ndarray, query_size: int) -> np.ndarray:
+        """similarity() for the given posting entries, computed as REAL like pg_trgm."""
+        overlap = shared[entries]
+        union = query_size + self._trigram_counts[entries].astype(np.int64) - overlap
+        return np.divide(overlap, union, out=np.zeros(len(entries), dtype=np.float32), where=union > 0, dtype=np.float32)
+
+    def search(self, term: str, max_results: int = DEFAULT_MAX_RESULTS) -> list[Mkb10Match]:
+        term = term.strip()
+        if not term or max_results <= 0:
+            return []
+        query_size, slices = self._query_postings(term)
+        shared = self._overlaps(slices)
+        # similarity >= t needs at least ceil(t * |q|) shared trigrams
+        required = max(math.ceil(SIMILARITY_THRESHOLD * query_size - 1e-9), 1)
+        entries = np.flatnonzero(shared >= required)
+        sims = self._similarity(entries, shared, query_size)
+        keep = sims >= SIMILARITY_THRESHOLD
+        prefix = self._code_prefix(term)
+
+        recs = [entries[keep] >> 1, np.arange(prefix.start, prefix.stop)]
+        scores = [sims[keep], np.ones(len(prefix), dtype=np.float32)]
+        # Substring-only rows score below the % threshold, so they can only
+        # reach the top-k when fewer than k rows matched on trigrams or code.
+        # A row appears at most three times above, so only small sets need deduping
+        total = len(recs[0]) + len(recs[1])
+        if total < 3 * max_results and len(np.union1d(recs[0], recs[1])) < max_results:
+            found = np.asarray(self._name_substring(term), dtype=np.int64)
+            both = np.concatenate([found * 2, found * 2 + 1])
+            recs.append(both >> 1)
+            scores.append(self._similarity(both, shared, query_size))
+
+        recs, scores = np.concatenate(recs), np.concatenate(scores)
+        if not len(recs):
+            return []
+        # GREATEST(...) per row
+        order = np.lexsort((-scores, recs))
+        recs, scores = recs[order], scores[order]
+        first = np.flatnonzero(np.r_[True, recs[1:] != recs[:-1]])
+        recs, scores = recs[first], scores[first]
+        # Rows are stored in code order, so the record number is the tie-break
+        top = np.lexsort((recs, -scores))[:max_results]
+        return [self._match(int(rec), score) for rec, score in zip(recs[top], scores[top])]
+
+    def search_tool_response(self, query: str, max_results: int = DEFAULT_MAX_RESULTS) -> dict:
+        """The search-mkb10 Edge Function's JSON body for `query`."""
+        results = [m.to_tool_result() for m in self.search(query, max_results)]
+        return {"query": query.strip(), "results": results, "count": len(results), "source": "mkb.hzjz.hr"}
+
+
+# ── Benchmark ──
+
+def sample_queries(index: Mkb10Index, count: int = 500, seed: int = 3) -> list[str]:
+    """Words from real names, with dictation-style typos in a third of them."""
+    rng = random.Random(seed)
+    queries = []
+    while len(queries) < count:
+        rec = rng.randrange(index.size)
+        roll = rng.random()
+        if roll < 0.1:
+            queries.append(index._field(rec, 0)[:rng.randint(1, 3)])
+            continue
+        words = [w for w in trigram_words(index._field(rec, 1)) if len(w) > 3]
+        if not words:
+            continue
+        query = " ".join(words[: rng.randint(1, 2)])
+        if roll > 0.66 and len(query) > 4:
+            i = rng.randrange(1, len(query) - 1)
+            query = query[:i] + query[i + 1:]
+        queries.append(query)
+    return queries
+
+
+def _percentiles(values: list[float]) -> str:
+    ordered = sorted(values)
+    pick = lambda p: ordered[min(int(len(ordered) * p / 100), len(ordered) - 1)]
+    return f"p50 {pick(50):9.1f}  p95 {pick(95):9.1f}  p99 {pick(99):9.1f}  mean {statistics.fmean(ordered):9.1f}"
+
+
+def _remote_postgres(dsn: str):
+    try:
+        import psycopg
+    except ImportError:
+        raise SystemExit("ERROR: --dsn needs psycopg (pip install 'psycopg[binary]')")
+    conn = psycopg.connect(dsn, autocommit=True)
+
+    def search(term: str, k: int) -> list[tuple[str, float]]:
+        rows = conn.execute("SELECT code, similarity FROM public.search_mkb10(%s, %s)", (term, k)).fetchall()
+        return [(code, float(sim)) for code, sim in rows]
+
+    return search
+
+
+def _remote_edge(url: str):
+    import requests
+
+    session = requests.Session()
+    key = os.getenv("SUPABASE_ANON_KEY", "")
+    headers = {"Authorization": f"Bearer {key}", "apikey": key} if key else {}
+
+    def search(term: str, k: int) -> list[tuple[str, float]]:
+        response = session.post(url, json={"query": term}, headers=headers, timeout=30)
+        response.raise_for_status()
+        return [(r["code"], float(r["match_score"])) for r in response.json().get("results", [])][:k]
+
+    return search
+
+
+def bench(index_path: str, queries: list[str] | None, k: int, dsn: str | None, edge_url: str | None):
+    start = time.perf_counter()
+    index = Mkb10Index(index_path)
+    open_ms = (time.perf_counter() - start) * 1000
+    queries = queries or sample_queries(index)
+    print(f"Index: {index.size} codes, {os.path.getsize(index_path) / 1e6:.1f} MB, opened in {open_ms:.2f} ms")
+
+    local_results, local_us = [], []
+    for q in queries:
+        start = time.perf_counter()
+        matches = index.search(q, k)
+        local_us.append((time.perf_counter() - start) * 1e6)
+        local_results.append(matches)
+    print(f"local      µs  {_percentiles(local_us)}  ({len(queries)} queries)")
+
+    remotes = []
+    if dsn:
+        remotes.append(("postgres", _remote_postgres(dsn)))
+    if edge_url:
+        remotes.append(("edge", _remote_edge(edge_url)))
+
+    for name, remote in remotes:
+        remote_us, top1, tie_aware, overlap = [], 0, 0, []
+        for q, local in zip(queries, local_results):
+            start = time.perf_counter()
+            rows = remote(q.strip(), k)
+            remote_us.append((time.perf_counter() - start) * 1e6)
+            local_codes = [m.code for m in local]
+            remote_codes = [code for code, _ in rows]
+            if local_codes[:1] == remote_codes[:1]:
+                top1 += 1
+            # Postgres orders equal scores arbitrarily; count a tied top-1 as agreement
+            if rows and local and rows[0][0] in {m.code for m in local if np.isclose(m.similarity, local[0].similarity)}:
+                tie_aware += 1
+            elif not rows and not local:
+                tie_aware += 1
+            if remote_codes:
+                overlap.append(len(set(local_codes) & set(remote_codes)) / len(remote_codes))
+        print(f"{name:10s} µs  {_percentiles(remote_us)}")
+        n = len(queries)
+        print(
+            f"  agreement: top-1 {top1 / n:.1%} (tie-aware {tie_aware / n:.1%}), "
+            f"top-{k} overlap {statistics.fmean(overlap) if overlap else 0:.1%}"
+        )
+        print(f"  speed-up: {statistics.median(remote_us) / statistics.median(local_us):.0f}x at p50")
+    index.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+
+    parser = argparse.ArgumentParser(description="Memory-mapped MKB-10 trigram index")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("build")
+    p.add_argument("csv")
+    p.add_argument("out")
+    p = sub.add_parser("query")
+    p.add_argument("index")
+    p.add_argument("term")
+    p.add_argument("-k", type=int, default=DEFAULT_MAX_RESULTS)
+    p.add_argument("--json", action="store_true")
+    p = sub.add_parser("bench")
+    p.add_argument("index")
+    p.add_argument("queries", nargs="?")
+    p.add_argument("-k", type=int, default=DEFAULT_MAX_RESULTS)
+    p.add_argument("--dsn", default=os.getenv("DATABASE_URL"))
+    p.add_argument("--edge-url")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        start = time.perf_counter()
+        count = build_index(args.csv, args.out)
+        print(f"Indexed {count} codes → {args.out} ({os.path.getsize(args.out) / 1e6:.1f} MB, {time.perf_counter() - start:.1f}s)")
+    elif args.command == "query":
+        with Mkb10Index(args.index) as index:
+            start = time.perf_counter()
+            matches = index.search(args.term, args.k)
+            elapsed = (time.perf_counter() - start) * 1e6
+            if args.json:
+                print(json.dumps(index.search_tool_response(args.term, args.k), ensure_ascii=False, indent=2))
+            else:
+                for m in matches:
+                    print(f"{m.code:8s} {m.similarity:5.3f}  {m.name_hr}" + (f" ({m.name_lat})" if m.name_lat else ""))
+                print(f"{len(matches)} matches in {elapsed:.0f} µs")
+    elif args.command == "bench":
+        queries = None
+        if args.queries:
+            with open(args.queries, "r", encoding="utf-8") as f:
+                queries = [line.strip() for line in f if line.strip()]
+        bench(args.index, queries, args.k, args.dsn, args.edge_url)
@@ -0,0 +1,240 @@
+"""
+Offline pre-flight check for audio fixtures before they are sent to the webhook.
+
+Decodes each recording locally (WAV via the standard library, webm/opus/mp4/
+ogg/mp3 via ffmpeg) and computes duration, frame RMS energy, noise floor and
+voiced-frame ratio with NumPy. Recordings the v5 Silence Guardrail would
+reject are flagged with the guardrail's own message, so the QA corpus and
+load tests stop paying ElevenLabs Scribe for silence.
+
+The guardrail works on the transcript; this works on the signal, so the
+mapping is approximate:
+  empty        no voiced frames             → "Nije detektovan govor u snimku..."
+  too_short    under MIN_VOICED_SECONDS     → "Snimak sadrži premalo govora..."
+  low_quality  voiced level near the floor  → "Kvalitet snimka je prenizak..."
+  sparse       > 5 s with < 3 est. words    → "Snimak od N sekundi sadrži samo..."
+Filler-only dictation ("hm, ovaj, da...") cannot be told apart acoustically
+and still has to go through the guardrail.
+
+Usage:
+  python tools/preflight_audio.py <audio_file|folder> [...] [options]
+
+Options:
+  --out FILE        Write the per-file analysis as JSON
+  --passing FILE    Write the paths that pass, one per line
+  --workers N       Parallel decode/analysis processes (default: CPU count)
+
+Can also be imported and used programmatically:
+  from preflight_audio import analyze_file, preflight_filter
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import wave
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+import numpy as np
+
+from test_webhook import collect_audio_files
+
+DECODE_RATE = 16000
+FRAME_SECONDS = 0.03
+
+# Frames below this level are never counted as voiced (digital silence, hum)
+MIN_VOICED_DB = -50.0
+# Voiced frames must sit this far above the recording's noise floor
+VOICED_MARGIN_DB = 9.0
+# Broadband noise has a zero-crossing rate near 0.5; voiced speech far below
+MAX_VOICED_ZCR = 0.25
+# Speech peak vs noise floor below this is "unintelligible" territory
+MIN_SNR_DB = 15.0
+# ~10 meaningful characters, the guardrail's "too short" limit
+MIN_VOICED_SECONDS = 0.8
+# Conversational dictation rate, used to estimate the guardrail's word count
+WORDS_PER_VOICED_SECOND = 2.5
+
+GUARDRAIL_MESSAGES = {
+    "empty": "Nije detektovan govor u snimku. Molimo pokušajte ponovo.",
+    "too_short": "Snimak sadrži premalo govora za obradu. Molimo diktirajte duže.",
+    "low_quality": "Kvalitet snimka je prenizak za pouzdanu transkripciju. Provjerite mikrofon.",
+}
+
+
+@dataclass
+class AudioAnalysis:
+    file: str
+    duration: float = 0.0
+    rms_db: float | None = None
+    noise_floor_db: float | None = None
+    speech_level_db: float | None = None
+    voiced_ratio: float = 0.0
+    voiced_seconds: float = 0.0
+    estimated_words: int = 0
+    verdict: str = "ok"
+    reason: str | None = None
+    message: str | None = None
+
+    @property
+    def passed(self) -> bool:
+        # Undecodable files are reported but left for the real pipeline to judge
+        return self.verdict != "reject"
+
+
+def decode_wav(path: Path) -> tuple[np.ndarray, int]:
+    with wave.open(str(path), "rb") as w:
+        width, channels, rate = w.getsampwidth(), w.getnchannels(), w.getframerate()
+        raw = w.readframes(w.getnframes())
+    if width == 1:
+        samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif width in (2, 4):
+        dtype = np.int16 if width == 2 else np.int32
+        samples = np.frombuffer(raw, dtype=dtype).astype(np.float32) / np.iinfo(dtype).max
+    else:
+        raise ValueError(f"Unsupported WAV sample width: {width} bytes")
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return samples, rate
+
+
+def decode_ffmpeg(path: Path) -> tuple[np.ndarray, int]:
+    if not shutil.which("ffmpeg"):
+        raise RuntimeError("ffmpeg not found on PATH (needed for non-WAV audio)")
+    result = subprocess.run(
+        ["ffmpeg", "-nostdin", "-v", "error", "-i", str(path),
+         "-f", "s16le", "-ac", "1", "-ar", str(DECODE_RATE), "pipe:1"],
+        capture_output=True,
+        check=False,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.decode("utf-8", "replace").strip() or "ffmpeg failed")
+    return np.frombuffer(result.stdout, dtype=np.int16).astype(np.float32) / 32768, DECODE_RATE
+
+
+def decode_audio(path: Path) -> tuple[np.ndarray, int]:
+    """Returns mono float32 samples in [-1, 1] and the sample rate."""
+    if path.suffix.lower() == ".wav":
+        try:
+            return decode_wav(path)
+        except (wave.Error, ValueError):
+            pass  # float or compressed WAV — let ffmpeg handle it
+    return decode_ffmpeg(path)
+
+
+def analyze_samples(name: str, samples: np.ndarray, rate: int) -> AudioAnalysis:
+    duration = len(samples) / rate if rate else 0.0
+    frame = max(int(rate * FRAME_SECONDS), 1)
+    count = len(samples) // frame
+    result = AudioAnalysis(file=name, duration=round(duration, 2))
+    if count == 0:
+        result.verdict, result.reason = "reject", "empty"
+        result.message = GUARDRAIL_MESSAGES["empty"]
+        return result
+
+    frames = samples[: count * frame].reshape(count, frame)
+    rms = np.sqrt(np.mean(np.square(frames, dtype=np.float32), axis=1))
+    db = 20 * np.log10(np.maximum(rms, 1e-6))
+    signs = np.signbit(frames)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / frame
+
+    noise_floor = float(np.percentile(db, 10))
+    speech_level = float(np.percentile(db, 95))
+    threshold = max(MIN_VOICED_DB, noise_floor + VOICED_MARGIN_DB)
+    voiced = (db > threshold) & (zcr < MAX_VOICED_ZCR)
+    voiced_seconds = float(np.count_nonzero(voiced)) * frame / rate
+    estimated_words = int(voiced_seconds * WORDS_PER_VOICED_SECOND)
+
+    result.rms_db = round(float(20 * np.log10(max(float(np.sqrt(np.mean(np.square(rms)))), 1e-6))), 1)
+    result.noise_floor_db = round(noise_floor, 1)
+    result.speech_level_db = round(speech_level, 1)
+    result.voiced_ratio = round(float(np.mean(voiced)), 3)
+    result.voiced_seconds = round(voiced_seconds, 2)
+    result.estimated_words = estimated_words
+
+    # Same precedence as the Silence Guardrail node
+    if not voiced.any():
+        reason = "empty"
+    elif voiced_seconds < MIN_VOICED_SECONDS:
+        reason = "too_short"
+    elif speech_level - noise_floor < MIN_SNR_DB:
+        reason = "low_quality"
+    elif duration > 5 and estimated_words < 3:
+        reason = "sparse"
+    else:
+        return result
+
+    result.verdict, result.reason = "reject", reason
+    result.message = GUARDRAIL_MESSAGES.get(reason) or (
+        f"Snimak od {round(duration)} sekundi sadrži samo {estimated_words} prepoznate riječi. "
+        "Provjerite mikrofon i okolnu buku."
+    )
+    return result
+
+
+def analyze_file(path: str | Path) -> AudioAnalysis:
+    path = Path(path)
+    try:
+        samples, rate = decode_audio(path)
+    except (OSError, RuntimeError, wave.Error, ValueError) as e:
+        return AudioAnalysis(file=str(path), verdict="error", message=str(e))
+    return analyze_samples(str(path), samples, rate)
+
+
+def analyze_many(files: list[Path], workers: int | None = None) -> list[AudioAnalysis]:
+    if workers == 1 or len(files) < 2:
+        return [analyze_file(f) for f in files]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(analyze_file, files, chunksize=4))
+
+
+def preflight_filter(files: list[Path], workers: int | None = None) -> tuple[list[Path], list[AudioAnalysis]]:
+    """Splits fixtures into those worth sending and the analyses of the rejected ones."""
+    analyses = analyze_many(files, workers)
+    passing = [f for f, a in zip(files, analyses) if a.passed]
+    rejected = [a for a in analyses if not a.passed]
+    return passing, rejected
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+
+    parser = argparse.ArgumentParser(description="Offline pre-flight check for audio fixtures")
+    parser.add_argument("paths", nargs="+")
+    parser.add_argument("--out")
+    parser.add_argument("--passing")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    files = collect_audio_files(args.paths)
+    analyses = analyze_many(files, args.workers)
+
+    print(f"{'file':40s} {'dur':>6s} {'floor':>6s} {'peak':>6s} {'voiced':>7s} verdict")
+    for a in analyses:
+        floor = f"{a.noise_floor_db:6.1f}" if a.noise_floor_db is not None else "     -"
+        peak = f"{a.speech_level_db:6.1f}" if a.speech_level_db is not None else "     -"
+        print(
+            f"{Path(a.file).name[:40]:40s} {a.duration:6.1f} {floor} {peak} "
+            f"{a.voiced_ratio:7.1%} {a.verdict}{f' ({a.reason})' if a.reason else ''}"
+        )
+        if not a.passed:
+            print(f"  → {a.message}")
+
+    passed = sum(a.passed for a in analyses)
+    print("-" * 60)
+    print(f"{passed}/{len(analyses)} recordings pass pre-flight")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump([asdict(a) for a in analyses], f, indent=2, ensure_ascii=False)
+    if args.passing:
+        with open(args.passing, "w", encoding="utf-8") as f:
+            f.writelines(f"{a.file}\n" for a in analyses if a.passed)
+
+    sys.exit(0 if passed == len(analyses) else 2)
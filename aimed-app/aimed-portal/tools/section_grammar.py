@@ -0,0 +1,183 @@
+"""
+Single-pass section tokenizer for AIMED report_text.
+
+Compiles the declarative grammar in aimed-app/src/lib/section-grammar.json
+(the same file report-parser.ts imports) into one token regex that walks the
+text once and returns section and warning spans as offsets into the original
+string. Content is only materialized when asked for.
+
+Usage:
+  python tools/section_grammar.py <report_file.txt>
+  python tools/section_grammar.py --spans corpus.jsonl > py-spans.ndjson
+
+Can also be imported and used programmatically:
+  from section_grammar import tokenize, parse_report
+  tokens = tokenize(report_text)
+  sections, warnings = parse_report(report_text)
+"""
+
+import json
+import re
+import sys
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+
+GRAMMAR_PATH = Path(__file__).resolve().parent.parent / "aimed-app" / "src" / "lib" / "section-grammar.json"
+
+
+@dataclass(slots=True)
+class SectionSpan:
+    title: str
+    filtered: bool
+    header_start: int
+    header_end: int
+    content_start: int
+    content_end: int
+
+    @property
+    def is_empty(self) -> bool:
+        return self.content_start == self.content_end
+
+
+@dataclass
+class ReportTokens:
+    sections: list[SectionSpan] = field(default_factory=list)
+    warnings: list[tuple[int, int]] = field(default_factory=list)
+
+
+def load_grammar(path: Path = GRAMMAR_PATH) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compile_token_pattern(grammar: dict) -> re.Pattern:
+    """
+    Compiles the grammar into one token regex. Each match skips blank space
+    (group 1) and then captures a warning line (group 2), a header line
+    (group 3) or a whole run of plain content lines (group 4), so the scan
+    costs one match per header/warning/block instead of one per line.
+    All bodies are trimmed: they start and end on a non-whitespace char.
+    """
+    ws = grammar["whitespace"]
+    header = grammar["header"]
+    letters = header["letters"]
+    solid = letters + header["symbols"]
+    inner = solid + header["innerWhitespace"]
+    middle = max(header["minLength"] - 2, 1)
+    prefix = re.escape(grammar["warningPrefix"])
+
+    header_re = f"(?=[{inner}]*[{letters}])[{solid}][{inner}]{{{middle},}}[{solid}]"
+    line_end = f"[{ws}]*(?:\\n|\\Z)"
+    line = f"[^{ws}\\n](?:[^\\n]*[^{ws}\\n])?"
+    return re.compile(
+        f"([{ws}\\n]*)(?:"
+        f"({prefix}(?:[^\\n]*[^{ws}\\n])?)(?={line_end})"
+        f"|({header_re})(?={line_end})"
+        f"|({line}(?:[{ws}\\n]*\\n[{ws}]*(?!{prefix}|{header_re}{line_end}){line})*)"
+        f")"
+    )
+
+
+GRAMMAR = load_grammar()
+TOKEN_RE = compile_token_pattern(GRAMMAR)
+STANDARD_SECTIONS = frozenset(GRAMMAR["standardSections"])
+FILTERED_SECTIONS = frozenset(GRAMMAR["filteredSections"])
+WARNING_PREFIX = GRAMMAR["warningPrefix"]
+_WHITESPACE_CHARS = GRAMMAR["whitespace"].encode("ascii").decode("unicode_escape")
+_TRAILING = re.compile(f"[{GRAMMAR['whitespace']}{GRAMMAR['normalize']['trailingPunctuation']}]+$")
+_SEPARATOR = GRAMMAR["normalize"]["compositeSeparator"]
+
+
+def _trim(value: str) -> str:
+    return value.strip(_WHITESPACE_CHARS)
+
+
+@lru_cache(maxsize=1024)
+def normalize_header(header: str) -> str:
+    """Maps variant headers to their base section, e.g. "PREPORUKE/KONTROLE" → "PREPORUKE"."""
+    cleaned = _trim(_TRAILING.sub("", header))
+    if _SEPARATOR in cleaned:
+        first = _trim(cleaned.split(_SEPARATOR)[0])
+        if first in STANDARD_SECTIONS:
+            return first
+    return cleaned
+
+
+def tokenize(text: str) -> ReportTokens:
+    tokens = ReportTokens()
+    current: SectionSpan | None = None
+
+    for m in TOKEN_RE.finditer(text):
+        kind = m.lastindex
+        if kind == 2:
+            tokens.warnings.append(m.span(2))
+        elif kind == 3:
+            start, end = m.span(3)
+            title = normalize_header(m.group(3))
+            current = SectionSpan(title, title in FILTERED_SECTIONS, start, end, end, end)
+            tokens.sections.append(current)
+        elif kind == 4 and current is not None:
+            start, end = m.span(4)
+            if current.content_start == current.content_end:
+                current.content_start = start
+            current.content_end = end
+
+    return tokens
+
+
+def section_content(text: str, span: SectionSpan) -> str:
+    """Materializes a section body: trimmed lines, warnings removed, inner blank lines kept."""
+    body = text[span.content_start:span.content_end]
+    if "\n" not in body:
+        return body
+    lines = [line.strip(_WHITESPACE_CHARS) for line in body.split("\n")]
+    if WARNING_PREFIX in body:
+        lines = [line for line in lines if not line.startswith(WARNING_PREFIX)]
+    return "\n".join(lines)
+
+
+def parse_report(text: str) -> tuple[list[tuple[str, str]], list[str]]:
+    """Python equivalent of parseReport() in report-parser.ts."""
+    tokens = tokenize(text)
+    sections = [
+        (span.title, section_content(text, span))
+        for span in tokens.sections
+        if not span.filtered
+    ]
+    warnings = [text[start:end] for start, end in tokens.warnings]
+    return sections, warnings
+
+
+def spans_record(report_id: str, text: str) -> dict:
+    tokens = tokenize(text)
+    return {
+        "id": report_id,
+        "sections": [
+            [s.title, s.filtered, s.header_start, s.header_end, s.content_start, s.content_end]
+            for s in tokens.sections
+        ],
+        "warnings": [list(w) for w in tokens.warnings],
+    }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "--spans":
+        with open(sys.argv[2], "r", encoding="utf-8") as f:
+            for lineno, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                payload = json.loads(line)
+                report_id = str(payload.get("id") or lineno)
+                record = spans_record(report_id, payload.get("report_text", ""))
+                print(json.dumps(record, ensure_ascii=False))
+    elif len(sys.argv) == 2:
+        with open(sys.argv[1], "r", encoding="utf-8") as f:
+            sections, warnings = parse_report(f.read())
+        for title, content in sections:
+            print(f"{title}\n{content}\n")
+        for w in warnings:
+            print(w)
+    else:
+        print(__doc__)
+        sys.exit(1)
@@ -0,0 +1,479 @@
+"""
+Local stand-in for the AIMED-transcribe-v5 n8n webhook.
+
+Speaks the v5 contract (multipart `audio`, `mode`, `preferred_sections`,
+`existing_data` in; `{success, sections, metadata}` or the Silence Guardrail
+error out) without n8n, ElevenLabs or Anthropic, so the /api/submit proxy,
+the client retry logic and tools/load_webhook.py can be benchmarked offline.
+
+Usage:
+  python tools/stub_webhook.py [options]
+
+Options:
+  --port PORT            Listen port (default: 5678, same as n8n)
+  --path PATH            Webhook path (default: /webhook/AIMED-transcribe-v5)
+  --segment-path PATH    STT-only segment webhook path (default: /webhook/AIMED-transcribe-segment)
+  --segment-latency SPEC Segment STT latency (default: uniform:0.8,2.0)
+  --latency SPEC         Response latency in seconds (default: lognormal:2.2,0.35)
+                           fixed:S | uniform:MIN,MAX | normal:MEAN,STD | lognormal:MU,SIGMA
+  --per-mb SECONDS       Extra latency per MB of audio (default: 0)
+  --error-rate P         Fraction of requests answered with HTTP 500 (default: 0)
+  --timeout-rate P       Fraction of requests that hang for --hang seconds (default: 0)
+  --hang SECONDS         Hang duration for injected timeouts (default: 130)
+  --silence-rate P       Fraction of requests answered with NO_SPEECH_DETECTED (default: 0)
+  --silence-bytes N      Audio smaller than N bytes is always "silent" (default: 2000)
+  --parse-error-rate P   Fraction of requests with an unparseable agent output (default: 0)
+  --replay DIR           Answer with recorded responses (<audio stem>.json, else round-robin)
+  --seed N               Seed for latency and error injection
+
+GET <path>/stats returns request counters, including how many requests carried
+audio the stub had already seen (duplicates the /api/submit cache should absorb)
+and the most report requests it had in flight at once (maxInFlight).
+POST <path>/stats/reset zeroes them.
+
+Async /api/submit jobs send `progress_url` + `progress_token`; the stub then
+reports transcribed / structured / validated along the way, like the
+Progress nodes in the workflow.
+
+Streamed dictations: the segment path answers like AIMED-transcribe-segment
+(text, words, language_probability), and a main request carrying a
+`transcript` field instead of audio skips the STT share of the latency.
+
+Point the app at it with:
+  AIMED_Transcribe_WEBHOOK_URL=http://localhost:5678/webhook/AIMED-transcribe-v5
+"""
+
+import argparse
+import email.parser
+import email.policy
+import hashlib
+import itertools
+import json
+import random
+import re
+import threading
+import time
+import urllib.request
+from collections import Counter
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+VERSION = "AIMED-transcribe-v5"
+ENGINE = "elevenlabs-scribe-v2"
+DEFAULT_SECTIONS = ["ANAMNEZA", "STATUS", "DIJAGNOZA", "TERAPIJA", "PREPORUKE"]
+
+# Same set as the Parse & Validate node
+ADMIN_BLACKLIST = {
+    "PODACI O PACIJENTU", "DATUM PREGLEDA", "IME I PREZIME", "JMBG",
+    "DATUM ROĐENJA", "ADRESA", "KONTAKT", "BROJ PROTOKOLA",
+    "MATIČNI BROJ", "DATUM NALAZA", "ZAKLJUČAK",
+}
+# Share of the response latency spent before each Progress node (STT, agent, validation)
+PROGRESS_STAGES = [("transcribed", 0.35), ("structured", 0.55), ("validated", 0.10)]
+KNOWN_DRUGS = ["Sumamed", "Brufen", "Amoksicilin", "Metformin", "Ibuprofen", "Diklofenak"]
+
+# Silence Guardrail reasons, verbatim from the workflow
+SILENCE_REASONS = [
+    "Nije detektovan govor u snimku. Molimo pokušajte ponovo.",
+    "Snimak sadrži premalo govora za obradu. Molimo diktirajte duže.",
+    "Kvalitet snimka je prenizak za pouzdanu transkripciju. Provjerite mikrofon.",
+    "Detektovane su samo popunjenice bez medicinskog sadržaja. Molimo diktirajte nalaz.",
+]
+
+CANNED_SECTIONS = {
+    "ANAMNEZA": "Pacijent se žali na bol u donjem dijelu leđa sa propagacijom u lijevu nogu. "
+                "Tegobe su počele prije tri dana nakon dizanja tereta.",
+    "STATUS": "Lasegueov test pozitivan lijevo na 40°. Krvni pritisak 130/85 mmHg.",
+    "DIJAGNOZA": "Ishijalgija (MKB-10: M54.3)",
+    "TERAPIJA": "Sumamed 500mg 1x1 per os 3 dana. Brufen 400mg 3x1 per os 5 dana.",
+    "PREPORUKE": "Kontrola za 10 dana. Mirovanje, izbjegavati dizanje tereta.",
+}
+
+
+def parse_latency(spec: str):
+    """Returns a zero-argument sampler for a latency spec like "uniform:5,15"."""
+    kind, _, params = spec.partition(":")
+    values = [float(v) for v in params.split(",")] if params else []
+    samplers = {
+        "fixed": (1, lambda rng, a: a),
+        "uniform": (2, lambda rng, a, b: rng.uniform(a, b)),
+        "normal": (2, lambda rng, mean, std: max(0.0, rng.gauss(mean, std))),
+        "lognormal": (2, lambda rng, mu, sigma: rng.lognormvariate(mu, sigma)),
+    }
+    if kind not in samplers or len(values) != samplers[kind][0]:
+        raise argparse.ArgumentTypeError(f"Invalid latency spec: {spec}")
+    fn = samplers[kind][1]
+    return lambda rng: fn(rng, *values)
+
+
+def parse_multipart(content_type: str, body: bytes) -> dict:
+    """Parses a multipart/form-data body into {name: str | (filename, bytes)}."""
+    message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+        b"Content-Type: " + content_type.encode("latin-1") + b"\r\n\r\n" + body
+    )
+    fields = {}
+    if not message.is_multipart():
+        return fields
+    for part in message.iter_parts():
+        name = part.get_param("name", header="content-disposition")
+        if not name:
+            continue
+        payload = part.get_payload(decode=True) or b""
+        filename = part.get_filename()
+        fields[name] = (filename, payload) if filename is not None else payload.decode("utf-8", "replace")
+    return fields
+
+
+def parse_json_field(value):
+    if not isinstance(value, str):
+        return value
+    try:
+        return json.loads(value)
+    except ValueError:
+        return None
+
+
+def detect_tools(sections: dict) -> list[str]:
+    """Same heuristics as Parse & Validate."""
+    all_text = " ".join(str(v) for v in sections.values())
+    tools = []
+    if re.search(r"MKB-10:|MKB10:", all_text):
+        tools.append("mkb10")
+    if re.search(r"\b[A-Z]\d{2}[A-Z]{2}\d{2}\b", all_text):
+        tools.append("atc_codes")
+    if any(d in all_text for d in KNOWN_DRUGS):
+        tools.append("drug_registry")
+    return tools
+
+
+def base_metadata(mode: str, confidence: float | None) -> dict:
+    now = datetime.now(timezone.utc)
+    return {
+        "generatedAt": now.isoformat(timespec="milliseconds").replace("+00:00", "Z"),
+        "datumNalaza": f"{now.day}. {now.month}. {now.year}.",
+        "version": VERSION,
+        "mode": mode,
+        "transcriptionEngine": ENGINE,
+        "transcriptionConfidence": confidence,
+    }
+
+
+def silence_response(mode: str, reason: str, audio_size: int) -> dict:
+    return {
+        "success": False,
+        "error": "NO_SPEECH_DETECTED",
+        "message": reason,
+        "sections": {},
+        "metadata": {
+            **base_metadata(mode, 0.12),
+            "guardrail": {
+                "triggered": True,
+                "reason": reason,
+                "transcriptLength": 0,
+                "wordCount": 0,
+                "duration": round(audio_size / 16000, 1),
+            },
+            "parseError": None,
+        },
+    }
+
+
+def report_response(fields: dict, audio_size: int, parse_error: bool) -> dict:
+    mode = fields.get("mode") or "new"
+    preferred = parse_json_field(fields.get("preferred_sections"))
+    expected = preferred if isinstance(preferred, list) and preferred else DEFAULT_SECTIONS
+    allowed = {s.upper() for s in expected}
+
+    if parse_error:
+        sections = {expected[0]: "Pacijent se žali na bol u leđima {nepotpun JSON"}
+        error = "Unexpected token p in JSON at position 1"
+    else:
+        error = None
+        if mode == "update":
+            existing = parse_json_field(fields.get("existing_data"))
+            sections = dict(existing) if isinstance(existing, dict) else {}
+            first = expected[0]
+            sections[first] = (str(sections.get(first) or "") + "\nDopuna: bez novih tegoba.").strip()
+        else:
+            sections = {s: CANNED_SECTIONS.get(s.upper(), "Uredan nalaz.") for s in expected}
+        sections = {
+            k: v for k, v in sections.items()
+            if k.upper() not in ADMIN_BLACKLIST
+            and (k == "_napomene" or k.upper() in allowed)
+            and v not in (None, "", "N/A", "n/a")
+        }
+
+    word_count = sum(len(str(v).split()) for v in sections.values())
+    return {
+        "success": not error,
+        "sections": sections,
+        "metadata": {
+            **base_metadata(mode, 0.97),
+            "toolsUsed": [] if error else detect_tools(sections),
+            "guardrail": {
+                "triggered": False,
+                "wordCount": word_count,
+                "duration": round(audio_size / 16000, 1),
+            },
+            "parseError": error,
+        },
+    }
+
+
+class ReplayStore:
+    """Recorded responses: <audio stem>.json when present, otherwise round-robin."""
+
+    def __init__(self, folder: str):
+        self.responses = {}
+        for path in sorted(Path(folder).glob("*.json")):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            # Responses saved straight from n8n may be single-item arrays
+            self.responses[path.stem] = data[0] if isinstance(data, list) and data else data
+        if not self.responses:
+            raise SystemExit(f"ERROR: No recorded responses (*.json) in {folder}")
+        self._cycle = itertools.cycle(list(self.responses.values()))
+        self._lock = threading.Lock()
+
+    def pick(self, filename: str | None) -> dict:
+        stem = Path(filename).stem if filename else None
+        if stem in self.responses:
+            return self.responses[stem]
+        with self._lock:
+            return next(self._cycle)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    server_version = "n8n-stub/1.0"
+    config: argparse.Namespace
+    replay: ReplayStore | None = None
+    rng = random.Random()
+    rng_lock = threading.Lock()
+    counter = itertools.count(1)
+    stats_lock = threading.Lock()
+    outcomes: Counter = Counter()
+    seen_audio: set[str] = set()
+    duplicates = 0
+    in_flight = 0
+    max_in_flight = 0
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status: int, payload: dict):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    @classmethod
+    def record(cls, audio_bytes: bytes, outcome: str):
+        digest = hashlib.sha256(audio_bytes).hexdigest()
+        with cls.stats_lock:
+            cls.outcomes[outcome] += 1
+            if digest in cls.seen_audio:
+                cls.duplicates += 1
+            cls.seen_audio.add(digest)
+
+    @classmethod
+    def snapshot(cls) -> dict:
+        with cls.stats_lock:
+            return {
+                "requests": sum(cls.outcomes.values()),
+                "distinctAudio": len(cls.seen_audio),
+                "duplicates": cls.duplicates,
+                "inFlight": cls.in_flight,
+                "maxInFlight": cls.max_in_flight,
+                "outcomes": dict(cls.outcomes),
+            }
+
+    def do_GET(self):
+        if self.path.split("?")[0] != self.config.path + "/stats":
+            self.send_json(404, {"code": 404, "message": f'The requested webhook "GET {self.path}" is not registered.'})
+            return
+        self.send_json(200, self.snapshot())
+
+    def handle_segment(self):
+        start = time.perf_counter()
+        length = int(self.headers.get("Content-Length") or 0)
+        fields = parse_multipart(self.headers.get("Content-Type", ""), self.rfile.read(length))
+        audio = fields.get("audio")
+        filename, audio_bytes = audio if isinstance(audio, tuple) else (None, b"")
+        with self.rng_lock:
+            latency = self.config.segment_latency(self.rng)
+
+        if audio is None:
+            status, payload, outcome = 500, {"code": 0, "message": "No binary data received."}, "no_audio"
+        else:
+            status, payload, outcome = 200, segment_transcript(len(audio_bytes)), "segment"
+        self.record(audio_bytes, outcome)
+
+        time.sleep(max(0.0, latency - (time.perf_counter() - start)))
+        try:
+            self.send_json(status, payload)
+        except (BrokenPipeError, ConnectionResetError):
+            outcome += " (client gone)"
+        print(f"seg    {str(filename)[:35]:35s} {len(audio_bytes) / 1024:8.1f} KB {outcome:12s} {time.perf_counter() - start:6.2f}s")
+
+    def do_POST(self):
+        if self.path.split("?")[0] == self.config.segment_path:
+            self.handle_segment()
+            return
+        if self.path.split("?")[0] == self.config.path + "/stats/reset":
+            with self.stats_lock:
+                StubHandler.outcomes.clear()
+                StubHandler.seen_audio.clear()
+                StubHandler.duplicates = 0
+                StubHandler.max_in_flight = StubHandler.in_flight
+            self.send_json(200, self.snapshot())
+            return
+        if self.path.split("?")[0] != self.config.path:
+            self.send_json(404, {"code": 404, "message": f'The requested webhook "POST {self.path}" is not registered.'})
+            return
+
+        # Concurrent report requests, to check the /api/submit concurrency limits
+        with self.stats_lock:
+            StubHandler.in_flight += 1
+            StubHandler.max_in_flight = max(StubHandler.max_in_flight, StubHandler.in_flight)
+        try:
+            self.handle_report()
+        finally:
+            with self.stats_lock:
+                StubHandler.in_flight -= 1
+
+    def handle_report(self):
+        start = time.perf_counter()
+        request_id = next(self.counter)
+        length = int(self.headers.get("Content-Length") or 0)
+        fields = parse_multipart(self.headers.get("Content-Type", ""), self.rfile.read(length))
+        audio = fields.get("audio")
+        filename, audio_bytes = audio if isinstance(audio, tuple) else (None, b"")
+        mode = fields.get("mode") or "new"
+        streamed = parse_json_field(fields.get("transcript"))
+        if isinstance(streamed, dict):
+            # Pre-transcribed: size checks use the transcript, and STT time is skipped
+            audio_bytes = str(streamed.get("text") or "").encode("utf-8")
+
+        with self.rng_lock:
+            roll = self.rng.random()
+            latency = self.config.latency(self.rng) + self.config.per_mb * len(audio_bytes) / 1e6
+            reason = self.rng.choice(SILENCE_REASONS)
+        if isinstance(streamed, dict):
+            latency *= 1 - PROGRESS_STAGES[0][1]
+
+        cfg = self.config
+        thresholds = itertools.accumulate([cfg.error_rate, cfg.timeout_rate, cfg.silence_rate, cfg.parse_error_rate])
+        error_at, timeout_at, silence_at, parse_error_at = thresholds
+
+        if audio is None and not isinstance(streamed, dict):
+            status, payload, outcome = 500, {"code": 0, "message": "No binary data received."}, "no_audio"
+        elif roll < error_at:
+            status, payload, outcome = 500, {"code": 0, "message": "Error in workflow"}, "error"
+        elif roll < timeout_at:
+            latency, status, payload, outcome = cfg.hang, 500, {"code": 0, "message": "Timeout"}, "timeout"
+        elif len(audio_bytes) < (10 if isinstance(streamed, dict) else cfg.silence_bytes):
+            status, payload, outcome = 200, silence_response(mode, SILENCE_REASONS[0], len(audio_bytes)), "silence"
+        elif roll < silence_at:
+            status, payload, outcome = 200, silence_response(mode, reason, len(audio_bytes)), "silence"
+        elif self.replay:
+            status, payload, outcome = 200, self.replay.pick(filename), "replay"
+        else:
+            parse_error = roll < parse_error_at
+            payload = report_response(fields, len(audio_bytes), parse_error)
+            status, outcome = 200, "parse_error" if parse_error else "ok"
+        self.record(audio_bytes, outcome)
+
+        progress_url = fields.get("progress_url")
+        if progress_url and status == 200 and outcome != "silence":
+            stages = PROGRESS_STAGES
+            if isinstance(streamed, dict):
+                # STT already happened during recording: report it straight away
+                stt_share = PROGRESS_STAGES[0][1]
+                stages = [("transcribed", 0.0)] + [(st, sh / (1 - stt_share)) for st, sh in PROGRESS_STAGES[1:]]
+            remaining = max(0.0, latency - (time.perf_counter() - start))
+            for stage, share in stages:
+                time.sleep(remaining * share)
+                report_progress(progress_url, fields.get("progress_token", ""), stage)
+
+        time.sleep(max(0.0, latency - (time.perf_counter() - start)))
+        try:
+            self.send_json(status, payload)
+        except (BrokenPipeError, ConnectionResetError):
+            outcome += " (client gone)"
+
+        print(
+            f"#{request_id:<5d} {mode:6s} {str(filename)[:28]:28s} {len(audio_bytes) / 1024:8.1f} KB "
+            f"{outcome:12s} {time.perf_counter() - start:6.2f}s"
+        )
+
+
+def segment_transcript(audio_size: int) -> dict:
+    """Synthetic Scribe output, roughly one word per 400 bytes of Opus audio."""
+    vocabulary = " ".join(CANNED_SECTIONS.values()).split()
+    count = max(1, audio_size // 400)
+    words = []
+    for i in range(count):
+        words.append({"text": vocabulary[i % len(vocabulary)], "start": i * 0.4, "end": i * 0.4 + 0.3, "type": "word"})
+    return {
+        "text": " ".join(w["text"] for w in words),
+        "words": words,
+        "language_probability": 0.97,
+    }
+
+
+def report_progress(url: str, token: str, stage: str):
+    request = urllib.request.Request(
+        url,
+        data=json.dumps({"stage": stage}).encode("utf-8"),
+        headers={"Content-Type": "application/json", "Authorization": f"Bearer {token}"},
+        method="POST",
+    )
+    try:
+        urllib.request.urlopen(request, timeout=3).close()
+    except OSError:
+        pass  # Same as the workflow: a lost callback never fails the request
+
+
+def probability(value: str) -> float:
+    p = float(value)
+    if not 0 <= p <= 1:
+        raise argparse.ArgumentTypeError(f"Expected a probability between 0 and 1, got {value}")
+    return p
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for the AIMED-transcribe-v5 webhook")
+    parser.add_argument("--port", type=int, default=5678)
+    parser.add_argument("--path", default="/webhook/AIMED-transcribe-v5")
+    parser.add_argument("--segment-path", default="/webhook/AIMED-transcribe-segment")
+    parser.add_argument("--segment-latency", type=parse_latency, default=parse_latency("uniform:0.8,2.0"))
+    parser.add_argument("--latency", type=parse_latency, default=parse_latency("lognormal:2.2,0.35"))
+    parser.add_argument("--per-mb", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=probability, default=0.0)
+    parser.add_argument("--timeout-rate", type=probability, default=0.0)
+    parser.add_argument("--hang", type=float, default=130.0)
+    parser.add_argument("--silence-rate", type=probability, default=0.0)
+    parser.add_argument("--silence-bytes", type=int, default=2000)
+    parser.add_argument("--parse-error-rate", type=probability, default=0.0)
+    parser.add_argument("--replay")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    if args.error_rate + args.timeout_rate + args.silence_rate + args.parse_error_rate > 1:
+        parser.error("Injection rates must add up to at most 1")
+
+    StubHandler.config = args
+    StubHandler.rng = random.Random(args.seed)
+    if args.replay:
+        StubHandler.replay = ReplayStore(args.replay)
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), StubHandler)
+    server.daemon_threads = True
+    print(f"Stub webhook listening on http://127.0.0.1:{args.port}{args.path}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopped.")
@@ -0,0 +1,137 @@
+"""
+Check the /api/submit admission queue against the local stub webhook.
+
+Doctor A submits a batch of async jobs at once (a clinic re-dictating a day's
+reports); a moment later doctor B submits one. The check follows every job
+through /api/jobs/<id> and verifies that:
+
+  - the stub never ran more reports at once than the two doctors' limits allow
+  - A's waiting jobs reported a queue position and an estimated wait
+  - B was not starved: B's report finished before most of A's batch
+  - every job finished with HTTP 200
+
+Prints the proxy's governor metrics at the end.
+
+Usage:
+  python tools/test_fair_queue.py <audio_file> --cookie COOKIE --other-cookie COOKIE [options]
+
+Options:
+  --proxy URL            /api/submit URL (default: http://localhost:3000/api/submit)
+  --stub URL             Stub webhook URL (default: http://127.0.0.1:5678/webhook/AIMED-transcribe-v5)
+  --cookie COOKIE        Session cookie of doctor A (sb-...-auth-token=...)
+  --other-cookie COOKIE  Session cookie of doctor B (a different account)
+  --batch N              Jobs doctor A submits at once (default: 10)
+  --per-doctor N         AIMED_MAX_CONCURRENT_PER_DOCTOR of the proxy (default: 2)
+
+Run the stub with a fixed latency so the queue builds up, e.g.:
+  python tools/stub_webhook.py --latency fixed:3
+  AIMED_Transcribe_WEBHOOK_URL=http://127.0.0.1:5678/webhook/AIMED-transcribe-v5 npm run dev
+"""
+
+import argparse
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+
+from test_idempotency import check, stub_stats
+from test_webhook import sniff_mime_type
+
+POLL_SECONDS = 0.5
+
+
+def start_job(proxy: str, cookie: str, path: Path, audio: bytes) -> str:
+    # Distinct bytes and key per job, so the submit cache never joins them
+    files = {"audio": (path.name, audio + uuid.uuid4().bytes, sniff_mime_type(path))}
+    headers = {"Cookie": cookie, "Idempotency-Key": str(uuid.uuid4()), "Prefer": "respond-async"}
+    response = requests.post(proxy, data={"mode": "new"}, files=files, headers=headers, timeout=120)
+    response.raise_for_status()
+    return response.json()["job_id"]
+
+
+def follow(base: str, jobs: dict[str, str], deadline: float) -> tuple[dict[str, dict], dict[str, list[dict]]]:
+    """Polls every job until done; returns final snapshots and the queue statuses each one reported."""
+    finished: dict[str, dict] = {}
+    queues: dict[str, list[dict]] = {job_id: [] for job_id in jobs}
+    while len(finished) < len(jobs) and time.time() < deadline:
+        for job_id, cookie in jobs.items():
+            if job_id in finished:
+                continue
+            snapshot = requests.get(f"{base}/api/jobs/{job_id}", headers={"Cookie": cookie}, timeout=10).json()
+            if snapshot.get("queue"):
+                queues[job_id].append(snapshot["queue"])
+            if snapshot.get("stage") == "done":
+                snapshot["finishedAt"] = time.time()
+                finished[job_id] = snapshot
+        time.sleep(POLL_SECONDS)
+    return finished, queues
+
+
+def run(args: argparse.Namespace) -> bool:
+    path = Path(args.audio_file)
+    audio = path.read_bytes()
+    base = args.proxy.split("/api/")[0]
+    requests.post(f"{args.stub}/stats/reset", timeout=10)
+    results = []
+
+    print(f"Doctor A submits {args.batch} jobs at once, doctor B one job right after...")
+    with ThreadPoolExecutor(max_workers=args.batch) as pool:
+        batch = list(pool.map(lambda _: start_job(args.proxy, args.cookie, path, audio), range(args.batch)))
+    other = start_job(args.proxy, args.other_cookie, path, audio)
+
+    jobs = {job_id: args.cookie for job_id in batch}
+    jobs[other] = args.other_cookie
+    finished, queues = follow(base, jobs, time.time() + 900)
+
+    results.append(check("all jobs finished", len(finished) == len(jobs), f"{len(finished)}/{len(jobs)}"))
+    statuses = [snapshot.get("status") for snapshot in finished.values()]
+    results.append(check("all 200", all(status == 200 for status in statuses), str(statuses)))
+
+    queued = [reported[0] for job_id, reported in queues.items() if job_id in batch and reported]
+    expected_queued = max(0, args.batch - args.per_doctor)
+    results.append(
+        check("A's waiting jobs showed their place", len(queued) >= expected_queued // 2, f"{len(queued)} reported a queue")
+    )
+    if queued:
+        first = max(queued, key=lambda status: status["position"])
+        print(f"       e.g. position {first['position']}, ~{first['estimatedWaitSeconds']} s")
+
+    if other in finished:
+        b_done = finished[other]["finishedAt"]
+        a_after = sum(1 for job_id in batch if job_id in finished and finished[job_id]["finishedAt"] > b_done)
+        results.append(check("B not starved by A's batch", a_after >= args.batch // 2, f"{a_after} of A's jobs finished after B"))
+
+    stats = stub_stats(args.stub)
+    limit = 2 * args.per_doctor  # two doctors
+    results.append(check("stub concurrency within limits", stats["maxInFlight"] <= limit, f"max {stats['maxInFlight']} in flight"))
+
+    metrics = requests.get(f"{args.proxy}/metrics", headers={"Cookie": args.cookie}, timeout=10)
+    if metrics.ok and "governor" in metrics.json():
+        governor = metrics.json()["governor"]
+        print(
+            f"\nGovernor: {governor['queued']} queued, mean wait {governor['meanWaitMs']} ms, "
+            f"{governor['rejectedFull'] + governor['rejectedTimeout']} rejected, "
+            f"service time {governor['serviceSeconds']} s"
+        )
+    return all(results)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+
+    parser = argparse.ArgumentParser(description="Check the /api/submit admission queue")
+    parser.add_argument("audio_file")
+    parser.add_argument("--proxy", default="http://localhost:3000/api/submit")
+    parser.add_argument("--stub", default="http://127.0.0.1:5678/webhook/AIMED-transcribe-v5")
+    parser.add_argument("--cookie", required=True)
+    parser.add_argument("--other-cookie", required=True)
+    parser.add_argument("--batch", type=int, default=10)
+    parser.add_argument("--per-doctor", type=int, default=2)
+    args = parser.parse_args()
+
+    sys.exit(0 if run(args) else 1)
@@ -0,0 +1,122 @@
+"""
+Check the /api/submit idempotency cache against the local stub webhook.
+
+Sends the same recording several times through the Next.js proxy — a
+concurrent burst sharing one Idempotency-Key, then a late retry — and checks
+that the stub only saw it once, that the X-Idempotency-Cache header says
+miss / inflight / hit as expected, and that reusing the key for different
+audio is refused with 422. Prints the proxy's cache metrics at the end.
+
+Usage:
+  python tools/test_idempotency.py <audio_file> --cookie COOKIE [options]
+
+Options:
+  --proxy URL       /api/submit URL (default: http://localhost:3000/api/submit)
+  --stub URL        Stub webhook URL (default: http://127.0.0.1:5678/webhook/AIMED-transcribe-v5)
+  --cookie COOKIE   Cookie header of a signed-in browser session (sb-...-auth-token=...)
+  --burst N         Concurrent duplicate submissions (default: 5)
+
+Run the stub with a latency longer than the burst spread, e.g.:
+  python tools/stub_webhook.py --latency fixed:3
+  AIMED_Transcribe_WEBHOOK_URL=http://127.0.0.1:5678/webhook/AIMED-transcribe-v5 npm run dev
+"""
+
+import argparse
+import hashlib
+import json
+import sys
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+
+from test_webhook import sniff_mime_type
+
+# Same order as FINGERPRINT_FIELDS in src/lib/submit-fingerprint.ts
+FINGERPRINT_FIELDS = [
+    "mode", "existing_report", "doctor_id", "existing_data", "preferred_sections", "dictation_session",
+]
+
+
+def fingerprint(audio: bytes, fields: dict[str, str]) -> str:
+    """Python port of fingerprintSubmission(): sha256(sha256(fields JSON) || sha256(audio))."""
+    field_json = json.dumps(
+        [fields.get(name) for name in FINGERPRINT_FIELDS], ensure_ascii=False, separators=(",", ":")
+    )
+    combined = hashlib.sha256(field_json.encode("utf-8")).digest() + hashlib.sha256(audio).digest()
+    return hashlib.sha256(combined).hexdigest()
+
+
+def submit(proxy: str, cookie: str, path: Path, audio: bytes, fields: dict[str, str], key: str) -> tuple[int, str]:
+    headers = {
+        "Cookie": cookie,
+        "Idempotency-Key": key,
+        "X-Content-Hash": fingerprint(audio, fields),
+    }
+    files = {"audio": (path.name, audio, sniff_mime_type(path))}
+    response = requests.post(proxy, data=fields, files=files, headers=headers, timeout=120)
+    return response.status_code, response.headers.get("X-Idempotency-Cache", "-")
+
+
+def stub_stats(stub: str) -> dict:
+    return requests.get(f"{stub}/stats", timeout=10).json()
+
+
+def check(label: str, ok: bool, detail: str) -> bool:
+    print(f"  {'OK  ' if ok else 'FAIL'} {label:34s} {detail}")
+    return ok
+
+
+def run(args: argparse.Namespace) -> bool:
+    path = Path(args.audio_file)
+    # Unique bytes per run so results cached by earlier runs don't count as hits
+    audio = path.read_bytes() + uuid.uuid4().bytes
+    fields = {"mode": "new"}
+    key = str(uuid.uuid4())
+    before = stub_stats(args.stub)["requests"]
+    results = []
+
+    print(f"Burst of {args.burst} identical submissions (one key)...")
+    with ThreadPoolExecutor(max_workers=args.burst) as pool:
+        burst = list(pool.map(lambda _: submit(args.proxy, args.cookie, path, audio, fields, key), range(args.burst)))
+    outcomes = Counter(cache for _, cache in burst)
+    results.append(check("all 200", all(status == 200 for status, _ in burst), str([s for s, _ in burst])))
+    results.append(check("one miss, rest joined", outcomes["miss"] == 1, str(dict(outcomes))))
+
+    status, cache = submit(args.proxy, args.cookie, path, audio, fields, key)
+    results.append(check("late retry served from cache", status == 200 and cache == "hit", f"{status} {cache}"))
+
+    status, _ = submit(args.proxy, args.cookie, path, audio + b"x", fields, key)
+    results.append(check("key reused for other audio → 422", status == 422, str(status)))
+
+    upstream = stub_stats(args.stub)["requests"] - before
+    results.append(check("stub saw one request", upstream == 1, f"{upstream} upstream"))
+
+    metrics = requests.get(f"{args.proxy}/metrics", headers={"Cookie": args.cookie}, timeout=10)
+    if metrics.ok:
+        data = metrics.json()
+        print(
+            f"\nProxy cache: hit rate {data['hitRate']:.0%} "
+            f"({data['hits']} hits, {data['inflightJoins']} joins, {data['misses']} misses), "
+            f"{data['entries']} entries, {data['hashMismatches']} hash mismatches"
+        )
+        results.append(check("client/server hashes agree", data["hashMismatches"] == 0, str(data["hashMismatches"])))
+    return all(results)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+
+    parser = argparse.ArgumentParser(description="Check the /api/submit idempotency cache")
+    parser.add_argument("audio_file")
+    parser.add_argument("--proxy", default="http://localhost:3000/api/submit")
+    parser.add_argument("--stub", default="http://127.0.0.1:5678/webhook/AIMED-transcribe-v5")
+    parser.add_argument("--cookie", required=True)
+    parser.add_argument("--burst", type=int, default=5)
+    args = parser.parse_args()
+
+    sys.exit(0 if run(args) else 1)
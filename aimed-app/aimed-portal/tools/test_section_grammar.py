@@ -0,0 +1,63 @@
+"""
+Regression check for report section parsing over fixed sample reports.
+
+tools/fixtures/section_reports.jsonl holds hand-written reports covering the
+edge cases (date lines, "EHO SRCA (TTE)", short code lines, warnings,
+repeated and composite headers, CRLF, BOM/NBSP, emoji) together with the
+output of the implementations that predate the shared grammar:
+
+  validator  ValidationResult of validate_report.py before section_grammar.py
+  parser     parseReport() of report-parser.ts before section-grammar.json
+             (sections and warnings; rawText is the input)
+
+This script checks validate_report() and section_grammar.parse_report()
+against them. scripts/check-report-parser.ts checks the TypeScript parser
+against the same file:
+
+  (cd aimed-app && npx tsx scripts/check-report-parser.ts)
+
+Usage:
+  python tools/test_section_grammar.py [fixtures.jsonl]
+"""
+
+import json
+import sys
+from dataclasses import asdict
+from pathlib import Path
+
+from section_grammar import parse_report
+from test_idempotency import check
+from validate_report import validate_report
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures" / "section_reports.jsonl"
+
+
+def first_difference(got: dict, want: dict) -> str:
+    for key in want:
+        if got.get(key) != want[key]:
+            return f"{key}: got {got.get(key)!r}, want {want[key]!r}"
+    return ""
+
+
+def run(path: Path) -> bool:
+    with open(path, "r", encoding="utf-8") as f:
+        cases = [json.loads(line) for line in f if line.strip()]
+
+    ok = True
+    for case in cases:
+        text = case["report_text"]
+        validator = asdict(validate_report(text))
+        sections, warnings = parse_report(text)
+        parser = {"sections": [{"title": t, "content": c} for t, c in sections], "warnings": warnings}
+
+        ok &= check(f"validator {case['id']}", validator == case["validator"],
+                    first_difference(validator, case["validator"]))
+        ok &= check(f"parser    {case['id']}", parser == case["parser"],
+                    first_difference(parser, case["parser"]))
+
+    print(f"{len(cases)} sample reports: {'all match' if ok else 'DIFFERENCES'}")
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run(Path(sys.argv[1]) if len(sys.argv) > 1 else FIXTURES) else 1)
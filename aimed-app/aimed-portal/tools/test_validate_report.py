@@ -0,0 +1,118 @@
+"""
+Offline checks for validate_report.py batch mode.
+
+Builds a JSONL corpus that mixes valid reports with records the exporter has
+been seen to produce (report_text null, a number or an object, non-object
+lines, broken JSON) and runs it through validate_batch() with a process pool.
+Checks that every line yields exactly one record, in input order, that bad
+records become per-record errors instead of aborting the batch, and that the
+summary counts them as unreadable.
+
+Usage:
+  python tools/test_validate_report.py [--workers N]
+
+Options:
+  --workers N   Process pool size for the batch (default: 2)
+"""
+
+import argparse
+import io
+import json
+import os
+import sys
+import tempfile
+
+from test_idempotency import check
+from validate_report import validate_batch
+
+VALID_REPORT = """DATUM PREGLEDA
+12.01.2025.
+
+PODACI O PACIJENTU
+Muškarac, 54 godine.
+
+ANAMNEZA
+Bol u grudima unazad dva dana.
+
+STATUS
+Srčana akcija ritmična, TA 140/90 mmHg.
+
+DIJAGNOZA
+I10 Esencijalna hipertenzija
+
+TERAPIJA
+Amlodipin 5 mg 1x1
+
+PREPORUKE / KONTROLA
+Kontrola za mjesec dana.
+"""
+
+# (JSONL line, expected outcome: "valid", "invalid" or "error")
+CORPUS = [
+    (json.dumps({"id": "ok-text", "report_text": VALID_REPORT}, ensure_ascii=False), "valid"),
+    (json.dumps({"id": "null-text", "report_text": None}), "invalid"),
+    (json.dumps({"id": "number-text", "report_text": 42}), "error"),
+    (json.dumps({"id": "object-text", "report_text": {"ANAMNEZA": "x"}}), "error"),
+    (json.dumps({"id": "list-text", "report_text": ["a", "b"]}), "error"),
+    ('["not", "an", "object"]', "error"),
+    ('"reports/passwd.txt"', "error"),
+    ("{broken json", "error"),
+    (json.dumps({
+        "id": "ok-sections",
+        "sections": {
+            "datum pregleda": "12.01.2025.",
+            "podaci o pacijentu": "Žena, 61 godina.",
+            "anamneza": "Vrtoglavica.",
+            "status": "Uredan.",
+            "dijagnoza": "R42 Vrtoglavica",
+            "terapija": "Betahistin 16 mg 2x1",
+            "preporuke / kontrola": "Kontrola po potrebi.",
+        },
+    }, ensure_ascii=False), "valid"),
+]
+
+
+def outcome(record: dict) -> str:
+    if "error" in record:
+        return "error"
+    return "valid" if record["is_valid"] else "invalid"
+
+
+def run(workers: int) -> bool:
+    # Repeat the corpus so bad records land in several chunks and workers
+    lines = [line for _ in range(20) for line, _ in CORPUS]
+    expected = [want for _ in range(20) for _, want in CORPUS]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "mixed.jsonl")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        out = io.StringIO()
+        try:
+            summary = validate_batch(path, out=out, workers=workers, chunk_size=7)
+        except Exception as e:  # anything escaping validate_batch is the bug
+            return check("batch completes", False, f"{type(e).__name__}: {e}")
+
+    records = [json.loads(line) for line in out.getvalue().splitlines()]
+    got = [outcome(r) for r in records]
+    mismatches = [i for i, (g, w) in enumerate(zip(got, expected)) if g != w]
+    unreadable = expected.count("error")
+
+    results = [
+        check("batch completes", True, f"{len(lines)} lines, {workers} workers"),
+        check("one record per line", len(records) == len(lines), f"{len(records)} records"),
+        check("outcome per record", not mismatches and len(got) == len(expected),
+              f"{len(mismatches)} mismatched" + (f" (first at line {mismatches[0] + 1})" if mismatches else "")),
+        check("ids in input order", records[0].get("id") == "ok-text" and records[-1].get("id") == "ok-sections",
+              f"{records[0].get('id')} … {records[-1].get('id')}"),
+        check("summary counts unreadable", summary.unreadable == unreadable and summary.total == len(lines),
+              f"total {summary.total}, unreadable {summary.unreadable}, valid {summary.valid}"),
+    ]
+    return all(results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline checks for validate_report.py batch mode")
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+    sys.exit(0 if run(args.workers) else 1)
@@ -1,26 +1,41 @@
 """
-Test the AIMED n8n webhook with a sample audio file.
+Test the AIMED n8n webhook with one or more sample audio files.
 
 Usage:
   python tools/test_webhook.py <audio_file> [webhook_url]
+  python tools/test_webhook.py <audio_file|folder> [...] [--url URL] [--out timings.json]
 
 Examples:
   python tools/test_webhook.py test_audio.webm
   python tools/test_webhook.py test_audio.webm https://your-n8n.com/webhook/AIMED
+  python tools/test_webhook.py fixtures/audio --out timings.json
 
 If webhook_url is not provided, reads from .env file (AIMED_WEBHOOK_URL).
+
+With several files (or a folder) all requests go over one pooled keep-alive
+session. Each multipart body is streamed from disk with its MIME type sniffed
+from the file header, and the timings are split into upload (body sent),
+TTFB (response headers received) and total, so a slow report can be pinned on
+the network or on the pipeline.
 """
 
+import argparse
 import sys
 import os
 import json
+import mimetypes
 import time
+import uuid
 import requests
 from pathlib import Path
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
 
 load_dotenv()
 
+UPLOAD_CHUNK_SIZE = 64 * 1024
+AUDIO_SUFFIXES = {".webm", ".ogg", ".opus", ".mp4", ".m4a", ".wav", ".mp3", ".flac"}
+
 
 def get_webhook_url(override: str | None = None) -> str:
     if override:
@@ -33,56 +48,228 @@ def get_webhook_url(override: str | None = None) -> str:
     return url
 
 
-def test_webhook(audio_path: str, webhook_url: str) -> dict:
+def sniff_mime_type(path: Path) -> str:
+    """Detects the audio container from its magic bytes, falling back to the extension."""
+    with open(path, "rb") as f:
+        head = f.read(16)
+    if head.startswith(b"\x1a\x45\xdf\xa3"):
+        return "audio/webm"
+    if head.startswith(b"OggS"):
+        return "audio/ogg"
+    if head.startswith(b"RIFF") and head[8:12] == b"WAVE":
+        return "audio/wav"
+    if head[4:8] == b"ftyp":
+        return "audio/mp4"
+    if head.startswith(b"fLaC"):
+        return "audio/flac"
+    if head.startswith(b"ID3") or (len(head) > 1 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0):
+        return "audio/mpeg"
+    return mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+
+
+class MultipartStream:
+    """
+    Multipart body that streams the file in chunks instead of loading it.
+    Defines __len__ so requests sends a Content-Length instead of chunked
+    encoding, and records when the last byte was handed to the socket.
+    """
+
+    def __init__(self, path: Path, fields: dict[str, str] | None = None, field_name: str = "audio"):
+        self.path = path
+        self.boundary = uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={self.boundary}"
+        self.mime_type = sniff_mime_type(path)
+        self.upload_done: float | None = None
+
+        parts = [
+            f'--{self.boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode("utf-8")
+            for name, value in (fields or {}).items()
+        ]
+        self.head = b"".join(parts) + (
+            f'--{self.boundary}\r\nContent-Disposition: form-data; name="{field_name}"; '
+            f'filename="{path.name}"\r\nContent-Type: {self.mime_type}\r\n\r\n'
+        ).encode("utf-8")
+        self.tail = f"\r\n--{self.boundary}--\r\n".encode("ascii")
+        self.file_size = path.stat().st_size
+
+    def __len__(self) -> int:
+        return len(self.head) + self.file_size + len(self.tail)
+
+    def __iter__(self):
+        yield self.head
+        with open(self.path, "rb") as f:
+            while chunk := f.read(UPLOAD_CHUNK_SIZE):
+                yield chunk
+        yield self.tail
+        # Only reached once the last chunk has been written to the socket
+        self.upload_done = time.perf_counter()
+
+
+def create_session(pool_size: int = 4) -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def post_audio(session: requests.Session, path: Path, webhook_url: str, timeout: float = 120) -> dict:
+    """Streams one file to the webhook and returns the response with split timings."""
+    body = MultipartStream(path)
+    start = time.perf_counter()
+    response = session.post(
+        webhook_url,
+        data=body,
+        headers={"Content-Type": body.content_type},
+        timeout=timeout,
+        stream=True,
+    )
+    # With stream=True, post() returns as soon as the status line and headers arrive
+    ttfb = time.perf_counter() - start
+    content = response.content
+    total = time.perf_counter() - start
+    upload = (body.upload_done - start) if body.upload_done else None
+
+    try:
+        data = json.loads(content)
+    except ValueError:
+        data = None
+    if isinstance(data, list) and data:
+        data = data[0]
+
+    return {
+        "file": path.name,
+        "size": body.file_size,
+        "mime_type": body.mime_type,
+        "status": response.status_code,
+        "upload": upload,
+        "ttfb": ttfb,
+        "total": total,
+        "success": response.status_code == 200 and isinstance(data, dict) and bool(data.get("success")),
+        "data": data if isinstance(data, dict) else None,
+        "text": content[:500].decode("utf-8", "replace"),
+    }
+
+
+def test_webhook(audio_path: str, webhook_url: str, session: requests.Session | None = None) -> dict:
     path = Path(audio_path)
     if not path.exists():
         print(f"ERROR: File not found: {audio_path}")
         sys.exit(1)
 
     file_size = path.stat().st_size
-    print(f"File: {path.name} ({file_size / 1024:.1f} KB)")
+    print(f"File: {path.name} ({file_size / 1024:.1f} KB, {sniff_mime_type(path)})")
     print(f"URL:  {webhook_url}")
     print(f"Sending...")
 
-    start = time.time()
-
-    with open(path, "rb") as f:
-        files = {"audio": (path.name, f, "audio/webm")}
-        response = requests.post(webhook_url, files=files, timeout=120)
-
-    elapsed = time.time() - start
+    result = post_audio(session or create_session(1), path, webhook_url)
 
-    print(f"Status: {response.status_code} ({elapsed:.1f}s)")
+    print(
+        f"Status: {result['status']} ({result['total']:.1f}s — "
+        f"upload {result['upload'] or 0:.2f}s, ttfb {result['ttfb']:.1f}s)"
+    )
     print("-" * 60)
 
-    if response.status_code == 200:
-        data = response.json()
+    data = result["data"]
+    if result["status"] == 200 and data is not None:
         if data.get("success"):
             print("SUCCESS")
             print()
-            print(data.get("report_text", "(no report_text)"))
+            if "report_text" in data:
+                print(data["report_text"])
+            else:
+                for title, content in (data.get("sections") or {}).items():
+                    print(f"{title}\n{content}\n")
         else:
             print("FAILED: success=false")
             print(json.dumps(data, indent=2, ensure_ascii=False))
     else:
-        print(f"HTTP ERROR: {response.status_code}")
-        print(response.text[:500])
+        print(f"HTTP ERROR: {result['status']}")
+        print(result["text"])
 
     print("-" * 60)
     return {
-        "status": response.status_code,
-        "elapsed": elapsed,
-        "success": response.status_code == 200 and response.json().get("success", False),
+        "status": result["status"],
+        "elapsed": result["total"],
+        "upload": result["upload"],
+        "ttfb": result["ttfb"],
+        "success": result["success"],
     }
 
 
+def collect_audio_files(paths: list[str]) -> list[Path]:
+    files = []
+    for p in map(Path, paths):
+        if p.is_dir():
+            files.extend(sorted(f for f in p.rglob("*") if f.suffix.lower() in AUDIO_SUFFIXES))
+        else:
+            files.append(p)
+    return files
+
+
+def test_many(files: list[Path], webhook_url: str) -> list[dict]:
+    """Sends files one after another over a single keep-alive session."""
+    print(f"URL:   {webhook_url}")
+    print(f"Files: {len(files)}")
+    print("-" * 86)
+    print(f"{'file':32s} {'KB':>8s} {'mime':12s} {'status':>6s} {'upload':>7s} {'ttfb':>7s} {'total':>7s}")
+
+    results = []
+    with create_session() as session:
+        for path in files:
+            try:
+                result = post_audio(session, path, webhook_url)
+            except requests.RequestException as e:
+                result = {"file": path.name, "error": type(e).__name__}
+            except OSError as e:
+                # Missing or unreadable file (RequestException is an OSError too, so it goes first)
+                result = {"file": path.name, "error": f"{type(e).__name__}: {e.strerror or e}"}
+            if "error" in result:
+                print(f"{path.name[:32]:32s} {'':8s} {'':12s} {result['error']}")
+                results.append(result)
+                continue
+            result.pop("text")
+            results.append(result)
+            print(
+                f"{path.name[:32]:32s} {result['size'] / 1024:8.1f} {result['mime_type'][6:18]:12s} "
+                f"{result['status']:6d} {result['upload'] or 0:7.2f} {result['ttfb']:7.2f} {result['total']:7.2f}"
+            )
+
+    done = [r for r in results if "total" in r]
+    if done:
+        print("-" * 86)
+        for key in ("upload", "ttfb", "total"):
+            values = [r[key] for r in done if r[key] is not None]
+            print(f"{key:7s} mean {sum(values) / len(values):6.2f}s  max {max(values):6.2f}s")
+        print(f"success {sum(r['success'] for r in done)}/{len(results)}")
+    return results
+
+
 if __name__ == "__main__":
     if len(sys.argv) < 2:
         print(__doc__)
         sys.exit(1)
 
-    audio_file = sys.argv[1]
-    url_override = sys.argv[2] if len(sys.argv) > 2 else None
+    parser = argparse.ArgumentParser(description="Test the AIMED n8n webhook")
+    parser.add_argument("paths", nargs="+")
+    parser.add_argument("--url")
+    parser.add_argument("--out")
+    args = parser.parse_args()
+
+    # Legacy form: test_webhook.py <audio_file> <webhook_url>
+    url_override = args.url
+    if not url_override and len(args.paths) > 1 and args.paths[-1].startswith(("http://", "https://")):
+        url_override = args.paths.pop()
 
     webhook_url = get_webhook_url(url_override)
-    test_webhook(audio_file, webhook_url)
+    files = collect_audio_files(args.paths)
+
+    if len(files) == 1 and not Path(args.paths[0]).is_dir():
+        results = [test_webhook(str(files[0]), webhook_url)]
+    else:
+        results = test_many(files, webhook_url)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"Timings written to {args.out}")
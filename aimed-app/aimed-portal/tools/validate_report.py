@@ -11,13 +11,34 @@ Usage:
   python tools/validate_report.py <report_file.txt>
   echo "REPORT TEXT" | python tools/validate_report.py
 
+Batch mode (directory, glob or JSONL of {"report_text": ...} / {"sections": {...}}):
+  python tools/validate_report.py --batch reports/ --out results.ndjson
+  python tools/validate_report.py --batch "exports/**/*.json" --workers 8
+  python tools/validate_report.py --batch nightly.jsonl --summary summary.json
+
+  Emits one ValidationResult per report as NDJSON (stdout or --out) and an
+  aggregate summary (stderr or --summary). Reports are streamed through a
+  process pool with a bounded number of in-flight batches, so memory use does
+  not grow with the size of the corpus.
+
 Can also be imported and used programmatically:
-  from validate_report import validate_report
+  from validate_report import validate_report, validate_batch
   result = validate_report(report_text)
+  summary = validate_batch("reports/", out=sys.stdout)
 """
 
+import argparse
+import glob
+import json
+import os
 import sys
-from dataclasses import dataclass, field
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import IO, Iterator
+
+from section_grammar import WARNING_PREFIX
 
 EXPECTED_SECTIONS = [
     "DATUM PREGLEDA",
@@ -31,6 +52,11 @@ EXPECTED_SECTIONS = [
 
 BOSNIAN_CHARS = set("čćšžđČĆŠŽĐ")
 
+JSONL_SUFFIXES = {".jsonl", ".ndjson"}
+REPORT_SUFFIXES = {".txt", ".json"}
+BATCH_CHUNK_SIZE = 64  # reports per worker task
+BATCH_WINDOW = 4  # in-flight tasks per worker
+
 
 @dataclass
 class ValidationResult:
@@ -43,6 +69,17 @@ class ValidationResult:
     issues: list[str] = field(default_factory=list)
 
 
+def is_validator_header(line: str) -> bool:
+    """
+    Any trimmed line of 3+ chars that upper() leaves unchanged and that does not
+    start with "[" (so "12.01.2025.", "EHO SRCA (TTE)" and "I10" count).
+    Deliberately looser than the report-parser grammar (section_grammar.py,
+    which needs a letter and a restricted charset): validation results and
+    their history are compared across runs, so this rule stays as it was.
+    """
+    return len(line) > 2 and line == line.upper() and not line.startswith("[")
+
+
 def validate_report(text: str) -> ValidationResult:
     result = ValidationResult()
 
@@ -51,37 +88,35 @@ def validate_report(text: str) -> ValidationResult:
         result.issues.append("Report text is empty")
         return result
 
-    lines = text.strip().split("\n")
-
-    # Parse sections
+    # Keyed by the raw header line; a repeated header restarts its section
+    section_empty: dict[str, bool] = {}
     current_section = None
-    section_content: dict[str, str] = {}
 
-    for line in lines:
+    for line in text.split("\n"):
         trimmed = line.strip()
         if not trimmed:
             continue
 
-        if trimmed.startswith("[NAPOMENA"):
+        if trimmed.startswith(WARNING_PREFIX):
             result.warnings.append(trimmed)
             continue
 
-        if trimmed == trimmed.toUpperCase() if hasattr(trimmed, 'toUpperCase') else trimmed == trimmed.upper() and len(trimmed) > 2 and not trimmed.startswith("["):
+        if is_validator_header(trimmed):
             current_section = trimmed
-            section_content[current_section] = ""
+            section_empty[current_section] = True
         elif current_section:
-            section_content[current_section] += trimmed + "\n"
+            section_empty[current_section] = False
 
-    result.sections_found = list(section_content.keys())
+    result.sections_found = list(section_empty.keys())
 
     # Check for expected sections
     for section in EXPECTED_SECTIONS:
-        if section not in section_content:
+        if section not in section_empty:
             result.sections_missing.append(section)
 
     # Check for empty sections
-    for section, content in section_content.items():
-        if not content.strip():
+    for section, is_empty in section_empty.items():
+        if is_empty:
             result.empty_sections.append(section)
 
     # Check diacritics
@@ -101,6 +136,184 @@ def validate_report(text: str) -> ValidationResult:
     return result
 
 
+def sections_to_text(sections: dict) -> str:
+    """Flatten structured v5 sections into report_text (same as /api/submit)."""
+    parts = []
+    for title, content in sections.items():
+        if content and isinstance(content, str):
+            parts.append(f"{title.upper()}\n{content}")
+    return "\n\n".join(parts)
+
+
+def payload_to_text(payload: dict) -> str:
+    if payload.get("report_text"):
+        return payload["report_text"]
+    sections = payload.get("sections")
+    if isinstance(sections, dict):
+        return sections_to_text(sections)
+    return ""
+
+
+# ── Batch mode ──
+
+
+@dataclass
+class BatchSummary:
+    total: int = 0
+    valid: int = 0
+    unreadable: int = 0
+    missing_sections: Counter = field(default_factory=Counter)
+    empty_sections: Counter = field(default_factory=Counter)
+    napomena_total: int = 0
+    reports_with_napomena: int = 0
+    without_diacritics: int = 0
+
+    def add(self, record: dict):
+        self.total += 1
+        if "error" in record:
+            self.unreadable += 1
+            return
+        if record["is_valid"]:
+            self.valid += 1
+        self.missing_sections.update(record["sections_missing"])
+        self.empty_sections.update(record["empty_sections"])
+        self.napomena_total += len(record["warnings"])
+        if record["warnings"]:
+            self.reports_with_napomena += 1
+        if not record["has_diacritics"]:
+            self.without_diacritics += 1
+
+    def to_dict(self) -> dict:
+        parsed = self.total - self.unreadable
+
+        def rate(count: int) -> float:
+            return round(count / parsed, 4) if parsed else 0.0
+
+        return {
+            "total": self.total,
+            "valid": self.valid,
+            "invalid": parsed - self.valid,
+            "unreadable": self.unreadable,
+            "valid_rate": rate(self.valid),
+            "missing_section_rates": {s: rate(self.missing_sections[s]) for s in EXPECTED_SECTIONS},
+            "empty_section_rates": {s: rate(n) for s, n in self.empty_sections.most_common()},
+            "napomena_total": self.napomena_total,
+            "reports_with_napomena": self.reports_with_napomena,
+            "napomena_per_report": round(self.napomena_total / parsed, 4) if parsed else 0.0,
+            "without_diacritics_rate": rate(self.without_diacritics),
+        }
+
+
+def iter_payloads(source: str) -> Iterator[tuple[str, str | dict]]:
+    """
+    Lazily yields (report_id, item) pairs from a directory, glob or JSONL file.
+
+    For files the item is the path (read by the worker, so the parent never
+    holds report text); for JSONL lines it is the decoded payload.
+    """
+    path = Path(source)
+    if path.is_file() and path.suffix in JSONL_SUFFIXES:
+        with open(path, "r", encoding="utf-8") as f:
+            for lineno, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                report_id = f"{path.name}:{lineno}"
+                try:
+                    payload = json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield report_id, {"_error": f"Invalid JSON: {e}"}
+                    continue
+                if not isinstance(payload, dict):
+                    # A bare string would otherwise be taken for a file path
+                    yield report_id, {"_error": f"Expected a JSON object, got {type(payload).__name__}"}
+                    continue
+                report_id = str(payload.get("id") or payload.get("report_id") or report_id)
+                yield report_id, payload
+        return
+
+    if path.is_dir():
+        paths = (
+            os.path.join(root, name)
+            for root, _, names in os.walk(path)
+            for name in names
+        )
+    elif path.is_file():
+        paths = iter([source])
+    else:
+        paths = glob.iglob(source, recursive=True)
+
+    for p in paths:
+        if Path(p).suffix in REPORT_SUFFIXES and os.path.isfile(p):
+            yield p, p
+
+
+def _load_item(item: str | dict) -> str:
+    if isinstance(item, dict):
+        if "_error" in item:
+            raise ValueError(item["_error"])
+        text = payload_to_text(item)
+    else:
+        with open(item, "r", encoding="utf-8") as f:
+            text = payload_to_text(json.load(f)) if item.endswith(".json") else f.read()
+    # report_text can be null, a number or an object in exported JSON
+    if not isinstance(text, str):
+        raise ValueError(f"report_text is {type(text).__name__}, expected a string")
+    return text
+
+
+def _validate_chunk(chunk: list[tuple[str, str | dict]]) -> list[dict]:
+    records = []
+    for report_id, item in chunk:
+        # One bad record must not fail the whole chunk (and with it the batch)
+        try:
+            text = _load_item(item)
+            records.append({"id": report_id, **asdict(validate_report(text))})
+        except (OSError, ValueError, AttributeError, TypeError) as e:
+            records.append({"id": report_id, "error": str(e)})
+    return records
+
+
+def _chunked(items: Iterator, size: int) -> Iterator[list]:
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def validate_batch(
+    source: str,
+    out: IO[str] = sys.stdout,
+    workers: int | None = None,
+    chunk_size: int = BATCH_CHUNK_SIZE,
+) -> BatchSummary:
+    """
+    Validates every report in `source`, writing one NDJSON record per report to
+    `out` in input order. Only `workers * BATCH_WINDOW` chunks are in flight at
+    any time, so memory stays flat regardless of corpus size.
+    """
+    workers = workers or os.cpu_count() or 1
+    summary = BatchSummary()
+    pending = deque()
+
+    def drain(limit: int):
+        while len(pending) > limit:
+            for record in pending.popleft().result():
+                summary.add(record)
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for chunk in _chunked(iter_payloads(source), chunk_size):
+            pending.append(pool.submit(_validate_chunk, chunk))
+            drain(workers * BATCH_WINDOW)
+        drain(0)
+
+    return summary
+
+
 def print_report(result: ValidationResult):
     status = "PASS" if result.is_valid else "FAIL"
     print(f"Validation: {status}")
@@ -125,9 +338,42 @@ def print_report(result: ValidationResult):
             print(f"  - {issue}")
 
 
+def run_batch(args: argparse.Namespace) -> int:
+    out = open(args.out, "w", encoding="utf-8") if args.out else sys.stdout
+    try:
+        summary = validate_batch(args.batch, out=out, workers=args.workers)
+    finally:
+        if args.out:
+            out.close()
+
+    summary_json = json.dumps(summary.to_dict(), indent=2, ensure_ascii=False)
+    if args.summary:
+        with open(args.summary, "w", encoding="utf-8") as f:
+            f.write(summary_json + "\n")
+    else:
+        print(summary_json, file=sys.stderr)
+    return 0 if summary.total and summary.valid == summary.total else 1
+
+
 if __name__ == "__main__":
-    if len(sys.argv) > 1:
-        with open(sys.argv[1], "r", encoding="utf-8") as f:
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("report_file", nargs="?")
+    parser.add_argument("--batch", metavar="SOURCE")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--out", metavar="FILE")
+    parser.add_argument("--summary", metavar="FILE")
+    parser.add_argument("-h", "--help", action="store_true")
+    args = parser.parse_args()
+
+    if args.help:
+        print(__doc__)
+        sys.exit(0)
+
+    if args.batch:
+        sys.exit(run_batch(args))
+
+    if args.report_file:
+        with open(args.report_file, "r", encoding="utf-8") as f:
             text = f.read()
     elif not sys.stdin.isatty():
         text = sys.stdin.read()
@@ -0,0 +1,1043 @@
+"""
+Offline replay of the AIMED-transcribe code nodes over recorded STT and agent outputs.
+
+Ports the v5 Silence Guardrail, Prepare Agent Context, Extract Mentions,
+Route Model, Silence Error Response and Parse & Validate nodes (and the v3 Build Claude Request / Parse JSON
+Response nodes) to Python, so they can be profiled, regression-tested and run
+without n8n. `check-js` executes the jsCode embedded in the workflow JSON with
+node over the same cases and diffs it against the port.
+
+A case is one JSON object (a line of a .jsonl file, or a .json file in a folder):
+  {
+    "id": "case-001",
+    "webhook": {"mode": "new", "preferred_sections": "[\\"ANAMNEZA\\"]", "existing_data": "{...}"},
+    "stt": {"text": "...", "language_probability": 0.97, "words": [...]},   # ElevenLabs response
+    "agent_output": "{\\"ANAMNEZA\\": \\"...\\"}",                        # v5 AI Agent output
+    "v3_output": "..."                                                     # optional, v3 Claude text
+  }
+
+Usage:
+  python tools/workflow_replay.py generate cases.jsonl [count]
+  python tools/workflow_replay.py run <cases.jsonl|folder> [--out results.jsonl]
+  python tools/workflow_replay.py bench <cases.jsonl|folder> [--rounds 5] [--js]
+  python tools/workflow_replay.py diff <cases.jsonl|folder>
+  python tools/workflow_replay.py check-js <cases.jsonl|folder>
+"""
+
+import argparse
+import json
+import math
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+
+WORKFLOWS_DIR = Path(__file__).resolve().parent.parent / "workflows"
+V5_WORKFLOW = WORKFLOWS_DIR / "AIMED-transcribe-v5.json"
+V3_WORKFLOW = WORKFLOWS_DIR / "AIMED-transcribe-v3.json"
+
+DEFAULT_SECTIONS = ["ANAMNEZA", "STATUS", "DIJAGNOZA", "TERAPIJA", "PREPORUKE"]
+ADMIN_BLACKLIST = {
+    "PODACI O PACIJENTU", "DATUM PREGLEDA", "IME I PREZIME", "JMBG",
+    "DATUM ROĐENJA", "ADRESA", "KONTAKT", "BROJ PROTOKOLA",
+    "MATIČNI BROJ", "DATUM NALAZA", "ZAKLJUČAK",
+}
+KNOWN_DRUGS = ["Sumamed", "Brufen", "Amoksicilin", "Metformin", "Ibuprofen", "Diklofenak"]
+
+# ── JavaScript semantics ──
+# The nodes rely on String.prototype.trim, JS \s, UTF-16 lengths, truthiness
+# and template-literal stringification; Python's defaults differ at the edges.
+
+JS_WHITESPACE = (
+    "\t\n\v\f\r \u00a0\u1680\u2000\u2001\u2002\u2003\u2004\u2005"
+    "\u2006\u2007\u2008\u2009\u200a\u2028\u2029\u202f\u205f\u3000\ufeff"
+)
+_JS_S = re.escape(JS_WHITESPACE)
+UNDEFINED = object()
+
+
+def js_trim(value: str) -> str:
+    return value.strip(JS_WHITESPACE)
+
+
+def js_length(value: str) -> int:
+    return len(value.encode("utf-16-le")) // 2
+
+
+def js_truthy(value) -> bool:
+    if value is UNDEFINED or value is None or value is False:
+        return False
+    if isinstance(value, (int, float)):
+        return value != 0 and not math.isnan(value)
+    if isinstance(value, str):
+        return value != ""
+    return True
+
+
+def js_round(value: float) -> int:
+    return math.floor(value + 0.5)
+
+
+def js_str(value) -> str:
+    """String(value), as used by template literals and Array.join."""
+    if value is UNDEFINED:
+        return "undefined"
+    if value is None:
+        return "null"
+    if value is True:
+        return "true"
+    if value is False:
+        return "false"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, list):
+        return ",".join("" if v is None or v is UNDEFINED else js_str(v) for v in value)
+    if isinstance(value, dict):
+        return "[object Object]"
+    return str(value)
+
+
+def js_upper(value) -> str:
+    if not isinstance(value, str):
+        raise TypeError("s.toUpperCase is not a function")
+    return value.upper()
+
+
+def _reject_constant(name: str):
+    raise ValueError(f"Unexpected token {name[0]} in JSON")
+
+
+def js_json_parse(text) -> object:
+    """JSON.parse: no NaN/Infinity, non-strings are stringified first."""
+    return json.loads(js_str(text), parse_constant=_reject_constant)
+
+
+def js_stringify(value, indent: int | None = None) -> str:
+    def integral(v):
+        if isinstance(v, float) and v.is_integer():
+            return int(v)
+        if isinstance(v, list):
+            return [integral(x) for x in v]
+        if isinstance(v, dict):
+            return {k: integral(x) for k, x in v.items()}
+        return v
+
+    separators = (",", ": ") if indent else (",", ":")
+    return json.dumps(integral(value), indent=indent, separators=separators, ensure_ascii=False)
+
+
+_ARRAY_INDEX = re.compile(r"0|[1-9]\d{0,9}")
+
+
+def js_object_entries(value) -> list[tuple[str, object]]:
+    """Object.entries: integer-like keys first (ascending), then insertion order."""
+    if value is None:
+        raise TypeError("Cannot convert undefined or null to object")
+    if isinstance(value, list):
+        return [(str(i), v) for i, v in enumerate(value)]
+    if isinstance(value, str):
+        return [(str(i), c) for i, c in enumerate(value)]
+    if not isinstance(value, dict):
+        return []
+    index_keys = sorted(
+        (k for k in value if _ARRAY_INDEX.fullmatch(k) and int(k) < 2**32 - 1), key=int
+    )
+    indexed = set(index_keys)
+    return [(k, value[k]) for k in index_keys] + [(k, v) for k, v in value.items() if k not in indexed]
+
+
+def _parse_form_json(value):
+    """`typeof x === 'string' ? JSON.parse(x) : x` inside a try/catch."""
+    if isinstance(value, str):
+        try:
+            return js_json_parse(value)
+        except ValueError:
+            return UNDEFINED
+    return value
+
+
+def _datum_nalaza(now: datetime) -> str:
+    # new Date().toLocaleDateString('bs-BA')
+    return f"{now.day}. {now.month}. {now.year}."
+
+
+def _timestamps(now: datetime | None) -> tuple[str, str]:
+    now = now or datetime.now(timezone.utc)
+    return now.isoformat(timespec="milliseconds").replace("+00:00", "Z"), _datum_nalaza(now)
+
+
+# ── v5 nodes ──
+
+_MEANINGFUL = re.compile(f"[{_JS_S}.,!?;:'\"()\\-]")
+_FILLER_ONLY = re.compile(
+    f"^[{_JS_S}]*(hm+|um+|uh+|ah+|eh+|oh+|mm+|ok|okej|da|ne|ovaj|znači|jel|ej|hej|halo|\\.{{2,}}|[,.{_JS_S}!?])+[{_JS_S}]*\\Z",
+    re.IGNORECASE,
+)
+
+
+def silence_guardrail(el_response: dict) -> dict:
+    """Silence Guardrail: flags empty, filler-only and unintelligible transcripts."""
+    transcript = js_trim(js_str(el_response.get("text"))) if js_truthy(el_response.get("text", UNDEFINED)) else ""
+    confidence = el_response.get("language_probability") if js_truthy(el_response.get("language_probability")) else 0
+    words = el_response.get("words") if js_truthy(el_response.get("words")) else []
+
+    last_word = words[-1] if words else None
+    duration = (last_word.get("end") or 0) if last_word else 0
+
+    is_silence = False
+    reason = None
+
+    if not transcript:
+        is_silence = True
+        reason = "Nije detektovan govor u snimku. Molimo pokušajte ponovo."
+    elif js_length(_MEANINGFUL.sub("", transcript)) < 10:
+        is_silence = True
+        reason = "Snimak sadrži premalo govora za obradu. Molimo diktirajte duže."
+    elif 0 < confidence < 0.25:
+        is_silence = True
+        reason = "Kvalitet snimka je prenizak za pouzdanu transkripciju. Provjerite mikrofon."
+    elif _FILLER_ONLY.search(transcript):
+        is_silence = True
+        reason = "Detektovane su samo popunjenice bez medicinskog sadržaja. Molimo diktirajte nalaz."
+
+    if not is_silence and duration > 5 and len(words) < 3:
+        is_silence = True
+        reason = (
+            f"Snimak od {js_round(duration)} sekundi sadrži samo {len(words)} prepoznate riječi. "
+            "Provjerite mikrofon i okolnu buku."
+        )
+
+    return {
+        **el_response,
+        "_guardrail": {
+            "isSilence": is_silence,
+            "silenceReason": reason,
+            "transcriptLength": js_length(transcript),
+            "wordCount": len(words),
+            "confidence": confidence,
+            "duration": js_round(duration * 10) / 10,
+        },
+    }
+
+
+def silence_error_response(guarded: dict, webhook: dict, now: datetime | None = None) -> dict:
+    """Silence Error Response: the NO_SPEECH_DETECTED payload."""
+    guardrail = guarded["_guardrail"]
+    generated_at, datum = _timestamps(now)
+    return {
+        "success": False,
+        "error": "NO_SPEECH_DETECTED",
+        "message": guardrail["silenceReason"] or "Nije detektovan govor. Molimo pokušajte ponovo.",
+        "sections": {},
+        "metadata": {
+            "generatedAt": generated_at,
+            "datumNalaza": datum,
+            "version": "AIMED-transcribe-v5",
+            "mode": webhook.get("mode") if js_truthy(webhook.get("mode")) else "new",
+            "transcriptionEngine": "elevenlabs-scribe-v2",
+            "transcriptionConfidence": guardrail["confidence"],
+            "guardrail": {
+                "triggered": True,
+                "reason": guardrail["silenceReason"],
+                "transcriptLength": guardrail["transcriptLength"],
+                "wordCount": guardrail["wordCount"],
+                "duration": guardrail["duration"],
+            },
+            "parseError": None,
+        },
+    }
+
+
+def _requested_sections(webhook: dict) -> list:
+    preferred = _parse_form_json(webhook.get("preferred_sections", UNDEFINED))
+    if js_truthy(preferred) and isinstance(preferred, list) and preferred:
+        return preferred
+    return list(DEFAULT_SECTIONS)
+
+
+def prepare_agent_context(guarded: dict, webhook: dict) -> dict:
+    """Prepare Agent Context: builds the AI Agent user message."""
+    transcript = js_trim(js_str(guarded.get("text"))) if js_truthy(guarded.get("text")) else ""
+    confidence = guarded.get("language_probability") if js_truthy(guarded.get("language_probability")) else None
+    guardrail = guarded.get("_guardrail") or {}
+
+    mode = webhook.get("mode") if js_truthy(webhook.get("mode")) else "new"
+    sections = _requested_sections(webhook)
+
+    existing_data = None
+    if mode == "update":
+        parsed = _parse_form_json(webhook.get("existing_data", UNDEFINED))
+        existing_data = None if parsed is UNDEFINED else parsed
+
+    section_list = ", ".join(f'"{js_str(s)}"' for s in sections)
+
+    if mode == "update" and js_truthy(existing_data):
+        user_message = (
+            "NAČIN RADA: AŽURIRANJE POSTOJEĆEG NALAZA\n\n"
+            f"POSTOJEĆI NALAZ (JSON):\n{js_stringify(existing_data, indent=2)}\n\n"
+            f"DOZVOLJENE SEKCIJE: {section_list}\n\n"
+            f"NOVI TRANSKRIPT S IZMJENAMA:\n{transcript}\n\n"
+            "INSTRUKCIJE:\n"
+            "- Primijeni SAMO eksplicitno diktirane izmjene na postojeći nalaz.\n"
+            "- Sekcije koje transkript ne pominje ostavi IDENTIČNE originalu.\n"
+            "- Za svaku dijagnozu u tekstu, koristi alat mkb10_pretraga da pronađeš tačnu MKB-10 šifru.\n"
+            "- Za svaki lijek u tekstu, koristi alat registar_lijekova da provjeriš i ispravi naziv.\n"
+            "- Vrati ISKLJUČIVO validan JSON objekat sa ažuriranim sekcijama."
+        )
+    else:
+        user_message = (
+            "NAČIN RADA: NOVI NALAZ\n\n"
+            f"DOZVOLJENE SEKCIJE: {section_list}\n\n"
+            f"TRANSKRIPT:\n{transcript}\n\n"
+            "INSTRUKCIJE:\n"
+            "- Semantički razvrstaš svaku rečenicu u odgovarajuću sekciju.\n"
+            "- Za svaku dijagnozu koju ljekar pomene, koristi alat mkb10_pretraga da pronađeš tačnu MKB-10 šifru.\n"
+            "- Za svaki lijek koji ljekar pomene, koristi alat registar_lijekova da provjeriš tačan naziv i dozu.\n"
+            "- Vrati ISKLJUČIVO validan JSON objekat. Uključi SAMO sekcije za koje postoji diktirani sadržaj."
+        )
+
+    return {
+        "userMessage": user_message,
+        "transcript": transcript,
+        "sections": sections,
+        "mode": mode,
+        "confidence": confidence,
+        "guardrailStats": {
+            "wordCount": guardrail.get("wordCount"),
+            "duration": guardrail.get("duration"),
+        },
+    }
+
+
+# Route Model tiers and thresholds; keep in sync with the node's jsCode
+ROUTING_ENABLED = True
+ROUTE_TIERS = {
+    "fast": {"model": "claude-haiku-4-5-20251001", "maxTokens": 4096},
+    "full": {"model": "claude-sonnet-4-5-20250929", "maxTokens": 8192},
+}
+FAST_MAX_WORDS = 150
+FAST_MAX_SECTIONS = 5
+FAST_MAX_ENTITIES = 4
+FAST_MAX_MESSAGE_CHARS = 8000
+
+_L = "A-Za-zČĆŽŠĐčćžšđ"
+# JS \d (no u flag) is ASCII-only; the letter class is spelled out in both
+_DOSE = re.compile(
+    rf"(?<![{_L}0-9])[0-9]+(?:[.,][0-9]+)?[{_JS_S}]*(?:mg|mcg|µg|g|ml|ij|miligram[{_L}]*|mikrogram[{_L}]*"
+    rf"|gram[{_L}]*|mililit[{_L}]*|jedinic[{_L}]*)(?![{_L}0-9])",
+    re.IGNORECASE,
+)
+_DRUG_FORM = re.compile(
+    rf"(?<![{_L}])(?:tablet[{_L}]*|tbl|kapsul[{_L}]*|sirup[{_L}]*|ampul[{_L}]*|injekcij[{_L}]*"
+    rf"|supozitorij[{_L}]*|kapi)(?![{_L}])",
+    re.IGNORECASE,
+)
+_DIAGNOSIS = re.compile(
+    rf"(?<![{_L}])(?:dijagnoz[{_L}]*|sindrom[{_L}]*|[{_L}]{{3,}}itis|[{_L}]{{3,}}oz[ae]|[{_L}]+algij[{_L}]*)(?![{_L}])",
+    re.IGNORECASE,
+)
+_ICD_CODE = re.compile(rf"(?<![{_L}0-9])[A-TV-Z][0-9]{{2}}(?:\.[0-9]{{1,2}})?(?![{_L}0-9])")
+_JS_SPLIT = re.compile(f"[{_JS_S}]+")
+
+# Extract Mentions; keep in sync with the node's jsCode
+MAX_MENTIONS = 12
+_UNIT = rf"(?:mg|mcg|µg|g|ml|ij|miligram[{_L}]*|mikrogram[{_L}]*|gram[{_L}]*|mililit[{_L}]*|jedinic[{_L}]*)"
+_FORM = rf"(?:tablet[{_L}]*|tbl|kapsul[{_L}]*|sirup[{_L}]*|ampul[{_L}]*|injekcij[{_L}]*|supozitorij[{_L}]*|kapi)"
+_DRUG_BEFORE_DOSE = re.compile(
+    rf"(?<![{_L}])([{_L}]{{3,}})[{_JS_S}]+(?:[0-9]+(?:[.,][0-9]+)?[{_JS_S}]*{_UNIT}|{_FORM})(?![{_L}])",
+    re.IGNORECASE,
+)
+_DRUG_BEFORE_NUMBER = re.compile(rf"(?<![{_L}])([A-ZČĆŽŠĐ][{_L}]{{2,}})[{_JS_S}]+[0-9]{{2,4}}(?![{_L}0-9.,/])")
+_DIAGNOSIS_LIST = re.compile(rf"(?<![{_L}])dijagnoz[{_L}]*[{_JS_S}]*:?[{_JS_S}]*([^.;\n(]{{3,160}})", re.IGNORECASE)
+_LIST_SEPARATOR = re.compile(f",|[{_JS_S}]+i[{_JS_S}]+|[{_JS_S}]+te[{_JS_S}]+")
+_LIST_VERB = re.compile(f"^[{_JS_S}]*(?:je|su)[{_JS_S}]+", re.IGNORECASE)
+_DIAGNOSIS_MENTION = re.compile(
+    rf"(?<![{_L}])(?:sindrom(?:[{_JS_S}]+[{_L}]{{3,}}){{1,2}}|[{_L}]{{3,}}itis|[{_L}]{{3,}}oz[ae]|[{_L}]+algij[{_L}]*)(?![{_L}])",
+    re.IGNORECASE,
+)
+NOT_A_DRUG = {
+    "dnevno", "puta", "jednom", "jedan", "jedna", "jednu", "dva", "dvije", "tri", "četiri",
+    "pet", "ujutro", "uveče", "navečer", "popodne", "doza", "dozi", "dozu", "dozom", "pritisak", "pritiska", "tlak",
+    "puls", "temperatura", "temperature", "stepeni", "dana", "sedmice", "mjeseca", "nakon", "prije", "oko", "još",
+    "ili", "uz", "sa", "pacijent", "pacijentica", "terapija", "terapiju", "lijek", "lijeka", "uzima", "uzimati",
+    "prima", "primati", "dati", "ordinirati", "ordiniram", "propisujem", "nastaviti", "povećati", "smanjiti",
+}
+NOT_A_DIAGNOSIS = {"dijagnoza", "dijagnoze", "prognoza", "prognoze", "doza", "doze", "hipoteza"}
+
+
+def _collect_mentions(matches: list[str], skip: set[str]) -> list[str]:
+    terms: list[str] = []
+    for raw in matches:
+        term = js_trim(_JS_SPLIT.sub(" ", raw))
+        key = term.lower()
+        if js_length(term) < 3 or key in skip or any(key in t.lower() for t in terms):
+            continue
+        terms.append(term)
+        if len(terms) >= MAX_MENTIONS:
+            break
+    return terms
+
+
+def extract_mentions(context: dict) -> dict:
+    """Extract Mentions: diagnosis and drug candidates for Pre-link Lookup."""
+    transcript = context.get("transcript") if js_truthy(context.get("transcript")) else ""
+    drugs = _collect_mentions(
+        [m.group(1) for m in _DRUG_BEFORE_DOSE.finditer(transcript)]
+        + [m.group(1) for m in _DRUG_BEFORE_NUMBER.finditer(transcript)],
+        NOT_A_DRUG,
+    )
+    listed = [
+        _LIST_VERB.sub("", _ICD_CODE.sub("", item))
+        for m in _DIAGNOSIS_LIST.finditer(transcript)
+        for item in _LIST_SEPARATOR.split(m.group(1))
+    ]
+    listed = [item for item in listed if len(_JS_SPLIT.split(js_trim(item))) <= 5]
+    diagnoses = _collect_mentions(
+        listed + _DIAGNOSIS_MENTION.findall(transcript) + _ICD_CODE.findall(transcript),
+        NOT_A_DIAGNOSIS,
+    )
+    return {**context, "mentions": {"diagnoses": diagnoses, "drugs": drugs}}
+
+
+def route_model(context: dict) -> dict:
+    """Route Model: picks the fast or full structuring model from transcript features."""
+    transcript = context.get("transcript") if js_truthy(context.get("transcript")) else ""
+    sections = context.get("sections") if js_truthy(context.get("sections")) else []
+    mode = context.get("mode") if js_truthy(context.get("mode")) else "new"
+
+    words = sum(1 for w in _JS_SPLIT.split(transcript) if w)
+    drugs = max(len(_DOSE.findall(transcript)), len(_DRUG_FORM.findall(transcript)))
+    diagnoses = len(_DIAGNOSIS.findall(transcript)) + len(_ICD_CODE.findall(transcript))
+    message_chars = js_length(context.get("userMessage") or "")
+
+    reasons = []
+    if not ROUTING_ENABLED:
+        reasons.append("routing_disabled")
+    if words > FAST_MAX_WORDS:
+        reasons.append("long_transcript")
+    if len(sections) > FAST_MAX_SECTIONS:
+        reasons.append("many_sections")
+    if drugs + diagnoses > FAST_MAX_ENTITIES:
+        reasons.append("many_entities")
+    if mode == "update" and message_chars > FAST_MAX_MESSAGE_CHARS:
+        reasons.append("large_existing_report")
+
+    tier = "full" if reasons else "fast"
+    return {
+        **context,
+        "route": {
+            "tier": tier,
+            "model": ROUTE_TIERS[tier]["model"],
+            "maxTokens": ROUTE_TIERS[tier]["maxTokens"],
+            "reasons": reasons,
+            "features": {
+                "words": words,
+                "sections": len(sections),
+                "drugs": drugs,
+                "diagnoses": diagnoses,
+                "mode": mode,
+                "messageChars": message_chars,
+            },
+        },
+    }
+
+
+_FENCE_JSON = re.compile(r"```json\n?")
+_FENCE = re.compile(r"```\n?")
+_MKB = re.compile(r"MKB-10:|MKB10:")
+_ATC = re.compile(r"\b[A-Z]\d{2}[A-Z]{2}\d{2}\b", re.ASCII)
+
+
+def _filter_sections(raw_output: str, expected: list) -> tuple[dict, str | None]:
+    """The try/catch block shared by v5 Parse & Validate and v3 Parse JSON Response."""
+    try:
+        cleaned = js_trim(_FENCE.sub("", _FENCE_JSON.sub("", raw_output)))
+        start, end = cleaned.find("{"), cleaned.rfind("}")
+        if start != -1 and end != -1 and end > start:
+            cleaned = cleaned[start:end + 1]
+
+        parsed = js_json_parse(cleaned)
+        allowed = {js_upper(s) for s in expected}
+        allowed.add("_napomene")
+
+        sections = {}
+        for key, value in js_object_entries(parsed):
+            upper = key.upper()
+            if upper in ADMIN_BLACKLIST:
+                continue
+            if key != "_napomene" and upper not in allowed:
+                continue
+            if value is None or (isinstance(value, str) and value in ("", "N/A", "n/a")):
+                continue
+            sections[key] = value
+        return sections, None
+    except (ValueError, TypeError) as e:
+        sections = {}
+        if raw_output and js_length(raw_output) > 10:
+            sections[js_str(expected[0])] = raw_output
+        return sections, str(e) or type(e).__name__
+
+
+def detect_tools_used(sections: dict) -> list[str]:
+    all_text = " ".join(js_str(v) for v in sections.values())
+    tools = []
+    if _MKB.search(all_text):
+        tools.append("mkb10")
+    if _ATC.search(all_text):
+        tools.append("atc_codes")
+    if any(d in all_text for d in KNOWN_DRUGS):
+        tools.append("drug_registry")
+    return tools
+
+
+def parse_and_validate(agent: dict, context: dict, now: datetime | None = None) -> dict:
+    """Parse & Validate: whitelist/blacklist filtering of the agent's JSON.
+
+    `context` is the Route Model output (Prepare Agent Context plus `mentions`,
+    `prelink` and `route`); `agent` may carry the AI Agent's intermediateSteps.
+    """
+    agent_output = next((agent[k] for k in ("output", "text") if js_truthy(agent.get(k))), "")
+    expected = context.get("sections") if js_truthy(context.get("sections")) else list(DEFAULT_SECTIONS)
+    mode = context.get("mode") if js_truthy(context.get("mode")) else "new"
+    stats = context.get("guardrailStats") if js_truthy(context.get("guardrailStats")) else {}
+    route = context.get("route") or {}
+    prelink = context.get("prelink") or None
+    steps = agent.get("intermediateSteps") or []
+    tool_calls = {
+        "mkb10": sum(1 for s in steps if (s.get("action") or {}).get("tool") == "mkb10_pretraga"),
+        "drugs": sum(1 for s in steps if (s.get("action") or {}).get("tool") == "registar_lijekova"),
+    }
+
+    sections, parse_error = _filter_sections(js_str(agent_output), expected)
+    tools_used = detect_tools_used(sections) if parse_error is None else []
+
+    generated_at, datum = _timestamps(now)
+    return {
+        "success": parse_error is None,
+        "sections": sections,
+        "metadata": {
+            "generatedAt": generated_at,
+            "datumNalaza": datum,
+            "version": "AIMED-transcribe-v5",
+            "mode": mode,
+            "transcriptionEngine": "elevenlabs-scribe-v2",
+            "transcriptionConfidence": context.get("confidence"),
+            "toolsUsed": tools_used,
+            "route": {
+                "tier": route.get("tier"),
+                "model": route.get("model"),
+                "reasons": route.get("reasons"),
+            },
+            "prelink": prelink and {"mentions": prelink.get("mentions"), "resolved": prelink.get("resolved")},
+            "toolCalls": tool_calls,
+            "guardrail": {
+                "triggered": False,
+                "wordCount": stats.get("wordCount"),
+                "duration": stats.get("duration"),
+            },
+            "parseError": parse_error,
+        },
+    }
+
+
+# ── v3 nodes ──
+
+def _v3_nodes() -> dict:
+    with open(V3_WORKFLOW, "r", encoding="utf-8") as f:
+        return {n["name"]: n["parameters"] for n in json.load(f)["nodes"]}
+
+
+def _v3_prompt_templates() -> tuple[str, str]:
+    """The update/new prompt templates, lifted from the v3 Build Claude Request node."""
+    code = _v3_nodes()["Build Claude Request"]["jsCode"]
+    templates = re.findall(r"prompt = `(.*?)`;", code, re.DOTALL)
+    if len(templates) != 2:
+        raise RuntimeError("Could not find both prompt templates in the v3 Build Claude Request node")
+    return templates[0], templates[1]
+
+
+_V3_TEMPLATES: tuple[str, str] | None = None
+_TEMPLATE_VAR = re.compile(r"\$\{([^}]+)\}")
+
+
+def _fill_template(template: str, values: dict) -> str:
+    return _TEMPLATE_VAR.sub(lambda m: values[m.group(1).strip()], template)
+
+
+def build_claude_request(stt: dict, webhook: dict) -> dict:
+    """v3 Build Claude Request: single-shot prompt for Claude Haiku."""
+    global _V3_TEMPLATES
+    if _V3_TEMPLATES is None:
+        _V3_TEMPLATES = _v3_prompt_templates()
+    update_template, new_template = _V3_TEMPLATES
+
+    transcript = stt.get("text", UNDEFINED)
+    mode = webhook.get("mode") if js_truthy(webhook.get("mode")) else "new"
+    sections = _requested_sections(webhook)
+    section_list = ", ".join(f'"{js_str(s)}"' for s in sections)
+    blacklist = ", ".join(
+        f'"{s}"' for s in [
+            "PODACI O PACIJENTU", "DATUM PREGLEDA", "IME I PREZIME", "JMBG",
+            "DATUM ROĐENJA", "ADRESA", "KONTAKT", "BROJ PROTOKOLA",
+            "MATIČNI BROJ", "DATUM NALAZA", "ZAKLJUČAK",
+        ]
+    )
+
+    existing_data = None
+    existing_report = None
+    if mode == "update":
+        parsed = _parse_form_json(webhook.get("existing_data", UNDEFINED))
+        existing_data = None if parsed is UNDEFINED else parsed
+        report = webhook.get("existing_report")
+        existing_report = report if js_truthy(report) else None
+
+    if mode == "update" and (js_truthy(existing_data) or js_truthy(existing_report)):
+        existing_json = js_stringify(existing_data, indent=2) if js_truthy(existing_data) else None
+        prompt = _fill_template(update_template, {
+            "sectionList": section_list,
+            "blacklistStr": blacklist,
+            "existingJson || existingReport": js_str(existing_json if js_truthy(existing_json) else existing_report),
+            "transcript": js_str(transcript),
+        })
+    else:
+        prompt = _fill_template(new_template, {
+            "sectionList": section_list,
+            "blacklistStr": blacklist,
+            "transcript": js_str(transcript),
+        })
+
+    request_body = {
+        "model": "claude-haiku-4-5-20251001",
+        "max_tokens": 4096,
+        "temperature": 0,
+        "messages": [{"role": "user", "content": prompt}],
+    }
+    return {"requestBody": js_stringify(request_body), "preferredSections": sections, "mode": mode}
+
+
+def parse_json_response(claude: dict, build: dict, now: datetime | None = None) -> dict:
+    """v3 Parse JSON Response."""
+    claude_response = claude["content"][0]["text"]
+    expected = build.get("preferredSections") if js_truthy(build.get("preferredSections")) else list(DEFAULT_SECTIONS)
+    mode = build.get("mode") if js_truthy(build.get("mode")) else "new"
+
+    if isinstance(claude_response, str):
+        sections, parse_error = _filter_sections(claude_response, expected)
+    else:
+        sections, parse_error = {}, "claudeResponse.replace is not a function"
+
+    generated_at, datum = _timestamps(now)
+    return {
+        "success": parse_error is None,
+        "sections": sections,
+        "metadata": {
+            "generatedAt": generated_at,
+            "datumNalaza": datum,
+            "version": "AIMED-transcribe-v4",
+            "mode": mode,
+            "parseError": parse_error,
+        },
+    }
+
+
+# ── Replay ──
+
+def load_cases(source: str) -> list[dict]:
+    path = Path(source)
+    if path.is_dir():
+        cases = []
+        for f in sorted(path.glob("*.json")):
+            with open(f, "r", encoding="utf-8") as fh:
+                case = json.load(fh)
+            case.setdefault("id", f.stem)
+            cases.append(case)
+        return cases
+    with open(path, "r", encoding="utf-8") as f:
+        return [
+            {"id": str(lineno), **json.loads(line)}
+            for lineno, line in enumerate(f, 1)
+            if line.strip()
+        ]
+
+
+def _agent_input(case: dict) -> dict:
+    return {"output": case.get("agent_output") or ""}
+
+
+def _claude_input(case: dict) -> dict:
+    return {"content": [{"text": case.get("v3_output") or case.get("agent_output") or ""}]}
+
+
+def run_case(case: dict, now: datetime | None = None) -> dict:
+    """Runs one case through both workflow versions, stage by stage."""
+    webhook = case.get("webhook") or {}
+    stt = case.get("stt") or {}
+    out = {"id": case["id"]}
+
+    guarded = silence_guardrail(stt)
+    out["guardrail"] = guarded["_guardrail"]
+    if guarded["_guardrail"]["isSilence"]:
+        out["v5"] = silence_error_response(guarded, webhook, now)
+    else:
+        context = prepare_agent_context(guarded, webhook)
+        out["prepare"] = context
+        extracted = extract_mentions(context)
+        out["mentions"] = extracted["mentions"]
+        routed = route_model(extracted)
+        out["route"] = routed["route"]
+        out["v5"] = parse_and_validate(_agent_input(case), routed, now)
+
+    build = build_claude_request(stt, webhook)
+    out["build"] = build
+    out["v3"] = parse_json_response(_claude_input(case), build, now)
+    return out
+
+
+def _time_stage(fn, inputs: list, rounds: int) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for args in inputs:
+            fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench(cases: list[dict], rounds: int = 5) -> dict[str, tuple[int, float]]:
+    """Per-stage best-of-N timings of the Python port: {stage: (items, seconds)}."""
+    now = datetime.now(timezone.utc)
+    webhooks = [c.get("webhook") or {} for c in cases]
+    stts = [c.get("stt") or {} for c in cases]
+    guarded = [silence_guardrail(s) for s in stts]
+    speech = [(g, w, c) for g, w, c in zip(guarded, webhooks, cases) if not g["_guardrail"]["isSilence"]]
+    silent = [(g, w) for g, w in zip(guarded, webhooks) if g["_guardrail"]["isSilence"]]
+    prepared = [prepare_agent_context(g, w) for g, w, _ in speech]
+    contexts = [route_model(extract_mentions(ctx)) for ctx in prepared]
+    builds = [build_claude_request(s, w) for s, w in zip(stts, webhooks)]
+
+    stages = [
+        ("v5 guardrail", silence_guardrail, [(s,) for s in stts]),
+        ("v5 silence", silence_error_response, [(g, w, now) for g, w in silent]),
+        ("v5 prepare", prepare_agent_context, [(g, w) for g, w, _ in speech]),
+        ("v5 mentions", extract_mentions, [(ctx,) for ctx in prepared]),
+        ("v5 route", route_model, [(ctx,) for ctx in contexts]),
+        ("v5 parse", parse_and_validate, [(_agent_input(c), ctx, now) for (_, _, c), ctx in zip(speech, contexts)]),
+        ("v3 build", build_claude_request, [(s, w) for s, w in zip(stts, webhooks)]),
+        ("v3 parse", parse_json_response, [(_claude_input(c), b, now) for c, b in zip(cases, builds)]),
+    ]
+    return {name: (len(inputs), _time_stage(fn, inputs, rounds)) for name, fn, inputs in stages}
+
+
+def print_bench(title: str, timings: dict[str, tuple[int, float]]):
+    print(title)
+    for stage, (count, seconds) in timings.items():
+        if not count:
+            print(f"  {stage:14s} {'-':>12s}")
+            continue
+        print(f"  {stage:14s} {count / seconds:12.0f} items/s  {seconds / count * 1e6:8.1f} µs/item  ({count} items)")
+
+
+def comparable(result: dict) -> dict:
+    """Drops wall-clock fields and engine-specific error text before diffing."""
+    result = json.loads(json.dumps(result, ensure_ascii=False))
+    meta = result.get("metadata") or {}
+    meta.pop("generatedAt", None)
+    meta.pop("datumNalaza", None)
+    if "parseError" in meta:
+        meta["parseError"] = bool(meta["parseError"])
+    return result
+
+
+def diff_versions(results: list[dict]) -> Counter:
+    """Buckets each case by how the v3 and v5 responses differ."""
+    buckets = Counter()
+    examples: dict[str, str] = {}
+    for r in results:
+        v3, v5 = r["v3"], r["v5"]
+        if v5.get("error") == "NO_SPEECH_DETECTED":
+            bucket = "v5 guardrail rejects (v3 calls the model)"
+        elif v3["success"] != v5["success"]:
+            bucket = "success differs"
+        elif v3["sections"] != v5["sections"]:
+            bucket = "sections differ" if set(v3["sections"]) == set(v5["sections"]) else "section keys differ"
+        else:
+            bucket = "same sections"
+        buckets[bucket] += 1
+        examples.setdefault(bucket, r["id"])
+    return buckets, examples
+
+
+# Evaluates the workflow's own jsCode with minimal `$json` / `$('Node')` shims.
+JS_RUNNER = r"""
+const fs = require('fs');
+const [, , v5Path, v3Path, casesPath, mode, roundsArg] = process.argv;
+// Only the synchronous nodes replayed below; the Progress nodes await HTTP callbacks
+const REPLAYED = new Set(['Silence Guardrail', 'Silence Error Response', 'Prepare Agent Context', 'Extract Mentions',
+  'Route Model', 'Parse & Validate', 'Build Claude Request', 'Parse JSON Response']);
+const load = (p) => Object.fromEntries(
+  JSON.parse(fs.readFileSync(p, 'utf-8')).nodes
+    .filter((n) => n.parameters && n.parameters.jsCode && REPLAYED.has(n.name))
+    .map((n) => [n.name, new Function('$json', '$', n.parameters.jsCode)])
+);
+const v5 = load(v5Path);
+const v3 = load(v3Path);
+const refs = (nodes) => (name) => ({ item: { json: nodes[name] } });
+const attempt = (fn) => { try { return fn(); } catch (e) { return { __error: String(e.message || e) }; } };
+const cases = fs.readFileSync(casesPath, 'utf-8').split('\n').filter((l) => l.trim()).map((l) => JSON.parse(l));
+
+function runCase(c) {
+  const webhook = { body: c.webhook || {} };
+  const stt = c.stt || {};
+  const out = { id: c.id };
+  const guarded = attempt(() => v5['Silence Guardrail'](stt, refs({ Webhook: webhook })));
+  out.guardrail = guarded._guardrail || guarded;
+  if (guarded._guardrail && guarded._guardrail.isSilence) {
+    out.v5 = attempt(() => v5['Silence Error Response'](guarded, refs({ Webhook: webhook })));
+  } else if (guarded._guardrail) {
+    const context = attempt(() => v5['Prepare Agent Context'](guarded, refs({ Webhook: webhook })));
+    out.prepare = context;
+    const extracted = attempt(() => v5['Extract Mentions'](context, refs({ Webhook: webhook })));
+    out.mentions = extracted.mentions || extracted;
+    const routed = attempt(() => v5['Route Model'](extracted, refs({ Webhook: webhook })));
+    out.route = routed.route || routed;
+    out.v5 = attempt(() => v5['Parse & Validate']({ output: c.agent_output || '' },
+      refs({ Webhook: webhook, 'Prepare Agent Context': context, 'Route Model': routed })));
+  }
+  const build = attempt(() => v3['Build Claude Request'](stt, refs({ Webhook: webhook })));
+  out.build = build;
+  out.v3 = attempt(() => v3['Parse JSON Response']({ content: [{ text: c.v3_output || c.agent_output || '' }] },
+    refs({ Webhook: webhook, 'Build Claude Request': build })));
+  return out;
+}
+
+if (mode === 'bench') {
+  const rounds = Number(roundsArg) || 5;
+  const results = cases.map(runCase);
+  const webhooks = cases.map((c) => ({ body: c.webhook || {} }));
+  const speech = results.map((r, i) => [r, i]).filter(([r]) => r.prepare);
+  const silent = results.map((r, i) => [r, i]).filter(([r]) => !r.prepare);
+  const guardedOf = (i) => ({ ...(cases[i].stt || {}), _guardrail: results[i].guardrail });
+  const stages = {
+    'v5 guardrail': cases.map((c, i) => () => v5['Silence Guardrail'](c.stt || {}, refs({ Webhook: webhooks[i] }))),
+    'v5 silence': silent.map(([, i]) => () => v5['Silence Error Response'](guardedOf(i), refs({ Webhook: webhooks[i] }))),
+    'v5 prepare': speech.map(([, i]) => () => v5['Prepare Agent Context'](guardedOf(i), refs({ Webhook: webhooks[i] }))),
+    'v5 mentions': speech.map(([r, i]) => () => v5['Extract Mentions'](r.prepare, refs({ Webhook: webhooks[i] }))),
+    'v5 route': speech.map(([r, i]) => () => v5['Route Model']({ ...r.prepare, mentions: r.mentions },
+      refs({ Webhook: webhooks[i] }))),
+    'v5 parse': speech.map(([r, i]) => () => v5['Parse & Validate']({ output: cases[i].agent_output || '' },
+      refs({ Webhook: webhooks[i], 'Prepare Agent Context': r.prepare,
+        'Route Model': { ...r.prepare, mentions: r.mentions, route: r.route } }))),
+    'v3 build': cases.map((c, i) => () => v3['Build Claude Request'](c.stt || {}, refs({ Webhook: webhooks[i] }))),
+    'v3 parse': results.map((r, i) => () => v3['Parse JSON Response'](
+      { content: [{ text: cases[i].v3_output || cases[i].agent_output || '' }] },
+      refs({ Webhook: webhooks[i], 'Build Claude Request': r.build }))),
+  };
+  const timings = {};
+  for (const [stage, calls] of Object.entries(stages)) {
+    for (const call of calls) call();  // warm up the JIT
+    let best = Infinity;
+    for (let r = 0; r < rounds; r++) {
+      const start = process.hrtime.bigint();
+      for (const call of calls) call();
+      best = Math.min(best, Number(process.hrtime.bigint() - start) / 1e9);
+    }
+    timings[stage] = [calls.length, best];
+  }
+  console.log(JSON.stringify(timings));
+} else {
+  for (const c of cases) console.log(JSON.stringify(runCase(c)));
+}
+"""
+
+
+def run_js(cases: list[dict], mode: str = "run", rounds: int = 5) -> list[dict] | dict:
+    if not shutil.which("node"):
+        raise SystemExit("ERROR: node not found on PATH (needed to execute the embedded jsCode)")
+    with tempfile.TemporaryDirectory() as tmp:
+        runner = Path(tmp) / "runner.js"
+        runner.write_text(JS_RUNNER, encoding="utf-8")
+        cases_path = Path(tmp) / "cases.jsonl"
+        with open(cases_path, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(c, ensure_ascii=False) + "\n" for c in cases)
+        result = subprocess.run(
+            ["node", str(runner), str(V5_WORKFLOW), str(V3_WORKFLOW), str(cases_path), mode, str(rounds)],
+            capture_output=True,
+            text=True,
+            encoding="utf-8",
+            check=False,
+        )
+    if result.returncode != 0:
+        raise SystemExit(f"ERROR: node runner failed:\n{result.stderr}")
+    if mode == "bench":
+        return {k: tuple(v) for k, v in json.loads(result.stdout).items()}
+    return [json.loads(line) for line in result.stdout.splitlines() if line.strip()]
+
+
+def check_js(cases: list[dict]) -> int:
+    """Diffs every stage of the Python port against the embedded jsCode."""
+    js_results = {r["id"]: r for r in run_js(cases)}
+    differences = 0
+    for case in cases:
+        py = run_case(case)
+        js = js_results.get(case["id"], {})
+        for stage in ("guardrail", "prepare", "mentions", "route", "v5", "build", "v3"):
+            py_stage = comparable(py[stage]) if stage in py else None
+            js_stage = comparable(js[stage]) if stage in js else None
+            if py_stage != js_stage:
+                differences += 1
+                if differences <= 10:
+                    print(f"DIFF {case['id']} [{stage}]\n  py: {py_stage}\n  js: {js_stage}")
+    print(f"Stage differences vs embedded JS: {differences} ({len(cases)} cases)")
+    return differences
+
+
+# ── Synthetic corpus ──
+
+_SENTENCES = [
+    "Pacijent se žali na bol u donjem dijelu leđa sa propagacijom u lijevu nogu.",
+    "Tegobe traju tri dana.",
+    "Lasegueov test pozitivan lijevo na 40 stepeni, krvni pritisak 130/85.",
+    "Dijagnoza ishijalgija.",
+    "Sumamed 500 miligrama jedan puta dnevno tri dana.",
+    "Kontrola za deset dana.",
+]
+_FILLERS = ["hm", "ovaj", "da", "ok", "ehm", "znači", "...", "uh"]
+
+
+def _words(text: str, rng: random.Random, duration: float | None = None) -> list[dict]:
+    tokens = text.split()
+    if not tokens:
+        return []
+    step = (duration or len(tokens) * 0.4) / len(tokens)
+    words, t = [], 0.0
+    for i, token in enumerate(tokens):
+        words.append({"text": token, "start": round(t, 2), "end": round(t + step * 0.8, 2), "type": "word"})
+        if i < len(tokens) - 1:
+            words.append({"text": " ", "start": round(t + step * 0.8, 2), "end": round(t + step, 2), "type": "spacing"})
+        t += step
+    return words
+
+
+def generate_case(i: int, rng: random.Random) -> dict:
+    kind = rng.choices(
+        ["speech", "empty", "short", "filler", "low_conf", "sparse"],
+        weights=[70, 6, 6, 8, 5, 5],
+    )[0]
+    if kind == "empty":
+        text, words = rng.choice(["", "   ", " "]), []
+    elif kind == "short":
+        text = rng.choice(["Da.", "Ok, hm.", "Bol."])
+        words = _words(text, rng)
+    elif kind == "filler":
+        text = " ".join(rng.choice(_FILLERS) for _ in range(rng.randint(2, 6)))
+        words = _words(text, rng)
+    elif kind == "sparse":
+        text = "Bol u leđima pacijent"
+        words = [{"text": "Bol u leđima pacijent", "start": 1.0, "end": rng.uniform(5.5, 40), "type": "word"}]
+    else:
+        text = " ".join(rng.sample(_SENTENCES, rng.randint(2, len(_SENTENCES))))
+        words = _words(text, rng)
+
+    confidence = rng.uniform(0.05, 0.2) if kind == "low_conf" else rng.choice([rng.uniform(0.8, 1.0), 0, None])
+    sections = rng.choice([None, None, ["ANAMNEZA", "DIJAGNOZA", "TERAPIJA"], ["anamneza", "STATUS", "ZAKLJUČAK"]])
+    mode = "update" if rng.random() < 0.2 else "new"
+
+    webhook = {"mode": mode}
+    if sections is not None:
+        webhook["preferred_sections"] = json.dumps(sections, ensure_ascii=False)
+    if mode == "update":
+        webhook["existing_data"] = rng.choice([
+            json.dumps({"ANAMNEZA": "Bol u leđima.", "TERAPIJA": "Brufen 400mg"}, ensure_ascii=False),
+            "{}",
+            "nevalidan json",
+        ])
+
+    body = {
+        "ANAMNEZA": "Pacijent se žali na bol u donjem dijelu leđa.",
+        "STATUS": "Lasegue pozitivan lijevo na 40°. TA 130/85 mmHg.",
+        "DIJAGNOZA": "Ishijalgija (MKB-10: M54.3)",
+        "TERAPIJA": rng.choice(["Sumamed 500mg 1x1 per os 3 dana (J01FA10)", "N/A", ""]),
+        "PREPORUKE": "Kontrola za 10 dana.",
+    }
+    if rng.random() < 0.2:
+        body["JMBG"] = "0101990123456"
+    if rng.random() < 0.1:
+        body["_napomene"] = "Doza nije jasno izgovorena."
+    output = json.dumps(body, ensure_ascii=False, indent=rng.choice([None, 2]))
+    wrap = rng.random()
+    if wrap < 0.2:
+        output = f"```json\n{output}\n```"
+    elif wrap < 0.3:
+        output = f"Evo strukturiranog nalaza:\n{output}\nNadam se da pomaže."
+    elif wrap < 0.35:
+        output = output[: len(output) // 2]
+
+    return {
+        "id": f"case-{i:05d}",
+        "webhook": webhook,
+        "stt": {"language_code": "hrv", "language_probability": confidence, "text": text, "words": words},
+        "agent_output": output,
+    }
+
+
+def generate(path: str, count: int, seed: int = 7):
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(count):
+            f.write(json.dumps(generate_case(i, rng), ensure_ascii=False) + "\n")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+
+    parser = argparse.ArgumentParser(description="Offline replay of the AIMED-transcribe code nodes")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("generate")
+    p.add_argument("out")
+    p.add_argument("count", nargs="?", type=int, default=5000)
+    p = sub.add_parser("run")
+    p.add_argument("cases")
+    p.add_argument("--out")
+    p = sub.add_parser("bench")
+    p.add_argument("cases")
+    p.add_argument("--rounds", type=int, default=5)
+    p.add_argument("--js", action="store_true", help="Also time the embedded jsCode under node")
+    p = sub.add_parser("diff")
+    p.add_argument("cases")
+    p = sub.add_parser("check-js")
+    p.add_argument("cases")
+    args = parser.parse_args()
+
+    if args.command == "generate":
+        generate(args.out, args.count)
+        print(f"Wrote {args.count} cases to {args.out}")
+    elif args.command == "run":
+        results = [run_case(c) for c in load_cases(args.cases)]
+        if args.out:
+            with open(args.out, "w", encoding="utf-8") as f:
+                f.writelines(json.dumps(r, ensure_ascii=False) + "\n" for r in results)
+            print(f"Wrote {len(results)} results to {args.out}")
+        else:
+            for r in results:
+                print(json.dumps({"id": r["id"], "v5": r["v5"]}, ensure_ascii=False))
+    elif args.command == "bench":
+        cases = load_cases(args.cases)
+        print_bench(f"Python port ({len(cases)} cases, best of {args.rounds}):", bench(cases, args.rounds))
+        if args.js:
+            print_bench("Embedded jsCode under node:", run_js(cases, "bench", args.rounds))
+    elif args.command == "diff":
+        buckets, examples = diff_versions([run_case(c) for c in load_cases(args.cases)])
+        total = sum(buckets.values())
+        print(f"v3 vs v5 over {total} cases:")
+        for bucket, count in buckets.most_common():
+            print(f"  {bucket:42s} {count:6d} ({count / total:.1%})  e.g. {examples[bucket]}")
+    elif args.command == "check-js":
+        sys.exit(0 if check_js(load_cases(args.cases)) == 0 else 1)